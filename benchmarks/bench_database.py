@@ -0,0 +1,89 @@
+"""
+Micro-benchmark da camada de base de dados
+
+Compara o padrão antigo (uma ligação aiosqlite nova por chamada) com o
+pool de ligações persistentes usado agora pela classe Database.
+
+Uso:
+    python benchmarks/bench_database.py [--ops 2000]
+"""
+
+import argparse
+import asyncio
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import aiosqlite
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from utils.database import Database
+
+
+async def legacy_get_user_level(db_path, user_id, guild_id):
+    """Leitura como era feita antes (ligação nova por chamada)"""
+    async with aiosqlite.connect(db_path) as db:
+        async with db.execute("""
+            SELECT xp, level, messages_sent, reputation FROM user_levels
+            WHERE user_id = ? AND guild_id = ?
+        """, (user_id, guild_id)) as cursor:
+            return await cursor.fetchone()
+
+
+async def legacy_update_user_level(db_path, user_id, guild_id, xp, level):
+    """Escrita como era feita antes (ligação nova por chamada)"""
+    async with aiosqlite.connect(db_path) as db:
+        await db.execute("""
+            INSERT INTO user_levels (user_id, guild_id, xp, level, messages_sent)
+            VALUES (?, ?, ?, ?, 1)
+            ON CONFLICT(user_id, guild_id)
+            DO UPDATE SET xp = ?, level = ?, messages_sent = messages_sent + 1
+        """, (user_id, guild_id, xp, level, xp, level))
+        await db.commit()
+
+
+async def timed(label, ops, coro_factory):
+    start = time.perf_counter()
+    for i in range(ops):
+        await coro_factory(i)
+    elapsed = time.perf_counter() - start
+    print(f"  {label:<28} {ops / elapsed:>10,.0f} ops/s  ({elapsed:.2f}s)")
+
+
+async def main(ops: int):
+    with tempfile.TemporaryDirectory() as tmp:
+        # Base "antiga": mesmas tabelas, sem pragmas nem ligações persistentes
+        legacy_path = str(Path(tmp) / "legacy.db")
+        setup = Database(legacy_path)
+        await setup.init_db()
+        await setup.close()
+        async with aiosqlite.connect(legacy_path) as db:
+            await db.execute("PRAGMA journal_mode = DELETE")
+
+        pooled = Database(str(Path(tmp) / "pooled.db"))
+        await pooled.init_db()
+
+        users = [str(100000 + i % 500) for i in range(ops)]
+
+        print(f"Leituras ({ops} ops)")
+        await timed("antes (connect por chamada)", ops,
+                    lambda i: legacy_get_user_level(legacy_path, users[i], "1"))
+        await timed("depois (pool)", ops,
+                    lambda i: pooled.get_user_level(users[i], "1"))
+
+        print(f"Escritas ({ops} ops)")
+        await timed("antes (connect por chamada)", ops,
+                    lambda i: legacy_update_user_level(legacy_path, users[i], "1", i, 1))
+        await timed("depois (pool)", ops,
+                    lambda i: pooled.update_user_level(users[i], "1", i, 1))
+
+        await pooled.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--ops", type=int, default=2000)
+    args = parser.parse_args()
+    asyncio.run(main(args.ops))
@@ -0,0 +1,99 @@
+"""
+Benchmark da fila de música
+
+Compara a fila antiga (deque, com `list(queue.queue)[i]` por linha no /queue)
+com a MusicQueue indexada de cogs/music.py numa fila de N músicas: mostrar
+todas as páginas, remover e mover por posição, inserir no meio e adicionar
+uma playlist inteira.
+
+Uso:
+    python benchmarks/bench_music_queue.py [--tracks 10000] [--ops 2000]
+"""
+
+import argparse
+import random
+import sys
+import time
+from collections import deque
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from cogs.music import MusicQueue
+
+
+PER_PAGE = 10
+
+
+def make_tracks(count: int):
+    return [
+        {"title": f"Música {i}", "webpage_url": f"https://youtube.com/watch?v={i:011d}",
+         "url": None, "duration": 180, "uploader": "Canal"}
+        for i in range(count)
+    ]
+
+
+class LegacyQueue:
+    """Operações da fila antiga, tal como eram feitas"""
+
+    def __init__(self):
+        self.queue = deque()
+
+    def page(self, page: int):
+        start = (page - 1) * PER_PAGE
+        end = min(start + PER_PAGE, len(self.queue))
+        return [list(self.queue)[i] for i in range(start, end)]
+
+    def remove(self, index: int):
+        del self.queue[index]
+
+    def move(self, source: int, destination: int):
+        track = self.queue[source]
+        del self.queue[source]
+        self.queue.insert(destination, track)
+
+    def insert(self, index: int, track):
+        self.queue.insert(index, track)
+
+    def add_many(self, tracks):
+        for track in tracks:
+            self.queue.append(track)
+
+
+def timed(label: str, fn):
+    start = time.perf_counter()
+    fn()
+    elapsed = time.perf_counter() - start
+    print(f"  {label:<34} {elapsed * 1000:10.1f} ms")
+    return elapsed
+
+
+def run(name: str, queue, tracks, ops: int):
+    print(name)
+    rng = random.Random(42)
+    timed(f"adicionar {len(tracks):,} músicas", lambda: queue.add_many(tracks))
+    pages = (len(queue.queue) + PER_PAGE - 1) // PER_PAGE
+    timed(f"mostrar as {pages:,} páginas", lambda: [queue.page(p) for p in range(1, pages + 1)])
+    positions = [(rng.randrange(len(tracks) - ops), rng.randrange(len(tracks) - ops)) for _ in range(ops)]
+    timed(f"{ops:,} inserções no meio",
+          lambda: [queue.insert(a, tracks[0]) for a, _ in positions])
+    timed(f"{ops:,} mudanças de posição",
+          lambda: [queue.move(a, b) for a, b in positions])
+    timed(f"{ops:,} remoções por posição",
+          lambda: [queue.remove(a) for a, _ in positions])
+
+
+def main(track_count: int, ops: int):
+    tracks = make_tracks(track_count)
+    print(f"Fila com {track_count:,} músicas\n")
+    run("antes (deque)", LegacyQueue(), tracks, ops)
+    print()
+    run("depois (MusicQueue indexada)", MusicQueue(), tracks, ops)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--tracks", type=int, default=10000)
+    parser.add_argument("--ops", type=int, default=2000)
+    args = parser.parse_args()
+    main(args.tracks, args.ops)
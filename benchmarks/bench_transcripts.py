@@ -0,0 +1,126 @@
+"""
+Benchmark da exportação de transcrições de tickets
+
+Exporta um canal falso com N mensagens (geradas à medida, como as páginas de
+`channel.history`) e compara o padrão "ler tudo para uma lista e escrever no
+fim" com o exportador em streaming de utils/transcripts.py: tempo, memória
+máxima (tracemalloc) e tamanho dos ficheiros comprimidos.
+
+Uso:
+    python benchmarks/bench_transcripts.py [--messages 50000]
+"""
+
+import argparse
+import asyncio
+import gzip
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from types import SimpleNamespace
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from utils.transcripts import (
+    HTML_FOOTER, HTML_HEADER, TranscriptExporter, message_to_dict, message_to_html
+)
+
+
+FRASES = [
+    "Olá, preciso de ajuda com o bot de música, não toca nada.",
+    "Já tentaste sair e voltar a entrar no canal de voz?",
+    "Sim, e continua igual. Aparece um erro a dizer que o vídeo não está disponível.",
+    "Podes enviar um print do erro?",
+    "Aqui está 👇",
+    "Obrigado, vou verificar com a equipa e já te digo algo.",
+    "Ok, fico a aguardar!",
+]
+
+
+class FakeAuthor:
+    def __init__(self, user_id: int, name: str):
+        self.id = user_id
+        self.name = name
+
+    def __str__(self):
+        return self.name
+
+
+class FakeChannel:
+    """Canal com `history` paginado (100 mensagens por página, como a API)"""
+
+    def __init__(self, count: int):
+        self.count = count
+
+    async def history(self, limit=None, oldest_first=True):
+        rng = random.Random(42)
+        authors = [FakeAuthor(1000 + i, f"user{i}") for i in range(5)]
+        start = datetime(2026, 1, 1, tzinfo=timezone.utc)
+        for i in range(self.count):
+            if i % 100 == 0:
+                await asyncio.sleep(0)  # Pedido de uma página
+            yield SimpleNamespace(
+                id=10**17 + i,
+                author=rng.choice(authors),
+                created_at=start + timedelta(seconds=i * 30),
+                edited_at=None,
+                content=rng.choice(FRASES),
+                attachments=[SimpleNamespace(url=f"https://cdn.discordapp.com/attachments/1/{i}/print.png")] if i % 50 == 0 else [],
+                embeds=[],
+            )
+
+
+async def export_in_memory(channel, base: str):
+    """Padrão ingénuo: juntar o histórico todo e escrever no fim"""
+    messages = [message async for message in channel.history(limit=None, oldest_first=True)]
+    data = [message_to_dict(message) for message in messages]
+    html = HTML_HEADER.format(title="Ticket") + "".join(message_to_html(d) for d in data)
+    html += HTML_FOOTER.format(count=len(data))
+    jsonl = "".join(json.dumps(d, ensure_ascii=False) + "\n" for d in data)
+    with gzip.open(f"{base}.html.gz", "wt", encoding="utf-8") as f:
+        f.write(html)
+    with gzip.open(f"{base}.jsonl.gz", "wt", encoding="utf-8") as f:
+        f.write(jsonl)
+    return len(data)
+
+
+def measure(label, coro_factory):
+    tracemalloc.start()
+    start = time.perf_counter()
+    count = asyncio.run(coro_factory())
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"  {label:<22} {elapsed:6.2f}s  {count / elapsed:>9,.0f} msg/s  pico de memória {peak / 2**20:7.1f} MiB")
+
+
+def main(message_count: int):
+    with tempfile.TemporaryDirectory() as tmp:
+        print(f"Transcrição de {message_count:,} mensagens")
+
+        measure("antes (tudo em memória)",
+                lambda: export_in_memory(FakeChannel(message_count), os.path.join(tmp, "naive")))
+
+        exporter = TranscriptExporter(tmp)
+
+        async def streaming():
+            _, _, count = await exporter.export(FakeChannel(message_count), 1, 1)
+            return count
+
+        measure("depois (streaming)", streaming)
+
+        base = exporter.path_for(1, 1)
+        for ext in ("html.gz", "jsonl.gz"):
+            print(f"  {os.path.basename(base)}.{ext}: {os.path.getsize(f'{base}.{ext}') / 2**10:,.0f} KiB")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--messages", type=int, default=50000)
+    args = parser.parse_args()
+    main(args.messages)
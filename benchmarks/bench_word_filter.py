@@ -0,0 +1,94 @@
+"""
+Micro-benchmark do filtro de palavras
+
+Compara o padrão antigo (uma regex por palavra, testadas uma a uma em cada
+mensagem) com a lista compilada de utils/word_filter.py.
+
+Uso:
+    python benchmarks/bench_word_filter.py [--words 10000] [--messages 2000]
+"""
+
+import argparse
+import random
+import re
+import string
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from utils.word_filter import WordFilter
+
+
+FRASES = [
+    "olá pessoal, alguém quer jogar hoje à noite?",
+    "acabei de sair do trabalho, que dia cansativo",
+    "viram o jogo de ontem? que golo incrível",
+    "alguém sabe como se configura o bot de música?",
+    "bom dia a todos! ☕",
+    "isso foi épico lol",
+    "vou fazer uma pausa, volto já",
+    "quem é que ganhou o sorteio da semana passada?",
+    "preciso de ajuda com o trabalho de matemática",
+    "https://youtube.com/watch?v=dQw4w9WgXcQ vejam isto",
+]
+
+
+def legacy_match(words, content):
+    """Verificação como era feita antes (uma regex por palavra)"""
+    content_lower = content.lower()
+    for word in words:
+        pattern = r'\b' + re.escape(word.lower()) + r'\b'
+        if re.search(pattern, content_lower):
+            return word
+    return None
+
+
+def random_word(rng):
+    return "".join(rng.choice(string.ascii_lowercase) for _ in range(rng.randint(4, 10)))
+
+
+def build_messages(rng, words, count):
+    """Mensagens realistas; ~5% com uma palavra proibida (algumas em leetspeak)"""
+    messages = []
+    for _ in range(count):
+        text = " ".join(rng.sample(FRASES, rng.randint(1, 3)))
+        if rng.random() < 0.05:
+            word = rng.choice(words)
+            if rng.random() < 0.5:
+                word = word.replace("a", "4").replace("e", "3").replace("o", "0")
+            text = f"{text} {word}"
+        messages.append(text)
+    return messages
+
+
+def timed(label, messages, match):
+    start = time.perf_counter()
+    hits = sum(1 for message in messages if match(message))
+    elapsed = time.perf_counter() - start
+    print(f"  {label:<28} {len(messages) / elapsed:>10,.0f} msg/s  ({elapsed:.2f}s, {hits} detetadas)")
+
+
+def main(word_count: int, message_count: int):
+    rng = random.Random(42)
+    words = list({random_word(rng) for _ in range(word_count)})
+    messages = build_messages(rng, words, message_count)
+
+    start = time.perf_counter()
+    compiled = WordFilter(words)
+    print(f"Compilação de {len(compiled)} palavras: {time.perf_counter() - start:.2f}s")
+
+    # O padrão antigo é várias ordens de grandeza mais lento; usa uma amostra
+    sample = messages[:max(1, message_count // 40)]
+    print(f"Mensagens ({len(words)} palavras)")
+    timed("antes (regex por palavra)", sample, lambda m: legacy_match(words, m))
+    timed("depois (lista compilada)", messages, compiled.match)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--words", type=int, default=10000)
+    parser.add_argument("--messages", type=int, default=2000)
+    args = parser.parse_args()
+    main(args.words, args.messages)
@@ -4,7 +4,6 @@ Baseado no DroppersShopBOT
 Atualizado com integração SQLite e embeds padronizados
 """
 
-import json
 import os
 import random
 from datetime import datetime, timedelta
@@ -23,8 +22,6 @@ class SimpleEconomy(commands.Cog):
     
     def __init__(self, bot):
         self.bot = bot
-        self.data_file = "data/economy_simple.json"
-        self.data = self.load_data()
         self.db = None  # Será inicializado em cog_load
         
         # Emoji das coins - tentar usar o personalizado primeiro, fallback para Unicode
@@ -73,84 +70,27 @@ class SimpleEconomy(commands.Cog):
             self.coin_emoji = self.coin_emoji_fallback
             return False
     
-    def load_data(self):
-        """Carregar dados do ficheiro JSON"""
-        try:
-            with open(self.data_file, 'r', encoding='utf-8') as f:
-                return json.load(f)
-        except (FileNotFoundError, json.JSONDecodeError):
-            return {"users": {}}
-    
-    def save_data(self):
-        """Guardar dados no ficheiro JSON com tratamento de erros"""
-        try:
-            # Criar backup antes de salvar
-            if os.path.exists(self.data_file):
-                backup_file = f"{self.data_file}.backup"
-                with open(self.data_file, 'r', encoding='utf-8') as f:
-                    backup_data = f.read()
-                with open(backup_file, 'w', encoding='utf-8') as f:
-                    f.write(backup_data)
-            
-            # Salvar dados
-            with open(self.data_file, 'w', encoding='utf-8') as f:
-                json.dump(self.data, f, indent=2, ensure_ascii=False)
-                
-        except Exception as e:
-            self.bot.logger.error(f"Erro ao guardar dados de economia: {e}")
-            # Tentar restaurar do backup se falhou
-            if os.path.exists(f"{self.data_file}.backup"):
-                try:
-                    with open(f"{self.data_file}.backup", 'r', encoding='utf-8') as f:
-                        self.data = json.load(f)
-                    self.bot.logger.info("Dados restaurados do backup")
-                except:
-                    pass
-    
-    def get_user_data(self, user_id: str):
+    async def get_user_data(self, user_id: str):
         """Obter dados do utilizador"""
-        if user_id not in self.data["users"]:
-            self.data["users"][user_id] = {
-                "balance": 2500,  # Saldo inicial como no DroppersShopBOT
-                "last_daily": None,
-                "last_work": None,
-                "last_crime": None,
-                "daily_streak": 0,
-                "total_earned": 2500,
-                "total_donated": 0,
-                "items": []
-            }
-            self.save_data()
-        return self.data["users"][user_id]
+        return await self.db.get_economy_user(user_id)
     
-    def add_money(self, user_id: str, amount: int):
+    async def add_money(self, user_id: str, amount: int):
         """Adicionar dinheiro ao utilizador"""
-        user_data = self.get_user_data(user_id)
-        user_data["balance"] += amount
-        user_data["total_earned"] += amount
-        self.save_data()
-        return user_data["balance"]
+        return await self.db.add_money(user_id, amount)
     
-    def remove_money(self, user_id: str, amount: int):
-        """Remover dinheiro do utilizador"""
-        user_data = self.get_user_data(user_id)
-        if user_data["balance"] >= amount:
-            user_data["balance"] -= amount
-            self.save_data()
-            return True
-        return False
+    async def remove_money(self, user_id: str, amount: int):
+        """Remover dinheiro do utilizador (False se não houver saldo)"""
+        return await self.db.debit_if_sufficient(user_id, amount) is not None
     
-    def get_balance(self, user_id: str):
+    async def get_balance(self, user_id: str):
         """Obter saldo do utilizador"""
-        return self.get_user_data(user_id)["balance"]
+        return await self.db.get_user_balance(user_id)
 
     async def _process_custom_role_purchase(self, interaction, user_id, item_info):
         """Processar compra de Custom Role"""
-        # Verificar se o usuário já tem uma custom role
-        user_data = self.get_user_data(user_id)
-        
         # Verificar se já comprou uma custom role
-        has_custom_role = any(item.get("name") == "🎨 Custom Role" for item in user_data.get("items", []))
+        items = await self.db.get_user_items(user_id)
+        has_custom_role = any(item.get("name") == "🎨 Custom Role" for item in items)
         
         if has_custom_role:
             embed = discord.Embed(
@@ -162,13 +102,13 @@ class SimpleEconomy(commands.Cog):
             return
         
         # Processar a compra
-        self.remove_money(user_id, item_info["price"])
-        user_data["items"].append({
+        if not await self.remove_money(user_id, item_info["price"]):
+            return await interaction.response.send_message("❌ Não tens EPA Coins suficientes!", ephemeral=True)
+        await self.db.add_user_item(user_id, {
             "name": item_info["name"],
             "purchased": datetime.now().isoformat(),
             "role_created": False
         })
-        self.save_data()
         
         embed = discord.Embed(
             title="✅ Custom Role Comprada!",
@@ -180,7 +120,7 @@ class SimpleEconomy(commands.Cog):
         
         embed.add_field(
             name="💳 Saldo Restante",
-            value=f"{self.get_coin_display(self.get_balance(user_id))}",
+            value=f"{self.get_coin_display(await self.get_balance(user_id))}",
             inline=True
         )
         
@@ -190,7 +130,7 @@ class SimpleEconomy(commands.Cog):
     async def balance(self, interaction: discord.Interaction, utilizador: Optional[discord.Member] = None):
         """Ver saldo próprio ou de outro utilizador"""
         target = utilizador or interaction.user
-        user_data = self.get_user_data(str(target.id))
+        user_data = await self.get_user_data(str(target.id))
         
         embed = discord.Embed(
             title=f"💰 Saldo de {target.display_name}",
@@ -224,7 +164,7 @@ class SimpleEconomy(commands.Cog):
     async def daily(self, interaction: discord.Interaction):
         """Recompensa diária com sistema de streak como no DroppersShopBOT"""
         user_id = str(interaction.user.id)
-        user_data = self.get_user_data(user_id)
+        user_data = await self.get_user_data(user_id)
         now = datetime.now()
         
         # Verificar se já recebeu hoje
@@ -269,9 +209,8 @@ class SimpleEconomy(commands.Cog):
         total_reward = int((base_reward + bonus) * streak_multiplier)
         
         # Atualizar dados
-        user_data["last_daily"] = now.isoformat()
-        user_data["daily_streak"] = streak
-        self.add_money(user_id, total_reward)
+        await self.db.update_economy_user(user_id, last_daily=now.isoformat(), daily_streak=streak)
+        new_balance = await self.add_money(user_id, total_reward)
         
         embed = discord.Embed(
             title="🎁 Recompensa Diária",
@@ -293,7 +232,7 @@ class SimpleEconomy(commands.Cog):
         
         embed.add_field(
             name="💳 Novo Saldo",
-            value=f"{self.get_coin_display(self.get_balance(user_id))}",
+            value=f"{self.get_coin_display(new_balance)}",
             inline=True
         )
         
@@ -318,7 +257,7 @@ class SimpleEconomy(commands.Cog):
     async def work(self, interaction: discord.Interaction):
         """Trabalhar para ganhar coins (cooldown 1h)"""
         user_id = str(interaction.user.id)
-        user_data = self.get_user_data(user_id)
+        user_data = await self.get_user_data(user_id)
         now = datetime.now()
         
         # Verificar cooldown (1 hora)
@@ -384,8 +323,8 @@ class SimpleEconomy(commands.Cog):
             bonus_msg = f"\n🎁 **Bónus:** +{self.get_coin_display(bonus)}"
         
         # Atualizar dados
-        user_data["last_work"] = now.isoformat()
-        self.add_money(user_id, reward)
+        await self.db.update_economy_user(user_id, last_work=now.isoformat())
+        new_balance = await self.add_money(user_id, reward)
         
         embed = discord.Embed(
             title=f"{job['emoji']} Trabalho Completo!",
@@ -401,7 +340,7 @@ class SimpleEconomy(commands.Cog):
         
         embed.add_field(
             name="💳 Novo Saldo",
-            value=self.get_coin_display(self.get_balance(user_id)),
+            value=self.get_coin_display(new_balance),
             inline=True
         )
         
@@ -414,7 +353,7 @@ class SimpleEconomy(commands.Cog):
     async def crime(self, interaction: discord.Interaction):
         """Cometer crime com risco/recompensa alta (cooldown 2h)"""
         user_id = str(interaction.user.id)
-        user_data = self.get_user_data(user_id)
+        user_data = await self.get_user_data(user_id)
         now = datetime.now()
         
         # Verificar cooldown (2 horas)
@@ -468,7 +407,7 @@ class SimpleEconomy(commands.Cog):
         crime_choice = random.choice(crimes)
         success = random.random() < crime_choice["success_rate"]
         
-        user_data["last_crime"] = now.isoformat()
+        await self.db.update_economy_user(user_id, last_crime=now.isoformat())
         
         if success:
             # Crime bem sucedido
@@ -481,7 +420,7 @@ class SimpleEconomy(commands.Cog):
                 reward += jackpot_bonus
                 jackpot = f"\n💎 **JACKPOT!** +{self.get_coin_display(jackpot_bonus)}"
             
-            self.add_money(user_id, reward)
+            await self.add_money(user_id, reward)
             
             success_messages = [
                 "Conseguiste escapar sem ser visto!",
@@ -498,19 +437,19 @@ class SimpleEconomy(commands.Cog):
             )
             
             embed.add_field(name="💰 Ganhos", value=self.get_coin_display(reward), inline=True)
-            embed.add_field(name="💳 Novo Saldo", value=self.get_coin_display(self.get_balance(user_id)), inline=True)
+            embed.add_field(name="💳 Novo Saldo", value=self.get_coin_display(await self.get_balance(user_id)), inline=True)
             embed.add_field(name="🎯 Taxa de Sucesso", value=f"{int(crime_choice['success_rate'] * 100)}%", inline=True)
             
         else:
             # Crime falhado
             penalty = random.randint(crime_choice["fail_penalty"][0], crime_choice["fail_penalty"][1])
             
-            current_balance = self.get_balance(user_id)
+            current_balance = await self.get_balance(user_id)
             if current_balance < penalty:
                 penalty = current_balance  # Não deixar ficar negativo
             
-            if penalty > 0:
-                self.remove_money(user_id, penalty)
+            if penalty > 0 and not await self.remove_money(user_id, penalty):
+                penalty = 0
             
             fail_messages = [
                 "Foste apanhado pela polícia!",
@@ -527,7 +466,7 @@ class SimpleEconomy(commands.Cog):
             )
             
             embed.add_field(name="💸 Multa", value=self.get_coin_display(penalty), inline=True)
-            embed.add_field(name="💳 Saldo Restante", value=self.get_coin_display(self.get_balance(user_id)), inline=True)
+            embed.add_field(name="💳 Saldo Restante", value=self.get_coin_display(await self.get_balance(user_id)), inline=True)
             embed.add_field(name="🎯 Taxa de Sucesso", value=f"{int(crime_choice['success_rate'] * 100)}%", inline=True)
         
         next_timestamp = int((now + timedelta(seconds=cooldown_seconds)).timestamp())
@@ -543,7 +482,7 @@ class SimpleEconomy(commands.Cog):
     async def gamble(self, interaction: discord.Interaction, jogo: str, quantia: int):
         """Sistema de apostas completo como no DroppersShopBOT"""
         user_id = str(interaction.user.id)
-        balance = self.get_balance(user_id)
+        balance = await self.get_balance(user_id)
         
         # Validações
         if quantia <= 0:
@@ -633,17 +572,19 @@ class SimpleEconomy(commands.Cog):
         # Processar resultado
         if won:
             winnings = quantia * multiplier
-            self.add_money(user_id, winnings - quantia)  # Subtrair aposta original
+            new_balance = await self.add_money(user_id, winnings - quantia)  # Subtrair aposta original
             embed.add_field(
                 name="🎉 Ganhaste!",
-                value=f"💰 Ganhaste **{self.get_coin_display(winnings)} EPA Coins**! (x{multiplier})\n💳 Novo saldo: **{self.get_coin_display(self.get_balance(user_id))}**",
+                value=f"💰 Ganhaste **{self.get_coin_display(winnings)} EPA Coins**! (x{multiplier})\n💳 Novo saldo: **{self.get_coin_display(new_balance)}**",
                 inline=False
             )
         else:
-            self.remove_money(user_id, quantia)
+            new_balance = await self.db.debit_if_sufficient(user_id, quantia, "gamble")
+            if new_balance is None:
+                return await interaction.response.send_message("❌ Não tens EPA Coins suficientes!", ephemeral=True)
             embed.add_field(
                 name="😢 Perdeste!",
-                value=f"💸 Perdeste **{self.get_coin_display(quantia)} EPA Coins**\n💳 Saldo restante: **{self.get_coin_display(self.get_balance(user_id))}**",
+                value=f"💸 Perdeste **{self.get_coin_display(quantia)} EPA Coins**\n💳 Saldo restante: **{self.get_coin_display(new_balance)}**",
                 inline=False
             )
         
@@ -668,10 +609,10 @@ class SimpleEconomy(commands.Cog):
         sender_id = str(interaction.user.id)
         receiver_id = str(utilizador.id)
         
-        if not self.remove_money(sender_id, quantia):
+        balances = await self.db.transfer_atomic(sender_id, receiver_id, quantia)
+        if balances is None:
             return await interaction.response.send_message("❌ Não tens EPA Coins suficientes!", ephemeral=True)
-        
-        self.add_money(receiver_id, quantia)
+        sender_balance, receiver_balance = balances
         
         embed = discord.Embed(
             title="💸 Transferência Realizada",
@@ -681,13 +622,13 @@ class SimpleEconomy(commands.Cog):
         
         embed.add_field(
             name="💳 Teu Saldo",
-            value=f"{self.get_coin_display(self.get_balance(sender_id))}",
+            value=f"{self.get_coin_display(sender_balance)}",
             inline=True
         )
         
         embed.add_field(
             name="💳 Saldo do Destinatário",
-            value=f"{self.get_coin_display(self.get_balance(receiver_id))}",
+            value=f"{self.get_coin_display(receiver_balance)}",
             inline=True
         )
         
@@ -697,18 +638,17 @@ class SimpleEconomy(commands.Cog):
     async def leaderboard(self, interaction: discord.Interaction):
         """Mostrar ranking de utilizadores"""
         # Obter todos os utilizadores e ordenar por saldo
+        # O ranking de saldo é global; mostrar só membros deste servidor
         all_users = []
-        for user_id, data in self.data["users"].items():
-            balance = data.get("balance", 0)
-            if balance > 0:
-                try:
-                    user = interaction.guild.get_member(int(user_id))
-                    if user:
-                        all_users.append((user, balance))
-                except:
-                    continue
-        
-        all_users.sort(key=lambda x: x[1], reverse=True)
+        for row in await self.db.get_top_richest(limit=500):
+            try:
+                user = interaction.guild.get_member(int(row["user_id"]))
+                if user:
+                    all_users.append((user, row["balance"]))
+            except:
+                continue
+            if len(all_users) >= 10:
+                break
         
         if not all_users:
             embed = discord.Embed(
@@ -735,15 +675,13 @@ class SimpleEconomy(commands.Cog):
         
         # Mostrar posição do utilizador atual se não estiver no top 10
         user_position = None
-        for i, (user, balance) in enumerate(all_users, 1):
-            if user.id == interaction.user.id:
-                user_position = i
-                break
+        if not any(user.id == interaction.user.id for user, _ in all_users):
+            user_position = await self.db.get_balance_rank(str(interaction.user.id))
         
-        if user_position and user_position > 10:
-            user_balance = self.get_balance(str(interaction.user.id))
+        if user_position:
+            user_balance = await self.get_balance(str(interaction.user.id))
             embed.add_field(
-                name=f"📍 A tua posição: #{user_position}",
+                name=f"📍 A tua posição global: #{user_position}",
                 value=f"💰 {self.get_coin_display(user_balance)}",
                 inline=False
             )
@@ -784,7 +722,7 @@ class SimpleEconomy(commands.Cog):
     async def buy(self, interaction: discord.Interaction, item: str):
         """Comprar itens da loja"""
         user_id = str(interaction.user.id)
-        balance = self.get_balance(user_id)
+        balance = await self.get_balance(user_id)
         
         # Mapear itens da loja
         shop_items = {
@@ -824,13 +762,12 @@ class SimpleEconomy(commands.Cog):
             return
         
         # Processar outras compras
-        self.remove_money(user_id, item_info["price"])
-        user_data = self.get_user_data(user_id)
-        user_data["items"].append({
+        if not await self.remove_money(user_id, item_info["price"]):
+            return await interaction.response.send_message("❌ Não tens EPA Coins suficientes!", ephemeral=True)
+        await self.db.add_user_item(user_id, {
             "name": item_info["name"],
             "purchased": datetime.now().isoformat()
         })
-        self.save_data()
         
         embed = discord.Embed(
             title="✅ Compra Realizada",
@@ -840,7 +777,7 @@ class SimpleEconomy(commands.Cog):
         
         embed.add_field(
             name="💳 Saldo Restante",
-            value=f"{self.get_coin_display(self.get_balance(user_id))}",
+            value=f"{self.get_coin_display(await self.get_balance(user_id))}",
             inline=True
         )
         
@@ -851,7 +788,7 @@ class SimpleEconomy(commands.Cog):
     async def profile(self, interaction: discord.Interaction, utilizador: Optional[discord.Member] = None):
         """Ver perfil económico detalhado"""
         target = utilizador or interaction.user
-        user_data = self.get_user_data(str(target.id))
+        user_data = await self.get_user_data(str(target.id))
         
         embed = discord.Embed(
             title=f"👤 Perfil de {target.display_name}",
@@ -888,14 +825,12 @@ class SimpleEconomy(commands.Cog):
         
         embed.add_field(
             name="🛍️ Itens Comprados",
-            value=f"{len(user_data.get('items', []))} itens",
+            value=f"{len(await self.db.get_user_items(str(target.id)))} itens",
             inline=True
         )
         
         # Calcular ranking
-        all_balances = [(uid, data.get('balance', 0)) for uid, data in self.data["users"].items()]
-        all_balances.sort(key=lambda x: x[1], reverse=True)
-        position = next((i for i, (uid, _) in enumerate(all_balances, 1) if uid == str(target.id)), "N/A")
+        position = await self.db.get_balance_rank(str(target.id)) or "N/A"
         
         embed.add_field(
             name="🏆 Ranking",
@@ -914,10 +849,10 @@ class SimpleEconomy(commands.Cog):
     async def create_custom_role_disabled(self, interaction: discord.Interaction, nome: str, cor: str = "#7289DA"):
         """Criar/personalizar Custom Role"""
         user_id = str(interaction.user.id)
-        user_data = self.get_user_data(user_id)
+        items = await self.db.get_user_items(user_id)
         
         # Verificar se comprou Custom Role
-        has_custom_role = any(item.get("name") == "🎨 Custom Role" for item in user_data.get("items", []))
+        has_custom_role = any(item.get("name") == "🎨 Custom Role" for item in items)
         
         if not has_custom_role:
             embed = discord.Embed(
@@ -1005,12 +940,12 @@ class SimpleEconomy(commands.Cog):
                 action = "criada"
                 
             # Marcar como criada nos dados
-            for item in user_data["items"]:
+            for item in reversed(items):
                 if item.get("name") == "🎨 Custom Role":
                     item["role_created"] = True
                     item["role_name"] = role_name
+                    await self.db.update_user_item(user_id, item["name"], item)
                     break
-            self.save_data()
             
             embed = discord.Embed(
                 title=f"✅ Custom Role {action.title()}!",
@@ -1061,7 +996,7 @@ class SimpleEconomy(commands.Cog):
         if quantia <= 0:
             return await interaction.response.send_message("❌ A quantia deve ser positiva!", ephemeral=True)
         
-        self.add_money(str(utilizador.id), quantia)
+        new_balance = await self.add_money(str(utilizador.id), quantia)
         
         embed = discord.Embed(
             title="✅ EPA Coins Adicionadas",
@@ -1071,7 +1006,7 @@ class SimpleEconomy(commands.Cog):
         
         embed.add_field(
             name="💳 Novo Saldo",
-            value=f"{self.get_coin_display(self.get_balance(str(utilizador.id)))}",
+            value=f"{self.get_coin_display(new_balance)}",
             inline=True
         )
         
@@ -1091,7 +1026,7 @@ class SimpleEconomy(commands.Cog):
         if quantia <= 0:
             return await interaction.response.send_message("❌ A quantia deve ser positiva!", ephemeral=True)
         
-        if self.remove_money(str(utilizador.id), quantia):
+        if await self.remove_money(str(utilizador.id), quantia):
             embed = discord.Embed(
                 title="✅ EPA Coins Removidas",
                 description=f"Removeste **{self.get_coin_display(quantia)} EPA Coins** de {utilizador.mention}",
@@ -1100,7 +1035,7 @@ class SimpleEconomy(commands.Cog):
             
             embed.add_field(
                 name="💳 Novo Saldo",
-                value=f"{self.get_coin_display(self.get_balance(str(utilizador.id)))}",
+                value=f"{self.get_coin_display(await self.get_balance(str(utilizador.id)))}",
                 inline=True
             )
         else:
@@ -1120,10 +1055,7 @@ class SimpleEconomy(commands.Cog):
         if not interaction.user.guild_permissions.administrator:
             return await interaction.response.send_message("❌ Apenas administradores podem usar este comando!", ephemeral=True)
         
-        user_id = str(utilizador.id)
-        if user_id in self.data["users"]:
-            del self.data["users"][user_id]
-            self.save_data()
+        await self.db.delete_economy_user(str(utilizador.id))
         
         embed = discord.Embed(
             title="✅ Utilizador Resetado",
@@ -1164,8 +1096,8 @@ class SimpleEconomy(commands.Cog):
             return
         
         # Verificar saldos
-        user_balance = self.get_balance(user_id)
-        target_balance = self.get_balance(target_id)
+        user_balance = await self.get_balance(user_id)
+        target_balance = await self.get_balance(target_id)
         
         if user_balance < quantia:
             await interaction.response.send_message(f"❌ Não tens EPA Coins suficientes! Saldo: {self.get_coin_display(user_balance)}", ephemeral=True)
@@ -1203,9 +1135,18 @@ class SimpleEconomy(commands.Cog):
         challenger_id = str(challenger.id)
         challenged_id = str(challenged.id)
         
-        # Remover dinheiro de ambos
-        self.remove_money(challenger_id, amount)
-        self.remove_money(challenged_id, amount)
+        # Remover dinheiro de ambos (tudo ou nada)
+        stakes = await self.db.batch_apply([
+            (challenger_id, -amount, "pvp_bet"),
+            (challenged_id, -amount, "pvp_bet"),
+        ])
+        if stakes is None:
+            embed = discord.Embed(
+                title="❌ Aposta Cancelada",
+                description="Um dos jogadores já não tem EPA Coins suficientes!",
+                color=discord.Color.red()
+            )
+            return await interaction.edit_original_response(embed=embed, view=None)
         
         # Determinar vencedor baseado no jogo
         if game_type == "coinflip":
@@ -1262,7 +1203,7 @@ class SimpleEconomy(commands.Cog):
         # Processar resultado
         if winner:
             # Vencedor recebe o dobro
-            self.add_money(str(winner.id), amount * 2)
+            await self.add_money(str(winner.id), amount * 2)
             embed.add_field(
                 name="🏆 Vencedor",
                 value=f"{winner.mention} ganhou {self.get_coin_display(amount * 2)}!",
@@ -1270,8 +1211,8 @@ class SimpleEconomy(commands.Cog):
             )
         else:
             # Empate - devolver dinheiro
-            self.add_money(challenger_id, amount)
-            self.add_money(challenged_id, amount)
+            await self.add_money(challenger_id, amount)
+            await self.add_money(challenged_id, amount)
             embed.add_field(
                 name="🤝 Empate",
                 value="Dinheiro devolvido a ambos os jogadores!",
@@ -1288,14 +1229,14 @@ class SimpleEconomy(commands.Cog):
         
         # Custo do bilhete
         ticket_cost = 100
-        balance = self.get_balance(user_id)
+        balance = await self.get_balance(user_id)
         
         if balance < ticket_cost:
             await interaction.response.send_message(f"❌ Precisas de {self.get_coin_display(ticket_cost)} para comprar um bilhete!", ephemeral=True)
             return
         
         # Verificar se já comprou bilhete esta semana
-        user_data = self.get_user_data(user_id)
+        user_data = await self.get_user_data(user_id)
         now = datetime.utcnow()
         week_start = now - timedelta(days=now.weekday())
         week_key = week_start.strftime("%Y-W%U")
@@ -1305,7 +1246,9 @@ class SimpleEconomy(commands.Cog):
             return
         
         # Comprar bilhete
-        self.remove_money(user_id, ticket_cost)
+        if not await self.remove_money(user_id, ticket_cost):
+            await interaction.response.send_message(f"❌ Precisas de {self.get_coin_display(ticket_cost)} para comprar um bilhete!", ephemeral=True)
+            return
         user_data["lottery_week"] = week_key
         user_data["lottery_tickets"] = user_data.get("lottery_tickets", 0) + 1
         
@@ -1325,7 +1268,7 @@ class SimpleEconomy(commands.Cog):
         if random.randint(1, 20) == 1:
             # Ganhou!
             prize = random.randint(500, 2000)
-            self.add_money(user_id, prize)
+            await self.add_money(user_id, prize)
             
             embed.title = "🎉 PARABÉNS! GANHASTE A LOTERIA!"
             embed.color = discord.Color.green()
@@ -1351,7 +1294,10 @@ class SimpleEconomy(commands.Cog):
             inline=False
         )
         
-        self.save_data()
+        await self.db.update_economy_user(
+            user_id,
+            **{k: user_data[k] for k in ("lottery_week", "lottery_tickets", "lottery_wins", "total_lottery_won") if k in user_data}
+        )
         await interaction.response.send_message(embed=embed)
 
     # DESATIVADO - USE /criar_evento (em economy_advanced.py)
@@ -1391,7 +1337,7 @@ class SimpleEconomy(commands.Cog):
             
             for member in interaction.guild.members:
                 if not member.bot:
-                    self.add_money(str(member.id), rain_amount)
+                    await self.add_money(str(member.id), rain_amount)
                     members_count += 1
             
             embed.add_field(
@@ -1399,8 +1345,6 @@ class SimpleEconomy(commands.Cog):
                 value=f"{self.get_coin_display(rain_amount)} para {members_count} membros!",
                 inline=False
             )
-            
-            self.save_data()
         
         embed.add_field(name="⚙️ Configurado por", value=interaction.user.mention, inline=True)
         embed.set_footer(text="Os eventos são temporários e podem ser desativados a qualquer momento.")
@@ -1426,7 +1370,7 @@ class BetChallengeView(discord.ui.View):
             return
         
         # Verificar se ainda tem dinheiro suficiente
-        balance = self.economy_cog.get_balance(str(self.challenged.id))
+        balance = await self.economy_cog.get_balance(str(self.challenged.id))
         if balance < self.amount:
             await interaction.response.send_message("❌ Já não tens EPA Coins suficientes!", ephemeral=True)
             return
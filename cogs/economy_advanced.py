@@ -103,7 +103,7 @@ class EconomyAdvanced(commands.Cog):
         if not economy_cog:
             return await interaction.followup.send("❌ Sistema de economia não disponível!")
         
-        balance = economy_cog.get_balance(user_id)
+        balance = await economy_cog.get_balance(user_id)
         price = 50000
         
         if balance < price:
@@ -137,6 +137,11 @@ class EconomyAdvanced(commands.Cog):
         except:
             return await interaction.followup.send("❌ Cor inválida! Use formato hex (#FF5733) ou nome (red, blue, etc.)")
         
+        # Deduzir coins antes de criar a role (devolvidas se a criação falhar)
+        new_balance = await self.db.debit_if_sufficient(user_id, price, "custom_role", "Compra de Custom Role")
+        if new_balance is None:
+            return await interaction.followup.send(f"❌ Precisas de **{self.get_coin_display(price)}** para comprar uma Custom Role!")
+        
         try:
             # Criar role no Discord
             role = await interaction.guild.create_role(
@@ -162,24 +167,23 @@ class EconomyAdvanced(commands.Cog):
                 role_color=str(color_value)
             )
             
-            # Deduzir coins
-            economy_cog.remove_money(user_id, price)
-            
             embed = discord.Embed(
                 title="✅ Custom Role Criada!",
                 description=f"**{nome}** foi criada e atribuída!",
                 color=color_value
             )
             embed.add_field(name="💰 Custo", value=self.get_coin_display(price), inline=True)
-            embed.add_field(name="💳 Saldo Restante", value=self.get_coin_display(economy_cog.get_balance(user_id)), inline=True)
+            embed.add_field(name="💳 Saldo Restante", value=self.get_coin_display(new_balance), inline=True)
             embed.add_field(name="🎨 Cor", value=str(color_value), inline=True)
             embed.set_footer(text="Usa /editar_role para mudar nome ou cor!")
             
             await interaction.followup.send(embed=embed)
             
         except discord.Forbidden:
+            await self.db.add_money(user_id, price, "refund", "Custom Role não criada")
             await interaction.followup.send("❌ Não tenho permissões para criar roles!")
         except Exception as e:
+            await self.db.add_money(user_id, price, "refund", "Custom Role não criada")
             await interaction.followup.send(f"❌ Erro ao criar role: {e}")
     
     @app_commands.command(name="editar_role", description="Edita a tua custom role (grátis)")
@@ -313,7 +317,7 @@ class EconomyAdvanced(commands.Cog):
         # Verificar saldo do sender
         from cogs.economy import SimpleEconomy
         economy_cog = self.bot.get_cog("SimpleEconomy")
-        sender_balance = economy_cog.get_balance(str(interaction.user.id))
+        sender_balance = await economy_cog.get_balance(str(interaction.user.id))
         
         if sender_balance < tuas_coins:
             return await interaction.followup.send(f"❌ Não tens {self.get_coin_display(tuas_coins)}!")
@@ -531,16 +535,11 @@ class EconomyAdvanced(commands.Cog):
         if valor < min_bid:
             return await interaction.followup.send(f"❌ Lance mínimo: {self.get_coin_display(min_bid)}")
         
-        # Verificar saldo
-        from cogs.economy import SimpleEconomy
-        economy_cog = self.bot.get_cog("SimpleEconomy")
-        balance = economy_cog.get_balance(str(interaction.user.id))
-        
-        if balance < valor:
-            return await interaction.followup.send(f"❌ Não tens {self.get_coin_display(valor)}!")
-        
-        # Registar lance
-        await self.db.place_bid(leilao_id, str(interaction.user.id), valor)
+        # Registar lance (saldo e lance atual verificados na mesma transação)
+        if not await self.db.place_bid(leilao_id, str(interaction.user.id), valor):
+            return await interaction.followup.send(
+                f"❌ Lance recusado! Precisas de ter {self.get_coin_display(valor)} e o lance tem de superar o atual."
+            )
         
         embed = discord.Embed(
             title="✅ Lance Registado!",
@@ -659,36 +658,18 @@ class TradeView(discord.ui.View):
         
         await interaction.response.defer()
         
-        # Obter trade
-        trade = await self.cog.db.get_trade(self.trade_id)
+        # Executar trade (saldos, transferências e status numa única transação)
+        result = await self.cog.db.settle_trade(self.trade_id)
         
-        if not trade or trade['status'] != 'pending':
+        if result == "unavailable":
             return await interaction.followup.send("❌ Trade já não está disponível!")
         
-        # Verificar saldos
-        sender_balance = self.economy_cog.get_balance(trade['sender_id'])
-        receiver_balance = self.economy_cog.get_balance(trade['receiver_id'])
-        
-        if sender_balance < trade['sender_offer_coins']:
-            await self.cog.db.update_trade_status(self.trade_id, "cancelled")
+        if result == str(self.sender.id):
             return await interaction.followup.send("❌ O remetente não tem coins suficientes!")
         
-        if receiver_balance < trade['receiver_offer_coins']:
-            await self.cog.db.update_trade_status(self.trade_id, "cancelled")
+        if result != "completed":
             return await interaction.followup.send("❌ Não tens coins suficientes!")
         
-        # Executar trade
-        if trade['sender_offer_coins'] > 0:
-            self.economy_cog.remove_money(trade['sender_id'], trade['sender_offer_coins'])
-            self.economy_cog.add_money(trade['receiver_id'], trade['sender_offer_coins'])
-        
-        if trade['receiver_offer_coins'] > 0:
-            self.economy_cog.remove_money(trade['receiver_id'], trade['receiver_offer_coins'])
-            self.economy_cog.add_money(trade['sender_id'], trade['receiver_offer_coins'])
-        
-        # Atualizar status
-        await self.cog.db.update_trade_status(self.trade_id, "completed")
-        
         embed = discord.Embed(
             title="✅ Trade Completado!",
             description=f"Trade entre {self.sender.mention} e {self.receiver.mention} foi completado com sucesso!",
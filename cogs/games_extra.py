@@ -132,7 +132,7 @@ class GamesExtraCog(commands.Cog):
                 try:
                     economy_cog = self.bot.get_cog("SimpleEconomy")
                     if economy_cog:
-                        economy_cog.add_money(str(user_id), 50)
+                        await economy_cog.add_money(str(user_id), 50)
                         result_embed.add_field(name="💰 Recompensa", value="50 EPA Coins!", inline=False)
                 except:
                     pass
@@ -303,7 +303,7 @@ class GamesExtraCog(commands.Cog):
             try:
                 economy_cog = self.bot.get_cog("SimpleEconomy")
                 if economy_cog:
-                    economy_cog.add_money(str(user_id), reward)
+                    await economy_cog.add_money(str(user_id), reward)
                     embed.add_field(name="💰 Recompensa", value=f"{reward} EPA Coins!", inline=False)
             except:
                 pass
@@ -343,11 +343,10 @@ class GamesExtraCog(commands.Cog):
         try:
             economy_cog = self.bot.get_cog("SimpleEconomy")
             if economy_cog:
-                balance = economy_cog.get_balance(str(user_id))
-                if balance < aposta:
+                if not await economy_cog.remove_money(str(user_id), aposta):
+                    balance = await economy_cog.get_balance(str(user_id))
                     await interaction.response.send_message(f"❌ Não tens EPA Coins suficientes! Saldo: {balance}", ephemeral=True)
                     return
-                economy_cog.remove_money(str(user_id), aposta)
         except:
             await interaction.response.send_message("❌ Sistema de economia não disponível!", ephemeral=True)
             return
@@ -468,7 +467,7 @@ class GamesExtraCog(commands.Cog):
                 try:
                     economy_cog = self.bot.get_cog("SimpleEconomy")
                     if economy_cog:
-                        economy_cog.add_money(str(user_id), bet * 2)
+                        await economy_cog.add_money(str(user_id), bet * 2)
                         embed.add_field(name="💰 Ganhos", value=f"{bet * 2} EPA Coins!", inline=False)
                 except:
                     pass
@@ -483,7 +482,7 @@ class GamesExtraCog(commands.Cog):
                 try:
                     economy_cog = self.bot.get_cog("SimpleEconomy")
                     if economy_cog:
-                        economy_cog.add_money(str(user_id), bet * 2)
+                        await economy_cog.add_money(str(user_id), bet * 2)
                         embed.add_field(name="💰 Ganhos", value=f"{bet * 2} EPA Coins!", inline=False)
                 except:
                     pass
@@ -498,7 +497,7 @@ class GamesExtraCog(commands.Cog):
                 try:
                     economy_cog = self.bot.get_cog("SimpleEconomy")
                     if economy_cog:
-                        economy_cog.add_money(str(user_id), bet)
+                        await economy_cog.add_money(str(user_id), bet)
                 except:
                     pass
                     
@@ -766,7 +765,7 @@ class ReactionGameView(discord.ui.View):
                 try:
                     economy_cog = self.cog.bot.get_cog("SimpleEconomy")
                     if economy_cog:
-                        economy_cog.add_money(str(self.user_id), reward)
+                        await economy_cog.add_money(str(self.user_id), reward)
                 except:
                     pass
             else:
@@ -829,7 +828,7 @@ class MathGameView(discord.ui.View):
                 try:
                     economy_cog = self.cog.bot.get_cog("SimpleEconomy")
                     if economy_cog:
-                        economy_cog.add_money(str(self.user_id), reward)
+                        await economy_cog.add_money(str(self.user_id), reward)
                 except:
                     pass
             else:
@@ -934,7 +933,7 @@ class MemoryGameView(discord.ui.View):
                         try:
                             economy_cog = self.cog.bot.get_cog("SimpleEconomy")
                             if economy_cog:
-                                economy_cog.add_money(str(self.user_id), reward)
+                                await economy_cog.add_money(str(self.user_id), reward)
                         except:
                             pass
                         
@@ -10,13 +10,14 @@ from datetime import datetime, timedelta
 from typing import Optional
 import asyncio
 import json
-import os
-import re
 import aiosqlite
 
 from utils.embeds import EmbedBuilder
 from utils.database import get_database
 from utils.logger import bot_logger
+from utils.link_filter import PhishingFeed, extract_links, is_invite
+from utils.moderation_config import GuildModerationConfig, ModerationConfigStore
+from utils.rate_window import SlidingWindow
 
 
 class Moderation(commands.Cog):
@@ -30,17 +31,17 @@ class Moderation(commands.Cog):
         self.bot = bot
         self.logger = bot.logger
         self.config_file = "config/moderation_config.json"
-        self.quarantine_users = {}  # {user_id: timestamp}
         
-        # Anti-spam tracking
-        self.user_messages = {}  # {user_id: [timestamps]}
+        # Anti-spam tracking (janelas deslizantes; chaves inativas são descartadas)
+        self.user_messages = SlidingWindow()  # {(guild_id, user_id): [(timestamp, conteúdo)]}
+        self.user_mentions = SlidingWindow()  # {(guild_id, user_id): [(timestamp, nº de menções)]}
         self.spam_warnings = {}  # {user_id: warning_count}
         
         # Anti-raid tracking
         self.recent_joins = []  # [(user_id, timestamp)]
         
         # Auto-slowmode tracking
-        self.channel_messages = {}  # {channel_id: [timestamps]}
+        self.channel_messages = SlidingWindow()  # {channel_id: [timestamps]}
         self.slowmode_active = {}  # {channel_id: end_timestamp}
         
         # Phishing domains (lista básica - expandir conforme necessário)
@@ -51,9 +52,18 @@ class Moderation(commands.Cog):
         ]
         
         self.load_config()
+        
+        # Configuração por servidor (o ficheiro JSON serve de base)
+        self.guild_configs = ModerationConfigStore(self.config)
+        
+        # Feed local de phishing (recarregado quando o ficheiro muda)
+        self.phishing_feed = PhishingFeed(
+            self.config.get("link_filter", {}).get("phishing_feed", "data/phishing_domains.txt"),
+            builtin=self.phishing_domains
+        )
     
     def load_config(self):
-        """Carregar configuração de moderação"""
+        """Carregar configuração de moderação por omissão"""
         try:
             with open(self.config_file, 'r', encoding='utf-8') as f:
                 self.config = json.load(f)
@@ -80,16 +90,29 @@ class Moderation(commands.Cog):
     async def cog_load(self):
         """Carregado quando o cog é inicializado"""
         self.db = await get_database()
-        self.check_quarantine.start()
+        await self.guild_configs.load(self.db)
+        await self.phishing_feed.refresh()
+        self.db.scheduler.register("quarantine", self.release_quarantine)
+        self.refresh_phishing_feed.start()
         bot_logger.info("✅ Sistema de moderação avançado carregado")
     
     def cog_unload(self):
         """Parar tasks ao descarregar"""
-        self.check_quarantine.cancel()
+        self.db.scheduler.unregister("quarantine")
+        self.refresh_phishing_feed.cancel()
+    
+    def guild_config(self, guild_id: int) -> GuildModerationConfig:
+        """Configuração de moderação de um servidor (só de leitura)"""
+        return self.guild_configs.get(guild_id)
+    
+    async def save_guild_config(self, guild_id: int, config: dict):
+        """Guardar a configuração de moderação de um servidor"""
+        await self.guild_configs.save(self.db, guild_id, config)
     
     async def send_mod_log(self, embed: discord.Embed, guild: discord.Guild):
         """Enviar log para canal de moderação"""
-        channel_id = self.config.get("logs", {}).get("channel_id", 0)
+        guild_config = self.guild_config(guild.id)
+        channel_id = guild_config.get("logs", {}).get("channel_id", 0)
         if channel_id == 0:
             return
         
@@ -100,44 +123,36 @@ class Moderation(commands.Cog):
             except Exception as e:
                 bot_logger.error(f"Erro ao enviar log de moderação: {e}")
     
-    @tasks.loop(minutes=1)
-    async def check_quarantine(self):
-        """Verificar e remover quarentena expirada"""
-        if not self.config.get("quarantine", {}).get("enabled", False):
-            return
-        
-        current_time = datetime.now().timestamp()
-        duration = self.config.get("quarantine", {}).get("duration_minutes", 10) * 60
-        role_id = self.config.get("quarantine", {}).get("role_id", 0)
-        
-        if role_id == 0:
-            return
+    @tasks.loop(minutes=5)
+    async def refresh_phishing_feed(self):
+        """Recarregar o feed de phishing se o ficheiro foi alterado"""
+        await self.phishing_feed.refresh()
+    
+    async def release_quarantine(self, key: str, payload: Optional[dict]) -> Optional[float]:
+        """Remover quarentena expirada (chamado pelo agendador na hora marcada)"""
+        await self.bot.wait_until_ready()
         
-        expired_users = []
-        for user_id, join_time in self.quarantine_users.items():
-            if current_time - join_time >= duration:
-                expired_users.append(user_id)
+        guild = self.bot.get_guild(int(payload["guild_id"]))
+        if not guild:
+            return None
         
-        for user_id in expired_users:
-            for guild in self.bot.guilds:
-                member = guild.get_member(user_id)
-                if member:
-                    role = guild.get_role(role_id)
-                    if role and role in member.roles:
-                        try:
-                            await member.remove_roles(role, reason="Quarentena expirada")
-                            bot_logger.info(f"Quarentena removida de {member}")
-                        except Exception as e:
-                            bot_logger.error(f"Erro ao remover quarentena de {member}: {e}")
-            
-            del self.quarantine_users[user_id]
+        member = guild.get_member(int(payload["user_id"]))
+        role = guild.get_role(int(payload["role_id"]))
+        if member and role and role in member.roles:
+            try:
+                await member.remove_roles(role, reason="Quarentena expirada")
+                bot_logger.info(f"Quarentena removida de {member}")
+            except Exception as e:
+                bot_logger.error(f"Erro ao remover quarentena de {member}: {e}")
+        return None
     
     @commands.Cog.listener()
     async def on_member_join(self, member: discord.Member):
         """Aplicar quarentena a novos membros, monitorar raids e restaurar roles"""
+        guild_config = self.guild_config(member.guild.id)
         # Restaurar roles se veio de um unban
-        if self.config.get("role_backup", {}).get("enabled", False) and \
-           self.config.get("role_backup", {}).get("restore_on_unban", True):
+        if guild_config.get("role_backup", {}).get("enabled", False) and \
+           guild_config.get("role_backup", {}).get("restore_on_unban", True):
             # Esperar um pouco para garantir que o membro foi totalmente adicionado
             await asyncio.sleep(2)
             restored = await self.restore_user_roles(member.id, member.guild.id)
@@ -151,9 +166,9 @@ class Moderation(commands.Cog):
                 await self.send_mod_log(embed, member.guild)
         
         # Anti-raid check
-        if self.config.get("anti_raid", {}).get("enabled", False):
+        if guild_config.get("anti_raid", {}).get("enabled", False):
             current_time = datetime.now().timestamp()
-            time_window = self.config.get("anti_raid", {}).get("time_window", 60)
+            time_window = guild_config.get("anti_raid", {}).get("time_window", 60)
             
             # Adicionar join atual
             self.recent_joins.append((member.id, current_time))
@@ -163,15 +178,15 @@ class Moderation(commands.Cog):
                                  if current_time - t <= time_window]
             
             # Verificar threshold
-            join_threshold = self.config.get("anti_raid", {}).get("join_threshold", 10)
+            join_threshold = guild_config.get("anti_raid", {}).get("join_threshold", 10)
             if len(self.recent_joins) >= join_threshold:
                 await self.handle_raid(member.guild)
         
         # Quarentena
-        if not self.config.get("quarantine", {}).get("enabled", False):
+        if not guild_config.get("quarantine", {}).get("enabled", False):
             return
         
-        role_id = self.config.get("quarantine", {}).get("role_id", 0)
+        role_id = guild_config.get("quarantine", {}).get("role_id", 0)
         if role_id == 0:
             return
         
@@ -181,9 +196,13 @@ class Moderation(commands.Cog):
         
         try:
             await member.add_roles(role, reason="Quarentena automática para novo membro")
-            self.quarantine_users[member.id] = datetime.now().timestamp()
             
-            duration_min = self.config.get("quarantine", {}).get("duration_minutes", 10)
+            duration_min = guild_config.get("quarantine", {}).get("duration_minutes", 10)
+            await self.db.scheduler.schedule(
+                "quarantine", f"{member.guild.id}:{member.id}",
+                datetime.now().timestamp() + duration_min * 60,
+                {"guild_id": member.guild.id, "user_id": member.id, "role_id": role.id}
+            )
             
             # Log
             embed = discord.Embed(
@@ -211,121 +230,116 @@ class Moderation(commands.Cog):
         if not isinstance(message.channel, discord.TextChannel):
             return
         
+        # Snapshot da configuração do servidor (não muda durante esta mensagem)
+        guild_config = self.guild_config(message.guild.id)
+        
         # Auto-slowmode tracking (antes de outras verificações)
-        if self.config.get("auto_slowmode", {}).get("enabled", False):
+        if guild_config.auto_slowmode_enabled:
             await self.track_channel_activity(message)
         
         # Link filter check
-        if self.config.get("link_filter", {}).get("enabled", False):
-            whitelisted_link = self.config.get("link_filter", {}).get("whitelisted_channels", [])
-            if message.channel.id not in whitelisted_link:
+        if guild_config.link_filter_enabled:
+            if message.channel.id not in guild_config.link_filter_channels:
                 if not message.author.guild_permissions.manage_messages:
                     if await self.check_links(message):
                         return  # Mensagem tratada como link malicioso
         
         # Mention spam check
-        if self.config.get("mention_spam", {}).get("enabled", False):
+        if guild_config.mention_spam_enabled:
             if not message.author.guild_permissions.manage_messages:
                 if await self.check_mention_spam(message):
                     return  # Mensagem tratada como mention spam
         
         # Anti-spam check
-        if self.config.get("anti_spam", {}).get("enabled", False):
-            whitelisted = self.config.get("anti_spam", {}).get("whitelisted_channels", [])
-            if message.channel.id not in whitelisted:
+        if guild_config.anti_spam_enabled:
+            if message.channel.id not in guild_config.anti_spam_channels:
                 # Bypass para moderadores
                 if not message.author.guild_permissions.manage_messages:
                     if await self.check_spam(message):
                         return  # Mensagem tratada como spam
         
         # NSFW detection
-        if self.config.get("nsfw_detection", {}).get("enabled", False) and message.attachments:
-            whitelisted_nsfw = self.config.get("nsfw_detection", {}).get("whitelisted_channels", [])
-            if message.channel.id not in whitelisted_nsfw:
+        if guild_config.nsfw_enabled and message.attachments:
+            if message.channel.id not in guild_config.nsfw_channels:
                 # Bypass para moderadores
                 if not message.author.guild_permissions.manage_messages:
                     await self.check_nsfw(message)
         
         # Word filter
-        if not self.config.get("word_filter", {}).get("enabled", False):
+        if not guild_config.word_filter_enabled:
             return
         
         # Verificar se tem permissões de moderador (bypass)
         if message.author.guild_permissions.manage_messages:
             return
         
-        words = self.config.get("word_filter", {}).get("words", [])
-        if not words:
+        # Lista compilada uma única vez por servidor (ver utils/word_filter.py)
+        word = guild_config.word_filter.match(message.content)
+        if not word:
             return
         
-        content_lower = message.content.lower()
+        # Palavra proibida detectada!
+        try:
+            await message.delete()
+        except:
+            pass
+        
+        action = guild_config.get("word_filter", {}).get("action", "warn")
         
-        for word in words:
-            pattern = r'\b' + re.escape(word.lower()) + r'\b'
-            if re.search(pattern, content_lower):
-                # Palavra proibida detectada!
-                try:
-                    await message.delete()
-                except:
-                    pass
-                
-                action = self.config.get("word_filter", {}).get("action", "warn")
-                
-                # Log
-                log_embed = discord.Embed(
-                    title="🚫 Palavra Proibida Detectada",
-                    description=f"Mensagem de {message.author.mention} apagada",
-                    color=discord.Color.red(),
-                    timestamp=datetime.now()
+        # Log
+        log_embed = discord.Embed(
+            title="🚫 Palavra Proibida Detectada",
+            description=f"Mensagem de {message.author.mention} apagada",
+            color=discord.Color.red(),
+            timestamp=datetime.now()
+        )
+        log_embed.add_field(name="Usuário", value=f"{message.author} ({message.author.id})", inline=True)
+        log_embed.add_field(name="Canal", value=message.channel.mention, inline=True)
+        log_embed.add_field(name="Palavra", value=f"||{word}||", inline=True)
+        log_embed.add_field(name="Ação", value=action.capitalize(), inline=True)
+        log_embed.set_thumbnail(url=message.author.display_avatar.url)
+        
+        await self.send_mod_log(log_embed, message.guild)
+        
+        # Aplicar ação
+        if action == "warn":
+            try:
+                dm_embed = discord.Embed(
+                    title="⚠️ Aviso de Moderação",
+                    description=f"A tua mensagem em **{message.guild.name}** continha uma palavra proibida e foi removida.",
+                    color=discord.Color.orange()
                 )
-                log_embed.add_field(name="Usuário", value=f"{message.author} ({message.author.id})", inline=True)
-                log_embed.add_field(name="Canal", value=message.channel.mention, inline=True)
-                log_embed.add_field(name="Palavra", value=f"||{word}||", inline=True)
-                log_embed.add_field(name="Ação", value=action.capitalize(), inline=True)
-                log_embed.set_thumbnail(url=message.author.display_avatar.url)
-                
-                await self.send_mod_log(log_embed, message.guild)
-                
-                # Aplicar ação
-                if action == "warn":
-                    try:
-                        dm_embed = discord.Embed(
-                            title="⚠️ Aviso de Moderação",
-                            description=f"A tua mensagem em **{message.guild.name}** continha uma palavra proibida e foi removida.",
-                            color=discord.Color.orange()
-                        )
-                        dm_embed.add_field(name="Canal", value=message.channel.mention, inline=True)
-                        await message.author.send(embed=dm_embed)
-                    except:
-                        pass
-                
-                elif action == "timeout":
-                    try:
-                        duration = timedelta(minutes=10)
-                        await message.author.timeout(duration, reason=f"Palavra proibida: {word}")
-                        bot_logger.info(f"{message.author} recebeu timeout por palavra proibida: {word}")
-                    except:
-                        pass
-                
-                elif action == "kick":
-                    try:
-                        await message.author.kick(reason=f"Palavra proibida: {word}")
-                        bot_logger.info(f"{message.author} foi expulso por palavra proibida: {word}")
-                    except:
-                        pass
-                
-                elif action == "ban":
-                    try:
-                        await message.author.ban(reason=f"Palavra proibida: {word}", delete_message_days=1)
-                        bot_logger.info(f"{message.author} foi banido por palavra proibida: {word}")
-                    except:
-                        pass
-                
-                break  # Só processar a primeira palavra encontrada
+                dm_embed.add_field(name="Canal", value=message.channel.mention, inline=True)
+                await message.author.send(embed=dm_embed)
+            except:
+                pass
+        
+        elif action == "timeout":
+            try:
+                duration = timedelta(minutes=10)
+                await message.author.timeout(duration, reason=f"Palavra proibida: {word}")
+                bot_logger.info(f"{message.author} recebeu timeout por palavra proibida: {word}")
+            except:
+                pass
+        
+        elif action == "kick":
+            try:
+                await message.author.kick(reason=f"Palavra proibida: {word}")
+                bot_logger.info(f"{message.author} foi expulso por palavra proibida: {word}")
+            except:
+                pass
+        
+        elif action == "ban":
+            try:
+                await message.author.ban(reason=f"Palavra proibida: {word}", delete_message_days=1)
+                bot_logger.info(f"{message.author} foi banido por palavra proibida: {word}")
+            except:
+                pass
     
     async def handle_raid(self, guild: discord.Guild):
         """Lidar com raid detectado"""
-        action = self.config.get("anti_raid", {}).get("action", "kick")
+        guild_config = self.guild_config(guild.id)
+        action = guild_config.get("anti_raid", {}).get("action", "kick")
         
         # Log do raid
         embed = discord.Embed(
@@ -358,38 +372,26 @@ class Moderation(commands.Cog):
     
     async def check_spam(self, message: discord.Message) -> bool:
         """Verificar se mensagem é spam"""
-        user_id = message.author.id
-        current_time = datetime.now().timestamp()
-        
-        # Inicializar tracking
-        if user_id not in self.user_messages:
-            self.user_messages[user_id] = []
-        
-        # Adicionar mensagem atual
-        self.user_messages[user_id].append({
-            "time": current_time,
-            "content": message.content
-        })
-        
-        # Remover mensagens antigas
-        time_window = self.config.get("anti_spam", {}).get("time_window", 5)
-        self.user_messages[user_id] = [
-            msg for msg in self.user_messages[user_id]
-            if current_time - msg["time"] <= time_window
-        ]
-        
-        # Verificar threshold de mensagens
-        message_threshold = self.config.get("anti_spam", {}).get("message_threshold", 5)
-        recent_msgs = self.user_messages[user_id]
+        guild_config = self.guild_config(message.guild.id)
+        key = (message.guild.id, message.author.id)
+        config = guild_config.get("anti_spam", {})
+        time_window = config.get("time_window", 5)
+        message_threshold = config.get("message_threshold", 5)
+        duplicate_threshold = config.get("duplicate_threshold", 3)
+        
+        # Adicionar mensagem atual (só guarda as últimas necessárias)
+        recent_msgs = self.user_messages.hit(
+            key, time_window, max(message_threshold, duplicate_threshold),
+            value=message.content
+        )
         
         if len(recent_msgs) >= message_threshold:
             await self.handle_spam(message, "Muitas mensagens em pouco tempo")
             return True
         
         # Verificar mensagens duplicadas
-        duplicate_threshold = self.config.get("anti_spam", {}).get("duplicate_threshold", 3)
         if len(recent_msgs) >= duplicate_threshold:
-            last_contents = [msg["content"] for msg in recent_msgs[-duplicate_threshold:]]
+            last_contents = [content for _, content in list(recent_msgs)[-duplicate_threshold:]]
             if len(set(last_contents)) == 1 and last_contents[0]:  # Todas iguais
                 await self.handle_spam(message, "Spam de mensagens idênticas")
                 return True
@@ -398,12 +400,14 @@ class Moderation(commands.Cog):
     
     async def handle_spam(self, message: discord.Message, reason: str):
         """Lidar com spam detectado"""
-        action = self.config.get("anti_spam", {}).get("action", "timeout")
+        guild_config = self.guild_config(message.guild.id)
+        action = guild_config.get("anti_spam", {}).get("action", "timeout")
         
         # Deletar mensagens recentes do spammer
         try:
             user_id = message.author.id
-            if user_id in self.user_messages:
+            key = (message.guild.id, user_id)
+            if key in self.user_messages:
                 # Tentar deletar mensagens recentes
                 async for msg in message.channel.history(limit=50):
                     if msg.author.id == user_id and (datetime.now().timestamp() - msg.created_at.timestamp()) < 10:
@@ -413,7 +417,7 @@ class Moderation(commands.Cog):
                             pass
                 
                 # Limpar tracking
-                self.user_messages[user_id] = []
+                self.user_messages.reset(key)
         except:
             pass
         
@@ -437,7 +441,7 @@ class Moderation(commands.Cog):
                 pass
         
         elif action == "timeout":
-            duration = self.config.get("anti_spam", {}).get("timeout_duration", 300)
+            duration = guild_config.get("anti_spam", {}).get("timeout_duration", 300)
             try:
                 await member.timeout(
                     datetime.now() + timedelta(seconds=duration),
@@ -469,12 +473,13 @@ class Moderation(commands.Cog):
     
     async def check_nsfw(self, message: discord.Message):
         """Verificar se imagem é NSFW usando DeepAI"""
-        api_key = self.config.get("nsfw_detection", {}).get("api_key", "")
+        guild_config = self.guild_config(message.guild.id)
+        api_key = guild_config.get("nsfw_detection", {}).get("api_key", "")
         
         if not api_key:
             return
         
-        confidence_threshold = self.config.get("nsfw_detection", {}).get("confidence_threshold", 0.7)
+        confidence_threshold = guild_config.get("nsfw_detection", {}).get("confidence_threshold", 0.7)
         
         for attachment in message.attachments:
             # Verificar se é imagem
@@ -503,7 +508,8 @@ class Moderation(commands.Cog):
     
     async def handle_nsfw(self, message: discord.Message, score: float):
         """Lidar com conteúdo NSFW detectado"""
-        action = self.config.get("nsfw_detection", {}).get("action", "delete")
+        guild_config = self.guild_config(message.guild.id)
+        action = guild_config.get("nsfw_detection", {}).get("action", "delete")
         
         # Deletar mensagem
         if action in ["delete", "warn", "timeout", "kick"]:
@@ -557,47 +563,38 @@ class Moderation(commands.Cog):
     
     async def check_links(self, message: discord.Message) -> bool:
         """Verificar se mensagem contém links maliciosos ou proibidos"""
-        import re
-        
-        # Regex para detectar URLs
-        url_pattern = r'https?://[^\s]+'
-        urls = re.findall(url_pattern, message.content.lower())
+        guild_config = self.guild_config(message.guild.id)
+        links = extract_links(message.content)
         
-        if not urls:
+        if not links:
             return False
         
-        config = self.config.get("link_filter", {})
-        block_invites = config.get("block_invites", True)
-        block_phishing = config.get("block_phishing", True)
-        whitelist = config.get("whitelist", [])
-        blacklist = config.get("blacklist", [])
-        
-        for url in urls:
+        for url, host, path in links:
             # Verificar whitelist primeiro
-            if any(domain in url for domain in whitelist):
+            if guild_config.link_whitelist.match(host):
                 continue
             
             # Verificar blacklist
-            if any(domain in url for domain in blacklist):
+            if guild_config.link_blacklist.match(host):
                 await self.handle_malicious_link(message, url, "Domínio na lista negra")
                 return True
             
             # Verificar convites do Discord
-            if block_invites and ('discord.gg/' in url or 'discord.com/invite/' in url):
+            if guild_config.block_invites and is_invite(host, path):
                 await self.handle_malicious_link(message, url, "Convite do Discord não autorizado")
                 return True
             
             # Verificar domínios de phishing conhecidos
-            if block_phishing:
-                if any(phishing_domain in url for phishing_domain in self.phishing_domains):
-                    await self.handle_malicious_link(message, url, "Domínio de phishing detectado")
-                    return True
+            if guild_config.block_phishing and self.phishing_feed.match(host):
+                await self.handle_malicious_link(message, url, "Domínio de phishing detectado")
+                return True
         
         return False
     
     async def handle_malicious_link(self, message: discord.Message, url: str, reason: str):
         """Lidar com links maliciosos"""
-        action = self.config.get("link_filter", {}).get("action", "delete")
+        guild_config = self.guild_config(message.guild.id)
+        action = guild_config.get("link_filter", {}).get("action", "delete")
         
         # Deletar mensagem
         try:
@@ -647,14 +644,15 @@ class Moderation(commands.Cog):
                 pass
         
         # Adicionar strike se sistema estiver ativo
-        if self.config.get("strikes_system", {}).get("enabled", False):
+        if guild_config.get("strikes_system", {}).get("enabled", False):
             await self.add_strike(member.id, member.guild.id, self.bot.user.id, f"Link malicioso: {reason}")
         
         bot_logger.warning(f"Link malicioso detectado: {member} em {message.channel} - {reason}")
     
     async def check_mention_spam(self, message: discord.Message) -> bool:
         """Verificar se mensagem contém spam de menções"""
-        config = self.config.get("mention_spam", {})
+        guild_config = self.guild_config(message.guild.id)
+        config = guild_config.get("mention_spam", {})
         max_mentions = config.get("max_mentions", 5)
         max_role_mentions = config.get("max_role_mentions", 2)
         
@@ -667,8 +665,17 @@ class Moderation(commands.Cog):
         # Verificar @everyone ou @here
         has_everyone = message.mention_everyone
         
+        # Somar menções das mensagens recentes (spam repartido por várias mensagens)
+        if user_mentions:
+            recent = self.user_mentions.hit(
+                (message.guild.id, message.author.id), config.get("time_window", 10), max_mentions + 1,
+                value=user_mentions
+            )
+            user_mentions = sum(count for _, count in recent)
+        
         # Verificar limites
         if user_mentions > max_mentions or role_mentions > max_role_mentions or has_everyone:
+            self.user_mentions.reset((message.guild.id, message.author.id))
             await self.handle_mention_spam(message, user_mentions, role_mentions, has_everyone)
             return True
         
@@ -676,8 +683,9 @@ class Moderation(commands.Cog):
     
     async def handle_mention_spam(self, message: discord.Message, user_mentions: int, role_mentions: int, has_everyone: bool):
         """Lidar com spam de menções"""
-        action = self.config.get("mention_spam", {}).get("action", "timeout")
-        timeout_duration = self.config.get("mention_spam", {}).get("timeout_duration", 600)
+        guild_config = self.guild_config(message.guild.id)
+        action = guild_config.get("mention_spam", {}).get("action", "timeout")
+        timeout_duration = guild_config.get("mention_spam", {}).get("timeout_duration", 600)
         
         # Deletar mensagem
         try:
@@ -689,9 +697,9 @@ class Moderation(commands.Cog):
         
         # Construir descrição da violação
         violations = []
-        if user_mentions > self.config.get("mention_spam", {}).get("max_mentions", 5):
+        if user_mentions > guild_config.get("mention_spam", {}).get("max_mentions", 5):
             violations.append(f"Menções de usuários: {user_mentions}")
-        if role_mentions > self.config.get("mention_spam", {}).get("max_role_mentions", 2):
+        if role_mentions > guild_config.get("mention_spam", {}).get("max_role_mentions", 2):
             violations.append(f"Menções de roles: {role_mentions}")
         if has_everyone:
             violations.append("Uso de @everyone/@here")
@@ -739,13 +747,14 @@ class Moderation(commands.Cog):
                 pass
         
         # Adicionar strike se sistema estiver ativo
-        if self.config.get("strikes_system", {}).get("enabled", False):
+        if guild_config.get("strikes_system", {}).get("enabled", False):
             await self.add_strike(member.id, member.guild.id, self.bot.user.id, "Spam de menções")
         
         bot_logger.warning(f"Spam de menções: {member} em {message.channel}")
     
     async def track_channel_activity(self, message: discord.Message):
         """Rastrear atividade do canal para auto-slowmode"""
+        guild_config = self.guild_config(message.guild.id)
         channel_id = message.channel.id
         current_time = datetime.now().timestamp()
         
@@ -762,30 +771,20 @@ class Moderation(commands.Cog):
                 except:
                     pass
         
-        # Inicializar tracking
-        if channel_id not in self.channel_messages:
-            self.channel_messages[channel_id] = []
-        
-        # Adicionar mensagem atual
-        self.channel_messages[channel_id].append(current_time)
-        
-        # Remover mensagens antigas
-        trigger_window = self.config.get("auto_slowmode", {}).get("trigger_window", 10)
-        self.channel_messages[channel_id] = [
-            t for t in self.channel_messages[channel_id]
-            if current_time - t <= trigger_window
-        ]
+        # Adicionar mensagem atual e descartar as que saíram da janela
+        trigger_window = guild_config.get("auto_slowmode", {}).get("trigger_window", 10)
+        trigger_threshold = guild_config.get("auto_slowmode", {}).get("trigger_threshold", 20)
+        recent = self.channel_messages.hit(channel_id, trigger_window, trigger_threshold, now=current_time)
         
         # Verificar se deve ativar slowmode
-        trigger_threshold = self.config.get("auto_slowmode", {}).get("trigger_threshold", 20)
-        
-        if len(self.channel_messages[channel_id]) >= trigger_threshold:
+        if len(recent) >= trigger_threshold:
             await self.activate_slowmode(message.channel)
     
     async def activate_slowmode(self, channel: discord.TextChannel):
         """Ativar slowmode automático em um canal"""
-        slowmode_duration = self.config.get("auto_slowmode", {}).get("slowmode_duration", 10)
-        slowmode_time = self.config.get("auto_slowmode", {}).get("slowmode_time", 300)
+        guild_config = self.guild_config(channel.guild.id)
+        slowmode_duration = guild_config.get("auto_slowmode", {}).get("slowmode_duration", 10)
+        slowmode_time = guild_config.get("auto_slowmode", {}).get("slowmode_time", 300)
         
         try:
             await channel.edit(slowmode_delay=slowmode_duration, reason="Auto-slowmode ativado devido a atividade alta")
@@ -794,7 +793,7 @@ class Moderation(commands.Cog):
             self.slowmode_active[channel.id] = datetime.now().timestamp() + slowmode_time
             
             # Limpar tracking
-            self.channel_messages[channel.id] = []
+            self.channel_messages.reset(channel.id)
             
             # Notificar no canal
             embed = discord.Embed(
@@ -810,6 +809,7 @@ class Moderation(commands.Cog):
     
     async def add_strike(self, user_id: int, guild_id: int, moderator_id: int, reason: str):
         """Adicionar strike a um usuário"""
+        guild_config = self.guild_config(guild_id)
         async with aiosqlite.connect(self.bot.db_path) as db:
             # Verificar strikes ativos
             async with db.execute(
@@ -822,7 +822,7 @@ class Moderation(commands.Cog):
             new_strike_count = current_strikes + 1
             
             # Calcular data de expiração
-            expiry_days = self.config.get("strikes_system", {}).get("strike_expiry_days", 30)
+            expiry_days = guild_config.get("strikes_system", {}).get("strike_expiry_days", 30)
             expires_at = datetime.now() + timedelta(days=expiry_days)
             
             # Adicionar strike
@@ -841,8 +841,9 @@ class Moderation(commands.Cog):
     
     async def check_strike_action(self, user_id: int, guild_id: int, strike_count: int):
         """Verificar e aplicar ação baseada no número de strikes"""
-        strikes_to_ban = self.config.get("strikes_system", {}).get("strikes_to_ban", 3)
-        progressive_actions = self.config.get("strikes_system", {}).get("progressive_actions", {})
+        guild_config = self.guild_config(guild_id)
+        strikes_to_ban = guild_config.get("strikes_system", {}).get("strikes_to_ban", 3)
+        progressive_actions = guild_config.get("strikes_system", {}).get("progressive_actions", {})
         
         guild = self.bot.get_guild(guild_id)
         if not guild:
@@ -1097,6 +1098,7 @@ class Moderation(commands.Cog):
         apagar_dias: app_commands.Range[int, 0, 7] = 0
     ):
         """Bane um membro do servidor"""
+        guild_config = self.guild_config(interaction.guild.id)
         
         # Verificações de segurança
         if membro.id == interaction.user.id:
@@ -1117,7 +1119,7 @@ class Moderation(commands.Cog):
         
         try:
             # Backup de roles se o sistema estiver ativo
-            if self.config.get("role_backup", {}).get("enabled", False):
+            if guild_config.get("role_backup", {}).get("enabled", False):
                 role_ids = [role.id for role in membro.roles if role != interaction.guild.default_role]
                 if role_ids:
                     await self.backup_user_roles(membro.id, interaction.guild.id, role_ids, f"Ban por: {motivo}")
@@ -1199,6 +1201,7 @@ class Moderation(commands.Cog):
         motivo: str = "Não especificado"
     ):
         """Remove o ban de um utilizador"""
+        guild_config = self.guild_config(interaction.guild.id)
         
         try:
             user_id_int = int(user_id)
@@ -1216,8 +1219,8 @@ class Moderation(commands.Cog):
             
             # Restaurar roles se o sistema estiver ativo e o unban permitir
             roles_restored = False
-            if self.config.get("role_backup", {}).get("enabled", False) and \
-               self.config.get("role_backup", {}).get("restore_on_unban", True):
+            if guild_config.get("role_backup", {}).get("enabled", False) and \
+               guild_config.get("role_backup", {}).get("restore_on_unban", True):
                 # Esperar um pouco para o usuário re-entrar
                 await interaction.response.send_message(
                     f"✅ **{user}** foi desbanido! Se o utilizador voltar ao servidor, os roles serão restaurados automaticamente.",
@@ -1279,6 +1282,7 @@ class Moderation(commands.Cog):
         motivo: str = "Não especificado"
     ):
         """Coloca um membro em timeout"""
+        guild_config = self.guild_config(interaction.guild.id)
         
         # Verificações de segurança
         if membro.id == interaction.user.id:
@@ -1299,7 +1303,7 @@ class Moderation(commands.Cog):
         
         try:
             # Obter duração em segundos do preset
-            presets = self.config.get("timeout_presets", {
+            presets = guild_config.get("timeout_presets", {
                 "1m": 60, "5m": 300, "10m": 600, "30m": 1800,
                 "1h": 3600, "6h": 21600, "12h": 43200,
                 "1d": 86400, "3d": 259200, "1w": 604800
@@ -1677,13 +1681,12 @@ class Moderation(commands.Cog):
         canal: discord.TextChannel
     ):
         """Configura canal de logs de moderação"""
+        guild_config = self.guild_configs.editable(interaction.guild.id)
         try:
-            self.config["logs"]["channel_id"] = canal.id
+            guild_config["logs"]["channel_id"] = canal.id
             
-            # Salvar config
-            os.makedirs("config", exist_ok=True)
-            with open(self.config_file, 'w', encoding='utf-8') as f:
-                json.dump(self.config, f, indent=2, ensure_ascii=False)
+            # Salvar config do servidor
+            await self.save_guild_config(interaction.guild.id, guild_config)
             
             embed = discord.Embed(
                 title="✅ Logs Configurados",
@@ -1710,14 +1713,14 @@ class Moderation(commands.Cog):
         acao: Optional[str] = "warn"
     ):
         """Configura filtro de palavras proibidas"""
+        guild_config = self.guild_configs.editable(interaction.guild.id)
         try:
-            self.config["word_filter"]["enabled"] = ativar
+            guild_config["word_filter"]["enabled"] = ativar
             if acao in ["warn", "timeout", "kick", "ban"]:
-                self.config["word_filter"]["action"] = acao
+                guild_config["word_filter"]["action"] = acao
             
-            # Salvar config
-            with open(self.config_file, 'w', encoding='utf-8') as f:
-                json.dump(self.config, f, indent=2, ensure_ascii=False)
+            # Salvar config do servidor
+            await self.save_guild_config(interaction.guild.id, guild_config)
             
             status = "✅ Ativado" if ativar else "❌ Desativado"
             
@@ -1747,18 +1750,18 @@ class Moderation(commands.Cog):
         palavra: str
     ):
         """Adiciona palavra proibida"""
+        guild_config = self.guild_configs.editable(interaction.guild.id)
         try:
             palavra_lower = palavra.lower().strip()
             
-            if palavra_lower in self.config["word_filter"]["words"]:
+            if palavra_lower in guild_config["word_filter"]["words"]:
                 await interaction.response.send_message("⚠️ Esta palavra já está na lista!", ephemeral=True)
                 return
             
-            self.config["word_filter"]["words"].append(palavra_lower)
+            guild_config["word_filter"]["words"].append(palavra_lower)
             
-            # Salvar config
-            with open(self.config_file, 'w', encoding='utf-8') as f:
-                json.dump(self.config, f, indent=2, ensure_ascii=False)
+            # Salvar config do servidor
+            await self.save_guild_config(interaction.guild.id, guild_config)
             
             embed = discord.Embed(
                 title="✅ Palavra Adicionada",
@@ -1767,7 +1770,7 @@ class Moderation(commands.Cog):
             )
             embed.add_field(
                 name="Total de Palavras",
-                value=str(len(self.config["word_filter"]["words"])),
+                value=str(len(guild_config["word_filter"]["words"])),
                 inline=True
             )
             
@@ -1786,18 +1789,18 @@ class Moderation(commands.Cog):
         palavra: str
     ):
         """Remove palavra proibida"""
+        guild_config = self.guild_configs.editable(interaction.guild.id)
         try:
             palavra_lower = palavra.lower().strip()
             
-            if palavra_lower not in self.config["word_filter"]["words"]:
+            if palavra_lower not in guild_config["word_filter"]["words"]:
                 await interaction.response.send_message("⚠️ Esta palavra não está na lista!", ephemeral=True)
                 return
             
-            self.config["word_filter"]["words"].remove(palavra_lower)
+            guild_config["word_filter"]["words"].remove(palavra_lower)
             
-            # Salvar config
-            with open(self.config_file, 'w', encoding='utf-8') as f:
-                json.dump(self.config, f, indent=2, ensure_ascii=False)
+            # Salvar config do servidor
+            await self.save_guild_config(interaction.guild.id, guild_config)
             
             embed = discord.Embed(
                 title="✅ Palavra Removida",
@@ -1815,8 +1818,9 @@ class Moderation(commands.Cog):
     @app_commands.checks.has_permissions(manage_messages=True)
     async def listwords(self, interaction: discord.Interaction):
         """Lista palavras proibidas"""
+        guild_config = self.guild_config(interaction.guild.id)
         try:
-            words = self.config["word_filter"]["words"]
+            words = guild_config["word_filter"]["words"]
             
             if not words:
                 await interaction.response.send_message("📝 Nenhuma palavra proibida configurada.", ephemeral=True)
@@ -1855,18 +1859,18 @@ class Moderation(commands.Cog):
         duracao_minutos: Optional[int] = 10
     ):
         """Configura sistema de quarentena"""
+        guild_config = self.guild_configs.editable(interaction.guild.id)
         try:
-            self.config["quarantine"]["enabled"] = ativar
+            guild_config["quarantine"]["enabled"] = ativar
             
             if role:
-                self.config["quarantine"]["role_id"] = role.id
+                guild_config["quarantine"]["role_id"] = role.id
             
             if duracao_minutos:
-                self.config["quarantine"]["duration_minutes"] = duracao_minutos
+                guild_config["quarantine"]["duration_minutes"] = duracao_minutos
             
-            # Salvar config
-            with open(self.config_file, 'w', encoding='utf-8') as f:
-                json.dump(self.config, f, indent=2, ensure_ascii=False)
+            # Salvar config do servidor
+            await self.save_guild_config(interaction.guild.id, guild_config)
             
             status = "✅ Ativado" if ativar else "❌ Desativado"
             
@@ -1925,7 +1929,8 @@ class Moderation(commands.Cog):
                 return
             
             # Verificar se appeals está ativado
-            if not self.config.get("appeals", {}).get("enabled", False):
+            guild_config = self.guild_config(guild.id)
+            if not guild_config.get("appeals", {}).get("enabled", False):
                 await interaction.response.send_message(
                     "❌ O sistema de appeals não está ativado neste servidor!",
                     ephemeral=True
@@ -1933,7 +1938,7 @@ class Moderation(commands.Cog):
                 return
             
             # Canal de appeals
-            appeals_channel_id = self.config.get("appeals", {}).get("channel_id", 0)
+            appeals_channel_id = guild_config.get("appeals", {}).get("channel_id", 0)
             if appeals_channel_id == 0:
                 await interaction.response.send_message(
                     "❌ Canal de appeals não configurado!",
@@ -1994,17 +1999,18 @@ class Moderation(commands.Cog):
         acao: Optional[str] = None
     ):
         """Configurar sistema anti-spam"""
+        guild_config = self.guild_configs.editable(interaction.guild.id)
         try:
             if ativar is not None:
-                self.config["anti_spam"]["enabled"] = ativar
+                guild_config["anti_spam"]["enabled"] = ativar
             
-            whitelisted = self.config.get("anti_spam", {}).get("whitelisted_channels", [])
+            whitelisted = guild_config.get("anti_spam", {}).get("whitelisted_channels", [])
             
             if acao and canal:
                 if acao == "add":
                     if canal.id not in whitelisted:
                         whitelisted.append(canal.id)
-                        self.config["anti_spam"]["whitelisted_channels"] = whitelisted
+                        guild_config["anti_spam"]["whitelisted_channels"] = whitelisted
                         action_msg = f"✅ {canal.mention} adicionado à whitelist"
                     else:
                         action_msg = f"ℹ️ {canal.mention} já está na whitelist"
@@ -2012,7 +2018,7 @@ class Moderation(commands.Cog):
                 elif acao == "remove":
                     if canal.id in whitelisted:
                         whitelisted.remove(canal.id)
-                        self.config["anti_spam"]["whitelisted_channels"] = whitelisted
+                        guild_config["anti_spam"]["whitelisted_channels"] = whitelisted
                         action_msg = f"✅ {canal.mention} removido da whitelist"
                     else:
                         action_msg = f"ℹ️ {canal.mention} não está na whitelist"
@@ -2026,23 +2032,22 @@ class Moderation(commands.Cog):
             else:
                 action_msg = ""
             
-            # Salvar config
-            with open(self.config_file, 'w', encoding='utf-8') as f:
-                json.dump(self.config, f, indent=2, ensure_ascii=False)
+            # Salvar config do servidor
+            await self.save_guild_config(interaction.guild.id, guild_config)
             
-            status = "✅ Ativado" if self.config["anti_spam"]["enabled"] else "❌ Desativado"
+            status = "✅ Ativado" if guild_config["anti_spam"]["enabled"] else "❌ Desativado"
             
             embed = discord.Embed(
                 title="🚫 Anti-Spam Configurado",
                 description=f"**Status:** {status}",
-                color=discord.Color.green() if self.config["anti_spam"]["enabled"] else discord.Color.gray()
+                color=discord.Color.green() if guild_config["anti_spam"]["enabled"] else discord.Color.gray()
             )
             
             if action_msg:
                 embed.add_field(name="Ação", value=action_msg, inline=False)
             
             # Configurações atuais
-            config = self.config["anti_spam"]
+            config = guild_config["anti_spam"]
             embed.add_field(name="Limite de Mensagens", value=f"{config['message_threshold']} msgs", inline=True)
             embed.add_field(name="Intervalo", value=f"{config['time_window']}s", inline=True)
             embed.add_field(name="Duplicadas", value=f"{config['duplicate_threshold']} msgs", inline=True)
@@ -2069,30 +2074,30 @@ class Moderation(commands.Cog):
         intervalo: Optional[int] = None
     ):
         """Configurar sistema anti-raid"""
+        guild_config = self.guild_configs.editable(interaction.guild.id)
         try:
             if ativar is not None:
-                self.config["anti_raid"]["enabled"] = ativar
+                guild_config["anti_raid"]["enabled"] = ativar
             
             if threshold is not None:
-                self.config["anti_raid"]["join_threshold"] = threshold
+                guild_config["anti_raid"]["join_threshold"] = threshold
             
             if intervalo is not None:
-                self.config["anti_raid"]["time_window"] = intervalo
+                guild_config["anti_raid"]["time_window"] = intervalo
             
-            # Salvar config
-            with open(self.config_file, 'w', encoding='utf-8') as f:
-                json.dump(self.config, f, indent=2, ensure_ascii=False)
+            # Salvar config do servidor
+            await self.save_guild_config(interaction.guild.id, guild_config)
             
-            status = "✅ Ativado" if self.config["anti_raid"]["enabled"] else "❌ Desativado"
+            status = "✅ Ativado" if guild_config["anti_raid"]["enabled"] else "❌ Desativado"
             
             embed = discord.Embed(
                 title="🚨 Anti-Raid Configurado",
                 description=f"**Status:** {status}",
-                color=discord.Color.green() if self.config["anti_raid"]["enabled"] else discord.Color.gray()
+                color=discord.Color.green() if guild_config["anti_raid"]["enabled"] else discord.Color.gray()
             )
             
             # Configurações atuais
-            config = self.config["anti_raid"]
+            config = guild_config["anti_raid"]
             embed.add_field(name="Threshold", value=f"{config['join_threshold']} joins", inline=True)
             embed.add_field(name="Intervalo", value=f"{config['time_window']}s", inline=True)
             embed.add_field(name="Ação", value=config['action'].upper(), inline=True)
@@ -2132,20 +2137,21 @@ class Moderation(commands.Cog):
         api_key: Optional[str] = None
     ):
         """Configurar detecção de conteúdo NSFW"""
+        guild_config = self.guild_configs.editable(interaction.guild.id)
         try:
             if ativar is not None:
-                self.config["nsfw_detection"]["enabled"] = ativar
+                guild_config["nsfw_detection"]["enabled"] = ativar
             
             if api_key:
-                self.config["nsfw_detection"]["api_key"] = api_key
+                guild_config["nsfw_detection"]["api_key"] = api_key
             
-            whitelisted = self.config.get("nsfw_detection", {}).get("whitelisted_channels", [])
+            whitelisted = guild_config.get("nsfw_detection", {}).get("whitelisted_channels", [])
             
             if acao and canal:
                 if acao == "add":
                     if canal.id not in whitelisted:
                         whitelisted.append(canal.id)
-                        self.config["nsfw_detection"]["whitelisted_channels"] = whitelisted
+                        guild_config["nsfw_detection"]["whitelisted_channels"] = whitelisted
                         action_msg = f"✅ {canal.mention} adicionado à whitelist (NSFW permitido)"
                     else:
                         action_msg = f"ℹ️ {canal.mention} já está na whitelist"
@@ -2153,7 +2159,7 @@ class Moderation(commands.Cog):
                 elif acao == "remove":
                     if canal.id in whitelisted:
                         whitelisted.remove(canal.id)
-                        self.config["nsfw_detection"]["whitelisted_channels"] = whitelisted
+                        guild_config["nsfw_detection"]["whitelisted_channels"] = whitelisted
                         action_msg = f"✅ {canal.mention} removido da whitelist"
                     else:
                         action_msg = f"ℹ️ {canal.mention} não está na whitelist"
@@ -2167,24 +2173,23 @@ class Moderation(commands.Cog):
             else:
                 action_msg = ""
             
-            # Salvar config
-            with open(self.config_file, 'w', encoding='utf-8') as f:
-                json.dump(self.config, f, indent=2, ensure_ascii=False)
+            # Salvar config do servidor
+            await self.save_guild_config(interaction.guild.id, guild_config)
             
-            status = "✅ Ativado" if self.config["nsfw_detection"]["enabled"] else "❌ Desativado"
-            has_key = "✅ Configurada" if self.config["nsfw_detection"]["api_key"] else "❌ Não configurada"
+            status = "✅ Ativado" if guild_config["nsfw_detection"]["enabled"] else "❌ Desativado"
+            has_key = "✅ Configurada" if guild_config["nsfw_detection"]["api_key"] else "❌ Não configurada"
             
             embed = discord.Embed(
                 title="🔞 Detecção NSFW Configurada",
                 description=f"**Status:** {status}\n**API Key:** {has_key}",
-                color=discord.Color.green() if self.config["nsfw_detection"]["enabled"] else discord.Color.gray()
+                color=discord.Color.green() if guild_config["nsfw_detection"]["enabled"] else discord.Color.gray()
             )
             
             if action_msg:
                 embed.add_field(name="Ação", value=action_msg, inline=False)
             
             # Configurações atuais
-            config = self.config["nsfw_detection"]
+            config = guild_config["nsfw_detection"]
             embed.add_field(name="Confiança Mínima", value=f"{config['confidence_threshold']:.0%}", inline=True)
             embed.add_field(name="Ação", value=config['action'].upper(), inline=True)
             
@@ -2215,15 +2220,15 @@ class Moderation(commands.Cog):
         canal: Optional[discord.TextChannel] = None
     ):
         """Configura sistema de appeals"""
+        guild_config = self.guild_configs.editable(interaction.guild.id)
         try:
-            self.config["appeals"]["enabled"] = ativar
+            guild_config["appeals"]["enabled"] = ativar
             
             if canal:
-                self.config["appeals"]["channel_id"] = canal.id
+                guild_config["appeals"]["channel_id"] = canal.id
             
-            # Salvar config
-            with open(self.config_file, 'w', encoding='utf-8') as f:
-                json.dump(self.config, f, indent=2, ensure_ascii=False)
+            # Salvar config do servidor
+            await self.save_guild_config(interaction.guild.id, guild_config)
             
             status = "✅ Ativado" if ativar else "❌ Desativado"
             
@@ -2271,37 +2276,37 @@ class Moderation(commands.Cog):
         acao_canal: Optional[str] = None
     ):
         """Configurar filtro de links maliciosos"""
+        guild_config = self.guild_configs.editable(interaction.guild.id)
         try:
             if ativar is not None:
-                self.config["link_filter"]["enabled"] = ativar
+                guild_config["link_filter"]["enabled"] = ativar
             
             if bloquear_convites is not None:
-                self.config["link_filter"]["block_invites"] = bloquear_convites
+                guild_config["link_filter"]["block_invites"] = bloquear_convites
             
             if bloquear_phishing is not None:
-                self.config["link_filter"]["block_phishing"] = bloquear_phishing
+                guild_config["link_filter"]["block_phishing"] = bloquear_phishing
             
             if canal and acao_canal:
-                whitelisted = self.config["link_filter"].get("whitelisted_channels", [])
+                whitelisted = guild_config["link_filter"].get("whitelisted_channels", [])
                 if acao_canal == "add" and canal.id not in whitelisted:
                     whitelisted.append(canal.id)
                 elif acao_canal == "remove" and canal.id in whitelisted:
                     whitelisted.remove(canal.id)
-                self.config["link_filter"]["whitelisted_channels"] = whitelisted
+                guild_config["link_filter"]["whitelisted_channels"] = whitelisted
             
-            # Salvar config
-            with open(self.config_file, 'w', encoding='utf-8') as f:
-                json.dump(self.config, f, indent=2, ensure_ascii=False)
+            # Salvar config do servidor
+            await self.save_guild_config(interaction.guild.id, guild_config)
             
-            status = "✅ Ativado" if self.config["link_filter"]["enabled"] else "❌ Desativado"
+            status = "✅ Ativado" if guild_config["link_filter"]["enabled"] else "❌ Desativado"
             
             embed = discord.Embed(
                 title="🔗 Filtro de Links Configurado",
                 description=f"**Status:** {status}",
-                color=discord.Color.green() if self.config["link_filter"]["enabled"] else discord.Color.gray()
+                color=discord.Color.green() if guild_config["link_filter"]["enabled"] else discord.Color.gray()
             )
             
-            config = self.config["link_filter"]
+            config = guild_config["link_filter"]
             embed.add_field(name="Bloquear Convites", value="✅" if config["block_invites"] else "❌", inline=True)
             embed.add_field(name="Bloquear Phishing", value="✅" if config["block_phishing"] else "❌", inline=True)
             embed.add_field(name="Ação", value=config["action"].upper(), inline=True)
@@ -2330,29 +2335,29 @@ class Moderation(commands.Cog):
         dias_expiracao: Optional[int] = None
     ):
         """Configurar sistema de strikes"""
+        guild_config = self.guild_configs.editable(interaction.guild.id)
         try:
             if ativar is not None:
-                self.config["strikes_system"]["enabled"] = ativar
+                guild_config["strikes_system"]["enabled"] = ativar
             
             if strikes_ban is not None:
-                self.config["strikes_system"]["strikes_to_ban"] = strikes_ban
+                guild_config["strikes_system"]["strikes_to_ban"] = strikes_ban
             
             if dias_expiracao is not None:
-                self.config["strikes_system"]["strike_expiry_days"] = dias_expiracao
+                guild_config["strikes_system"]["strike_expiry_days"] = dias_expiracao
             
-            # Salvar config
-            with open(self.config_file, 'w', encoding='utf-8') as f:
-                json.dump(self.config, f, indent=2, ensure_ascii=False)
+            # Salvar config do servidor
+            await self.save_guild_config(interaction.guild.id, guild_config)
             
-            status = "✅ Ativado" if self.config["strikes_system"]["enabled"] else "❌ Desativado"
+            status = "✅ Ativado" if guild_config["strikes_system"]["enabled"] else "❌ Desativado"
             
             embed = discord.Embed(
                 title="⚠️ Sistema de Strikes Configurado",
                 description=f"**Status:** {status}",
-                color=discord.Color.green() if self.config["strikes_system"]["enabled"] else discord.Color.gray()
+                color=discord.Color.green() if guild_config["strikes_system"]["enabled"] else discord.Color.gray()
             )
             
-            config = self.config["strikes_system"]
+            config = guild_config["strikes_system"]
             embed.add_field(name="Strikes para Ban", value=str(config["strikes_to_ban"]), inline=True)
             embed.add_field(name="Expiração", value=f"{config['strike_expiry_days']} dias", inline=True)
             
@@ -2385,29 +2390,29 @@ class Moderation(commands.Cog):
         max_mencoes_roles: Optional[int] = None
     ):
         """Configurar proteção contra spam de menções"""
+        guild_config = self.guild_configs.editable(interaction.guild.id)
         try:
             if ativar is not None:
-                self.config["mention_spam"]["enabled"] = ativar
+                guild_config["mention_spam"]["enabled"] = ativar
             
             if max_mencoes is not None:
-                self.config["mention_spam"]["max_mentions"] = max_mencoes
+                guild_config["mention_spam"]["max_mentions"] = max_mencoes
             
             if max_mencoes_roles is not None:
-                self.config["mention_spam"]["max_role_mentions"] = max_mencoes_roles
+                guild_config["mention_spam"]["max_role_mentions"] = max_mencoes_roles
             
-            # Salvar config
-            with open(self.config_file, 'w', encoding='utf-8') as f:
-                json.dump(self.config, f, indent=2, ensure_ascii=False)
+            # Salvar config do servidor
+            await self.save_guild_config(interaction.guild.id, guild_config)
             
-            status = "✅ Ativado" if self.config["mention_spam"]["enabled"] else "❌ Desativado"
+            status = "✅ Ativado" if guild_config["mention_spam"]["enabled"] else "❌ Desativado"
             
             embed = discord.Embed(
                 title="📢 Proteção Mention Spam Configurada",
                 description=f"**Status:** {status}",
-                color=discord.Color.green() if self.config["mention_spam"]["enabled"] else discord.Color.gray()
+                color=discord.Color.green() if guild_config["mention_spam"]["enabled"] else discord.Color.gray()
             )
             
-            config = self.config["mention_spam"]
+            config = guild_config["mention_spam"]
             embed.add_field(name="Máx. Menções Usuários", value=str(config["max_mentions"]), inline=True)
             embed.add_field(name="Máx. Menções Roles", value=str(config["max_role_mentions"]), inline=True)
             embed.add_field(name="Ação", value=config["action"].upper(), inline=True)
@@ -2436,32 +2441,32 @@ class Moderation(commands.Cog):
         duracao: Optional[int] = None
     ):
         """Configurar auto-slowmode durante alta atividade"""
+        guild_config = self.guild_configs.editable(interaction.guild.id)
         try:
             if ativar is not None:
-                self.config["auto_slowmode"]["enabled"] = ativar
+                guild_config["auto_slowmode"]["enabled"] = ativar
             
             if threshold is not None:
-                self.config["auto_slowmode"]["trigger_threshold"] = threshold
+                guild_config["auto_slowmode"]["trigger_threshold"] = threshold
             
             if janela is not None:
-                self.config["auto_slowmode"]["trigger_window"] = janela
+                guild_config["auto_slowmode"]["trigger_window"] = janela
             
             if duracao is not None:
-                self.config["auto_slowmode"]["slowmode_duration"] = duracao
+                guild_config["auto_slowmode"]["slowmode_duration"] = duracao
             
-            # Salvar config
-            with open(self.config_file, 'w', encoding='utf-8') as f:
-                json.dump(self.config, f, indent=2, ensure_ascii=False)
+            # Salvar config do servidor
+            await self.save_guild_config(interaction.guild.id, guild_config)
             
-            status = "✅ Ativado" if self.config["auto_slowmode"]["enabled"] else "❌ Desativado"
+            status = "✅ Ativado" if guild_config["auto_slowmode"]["enabled"] else "❌ Desativado"
             
             embed = discord.Embed(
                 title="⏱️ Auto-Slowmode Configurado",
                 description=f"**Status:** {status}",
-                color=discord.Color.green() if self.config["auto_slowmode"]["enabled"] else discord.Color.gray()
+                color=discord.Color.green() if guild_config["auto_slowmode"]["enabled"] else discord.Color.gray()
             )
             
-            config = self.config["auto_slowmode"]
+            config = guild_config["auto_slowmode"]
             embed.add_field(name="Threshold", value=f"{config['trigger_threshold']} mensagens", inline=True)
             embed.add_field(name="Janela", value=f"{config['trigger_window']}s", inline=True)
             embed.add_field(name="Slowmode", value=f"{config['slowmode_duration']}s", inline=True)
@@ -2493,26 +2498,26 @@ class Moderation(commands.Cog):
         restaurar_unban: Optional[bool] = None
     ):
         """Configurar sistema de backup de roles"""
+        guild_config = self.guild_configs.editable(interaction.guild.id)
         try:
             if ativar is not None:
-                self.config["role_backup"]["enabled"] = ativar
+                guild_config["role_backup"]["enabled"] = ativar
             
             if restaurar_unban is not None:
-                self.config["role_backup"]["restore_on_unban"] = restaurar_unban
+                guild_config["role_backup"]["restore_on_unban"] = restaurar_unban
             
-            # Salvar config
-            with open(self.config_file, 'w', encoding='utf-8') as f:
-                json.dump(self.config, f, indent=2, ensure_ascii=False)
+            # Salvar config do servidor
+            await self.save_guild_config(interaction.guild.id, guild_config)
             
-            status = "✅ Ativado" if self.config["role_backup"]["enabled"] else "❌ Desativado"
+            status = "✅ Ativado" if guild_config["role_backup"]["enabled"] else "❌ Desativado"
             
             embed = discord.Embed(
                 title="♻️ Backup de Roles Configurado",
                 description=f"**Status:** {status}",
-                color=discord.Color.green() if self.config["role_backup"]["enabled"] else discord.Color.gray()
+                color=discord.Color.green() if guild_config["role_backup"]["enabled"] else discord.Color.gray()
             )
             
-            config = self.config["role_backup"]
+            config = guild_config["role_backup"]
             embed.add_field(name="Restaurar no Unban", value="✅" if config["restore_on_unban"] else "❌", inline=True)
             
             embed.add_field(
@@ -2541,7 +2546,8 @@ class Moderation(commands.Cog):
         motivo: str
     ):
         """Adicionar strike a um usuário"""
-        if not self.config.get("strikes_system", {}).get("enabled", False):
+        guild_config = self.guild_config(interaction.guild.id)
+        if not guild_config.get("strikes_system", {}).get("enabled", False):
             await interaction.response.send_message("❌ Sistema de strikes não está ativo!", ephemeral=True)
             return
         
@@ -2557,7 +2563,7 @@ class Moderation(commands.Cog):
             await self.add_strike(membro.id, interaction.guild.id, interaction.user.id, motivo)
             
             strikes = await self.get_active_strikes(membro.id, interaction.guild.id)
-            strikes_to_ban = self.config.get("strikes_system", {}).get("strikes_to_ban", 3)
+            strikes_to_ban = guild_config.get("strikes_system", {}).get("strikes_to_ban", 3)
             
             embed = discord.Embed(
                 title="⚠️ Strike Adicionado",
@@ -2605,7 +2611,8 @@ class Moderation(commands.Cog):
         membro: Optional[discord.Member] = None
     ):
         """Ver strikes de um usuário"""
-        if not self.config.get("strikes_system", {}).get("enabled", False):
+        guild_config = self.guild_config(interaction.guild.id)
+        if not guild_config.get("strikes_system", {}).get("enabled", False):
             await interaction.response.send_message("❌ Sistema de strikes não está ativo!", ephemeral=True)
             return
         
@@ -2613,7 +2620,7 @@ class Moderation(commands.Cog):
         
         try:
             strikes = await self.get_active_strikes(target.id, interaction.guild.id)
-            strikes_to_ban = self.config.get("strikes_system", {}).get("strikes_to_ban", 3)
+            strikes_to_ban = guild_config.get("strikes_system", {}).get("strikes_to_ban", 3)
             
             # Buscar histórico de strikes
             async with aiosqlite.connect(self.bot.db_path) as db:
@@ -2662,7 +2669,8 @@ class Moderation(commands.Cog):
         membro: discord.Member
     ):
         """Limpar todos os strikes de um usuário"""
-        if not self.config.get("strikes_system", {}).get("enabled", False):
+        guild_config = self.guild_config(interaction.guild.id)
+        if not guild_config.get("strikes_system", {}).get("enabled", False):
             await interaction.response.send_message("❌ Sistema de strikes não está ativo!", ephemeral=True)
             return
         
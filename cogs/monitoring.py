@@ -118,6 +118,61 @@ class MonitoringCog(commands.Cog):
             inline=True
         )
         
+        # Base de dados (cache de níveis e escrita em lote)
+        if self.bot.db:
+            cache = self.bot.db.level_cache.stats()
+            ranks = self.bot.db.leaderboards.stats()
+            embed.add_field(
+                name="💾 Base de Dados",
+                value=f"**Cache níveis:** {cache['size']:,}/{cache['maxsize']:,}\n"
+                      f"**Hits/Misses:** {cache['hits']:,}/{cache['misses']:,} ({cache['hit_rate']*100:.1f}%)\n"
+                      f"**Escritas pendentes:** {self.bot.db.activity.pending_events:,}\n"
+                      f"**Rankings:** {ranks['indexes']} índices, {ranks['entries']:,} entradas",
+                inline=True
+            )
+            
+            jobs = self.bot.db.scheduler.stats()
+            next_in = f"{jobs['next_in']:.0f}s" if jobs['next_in'] is not None else "—"
+            embed.add_field(
+                name="⏰ Agendador",
+                value=f"**Pendentes:** {jobs['pending']:,} (próxima em {next_in})\n"
+                      f"**Executadas:** {jobs['fired']:,} ({jobs['failed']:,} erros, {jobs['dropped']:,} descartadas)\n"
+                      f"**Atraso:** {jobs['lag_avg_ms']:.0f}ms médio, {jobs['lag_max_ms']:.0f}ms máx.",
+                inline=True
+            )
+        
+        # Música (cache e serviço de extração)
+        music = self.bot.get_cog("MusicCog")
+        if music:
+            tracks = music.extraction_cache.stats()
+            extractor = music.extractor.stats()
+            embed.add_field(
+                name="🎵 Música",
+                value=f"**Cache:** {tracks['tracks']:,} músicas, {tracks['streams']:,} streams\n"
+                      f"**Hits/Misses:** {tracks['hits']:,}/{tracks['misses']:,} ({tracks['hit_rate']*100:.1f}%)\n"
+                      f"**Refreshes:** {tracks['refreshes']:,} ({tracks['expired']:,} expirados)\n"
+                      f"**Extrações:** {extractor['extractions']:,} ({extractor['failures']:,} falhas, "
+                      f"{extractor['coalesced']:,} partilhadas), {extractor['avg_time']:.1f}s média\n"
+                      f"**Em curso:** {extractor['in_flight']}",
+                inline=True
+            )
+        
+        # Utilidades (starboard, lembretes e tempo em voz)
+        utilities = self.bot.get_cog("UtilitiesAdvanced")
+        if utilities:
+            stars = utilities.starboard.stats()
+            delivery = utilities.delivery.stats()
+            voice = utilities.voice_tracker.stats()
+            embed.add_field(
+                name="🧰 Utilidades",
+                value=f"**Starboard:** {stars['tracked']:,} mensagens, {stars['edits']:,} edições, "
+                      f"{stars['fetches']:,} fetches ({stars['dirty']} por gravar)\n"
+                      f"**Lembretes:** {delivery['delivered']:,} entregues em {delivery['messages_sent']:,} mensagens "
+                      f"({delivery['pending']} pendentes, {delivery['rest_lookups']:,} pedidos REST)\n"
+                      f"**Voz:** {voice['open']:,} sessões abertas ({voice['pending']} por gravar)",
+                inline=False
+            )
+        
         embed.set_footer(text=f"Bot criado por {self.bot.application.owner}")
         
         await interaction.followup.send(embed=embed)
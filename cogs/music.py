@@ -5,30 +5,70 @@ import yt_dlp
 import asyncio
 from collections import deque
 import os
-from typing import Optional, Dict, List
+import time
+from typing import Optional, Dict, List, Tuple
 import logging
 
+from utils.indexed_list import IndexedList
+from utils.music_cache import METADATA_FIELDS, ExtractionCache
+from utils.ytdl_service import ExtractionService
+
 
 class MusicQueue:
     """Classe para gerenciar a fila de música de um servidor"""
     
-    def __init__(self):
-        self.queue: deque = deque()
+    HISTORY_SIZE = 50
+    
+    def __init__(self, max_size: int = 0):
+        self.queue = IndexedList()
+        self.history: deque = deque(maxlen=self.HISTORY_SIZE)  # Músicas já tocadas
         self.current: Optional[dict] = None
         self.loop_mode: str = "off"  # off, song, queue
         self.volume: float = 0.5
+        self.max_size = max_size  # 0 = sem limite
+        self.version = 0  # Incrementado em cada alteração (para saber o que gravar)
+        
+        # Posição da música atual (para retomar depois de um reinício)
+        self._started_at: Optional[float] = None
+        self._paused_at: Optional[float] = None
+    
+    def is_full(self) -> bool:
+        return bool(self.max_size) and len(self.queue) >= self.max_size
     
-    def add(self, track: dict):
-        """Adiciona uma música à fila"""
+    def add(self, track: dict) -> bool:
+        """Adiciona uma música à fila (False se estiver cheia)"""
+        if self.is_full():
+            return False
+        self.version += 1
         self.queue.append(track)
+        return True
+    
+    def add_many(self, tracks: List[dict]) -> int:
+        """Adiciona várias músicas de uma vez; devolve quantas couberam"""
+        if self.max_size:
+            tracks = tracks[:max(0, self.max_size - len(self.queue))]
+        self.version += 1
+        self.queue.extend(tracks)
+        return len(tracks)
+    
+    def insert(self, index: int, track: dict) -> bool:
+        """Insere uma música numa posição da fila"""
+        if self.is_full():
+            return False
+        self.version += 1
+        self.queue.insert(index, track)
+        return True
     
     def next(self) -> Optional[dict]:
         """Retorna a próxima música da fila"""
         if self.loop_mode == "song" and self.current:
             return self.current
         
-        if self.loop_mode == "queue" and self.current:
-            self.queue.append(self.current)
+        self.version += 1
+        if self.current:
+            self.history.append(self.current)
+            if self.loop_mode == "queue":
+                self.queue.append(self.current)
         
         if self.queue:
             self.current = self.queue.popleft()
@@ -37,33 +77,340 @@ class MusicQueue:
         self.current = None
         return None
     
+    def finish(self):
+        """A música atual acabou e não há outra a seguir (a sessão terminou)"""
+        if self.current:
+            self.history.append(self.current)
+        self.version += 1
+        self.current = None
+        self._started_at = None
+        self._paused_at = None
+    
+    def previous(self) -> Optional[dict]:
+        """Volta à música anterior: ela e a atual passam para o início da fila
+        
+        A música anterior fica em primeiro lugar, por isso é a próxima a tocar.
+        """
+        if not self.history:
+            return None
+        track = self.history.pop()
+        if self.current:
+            if self.loop_mode == "queue" and self.queue and self.queue[-1] is track:
+                self.queue.pop()  # Já tinha voltado ao fim da fila pelo loop
+            self.queue.insert(0, self.current)
+            self.current = None
+        self.version += 1
+        self.queue.insert(0, track)
+        return track
+    
     def clear(self):
         """Limpa a fila"""
+        self.version += 1
         self.queue.clear()
         self.current = None
     
-    def remove(self, index: int) -> bool:
+    def remove(self, index: int) -> Optional[dict]:
         """Remove uma música da fila por índice"""
         try:
-            del self.queue[index]
-            return True
+            track = self.queue.pop(index)
+        except IndexError:
+            return None
+        self.version += 1
+        return track
+    
+    def move(self, source: int, destination: int) -> bool:
+        """Muda uma música de posição na fila"""
+        try:
+            self.queue.move(source, destination)
         except IndexError:
             return False
+        self.version += 1
+        return True
+    
+    def page(self, page: int, per_page: int = 10) -> List[dict]:
+        """Músicas de uma página da fila (página 1 = primeiras)"""
+        start = (page - 1) * per_page
+        return self.queue.slice(start, start + per_page)
+    
+    def upcoming(self, count: int) -> List[dict]:
+        """Próximas `count` músicas"""
+        return self.queue.slice(0, count)
     
     def shuffle(self):
         """Embaralha a fila"""
         import random
         queue_list = list(self.queue)
         random.shuffle(queue_list)
-        self.queue = deque(queue_list)
+        self.version += 1
+        self.queue.replace(queue_list)
+    
+    # --- Posição da música atual ---
+    
+    def mark_started(self, offset: float = 0.0):
+        """A música atual começou a tocar em `offset` segundos"""
+        self._started_at = time.monotonic() - offset
+        self._paused_at = None
+    
+    def mark_paused(self):
+        if self._started_at is not None and self._paused_at is None:
+            self._paused_at = time.monotonic()
+    
+    def mark_resumed(self):
+        if self._paused_at is not None:
+            self._started_at += time.monotonic() - self._paused_at
+            self._paused_at = None
+    
+    def elapsed(self) -> float:
+        """Segundos já tocados da música atual"""
+        if self._started_at is None or self.current is None:
+            return 0.0
+        return max(0.0, (self._paused_at or time.monotonic()) - self._started_at)
+    
+    # --- Persistência ---
+    
+    @staticmethod
+    def _track_state(track: dict) -> dict:
+        return {field: track.get(field) for field in METADATA_FIELDS + ("url",)}
+    
+    def to_state(self) -> dict:
+        """Estado serializável da fila (para gravar a sessão)"""
+        return {
+            "current": self._track_state(self.current) if self.current else None,
+            "position": self.elapsed(),
+            "queue": [self._track_state(track) for track in self.queue],
+            "loop_mode": self.loop_mode,
+            "volume": self.volume,
+        }
+    
+    @classmethod
+    def from_state(cls, state: dict, max_size: int = 0) -> "MusicQueue":
+        """Recria uma fila gravada; a música atual volta ao início da fila
+        marcada para recomeçar na posição em que estava"""
+        queue = cls(max_size)
+        queue.queue.extend(state["queue"])
+        if state.get("current"):
+            current = dict(state["current"])
+            current["resume_at"] = state.get("position") or 0
+            queue.queue.insert(0, current)
+        queue.loop_mode = state.get("loop_mode") or "off"
+        queue.volume = state.get("volume") or 0.5
+        return queue
     
     def __len__(self):
         return len(self.queue)
 
 
+# Configurações alternativas para procurar músicas (ytsearch)
+SEARCH_STRATEGIES = [
+    # Configuração 1: Android TV (mais confiável)
+    {
+        "format": "bestaudio/best",
+        "noplaylist": True,
+        "quiet": True,
+        "no_warnings": True,
+        "default_search": "ytsearch",
+        "extract_flat": False,
+        "extractor_args": {
+            "youtube": {
+                "player_client": ["android_creator", "android_music"],
+                "player_skip": ["configs", "webpage", "js"]
+            }
+        },
+        "http_headers": {
+            "User-Agent": "com.google.android.apps.youtube.creator/22.30.100 (Linux; U; Android 11; SM-G973F) gzip",
+            "X-YouTube-Client-Name": "14",
+            "X-YouTube-Client-Version": "22.30.100"
+        }
+    },
+
+    # Configuração 2: iOS (alternativa móvel)
+    {
+        "format": "bestaudio/best",
+        "noplaylist": True,
+        "quiet": True,
+        "no_warnings": True,
+        "default_search": "ytsearch",
+        "extract_flat": False,
+        "extractor_args": {
+            "youtube": {
+                "player_client": ["ios"],
+                "player_skip": ["configs", "webpage"]
+            }
+        },
+        "http_headers": {
+            "User-Agent": "com.google.ios.youtube/17.33.2 (iPhone14,3; U; CPU iOS 15_6 like Mac OS X)"
+        }
+    },
+
+    # Configuração 3: Web com bypass agressivo
+    {
+        "format": "worst/bestaudio/best",
+        "noplaylist": True,
+        "quiet": True,
+        "no_warnings": True,
+        "default_search": "ytsearch",
+        "extract_flat": False,
+        "geo_bypass": True,
+        "geo_bypass_country": "US",
+        "extractor_args": {
+            "youtube": {
+                "player_client": ["web"],
+                "player_skip": ["configs", "webpage", "js"],
+                "skip": ["hls", "dash"]
+            }
+        },
+        "http_headers": {
+            "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
+            "Accept-Language": "en-US,en;q=0.9",
+            "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8"
+        }
+    },
+
+    # Configuração 4: TV HTML5 (sem JavaScript)
+    {
+        "format": "worst",
+        "noplaylist": True,
+        "quiet": True,
+        "no_warnings": True,
+        "default_search": "ytsearch",
+        "extract_flat": False,
+        "extractor_args": {
+            "youtube": {
+                "player_client": ["tv_embedded"],
+                "player_skip": ["configs", "webpage", "js", "initial_data"]
+            }
+        },
+        "http_headers": {
+            "User-Agent": "Mozilla/5.0 (SMART-TV; LINUX; Tizen 2.4.0) AppleWebKit/538.1 (KHTML, like Gecko) Version/2.4.0 TV Safari/538.1"
+        }
+    },
+
+    # Configuração 5: Fallback extremo (sem extractor_args)
+    {
+        "format": "worst",
+        "noplaylist": True,
+        "quiet": True,
+        "no_warnings": True,
+        "default_search": "ytsearch",
+        "extract_flat": False,
+        "geo_bypass": True,
+        "prefer_insecure": True,
+        "http_headers": {
+            "User-Agent": "yt-dlp/2024.10.01"
+        }
+    }
+]
+
+
+# Configurações de emergência para URLs diretos do YouTube
+EMERGENCY_STRATEGIES = [
+    {
+        "format": "worst",
+        "quiet": True,
+        "no_warnings": True,
+        "geo_bypass": True,
+        "extractor_args": {
+            "youtube": {
+                "player_client": ["android_creator"],
+                "player_skip": ["configs", "webpage", "js", "initial_data"]
+            }
+        }
+    },
+    {
+        "format": "worst",
+        "quiet": True,
+        "no_warnings": True,
+        "prefer_insecure": True,
+        "source_address": "0.0.0.0"
+    }
+]
+
+
+# Estratégias do /playurl para contornar restrições do YouTube
+URL_STRATEGIES = [
+    # Estratégia 1: Android client mais recente
+    {
+        "format": "bestaudio/best",
+        "quiet": True,
+        "no_warnings": True,
+        "extract_flat": False,
+        "extractor_args": {
+            "youtube": {
+                "player_client": ["android", "web"],
+                "player_skip": ["webpage", "configs"]
+            }
+        },
+        "http_headers": {
+            "User-Agent": "com.google.android.youtube/19.09.37 (Linux; U; Android 13) gzip",
+            "Accept": "*/*",
+            "Accept-Language": "en-US,en;q=0.9",
+        }
+    },
+
+    # Estratégia 2: iOS client (muito eficaz)
+    {
+        "format": "bestaudio/best",
+        "quiet": True,
+        "no_warnings": True,
+        "extract_flat": False,
+        "extractor_args": {
+            "youtube": {
+                "player_client": ["ios", "web"],
+                "player_skip": ["webpage"]
+            }
+        },
+        "http_headers": {
+            "User-Agent": "com.google.ios.youtube/19.09.3 (iPhone14,3; U; CPU iOS 15_6 like Mac OS X)",
+            "Accept": "*/*",
+        }
+    },
+
+    # Estratégia 3: Web Embedded com headers atualizados
+    {
+        "format": "bestaudio/best",
+        "quiet": True,
+        "no_warnings": True,
+        "extract_flat": False,
+        "extractor_args": {
+            "youtube": {
+                "player_client": ["web_embedded"],
+                "player_skip": ["configs"]
+            }
+        },
+        "http_headers": {
+            "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
+            "Accept-Language": "en-US,en;q=0.9",
+            "Referer": "https://www.youtube.com/"
+        }
+    },
+
+    # Estratégia 4: TV client (alternativa)
+    {
+        "format": "bestaudio/best",
+        "quiet": True,
+        "no_warnings": True,
+        "extract_flat": False,
+        "extractor_args": {
+            "youtube": {
+                "player_client": ["tv_embedded"],
+            }
+        },
+        "http_headers": {
+            "User-Agent": "Mozilla/5.0 (PlayStation; PlayStation 5/2.26) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/13.0 Safari/605.1.15",
+        }
+    },
+]
+
+
 class MusicCog(commands.Cog):
     """Cog para funcionalidades de música"""
     
+    # Segundos antes do fim da música atual em que o FFmpeg da seguinte arranca
+    PREPARE_BEFORE_END = 15
+    # Intervalo de gravação das sessões de música e reconexões em simultâneo
+    SESSION_INTERVAL = 10
+    MAX_CONCURRENT_RESTORES = 5
+    
     # Definir grupos de comandos
     playlist_group = app_commands.Group(name="playlist", description="🎵 Gerenciar playlists pessoais")
     
@@ -71,10 +418,31 @@ class MusicCog(commands.Cog):
         self.bot = bot
         self.queues: Dict[int, MusicQueue] = {}
         
-        # Sistema de cache para URLs extraídas
-        self.url_cache = {}
-        self.failed_cache = {}  # Cache de URLs que falharam recentemente
+        # Sistema de cache para URLs extraídas (metadados + streams com validade)
         self.cache_enabled = getattr(bot.config, 'enable_music_cache', True)
+        self.extraction_cache = ExtractionCache("data/music_cache.json" if self.cache_enabled else None)
+        self._cache_save_task: Optional[asyncio.Task] = None
+        self.failed_cache = {}  # Cache de URLs que falharam recentemente
+        
+        # Extrações do yt-dlp numa pool própria (pedidos iguais partilhados)
+        self.extractor = ExtractionService(
+            {"search": SEARCH_STRATEGIES, "emergency": EMERGENCY_STRATEGIES, "url": URL_STRATEGIES},
+            max_workers=getattr(bot.config, 'music_workers', 4),
+            attempt_timeout=float(getattr(bot.config, 'music_timeout', 15)),
+            use_processes=getattr(bot.config, 'music_process_pool', False)
+        )
+        
+        # Pré-carregamento: streams das próximas músicas resolvidos em segundo
+        # plano e source da seguinte criado antes de a atual acabar
+        self.prefetch_ahead = getattr(bot.config, 'music_prefetch', 3)
+        self._prefetch_tasks: Dict[int, asyncio.Task] = {}
+        self._prepare_tasks: Dict[int, asyncio.Task] = {}
+        self._ready_sources: Dict[int, Tuple[dict, discord.AudioSource]] = {}
+        
+        # Sessões persistentes: {guild_id: estado gravado} e canal de texto de cada sessão
+        self._saved_sessions: Dict[int, tuple] = {}
+        self._session_channels: Dict[int, int] = {}
+        self._session_task: Optional[asyncio.Task] = None
         
         # Obter formato da configuração ou usar padrão
         ytdl_format = getattr(bot.config, 'ytdl_format', 'bestaudio')
@@ -145,236 +513,181 @@ class MusicCog(commands.Cog):
 
     async def cog_load(self):
         """Método chamado quando o cog é carregado"""
+        if self.cache_enabled:
+            await asyncio.to_thread(self.extraction_cache.load)
+            self._cache_save_task = asyncio.create_task(self._cache_save_loop())
+        # Retomar as sessões em segundo plano (não atrasa o setup_hook)
+        self._session_task = asyncio.create_task(self._session_loop())
         self.bot.logger.info("🎵 Cog de música carregado com sucesso")
 
+    async def cog_unload(self):
+        """Grava a cache de extração e fecha a pool do yt-dlp ao descarregar"""
+        if self._cache_save_task is not None:
+            self._cache_save_task.cancel()
+            self._cache_save_task = None
+        if self._session_task is not None:
+            self._session_task.cancel()
+            self._session_task = None
+            # Ainda ligado à voz: gravar a posição exata para retomar
+            await self.checkpoint_sessions()
+        for task in list(self._prefetch_tasks.values()) + list(self._prepare_tasks.values()):
+            task.cancel()
+        for guild_id in list(self._ready_sources):
+            self._discard_ready_source(guild_id)
+        if self.cache_enabled:
+            await asyncio.to_thread(self.extraction_cache.save)
+        self.extractor.shutdown()
+
+    async def _cache_save_loop(self):
+        """Grava a cache de extração a cada 5 minutos (só se mudou)"""
+        while True:
+            await asyncio.sleep(300)
+            await asyncio.to_thread(self.extraction_cache.save)
+
+    # --- Sessões persistentes ---
+
+    async def _session_loop(self):
+        await self.bot.wait_until_ready()
+        await self.restore_sessions()
+        while True:
+            await asyncio.sleep(self.SESSION_INTERVAL)
+            await self.checkpoint_sessions()
+
+    async def checkpoint_sessions(self):
+        """Grava as sessões alteradas e a posição das que estão a tocar
+        
+        O estado completo (fila incluída) só é gravado quando a fila, o loop,
+        o volume ou os canais mudam; nas restantes só se atualiza a posição.
+        As sessões que terminaram (sem voz ou sem músicas) são apagadas.
+        """
+        sessions, positions, ended = [], [], []
+        saved = {}
+        for guild_id, queue in list(self.queues.items()):
+            guild = self.bot.get_guild(guild_id)
+            voice_client = guild.voice_client if guild else None
+            if not voice_client or not voice_client.is_connected() or not (queue.current or len(queue)):
+                continue
+            signature = (queue.version, queue.loop_mode, queue.volume,
+                         voice_client.channel.id, self._session_channels.get(guild_id))
+            saved[guild_id] = signature
+            if self._saved_sessions.get(guild_id) != signature:
+                text_channel_id = self._session_channels.get(guild_id)
+                sessions.append({
+                    "guild_id": str(guild_id),
+                    "voice_channel_id": str(voice_client.channel.id),
+                    "text_channel_id": str(text_channel_id) if text_channel_id else None,
+                    **queue.to_state(),
+                })
+            elif voice_client.is_playing():
+                positions.append((queue.elapsed(), str(guild_id)))
+        ended = [str(guild_id) for guild_id in self._saved_sessions if guild_id not in saved]
+        
+        if not sessions and not positions and not ended:
+            return
+        try:
+            await self.bot.db.save_music_sessions(sessions, positions)
+            if ended:
+                await self.bot.db.delete_music_sessions(ended)
+            self._saved_sessions = saved
+        except Exception as e:
+            self.bot.logger.error(f"❌ Erro ao gravar sessões de música: {e}")
+
+    async def restore_sessions(self):
+        """Volta a ligar e retoma as sessões gravadas (vários servidores em paralelo)"""
+        try:
+            sessions = await self.bot.db.get_music_sessions()
+        except Exception as e:
+            self.bot.logger.error(f"❌ Erro ao ler sessões de música: {e}")
+            return
+        if not sessions:
+            return
+        
+        semaphore = asyncio.Semaphore(self.MAX_CONCURRENT_RESTORES)
+        results = await asyncio.gather(
+            *(self._restore_session(session, semaphore) for session in sessions),
+            return_exceptions=True
+        )
+        restored = 0
+        ended = []
+        for session, result in zip(sessions, results):
+            if result is True:
+                restored += 1
+                continue
+            if isinstance(result, Exception):
+                self.bot.logger.warning(f"Não foi possível retomar a sessão de música em {session['guild_id']}: {result}")
+            ended.append(session['guild_id'])
+        if ended:
+            try:
+                await self.bot.db.delete_music_sessions(ended)
+            except Exception as e:
+                self.bot.logger.error(f"❌ Erro ao apagar sessões de música: {e}")
+        self.bot.logger.info(f"🎵 {restored}/{len(sessions)} sessões de música retomadas")
+
+    async def _restore_session(self, session: dict, semaphore: asyncio.Semaphore) -> bool:
+        guild = self.bot.get_guild(int(session['guild_id']))
+        voice_channel = guild.get_channel(int(session['voice_channel_id'])) if guild else None
+        # Só voltar se ainda houver alguém a ouvir
+        if voice_channel is None or not any(not member.bot for member in voice_channel.members):
+            return False
+        
+        async with semaphore:
+            if guild.voice_client is None:
+                await voice_channel.connect()
+            queue = MusicQueue.from_state(session, getattr(self.bot.config, 'max_queue_size', 0))
+            if not len(queue):
+                return False
+            self.queues[guild.id] = queue
+            
+            text_channel = guild.get_channel(int(session['text_channel_id'])) if session['text_channel_id'] else None
+            await self.play_next(guild.id, text_channel)
+        return True
+
     def get_queue(self, guild_id: int) -> MusicQueue:
         """Retorna a fila de música do servidor"""
         if guild_id not in self.queues:
-            self.queues[guild_id] = MusicQueue()
+            self.queues[guild_id] = MusicQueue(getattr(self.bot.config, 'max_queue_size', 0))
         return self.queues[guild_id]
 
     async def search_song(self, query: str) -> Optional[dict]:
         """Procura por uma música no YouTube com múltiplas tentativas"""
         
         # Verificar cache primeiro se habilitado
-        if self.cache_enabled and query in self.url_cache:
-            self.bot.logger.info(f"🎯 Cache hit para: {query}")
-            return self.url_cache[query]
+        refresh_meta = None
+        if self.cache_enabled:
+            cached, refresh_meta = self.extraction_cache.get(query)
+            if cached:
+                self.bot.logger.info(f"🎯 Cache hit para: {query}")
+                return cached
+            if refresh_meta:
+                self.bot.logger.info(f"🔄 Stream expirado, a extrair de novo: {refresh_meta['webpage_url']}")
+        
+        # Com metadados em cache basta extrair o vídeo (sem voltar a pesquisar)
+        target = refresh_meta["webpage_url"] if refresh_meta else f"ytsearch:{query}"
         
         # Verificar se falhou recentemente (cache negativo)
-        import time
         if query in self.failed_cache:
             last_fail = self.failed_cache[query]
             if time.time() - last_fail < 300:  # 5 minutos de cooldown
                 self.bot.logger.warning(f"⏰ URL em cooldown (falhou recentemente): {query}")
                 return None
         
-        # Lista de configurações alternativas para tentar
-        alternative_opts = [
-            # Configuração 1: Android TV (mais confiável)
-            {
-                "format": "bestaudio/best",
-                "noplaylist": True,
-                "quiet": True,
-                "no_warnings": True,
-                "default_search": "ytsearch",
-                "extract_flat": False,
-                "extractor_args": {
-                    "youtube": {
-                        "player_client": ["android_creator", "android_music"],
-                        "player_skip": ["configs", "webpage", "js"]
-                    }
-                },
-                "http_headers": {
-                    "User-Agent": "com.google.android.apps.youtube.creator/22.30.100 (Linux; U; Android 11; SM-G973F) gzip",
-                    "X-YouTube-Client-Name": "14",
-                    "X-YouTube-Client-Version": "22.30.100"
-                }
-            },
-            
-            # Configuração 2: iOS (alternativa móvel)
-            {
-                "format": "bestaudio/best",
-                "noplaylist": True,
-                "quiet": True,
-                "no_warnings": True,
-                "default_search": "ytsearch",
-                "extract_flat": False,
-                "extractor_args": {
-                    "youtube": {
-                        "player_client": ["ios"],
-                        "player_skip": ["configs", "webpage"]
-                    }
-                },
-                "http_headers": {
-                    "User-Agent": "com.google.ios.youtube/17.33.2 (iPhone14,3; U; CPU iOS 15_6 like Mac OS X)"
-                }
-            },
-            
-            # Configuração 3: Web com bypass agressivo
-            {
-                "format": "worst/bestaudio/best",
-                "noplaylist": True,
-                "quiet": True,
-                "no_warnings": True,
-                "default_search": "ytsearch",
-                "extract_flat": False,
-                "geo_bypass": True,
-                "geo_bypass_country": "US",
-                "extractor_args": {
-                    "youtube": {
-                        "player_client": ["web"],
-                        "player_skip": ["configs", "webpage", "js"],
-                        "skip": ["hls", "dash"]
-                    }
-                },
-                "http_headers": {
-                    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
-                    "Accept-Language": "en-US,en;q=0.9",
-                    "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8"
-                }
-            },
-            
-            # Configuração 4: TV HTML5 (sem JavaScript)
-            {
-                "format": "worst",
-                "noplaylist": True,
-                "quiet": True,
-                "no_warnings": True,
-                "default_search": "ytsearch",
-                "extract_flat": False,
-                "extractor_args": {
-                    "youtube": {
-                        "player_client": ["tv_embedded"],
-                        "player_skip": ["configs", "webpage", "js", "initial_data"]
-                    }
-                },
-                "http_headers": {
-                    "User-Agent": "Mozilla/5.0 (SMART-TV; LINUX; Tizen 2.4.0) AppleWebKit/538.1 (KHTML, like Gecko) Version/2.4.0 TV Safari/538.1"
-                }
-            },
-            
-            # Configuração 5: Fallback extremo (sem extractor_args)
-            {
-                "format": "worst",
-                "noplaylist": True,
-                "quiet": True,
-                "no_warnings": True,
-                "default_search": "ytsearch",
-                "extract_flat": False,
-                "geo_bypass": True,
-                "prefer_insecure": True,
-                "http_headers": {
-                    "User-Agent": "yt-dlp/2024.10.01"
-                }
-            }
-        ]
-        
-        for i, opts in enumerate(alternative_opts):
-            try:
-                if getattr(self.bot.config, 'music_debug', False):
-                    self.bot.logger.debug(f"🔍 Tentativa {i+1} com configuração: {opts.get('extractor_args', {})}")
-                
-                self.bot.logger.info(f"Tentativa {i+1} de procura por música: {query}")
-                
-                loop = asyncio.get_event_loop()
-                data = await loop.run_in_executor(
-                    None, 
-                    lambda: yt_dlp.YoutubeDL(opts).extract_info(
-                        f"ytsearch:{query}", download=False
-                    )
-                )
-                
-                if data and "entries" in data and data["entries"]:
-                    track = data["entries"][0]
-                    self.bot.logger.info(f"✅ Música encontrada na tentativa {i+1}: {track.get('title', 'Desconhecido')}")
-                    
-                    track_info = {
-                        "title": track.get("title", "Desconhecido"),
-                        "url": track.get("url"),
-                        "webpage_url": track.get("webpage_url"),
-                        "duration": track.get("duration", 0),
-                        "uploader": track.get("uploader", "Desconhecido"),
-                        "thumbnail": track.get("thumbnail"),
-                    }
-                    
-                    # Salvar no cache se habilitado
-                    if self.cache_enabled:
-                        self.url_cache[query] = track_info
-                        # Manter cache limitado (máximo 100 entradas)
-                        if len(self.url_cache) > 100:
-                            # Remove a entrada mais antiga
-                            oldest_key = next(iter(self.url_cache))
-                            del self.url_cache[oldest_key]
-                    
-                    return track_info
-                    
-            except Exception as e:
-                self.bot.logger.warning(f"Tentativa {i+1} falhou: {str(e)}")
-                if i < len(alternative_opts) - 1:
-                    await asyncio.sleep(1)  # Esperar 1 segundo antes da próxima tentativa
-                continue
+        track_info = await self.extractor.extract(target, "search")
         
         # Se todas as tentativas falharam, tentar busca direta por URL se parecer um link
-        if "youtube.com" in query or "youtu.be" in query:
-            # Tentar com diferentes configurações de emergência
-            emergency_configs = [
-                {
-                    "format": "worst",
-                    "quiet": True,
-                    "no_warnings": True,
-                    "geo_bypass": True,
-                    "extractor_args": {
-                        "youtube": {
-                            "player_client": ["android_creator"],
-                            "player_skip": ["configs", "webpage", "js", "initial_data"]
-                        }
-                    }
-                },
-                {
-                    "format": "worst",
-                    "quiet": True,
-                    "no_warnings": True,
-                    "prefer_insecure": True,
-                    "source_address": "0.0.0.0"
-                }
-            ]
-            
-            for i, config in enumerate(emergency_configs):
-                try:
-                    self.bot.logger.info(f"Tentando configuração de emergência {i+1} para URL...")
-                    loop = asyncio.get_event_loop()
-                    data = await loop.run_in_executor(
-                        None, 
-                        lambda: yt_dlp.YoutubeDL(config).extract_info(query, download=False)
-                    )
-                    
-                    if data:
-                        self.bot.logger.info(f"✅ URL extraída com configuração de emergência {i+1}: {data.get('title', 'Desconhecido')}")
-                        track_info = {
-                            "title": data.get("title", "Desconhecido"),
-                            "url": data.get("url"),
-                            "webpage_url": data.get("webpage_url", query),
-                            "duration": data.get("duration", 0),
-                            "uploader": data.get("uploader", "Desconhecido"),
-                            "thumbnail": data.get("thumbnail"),
-                        }
-                        
-                        # Salvar no cache se habilitado
-                        if self.cache_enabled:
-                            self.url_cache[query] = track_info
-                        
-                        return track_info
-                        
-                except Exception as e:
-                    self.bot.logger.warning(f"Configuração de emergência {i+1} falhou: {e}")
-                    continue
+        if not track_info and ("youtube.com" in query or "youtu.be" in query):
+            self.bot.logger.info("Tentando configurações de emergência para URL...")
+            track_info = await self.extractor.extract(query, "emergency")
+        
+        if track_info:
+            # Salvar no cache se habilitado
+            if self.cache_enabled:
+                self.extraction_cache.put(query, track_info)
+            return track_info
         
         self.bot.logger.error(f"❌ Todas as tentativas falharam para: {query}")
         
         # Adicionar ao cache negativo
         if self.cache_enabled:
-            import time
             self.failed_cache[query] = time.time()
             # Limitar cache negativo (máximo 50 entradas)
             if len(self.failed_cache) > 50:
@@ -383,6 +696,120 @@ class MusicCog(commands.Cog):
         
         return None
 
+    # --- Pré-carregamento da fila ---
+
+    def _stream_ready(self, track: dict) -> bool:
+        """Se a música já tem um URL de stream que dura até ao fim dela"""
+        url = track.get("url")
+        if not url or url == track.get("webpage_url"):
+            return False  # Músicas de playlists guardam só o URL da página
+        return ExtractionCache.is_fresh(url, track.get("duration"))
+
+    async def resolve_stream(self, track: dict) -> bool:
+        """Garante um URL de stream válido para a música (extrai se faltar ou estiver a expirar)"""
+        if self._stream_ready(track):
+            return True
+        webpage_url = track.get("webpage_url")
+        if not webpage_url:
+            return bool(track.get("url"))
+        
+        resolved = None
+        if self.cache_enabled:
+            resolved, _ = self.extraction_cache.get(webpage_url)
+        if resolved is None:
+            resolved = await self.extractor.extract(webpage_url, "url")
+            if resolved and self.cache_enabled:
+                self.extraction_cache.put(webpage_url, resolved)
+        if not resolved:
+            return False
+        
+        track["url"] = resolved["url"]
+        for field in ("title", "duration", "uploader", "thumbnail"):
+            if not track.get(field):
+                track[field] = resolved.get(field)
+        return True
+
+    def schedule_prefetch(self, guild_id: int):
+        """Resolve em segundo plano os streams das próximas músicas da fila"""
+        task = self._prefetch_tasks.get(guild_id)
+        if task is not None and not task.done():
+            return  # A tarefa em curso volta a olhar para a fila antes de acabar
+        self._prefetch_tasks[guild_id] = asyncio.create_task(self._prefetch(guild_id))
+
+    async def _prefetch(self, guild_id: int):
+        queue = self.get_queue(guild_id)
+        attempted = set()
+        while True:
+            pending = [
+                track for track in queue.upcoming(self.prefetch_ahead)
+                if id(track) not in attempted and not self._stream_ready(track)
+            ]
+            if not pending:
+                return
+            track = pending[0]
+            attempted.add(id(track))
+            try:
+                if await self.resolve_stream(track):
+                    self.bot.logger.debug(f"⏩ Stream pré-carregado: {track.get('title')}")
+            except Exception as e:
+                self.bot.logger.warning(f"Erro ao pré-carregar '{track.get('title')}': {e}")
+
+    def _create_source(self, url: str, seek: float = 0) -> discord.AudioSource:
+        """Cria o source do FFmpeg (Opus e, se falhar, PCM), a começar em `seek` segundos"""
+        ffmpeg_options, ffmpeg_pcm_options = self.ffmpeg_options, self.ffmpeg_pcm_options
+        if seek:
+            # -ss antes do input: o FFmpeg salta logo para a posição (pedido com Range)
+            ffmpeg_options = {**ffmpeg_options, "before_options": f"-ss {seek:.1f} {ffmpeg_options['before_options']}"}
+            ffmpeg_pcm_options = {**ffmpeg_pcm_options, "before_options": f"-ss {seek:.1f} {ffmpeg_pcm_options['before_options']}"}
+        try:
+            return discord.FFmpegOpusAudio(url, **ffmpeg_options)
+        except Exception as opus_error:
+            self.bot.logger.warning(f"FFmpegOpusAudio falhou: {opus_error}")
+            return discord.FFmpegPCMAudio(url, **ffmpeg_pcm_options)
+
+    def _schedule_prepare(self, guild_id: int, track: dict, offset: float = 0):
+        """Agenda a criação do source da próxima música perto do fim da atual"""
+        task = self._prepare_tasks.pop(guild_id, None)
+        if task is not None:
+            task.cancel()
+        if track.get("duration"):
+            delay = max(0, track["duration"] - offset - self.PREPARE_BEFORE_END)
+            self._prepare_tasks[guild_id] = asyncio.create_task(self._prepare_next(guild_id, delay))
+
+    async def _prepare_next(self, guild_id: int, delay: float):
+        await asyncio.sleep(delay)
+        queue = self.get_queue(guild_id)
+        if queue.loop_mode == "song" or not queue.queue:
+            return
+        track = queue.queue[0]
+        try:
+            # Também renova o stream se tiver expirado entretanto (pausas longas)
+            if not await self.resolve_stream(track):
+                return
+            if not queue.queue or queue.queue[0] is not track:
+                return  # A fila mudou entretanto
+            self._discard_ready_source(guild_id)
+            self._ready_sources[guild_id] = (track, self._create_source(track["url"]))
+            self.bot.logger.info(f"⏩ Próxima música pronta: {track.get('title')}")
+        except Exception as e:
+            self.bot.logger.warning(f"Erro ao preparar a próxima música: {e}")
+
+    def _take_ready_source(self, guild_id: int, track: dict) -> Optional[discord.AudioSource]:
+        """Source já criado para esta música (descarta-o se for de outra)"""
+        ready = self._ready_sources.pop(guild_id, None)
+        if ready is None:
+            return None
+        ready_track, source = ready
+        if ready_track is track:
+            return source
+        source.cleanup()
+        return None
+
+    def _discard_ready_source(self, guild_id: int):
+        ready = self._ready_sources.pop(guild_id, None)
+        if ready is not None:
+            ready[1].cleanup()
+
     async def play_next(self, guild_id: int, text_channel):
         """Toca a próxima música da fila"""
         guild = self.bot.get_guild(guild_id)
@@ -402,7 +829,10 @@ class MusicCog(commands.Cog):
         queue = self.get_queue(guild_id)
         
         next_track = queue.next()
+        if text_channel:
+            self._session_channels[guild_id] = text_channel.id
         if not next_track:
+            self._discard_ready_source(guild_id)
             # Fila vazia, agendar desconexão para mais tarde (não bloquear)
             self.bot.logger.info(f"Fila vazia para guild {guild_id}, agendando desconexão...")
             
@@ -450,46 +880,29 @@ class MusicCog(commands.Cog):
                     self.bot.logger.error(f"Falha ao reconectar: {reconnect_error}")
                     return
             
-            # Criar source com retry em caso de falha
-            source = None
-            for attempt in range(3):
-                try:
-                    # Verificar se a URL do áudio é válida
-                    if not next_track["url"]:
-                        self.bot.logger.error("URL de áudio vazio")
-                        return
-                    
-                    self.bot.logger.info(f"Tentativa {attempt + 1}: Criando source para {next_track['url'][:100]}...")
-                    
-                    # Tentar FFmpegOpusAudio primeiro (mais eficiente)
+            # Usar o source preparado antes do fim da música anterior, se existir
+            # Música de uma sessão retomada: recomeçar onde estava
+            seek = next_track.pop("resume_at", 0)
+            source = None if seek else self._take_ready_source(guild_id, next_track)
+            if source is not None:
+                self.bot.logger.info(f"⏩ A usar source pré-carregado para: {next_track['title']}")
+            else:
+                # Garantir um stream válido (músicas de playlists ou com o URL a expirar)
+                if not await self.resolve_stream(next_track):
+                    raise RuntimeError(f"sem URL de áudio para '{next_track['title']}'")
+                
+                # Criar source com retry em caso de falha
+                for attempt in range(3):
                     try:
-                        source = discord.FFmpegOpusAudio(
-                            next_track["url"],
-                            **self.ffmpeg_options
-                        )
-                        self.bot.logger.info(f"✅ Source Opus criado com sucesso (tentativa {attempt + 1})")
+                        self.bot.logger.info(f"Tentativa {attempt + 1}: Criando source para {next_track['url'][:100]}...")
+                        source = self._create_source(next_track["url"], seek)
+                        self.bot.logger.info(f"✅ Source criado com sucesso (tentativa {attempt + 1})")
                         break
-                    except Exception as opus_error:
-                        self.bot.logger.warning(f"FFmpegOpusAudio falhou (tentativa {attempt + 1}): {opus_error}")
-                        
-                        # Fallback para FFmpegPCMAudio se Opus falhar
-                        try:
-                            source = discord.FFmpegPCMAudio(
-                                next_track["url"],
-                                **self.ffmpeg_pcm_options
-                            )
-                            self.bot.logger.info(f"✅ Source PCM criado como fallback (tentativa {attempt + 1})")
-                            break
-                        except Exception as pcm_error:
-                            self.bot.logger.warning(f"FFmpegPCMAudio também falhou (tentativa {attempt + 1}): {pcm_error}")
-                            if attempt == 2:
-                                raise pcm_error
-                            
-                except Exception as source_error:
-                    self.bot.logger.warning(f"Tentativa {attempt + 1} de criar source falhou: {source_error}")
-                    if attempt == 2:
-                        raise source_error
-                    await asyncio.sleep(1)
+                    except Exception as source_error:
+                        self.bot.logger.warning(f"Tentativa {attempt + 1} de criar source falhou: {source_error}")
+                        if attempt == 2:
+                            raise source_error
+                        await asyncio.sleep(1)
             
             if not source:
                 self.bot.logger.error("Falha ao criar source de áudio após todas as tentativas")
@@ -534,6 +947,8 @@ class MusicCog(commands.Cog):
                             self.bot.loop
                         )
                     else:
+                        # Fila vazia: a sessão acabou (não é retomada depois de um reinício)
+                        self.bot.loop.call_soon_threadsafe(queue.finish)
                         self.bot.logger.info(f"Reprodução finalizada para guild {guild_id}")
                 except Exception as after_error:
                     self.bot.logger.error(f"Erro na função after_play: {after_error}")
@@ -548,6 +963,11 @@ class MusicCog(commands.Cog):
             try:
                 voice_client.play(source, after=after_play)
                 self.bot.logger.info(f"✅ Comando voice_client.play() executado com sucesso")
+                
+                # Preparar as próximas enquanto esta toca
+                queue.mark_started(seek)
+                self._schedule_prepare(guild_id, next_track, seek)
+                self.schedule_prefetch(guild_id)
             except Exception as play_error:
                 self.bot.logger.error(f"❌ Erro ao executar voice_client.play(): {play_error}")
                 return
@@ -709,12 +1129,13 @@ class MusicCog(commands.Cog):
         queue = self.get_queue(interaction.guild.id)
         
         # Verificar limite da fila
-        if len(queue) >= self.bot.config.max_queue_size:
-            await interaction.followup.send(f"❌ Fila cheia! Máximo: {self.bot.config.max_queue_size}")
+        if queue.is_full():
+            await interaction.followup.send(f"❌ Fila cheia! Máximo: {queue.max_size}")
             return
         
         # Adicionar à fila
         queue.add(track)
+        self.schedule_prefetch(interaction.guild.id)
         
         # Se não estiver tocando, começar imediatamente
         if not voice_client.is_playing() and not voice_client.is_paused():
@@ -743,21 +1164,34 @@ class MusicCog(commands.Cog):
             await interaction.followup.send(embed=embed)
 
     @discord.app_commands.command(name="skip", description="Passa à próxima música")
-    async def skip(self, interaction: discord.Interaction):
-        """Passa à próxima música"""
+    @discord.app_commands.describe(anterior="Voltar à música anterior em vez de avançar")
+    async def skip(self, interaction: discord.Interaction, anterior: bool = False):
+        """Passa à próxima música (ou volta à anterior)"""
         voice_client = interaction.guild.voice_client
         
         if not voice_client or not voice_client.is_playing():
             await interaction.response.send_message("❌ Não estou tocando nada!", ephemeral=True)
             return
         
+        if anterior:
+            previous = self.get_queue(interaction.guild.id).previous()
+            if not previous:
+                await interaction.response.send_message("❌ Não há músicas anteriores!", ephemeral=True)
+                return
+            embed = discord.Embed(
+                title="⏮️ Música Anterior",
+                description=f"A voltar a **{previous['title']}**...",
+                color=discord.Color.blue()
+            )
+        else:
+            embed = discord.Embed(
+                title="⏭️ Música Passou",
+                description="Próxima música em instantes...",
+                color=discord.Color.blue()
+            )
+        
         voice_client.stop()
         
-        embed = discord.Embed(
-            title="⏭️ Música Passou",
-            description="Próxima música em instantes...",
-            color=discord.Color.blue()
-        )
         await interaction.response.send_message(embed=embed)
 
     @discord.app_commands.command(name="pause", description="Pausa a música actual")
@@ -774,6 +1208,7 @@ class MusicCog(commands.Cog):
             return
         
         voice_client.pause()
+        self.get_queue(interaction.guild.id).mark_paused()
         
         embed = discord.Embed(
             title="⏸️ Música Pausada",
@@ -796,6 +1231,7 @@ class MusicCog(commands.Cog):
             return
         
         voice_client.resume()
+        self.get_queue(interaction.guild.id).mark_resumed()
         
         embed = discord.Embed(
             title="▶️ Música Retomada",
@@ -815,6 +1251,7 @@ class MusicCog(commands.Cog):
         
         queue = self.get_queue(interaction.guild.id)
         queue.clear()
+        self._discard_ready_source(interaction.guild.id)
         
         if voice_client.is_playing() or voice_client.is_paused():
             voice_client.stop()
@@ -864,14 +1301,21 @@ class MusicCog(commands.Cog):
                 inline=False
             )
         
+        # Última música tocada
+        if queue.history:
+            previous = queue.history[-1]
+            embed.add_field(
+                name="⏮️ Anterior",
+                value=f"[{previous['title']}]({previous['webpage_url']})",
+                inline=False
+            )
+        
         # Fila
         if len(queue) > 0:
             start_idx = (pagina - 1) * items_per_page
-            end_idx = min(start_idx + items_per_page, len(queue))
             
             queue_text = ""
-            for i in range(start_idx, end_idx):
-                track = list(queue.queue)[i]
+            for i, track in enumerate(queue.page(pagina, items_per_page), start_idx):
                 queue_text += f"`{i+1}.` **[{track['title']}]({track['webpage_url']})**\n"
             
             embed.add_field(
@@ -1088,114 +1532,9 @@ class MusicCog(commands.Cog):
             try:
                 self.bot.logger.info(f"Extraindo informações do URL: {url}")
                 
-                # Estratégias múltiplas para contornar restrições do YouTube
-                extraction_strategies = [
-                    # Estratégia 1: Android client mais recente
-                    {
-                        "format": "bestaudio/best",
-                        "quiet": True,
-                        "no_warnings": True,
-                        "extract_flat": False,
-                        "extractor_args": {
-                            "youtube": {
-                                "player_client": ["android", "web"],
-                                "player_skip": ["webpage", "configs"]
-                            }
-                        },
-                        "http_headers": {
-                            "User-Agent": "com.google.android.youtube/19.09.37 (Linux; U; Android 13) gzip",
-                            "Accept": "*/*",
-                            "Accept-Language": "en-US,en;q=0.9",
-                        }
-                    },
-                    
-                    # Estratégia 2: iOS client (muito eficaz)
-                    {
-                        "format": "bestaudio/best",
-                        "quiet": True,
-                        "no_warnings": True,
-                        "extract_flat": False,
-                        "extractor_args": {
-                            "youtube": {
-                                "player_client": ["ios", "web"],
-                                "player_skip": ["webpage"]
-                            }
-                        },
-                        "http_headers": {
-                            "User-Agent": "com.google.ios.youtube/19.09.3 (iPhone14,3; U; CPU iOS 15_6 like Mac OS X)",
-                            "Accept": "*/*",
-                        }
-                    },
-                    
-                    # Estratégia 3: Web Embedded com headers atualizados
-                    {
-                        "format": "bestaudio/best",
-                        "quiet": True,
-                        "no_warnings": True,
-                        "extract_flat": False,
-                        "extractor_args": {
-                            "youtube": {
-                                "player_client": ["web_embedded"],
-                                "player_skip": ["configs"]
-                            }
-                        },
-                        "http_headers": {
-                            "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
-                            "Accept-Language": "en-US,en;q=0.9",
-                            "Referer": "https://www.youtube.com/"
-                        }
-                    },
-                    
-                    # Estratégia 4: TV client (alternativa)
-                    {
-                        "format": "bestaudio/best",
-                        "quiet": True,
-                        "no_warnings": True,
-                        "extract_flat": False,
-                        "extractor_args": {
-                            "youtube": {
-                                "player_client": ["tv_embedded"],
-                            }
-                        },
-                        "http_headers": {
-                            "User-Agent": "Mozilla/5.0 (PlayStation; PlayStation 5/2.26) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/13.0 Safari/605.1.15",
-                        }
-                    },
-                ]
-                
-                data = None
-                successful_strategy = None
-                
-                for i, strategy in enumerate(extraction_strategies):
-                    try:
-                        self.bot.logger.info(f"Tentando estratégia {i+1}/4 para extrair URL...")
-                        
-                        async def extract_with_strategy():
-                            loop = asyncio.get_event_loop()
-                            return await loop.run_in_executor(
-                                None, 
-                                lambda: yt_dlp.YoutubeDL(strategy).extract_info(url, download=False)
-                            )
-                        
-                        # Timeout configurável por estratégia
-                        timeout = getattr(self.bot.config, 'music_timeout', 15)
-                        data = await asyncio.wait_for(extract_with_strategy(), timeout=float(timeout))
-                        
-                        if data and data.get("url"):
-                            successful_strategy = i + 1
-                            self.bot.logger.info(f"✅ Estratégia {successful_strategy} funcionou!")
-                            break
-                        else:
-                            self.bot.logger.warning(f"⚠️ Estratégia {i+1} não retornou dados válidos")
-                            
-                    except asyncio.TimeoutError:
-                        self.bot.logger.warning(f"⏱️ Estratégia {i+1} expirou (timeout)")
-                        continue
-                    except Exception as e:
-                        self.bot.logger.warning(f"❌ Estratégia {i+1} falhou: {str(e)}")
-                        continue
+                track = await self.extractor.extract(url, "url")
                 
-                if not data or not data.get("url"):
+                if not track:
                     await interaction.followup.send(
                         "❌ **YouTube bloqueou todas as tentativas!**\n"
                         "💡 **Soluções:**\n"
@@ -1205,16 +1544,7 @@ class MusicCog(commands.Cog):
                     )
                     return
                 
-                track = {
-                    "title": data.get("title", "Desconhecido"),
-                    "url": data.get("url"),
-                    "webpage_url": data.get("webpage_url", url),
-                    "duration": data.get("duration", 0),
-                    "uploader": data.get("uploader", "Desconhecido"),
-                    "thumbnail": data.get("thumbnail"),
-                }
-                
-                self.bot.logger.info(f"✅ URL extraído com sucesso (estratégia {successful_strategy}): {track['title']}")
+                self.bot.logger.info(f"✅ URL extraído com sucesso: {track['title']}")
                 
             except Exception as e:
                 self.bot.logger.error(f"Erro ao extrair URL: {e}")
@@ -1224,12 +1554,13 @@ class MusicCog(commands.Cog):
             queue = self.get_queue(interaction.guild.id)
             
             # Verificar limite da fila
-            if len(queue) >= self.bot.config.max_queue_size:
-                await interaction.followup.send(f"❌ Fila cheia! Máximo: {self.bot.config.max_queue_size}")
+            if queue.is_full():
+                await interaction.followup.send(f"❌ Fila cheia! Máximo: {queue.max_size}")
                 return
             
             # Adicionar à fila
             queue.add(track)
+            self.schedule_prefetch(interaction.guild.id)
             
             # Se não estiver tocando, começar imediatamente
             if not voice_client.is_playing() and not voice_client.is_paused():
@@ -1588,33 +1919,36 @@ class MusicCog(commands.Cog):
         # Conectar ao canal de voz se necessário
         guild_id = interaction.guild.id
         voice_channel = interaction.user.voice.channel
+        voice_client = interaction.guild.voice_client
         
-        if guild_id not in self.voice_clients or not self.voice_clients[guild_id].is_connected():
+        if not voice_client or not voice_client.is_connected():
             try:
                 voice_client = await voice_channel.connect()
-                self.voice_clients[guild_id] = voice_client
             except Exception as e:
                 await interaction.followup.send(f"❌ Erro ao conectar: {e}")
                 return
         
-        # Adicionar todas as músicas à fila
-        queue = self.music_queues.get(guild_id, [])
-        added_count = 0
-        
-        for song in songs:
-            # Converter para formato esperado
-            track = {
+        # Adicionar todas as músicas à fila de uma vez (os streams são
+        # resolvidos pelo pré-carregamento antes de cada música tocar)
+        queue = self.get_queue(guild_id)
+        tracks = [
+            {
                 "title": song["title"],
                 "webpage_url": song["url"],
                 "duration": song["duration"],
                 "uploader": song["uploader"],
-                "url": song["url"],  # Para compatibilidade
-                "requester": interaction.user
+                "url": song["url"],  # URL da página até o stream ser resolvido
+                "thumbnail": song.get("thumbnail"),
             }
-            queue.append(track)
-            added_count += 1
+            for song in songs
+        ]
+        start_position = len(queue) + 1
+        added_count = queue.add_many(tracks)
         
-        self.music_queues[guild_id] = queue
+        if not added_count:
+            await interaction.followup.send(f"❌ Fila cheia! Máximo: {queue.max_size}")
+            return
+        self.schedule_prefetch(guild_id)
         
         embed = discord.Embed(
             title="🎵 Playlist Adicionada!",
@@ -1624,21 +1958,23 @@ class MusicCog(commands.Cog):
         
         embed.add_field(
             name="📊 Músicas Adicionadas",
-            value=f"{added_count} música(s)",
+            value=f"{added_count} música(s)" + (
+                f" ({len(tracks) - added_count} não couberam na fila)" if added_count < len(tracks) else ""
+            ),
             inline=True
         )
         
         embed.add_field(
             name="📋 Posição na Fila",
-            value=f"{len(queue) - added_count + 1}-{len(queue)}",
+            value=f"{start_position}-{start_position + added_count - 1}",
             inline=True
         )
         
         await interaction.followup.send(embed=embed)
         
         # Iniciar reprodução se não estiver tocando
-        if guild_id not in self.current_tracks or not self.current_tracks[guild_id]:
-            await self.play_next(guild_id)
+        if not voice_client.is_playing() and not voice_client.is_paused():
+            await self.play_next(guild_id, interaction.channel)
 
     @playlist_group.command(name="list", description="Lista as tuas playlists")
     async def playlist_list(self, interaction: discord.Interaction):
@@ -1800,8 +2136,7 @@ class MusicCog(commands.Cog):
                 self.bot.logger.info(f"🔄 Cache negativo limpo para: {url}")
             
             # Remover do cache positivo também para forçar nova extração
-            if url in self.url_cache:
-                del self.url_cache[url]
+            if self.extraction_cache.invalidate(url):
                 self.bot.logger.info(f"🗑️ Cache positivo limpo para: {url}")
             
             # Tentar extrair novamente
@@ -1845,9 +2180,17 @@ class MusicCog(commands.Cog):
                 color=discord.Color.blue()
             )
             
+            cache_stats = self.extraction_cache.stats()
             embed.add_field(
                 name="✅ Cache Positivo",
-                value=f"{len(self.url_cache)} URLs em cache",
+                value=f"{cache_stats['tracks']} músicas / {cache_stats['streams']} streams válidos",
+                inline=True
+            )
+            
+            embed.add_field(
+                name="🎯 Utilização",
+                value=f"{cache_stats['hits']} hits / {cache_stats['misses']} misses / "
+                      f"{cache_stats['refreshes']} refreshes ({cache_stats['hit_rate']:.0%})",
                 inline=True
             )
             
@@ -10,6 +10,7 @@ from typing import Optional
 import logging
 
 from utils.embeds import EmbedBuilder
+from utils.cache import LRUCache
 from utils.database import get_database
 
 
@@ -27,6 +28,7 @@ class SocialCog(commands.Cog):
         self.xp_cooldowns = {}
         self.rep_cooldowns = {}
         self.levelup_notified = {}  # Evitar notificações duplicadas de level up
+        self.owned_badges = LRUCache(maxsize=5000)  # (user_id, guild_id) -> badge_ids já atribuídas
     
     async def cog_load(self):
         """Carregado quando o cog é inicializado"""
@@ -102,24 +104,9 @@ class SocialCog(commands.Cog):
             # Debug log
             self.bot.logger.debug(f"XP Update - User {user_id}: old_level={old_level}, old_xp={old_xp}, xp_gain={xp_gain}, new_xp={new_xp}, new_level={new_level}")
             
-            # Atualizar na base de dados
-            await self.db.update_user_level(user_id, guild_id, new_xp, new_level)
-            
-            # Atualizar streak de mensagens (1 dia de streak)
-            await self.db.update_streak(user_id, guild_id, "messages", 1)
-            
-            # Registrar estatísticas diárias para gráficos
-            import aiosqlite
-            today = datetime.utcnow().date().isoformat()
-            async with aiosqlite.connect(self.db.db_path) as db:
-                await db.execute(
-                    """INSERT INTO message_stats (user_id, guild_id, date, message_count, xp_gained)
-                       VALUES (?, ?, ?, 1, ?)
-                       ON CONFLICT(user_id, guild_id, date)
-                       DO UPDATE SET message_count = message_count + 1, xp_gained = xp_gained + ?""",
-                    (user_id, guild_id, today, xp_gain, xp_gain)
-                )
-                await db.commit()
+            # XP, streak de mensagens e estatísticas diárias (para gráficos)
+            # ficam no buffer e são escritos em lote
+            self.db.record_message_activity(user_id, guild_id, xp_gain, new_level)
             
             # Verificar e dar achievements
             await self.check_and_award_achievements(user_id, guild_id)
@@ -320,12 +307,6 @@ class SocialCog(commands.Cog):
                 inline=True
             )
             
-            embed.add_field(
-                name="✨ XP Total",
-                value=f"**{current_xp:,}**",
-                inline=True
-            )
-            
             embed.add_field(
                 name="📈 Reputação",
                 value=f"**{level_data.get('reputation', 0)}**",
@@ -344,12 +325,6 @@ class SocialCog(commands.Cog):
                 inline=True
             )
             
-            embed.add_field(
-                name="💬 Mensagens Enviadas",
-                value=f"**{messages:,}**",
-                inline=True
-            )
-            
             embed.set_footer(text=f"Solicitado por {interaction.user.display_name}")
             await interaction.followup.send(embed=embed)
         
@@ -393,18 +368,7 @@ class SocialCog(commands.Cog):
         
         try:
             # Incrementar reputação
-            await self.db.execute(
-                """INSERT INTO user_levels (user_id, guild_id, reputation, xp, level)
-                   VALUES (?, ?, 1, 0, 1)
-                   ON CONFLICT(user_id, guild_id) 
-                   DO UPDATE SET reputation = reputation + 1""",
-                (str(utilizador.id), str(interaction.guild.id))
-            )
-            await self.db.commit()
-            
-            # Buscar nova reputação
-            level_data = await self.db.get_user_level(str(utilizador.id), str(interaction.guild.id))
-            reputation = level_data.get("reputation", 1)
+            reputation = await self.db.add_reputation(str(utilizador.id), str(interaction.guild.id))
             
             embed = discord.Embed(
                 title="👍 Like Dado!",
@@ -444,63 +408,46 @@ class SocialCog(commands.Cog):
             return
         
         try:
-            # Buscar dados baseado na categoria
+            # Rankings mantidos em memória (sem percorrer as tabelas)
+            metric = None
             if categoria == "xp":
-                query = """SELECT user_id, xp, level 
-                          FROM user_levels 
-                          WHERE guild_id = ? 
-                          ORDER BY xp DESC 
-                          LIMIT 10"""
+                metric = "xp"
                 title = "🏆 Ranking por XP/Nível"
                 format_func = lambda row: f"Nível {row[2]} ({row[1]:,} XP)"
                 
             elif categoria == "reputation":
-                query = """SELECT user_id, reputation, level 
-                          FROM user_levels 
-                          WHERE guild_id = ? AND reputation > 0
-                          ORDER BY reputation DESC 
-                          LIMIT 10"""
+                metric = "reputation"
                 title = "👍 Ranking por Reputação"
                 format_func = lambda row: f"{row[1]} likes"
                 
             elif categoria == "money":
-                query = """SELECT user_id, balance 
-                          FROM economy 
-                          WHERE guild_id = ? 
-                          ORDER BY balance DESC 
-                          LIMIT 10"""
+                metric = "balance"
                 title = "💰 Ranking por Dinheiro"
                 format_func = lambda row: f"${row[1]:,}"
                 
             elif categoria == "games":
-                query = """SELECT user_id, total_wins 
-                          FROM game_stats 
-                          WHERE guild_id = ? AND total_wins > 0
-                          ORDER BY total_wins DESC 
-                          LIMIT 10"""
                 title = "🎮 Ranking por Vitórias em Jogos"
                 format_func = lambda row: f"{row[1]} vitórias"
                 
             elif categoria == "messages":
-                query = """SELECT user_id, messages_sent 
-                          FROM user_levels 
-                          WHERE guild_id = ? AND messages_sent > 0
-                          ORDER BY messages_sent DESC 
-                          LIMIT 10"""
+                metric = "messages"
                 title = "📨 Ranking por Mensagens Enviadas"
                 format_func = lambda row: f"{row[1]:,} mensagens"
                 
             elif categoria == "streaks":
-                query = """SELECT user_id, daily_streak 
-                          FROM user_levels 
-                          WHERE guild_id = ? AND daily_streak > 0
-                          ORDER BY daily_streak DESC 
-                          LIMIT 10"""
-                title = "🔥 Ranking por Streak Diário"
-                format_func = lambda row: f"{row[1]} dias"
-            
-            async with self.db.execute(query, (guild_id,)) as cursor:
-                rows = await cursor.fetchall()
+                metric = "streaks"
+                title = "🔥 Ranking por Streak de Mensagens"
+                format_func = lambda row: f"{row[1]:,} mensagens seguidas"
+            
+            if metric:
+                rows = await self.db.leaderboards.top(metric, guild_id, limit=10)
+                if metric == "xp":
+                    rows = [
+                        (user_id, xp, (await self.db.get_user_level(user_id, guild_id))["level"])
+                        for user_id, xp in rows
+                    ]
+            else:
+                rows = [(row["user_id"], row["wins"]) for row in await self.db.get_total_wins_leaderboard(limit=10)]
             
             embed = discord.Embed(
                 title=title,
@@ -528,7 +475,13 @@ class SocialCog(commands.Cog):
                 leaderboard_text = "Nenhum dado encontrado!"
             
             embed.description = leaderboard_text
-            embed.set_footer(text=f"Solicitado por {interaction.user.display_name}")
+            
+            footer = f"Solicitado por {interaction.user.display_name}"
+            if metric:
+                position = await self.db.leaderboards.rank(metric, guild_id, str(interaction.user.id))
+                if position:
+                    footer += f" • A tua posição: #{position}"
+            embed.set_footer(text=footer)
             
             await interaction.followup.send(embed=embed)
         
@@ -1182,18 +1135,13 @@ class SocialCog(commands.Cog):
             return
         
         try:
-            # Buscar estatísticas do utilizador
-            async with self.db.execute(
-                """SELECT xp, level, reputation, messages_sent, daily_streak 
-                   FROM user_levels WHERE user_id = ? AND guild_id = ?""",
-                (user_id, guild_id)
-            ) as cursor:
-                user_data = await cursor.fetchone()
-            
-            if not user_data:
-                return
+            # Buscar estatísticas do utilizador (normalmente da cache)
+            user_data = await self.db.get_user_level(user_id, guild_id)
             
-            xp, level, reputation, messages_sent, daily_streak = user_data
+            level = user_data["level"]
+            reputation = user_data["reputation"]
+            messages_sent = user_data["messages"]
+            daily_streak = user_data["daily_streak"]
             
             # Lista de achievements a verificar
             achievements = [
@@ -1219,27 +1167,23 @@ class SocialCog(commands.Cog):
                 (daily_streak >= 90, "streak_90", "💎 Trimestre Diamante", "90 dias de streak!", "💎"),
             ]
             
+            earned = [a for a in achievements if a[0]]
+            if not earned:
+                return
+            
+            # Badges que o utilizador já tem (só vai à base de dados uma vez)
+            key = (user_id, guild_id)
+            owned = self.owned_badges.get(key)
+            if owned is None:
+                owned = {badge["id"] for badge in await self.db.get_user_badges(user_id, guild_id)}
+                self.owned_badges.put(key, owned)
+            
             # Verificar e adicionar badges
-            for condition, badge_id, name, description, emoji in achievements:
-                if condition:
-                    # Verificar se já tem a badge
-                    async with self.db.execute(
-                        """SELECT 1 FROM user_badges 
-                           WHERE user_id = ? AND guild_id = ? AND badge_id = ?""",
-                        (user_id, guild_id, badge_id)
-                    ) as cursor:
-                        has_badge = await cursor.fetchone()
-                    
-                    if not has_badge:
-                        # Adicionar badge
-                        await self.db.execute(
-                            """INSERT INTO user_badges 
-                               (user_id, guild_id, badge_id, badge_name, badge_description, badge_emoji)
-                               VALUES (?, ?, ?, ?, ?, ?)""",
-                            (user_id, guild_id, badge_id, name, description, emoji)
-                        )
-                        await self.db.commit()
-                        self.bot.logger.info(f"Badge '{name}' awarded to user {user_id}")
+            for _, badge_id, name, description, emoji in earned:
+                if badge_id not in owned:
+                    await self.db.add_badge(user_id, guild_id, badge_id, name, emoji, description)
+                    owned.add(badge_id)
+                    self.bot.logger.info(f"Badge '{name}' awarded to user {user_id}")
         
         except Exception as e:
             self.bot.logger.error(f"Erro ao verificar achievements: {e}")
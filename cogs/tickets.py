@@ -6,12 +6,14 @@ Simples, rápido e funcional
 import discord
 from discord.ext import commands
 from discord import app_commands
-from datetime import datetime
+from datetime import datetime, timedelta
 import asyncio
+import os
 import random
 
 from utils.embeds import EmbedBuilder
 from utils.logger import bot_logger
+from utils.transcripts import TranscriptExporter
 
 
 class TicketCategorySelect(discord.ui.Select):
@@ -101,19 +103,26 @@ class TicketCategorySelect(discord.ui.Select):
                 )
                 return
             
-            # Verificar se o utilizador já tem um ticket aberto
-            for channel in ticket_category.text_channels:
-                if channel.permissions_for(interaction.user).read_messages:
-                    # Verificar se o utilizador está nas permissões do canal
-                    overwrites = channel.overwrites
-                    if interaction.user in overwrites:
-                        await interaction.followup.send(
-                            f"❌ **Já tens um ticket aberto!**\n\n"
-                            f"Fecha o teu ticket atual antes de criar outro: {channel.mention}\n"
-                            f"Usa o botão 🔒 para fechar.",
-                            ephemeral=True
-                        )
-                        return
+            # Verificar se o utilizador já tem um ticket aberto e reservar o número
+            cog = interaction.client.get_cog('Tickets')
+            open_channel, ticket = await cog.reserve_ticket(interaction.guild, interaction.user, category)
+            
+            if open_channel:
+                await interaction.followup.send(
+                    f"❌ **Já tens um ticket aberto!**\n\n"
+                    f"Fecha o teu ticket atual antes de criar outro: {open_channel.mention}\n"
+                    f"Usa o botão 🔒 para fechar.",
+                    ephemeral=True
+                )
+                return
+            
+            if not ticket:
+                await interaction.followup.send(
+                    "⏳ **O teu ticket já está a ser criado!**\n\n"
+                    "Aguarda uns segundos.",
+                    ephemeral=True
+                )
+                return
             
             # Configurações das categorias
             categories = {
@@ -156,40 +165,21 @@ class TicketCategorySelect(discord.ui.Select):
             
             cat_info = categories.get(category, categories["other"])
             
-            # Obter configuração do bot
-            bot = interaction.client
-            config = bot.config
-            
-            if not config.ticket_category_id:
-                await interaction.followup.send(
-                    "❌ **Configuração Inválida**\n\n"
-                    "A categoria de tickets não está configurada.\n"
-                    "Contacta um administrador!",
-                    ephemeral=True
-                )
-                return
-            
-            ticket_category = interaction.guild.get_channel(config.ticket_category_id)
-            
-            if not ticket_category:
-                await interaction.followup.send(
-                    "❌ **Categoria Não Encontrada**\n\n"
-                    "A categoria de tickets não existe no servidor.\n"
-                    "Contacta um administrador!",
-                    ephemeral=True
-                )
-                return
-            
-            # Gerar ID sequencial
-            cog = interaction.client.get_cog('Tickets')
-            ticket_id = cog.get_next_ticket_id(interaction.guild.id)
+            # Número sequencial do ticket no servidor
+            ticket_id = ticket['number']
             
             # Criar canal SEM overwrites (mais rápido)
             username = interaction.user.name.lower().replace(" ", "-")
-            ticket_channel = await ticket_category.create_text_channel(
-                name=f"🎫┃{username}-{ticket_id:04d}",
-                topic=f"Ticket de {interaction.user.name} | {cat_info['name']}"
-            )
+            try:
+                ticket_channel = await ticket_category.create_text_channel(
+                    name=f"🎫┃{username}-{ticket_id:04d}",
+                    topic=f"Ticket de {interaction.user.name} | {cat_info['name']}"
+                )
+            except Exception:
+                # Libertar a reserva para o utilizador poder tentar de novo
+                await bot.db.close_ticket(ticket['ticket_id'])
+                raise
+            await bot.db.set_ticket_channel(ticket['ticket_id'], str(ticket_channel.id))
             
             # Configurar permissões DEPOIS
             await ticket_channel.set_permissions(
@@ -367,7 +357,7 @@ class TicketControlView(discord.ui.View):
             goodbye_embed = discord.Embed(
                 title="✅ Ticket Fechado",
                 description=f"Este ticket foi fechado por {interaction.user.mention}\n\n"
-                           f"**O canal será apagado em 5 segundos...**\n\n"
+                           f"**A guardar a transcrição; o canal será apagado a seguir...**\n\n"
                            f"Obrigado por usares o nosso sistema de suporte!",
                 color=discord.Color.green(),
                 timestamp=datetime.now()
@@ -376,6 +366,9 @@ class TicketControlView(discord.ui.View):
             
             await interaction.channel.send(embed=goodbye_embed)
             
+            # Guardar transcrição e fechar o registo do ticket
+            await bot.get_cog('Tickets').archive_ticket(interaction.channel, interaction.user)
+            
             # Aguardar e apagar
             await asyncio.sleep(5)
             await interaction.channel.delete(reason=f"Ticket fechado por {interaction.user}")
@@ -418,7 +411,7 @@ class Tickets(commands.Cog):
     
     def __init__(self, bot):
         self.bot = bot
-        self.ticket_counter = {}  # {guild_id: counter}
+        self.transcripts = TranscriptExporter()
     
     async def cog_load(self):
         """Carrega views persistentes"""
@@ -426,12 +419,78 @@ class Tickets(commands.Cog):
         self.bot.add_view(TicketControlView())
         bot_logger.info("Sistema de tickets carregado")
     
-    def get_next_ticket_id(self, guild_id: int) -> int:
-        """Obtém próximo ID sequencial do ticket"""
-        if guild_id not in self.ticket_counter:
-            self.ticket_counter[guild_id] = 0
-        self.ticket_counter[guild_id] += 1
-        return self.ticket_counter[guild_id]
+    async def reserve_ticket(self, guild: discord.Guild, user: discord.abc.User, category: str):
+        """Reserva um ticket para o utilizador
+        
+        Devolve (canal do ticket já aberto, None) ou (None, novo ticket).
+        (None, None) significa que outro ticket do utilizador está a ser criado.
+        """
+        for _ in range(2):
+            existing, ticket = await self.bot.db.reserve_ticket(str(guild.id), str(user.id), category)
+            if ticket:
+                return None, ticket
+            
+            channel_id = existing['channel_id']
+            if channel_id.isdigit():
+                channel = guild.get_channel(int(channel_id))
+                if channel:
+                    return channel, None
+            elif datetime.utcnow() - datetime.fromisoformat(existing['created_at']) < timedelta(minutes=5):
+                return None, None  # Canal ainda a ser criado
+            
+            # Canal apagado (ou criação interrompida): fechar o registo e tentar de novo
+            await self.bot.db.close_ticket(existing['ticket_id'])
+        return None, None
+    
+    async def archive_ticket(self, channel: discord.TextChannel, closed_by: discord.abc.User):
+        """Exporta a transcrição, envia-a para o canal de logs e fecha o registo"""
+        ticket = await self.bot.db.get_ticket_by_channel(str(channel.id))
+        number = ticket['number'] if ticket and ticket['number'] else channel.id
+        
+        try:
+            html_path, jsonl_path, count = await self.transcripts.export(
+                channel, channel.guild.id, number, title=f"{channel.name} - Ticket #{number}"
+            )
+        except Exception as e:
+            bot_logger.error(f"Erro ao exportar transcrição do ticket {channel.name}: {e}")
+            html_path = None
+        
+        if html_path:
+            if ticket:
+                await self.bot.db.set_ticket_transcript(ticket['ticket_id'], jsonl_path)
+            
+            log_channel = channel.guild.get_channel(self.bot.config.ticket_log_channel_id or 0)
+            if log_channel:
+                embed = discord.Embed(
+                    title=f"📄 Transcrição - Ticket #{number}",
+                    color=discord.Color.blue(),
+                    timestamp=datetime.now()
+                )
+                if ticket:
+                    embed.add_field(name="👤 Utilizador", value=f"<@{ticket['user_id']}>", inline=True)
+                embed.add_field(name="🔒 Fechado por", value=closed_by.mention, inline=True)
+                embed.add_field(name="💬 Mensagens", value=str(count), inline=True)
+                
+                files = []
+                if os.path.getsize(html_path) <= channel.guild.filesize_limit:
+                    files.append(discord.File(html_path, filename=os.path.basename(html_path)))
+                else:
+                    embed.add_field(name="📁 Ficheiro", value=f"Demasiado grande para enviar; guardado em `{html_path}`", inline=False)
+                
+                try:
+                    await log_channel.send(embed=embed, files=files)
+                except Exception as e:
+                    bot_logger.error(f"Erro ao enviar transcrição do ticket #{number}: {e}")
+            
+            bot_logger.info(f"Transcrição do ticket #{number} guardada ({count} mensagens)")
+        
+        await self.bot.db.close_ticket_by_channel(str(channel.id), str(closed_by.id))
+    
+    @commands.Cog.listener()
+    async def on_guild_channel_delete(self, channel):
+        """Fecha o registo de tickets cujo canal foi apagado manualmente"""
+        if channel.name.startswith("🎫"):
+            await self.bot.db.close_ticket_by_channel(str(channel.id))
     
     @app_commands.command(
         name="setup_tickets",
@@ -4,26 +4,42 @@ Includes: Lembretes, Polls, Anúncios, Auto-roles, Verificação
 """
 
 import discord
-from discord.ext import commands, tasks
+from discord.ext import commands
 from discord import app_commands
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 import asyncio
+import time
 import json
-import os
 from typing import Optional
 import random
 import string
 
+from utils.delivery import ReminderDelivery
 from utils.embeds import EmbedBuilder
 from utils.logger import bot_logger
+from utils.starboard import StarboardEngine
+from utils.voice_tracker import VoiceTracker
 
 
 class PollView(discord.ui.View):
-    """View para sistema de votação"""
+    """View para sistema de votação
+    
+    Os custom_id dos botões dependem só do ID da poll, por isso a view é
+    registada de novo no arranque. Os votos ficam na tabela poll_votes (um
+    por utilizador) e a mensagem é editada no máximo uma vez a cada
+    EDIT_INTERVAL segundos, com as contagens mais recentes. Uma poll fecha
+    quando a mensagem é apagada ou ao fim de MAX_AGE segundos (no arranque).
+    """
+    
+    EDIT_INTERVAL = 3.0
+    MAX_AGE = 30 * 24 * 3600
     
     def __init__(self, poll_data):
         super().__init__(timeout=None)
         self.poll_data = poll_data
+        self._message = None
+        self._update_task = None
+        self._last_edit = 0.0
         
         # Adicionar botões para cada opção (máximo 5)
         for i, option in enumerate(poll_data['options'][:5]):
@@ -41,26 +57,48 @@ class PollView(discord.ui.View):
         option_index = int(interaction.data['custom_id'].split('_')[-1])
         user_id = str(interaction.user.id)
         
-        # Verificar se já votou
-        if user_id in self.poll_data['voters']:
+        # Registar voto (a chave (poll, utilizador) impede votos repetidos)
+        if not await interaction.client.db.add_poll_vote(self.poll_data['id'], user_id, option_index):
             await interaction.response.send_message(
                 "❌ Já votaste nesta poll!",
                 ephemeral=True
             )
             return
         
-        # Registar voto
-        self.poll_data['voters'].add(user_id)
         self.poll_data['options'][option_index]['votes'] += 1
         
-        # Atualizar embed
-        embed = self.create_poll_embed()
-        await interaction.response.edit_message(embed=embed, view=self)
-        
-        await interaction.followup.send(
+        await interaction.response.send_message(
             f"✅ Voto registado: {self.poll_data['options'][option_index]['text']}",
             ephemeral=True
         )
+        
+        # Atualizar embed (agrupado)
+        self._message = interaction.message
+        if self._update_task is None or self._update_task.done():
+            self._update_task = asyncio.create_task(self._update_message())
+    
+    async def _update_message(self):
+        """Edita a mensagem com as contagens atuais, respeitando EDIT_INTERVAL
+        
+        Repete enquanto chegarem votos durante a edição, para a mensagem
+        acabar sempre com o total mais recente.
+        """
+        rendered = None
+        while True:
+            total = sum(opt['votes'] for opt in self.poll_data['options'])
+            if total == rendered:
+                return
+            wait = self._last_edit + self.EDIT_INTERVAL - time.monotonic()
+            if wait > 0:
+                await asyncio.sleep(wait)
+                total = sum(opt['votes'] for opt in self.poll_data['options'])
+            self._last_edit = time.monotonic()
+            try:
+                await self._message.edit(embed=self.create_poll_embed())
+            except Exception as e:
+                bot_logger.error(f"Erro ao atualizar poll {self.poll_data['id']}: {e}")
+                return
+            rendered = total
     
     def create_poll_embed(self):
         """Criar embed da poll"""
@@ -736,24 +774,34 @@ class UtilitiesAdvanced(commands.Cog):
     
     def __init__(self, bot):
         self.bot = bot
-        self.reminders_file = "data/reminders.json"
-        self.polls_file = "data/polls.json"
-        self.scheduled_announcements_file = "data/scheduled_announcements.json"
         self.config_file = "config/utilities_config.json"
         
-        # Tracking de voz
-        self.voice_sessions = {}  # {user_id: {'join_time': datetime, 'channel_id': int}}
+        # Tracking de voz (sessões em memória com checkpoint periódico)
+        self.voice_tracker = VoiceTracker(bot, bot.db, lambda: self.config.get('voice_tracker', {}))
         
-        # Carregar configuração
-        self.load_config()
+        # Entrega de lembretes (agrupada por canal, com cache de utilizadores/canais)
+        self.delivery = ReminderDelivery(bot)
+        
+        # Estados AFK em memória: {guild_id: {user_id: (razão, set_at)}}
+        # Carregados no cog_load e mantidos pelo /afk e pela remoção automática
+        self.afk_users = {}
         
-        self.ensure_data_files()
-        self.load_data()
+        # Starboard: contagens em memória, edições agrupadas e gravação em lote
+        self.starboard = StarboardEngine(bot, bot.db, lambda: self.config.get('starboard', {}))
         
-        # Iniciar tasks
-        self.check_reminders.start()
-        self.check_announcements.start()
-        self.check_giveaways.start()
+        # Polls abertas por mensagem (para fechar quando a mensagem é apagada)
+        self.open_polls = {}  # {message_id: poll_id}
+        
+        # Giveaways: entradas seguidas pelos eventos de reação
+        self.active_giveaways = {}  # {message_id: giveaway_id (None enquanto é criado)}
+        self._early_entries = {}  # {message_id: {user_id: entrou}} antes de o giveaway ter ID
+        self._entry_changes = {}  # {(giveaway_id, user_id): True (entrou) / False (saiu)}
+        self._entries_flush = None
+        self._entries_lock = asyncio.Lock()  # Uma gravação de entradas de cada vez
+        self._entries_reconcile = None
+        
+        # Carregar configuração
+        self.load_config()
     
     def load_config(self):
         """Carregar configuração de IDs"""
@@ -787,41 +835,6 @@ class UtilitiesAdvanced(commands.Cog):
                 "messages": {}
             }
     
-    def ensure_data_files(self):
-        """Garantir que os ficheiros de dados existem"""
-        os.makedirs("data", exist_ok=True)
-        
-        for file in [self.reminders_file, self.polls_file, self.scheduled_announcements_file]:
-            if not os.path.exists(file):
-                with open(file, 'w', encoding='utf-8') as f:
-                    json.dump([], f)
-    
-    def load_data(self):
-        """Carregar dados dos ficheiros"""
-        with open(self.reminders_file, 'r', encoding='utf-8') as f:
-            self.reminders = json.load(f)
-        
-        with open(self.polls_file, 'r', encoding='utf-8') as f:
-            self.polls = json.load(f)
-        
-        with open(self.scheduled_announcements_file, 'r', encoding='utf-8') as f:
-            self.scheduled_announcements = json.load(f)
-    
-    def save_reminders(self):
-        """Guardar lembretes"""
-        with open(self.reminders_file, 'w', encoding='utf-8') as f:
-            json.dump(self.reminders, f, indent=2)
-    
-    def save_polls(self):
-        """Guardar polls"""
-        with open(self.polls_file, 'w', encoding='utf-8') as f:
-            json.dump(self.polls, f, indent=2)
-    
-    def save_announcements(self):
-        """Guardar anúncios agendados"""
-        with open(self.scheduled_announcements_file, 'w', encoding='utf-8') as f:
-            json.dump(self.scheduled_announcements, f, indent=2)
-    
     async def cog_load(self):
         """Carregar views persistentes"""
         # Carregar views com IDs da configuração
@@ -833,334 +846,290 @@ class UtilitiesAdvanced(commands.Cog):
         self.bot.add_view(PlatformRoleView(platform_ids))
         self.bot.add_view(DMPreferenceRoleView(dm_ids))
         self.bot.add_view(VerificationView(self.config))
+        
+        # Polls: fechar as antigas e registar de novo as views das abertas
+        await self.bot.db.import_polls_json()
+        closed = await self.bot.db.close_stale_polls(time.time() - PollView.MAX_AGE)
+        if closed:
+            bot_logger.info(f"📊 {closed} polls antigas fechadas")
+        for poll_data in await self.bot.db.get_open_polls():
+            message_id = int(poll_data['message_id']) if poll_data['message_id'] else None
+            self.bot.add_view(PollView(poll_data), message_id=message_id)
+            if message_id:
+                self.open_polls[message_id] = poll_data['id']
+        
+        # Tarefas agendadas (lembretes, anúncios e fim de giveaways)
+        scheduler = self.bot.db.scheduler
+        scheduler.register("reminder", self.fire_reminder)
+        scheduler.register("announcement", self.fire_announcement)
+        scheduler.register("giveaway", self.fire_giveaway)
+        await self.bot.db.import_reminders_json()
+        await self.schedule_existing()
+        
+        self.afk_users = {
+            int(guild_id): {int(user_id): status for user_id, status in users.items()}
+            for guild_id, users in (await self.bot.db.get_afk_statuses()).items()
+        }
+        self.starboard.start()
+        self.voice_tracker.start()
+        
         bot_logger.info("Sistema avançado de utilidades carregado")
     
-    def cog_unload(self):
-        """Parar tasks ao descarregar"""
-        self.check_reminders.cancel()
-        self.check_announcements.cancel()
+    async def cog_unload(self):
+        """Remover handlers do agendador e gravar o starboard ao descarregar"""
+        for kind in ("reminder", "announcement", "giveaway"):
+            self.bot.db.scheduler.unregister(kind)
+        await self.starboard.stop()
+        await self.voice_tracker.stop()
+        await self.flush_giveaway_entries()
+    
+    async def schedule_existing(self):
+        """Agendar giveaways criados antes do agendador (idempotente)"""
+        scheduler = self.bot.db.scheduler
+        active = await self.bot.db.get_active_giveaways()
+        giveaways = []
+        for giveaway in active:
+            self.active_giveaways[int(giveaway['message_id'])] = giveaway['id']
+            if scheduler.is_scheduled("giveaway", giveaway['message_id']):
+                continue
+            # ends_at é guardado em UTC sem fuso horário
+            ends_at = datetime.fromisoformat(giveaway['ends_at']).replace(tzinfo=timezone.utc).timestamp()
+            giveaways.append((giveaway['message_id'], ends_at, {"guild_id": giveaway['guild_id']}))
+        await scheduler.schedule_many("giveaway", giveaways)
+        
+        if active:
+            self._entries_reconcile = asyncio.create_task(self.reconcile_giveaway_entries(active))
     
-    @tasks.loop(minutes=1)
-    async def check_reminders(self):
-        """Verificar lembretes pendentes"""
-        now = datetime.now().timestamp()
-        completed = []
+    async def reconcile_giveaway_entries(self, giveaways):
+        """Junta as reações feitas com o bot desligado (uma vez, no arranque)"""
+        await self.bot.wait_until_ready()
+        for giveaway in giveaways:
+            channel = self.bot.get_channel(int(giveaway['channel_id']))
+            if channel is None:
+                continue
+            try:
+                msg = await channel.fetch_message(int(giveaway['message_id']))
+                reacted = set()
+                reaction = discord.utils.get(msg.reactions, emoji="🎉")
+                if reaction:
+                    async for user in reaction.users():
+                        if not user.bot:
+                            reacted.add(str(user.id))
+                # As reações atuais substituem as entradas gravadas (incluindo quem
+                # saiu com o bot desligado); eventos já recebidos prevalecem
+                stored = await self.bot.db.get_giveaway_entrants(giveaway['id'])
+                for user_id in reacted:
+                    self._entry_changes.setdefault((giveaway['id'], user_id), True)
+                for user_id in set(stored) - reacted:
+                    self._entry_changes.setdefault((giveaway['id'], user_id), False)
+            except Exception as e:
+                bot_logger.error(f"Erro ao verificar entradas do giveaway {giveaway['message_id']}: {e}")
+        await self.flush_giveaway_entries()
+    
+    def queue_giveaway_entry(self, message_id: int, user_id: int, joined: bool):
+        """Regista uma entrada/saída; as alterações são gravadas em lote"""
+        giveaway_id = self.active_giveaways.get(message_id)
+        if giveaway_id is None:
+            # Giveaway ainda a ser gravado: guardar até haver ID
+            self._early_entries.setdefault(message_id, {})[user_id] = joined
+            return
+        self._entry_changes[(giveaway_id, str(user_id))] = joined
+        if self._entries_flush is None or self._entries_flush.done():
+            self._entries_flush = asyncio.create_task(self._flush_giveaway_entries_later())
+    
+    async def _flush_giveaway_entries_later(self):
+        await asyncio.sleep(2)
+        await self.flush_giveaway_entries()
+    
+    async def flush_giveaway_entries(self) -> bool:
+        """Grava as entradas pendentes numa só transação
+        
+        As gravações são feitas uma de cada vez: quem chama espera pela que
+        estiver em curso, por isso ao voltar todas as entradas anteriores
+        já estão na base de dados (o sorteio depende disso). Devolve False
+        se a gravação falhou (as entradas ficam pendentes).
+        """
+        async with self._entries_lock:
+            if not self._entry_changes:
+                return True
+            changes, self._entry_changes = self._entry_changes, {}
+            added = [key for key, joined in changes.items() if joined]
+            removed = [key for key, joined in changes.items() if not joined]
+            try:
+                await self.bot.db.apply_giveaway_entries(added, removed)
+            except Exception as e:
+                for key, joined in changes.items():
+                    self._entry_changes.setdefault(key, joined)
+                bot_logger.error(f"Erro ao gravar entradas de giveaways: {e}")
+                return False
+            return True
+    
+    async def fire_reminder(self, key: str, payload: Optional[dict]) -> Optional[float]:
+        """Enviar um lembrete (chamado pelo agendador na hora marcada)"""
+        reminder = await self.bot.db.get_reminder(int(key))
+        if reminder is None:
+            return None  # Já não existe
         
-        for reminder in self.reminders:
-            if reminder['time'] <= now:
-                # Enviar lembrete
-                try:
-                    channel = self.bot.get_channel(int(reminder['channel_id']))
-                    user = await self.bot.fetch_user(int(reminder['user_id']))
-                    
-                    if channel and user:
-                        embed = discord.Embed(
-                            title="⏰ Lembrete!",
-                            description=reminder['message'],
-                            color=discord.Color.orange(),
-                            timestamp=datetime.now()
-                        )
-                        embed.set_footer(text=f"Definido há {self.format_time_ago(reminder['created_at'])}")
-                        
-                        await channel.send(content=user.mention, embed=embed)
-                        
-                        # Se for recorrente, reagendar
-                        if reminder.get('recurring'):
-                            reminder['time'] = now + reminder['interval']
-                        else:
-                            completed.append(reminder)
-                    else:
-                        completed.append(reminder)
-                        
-                except Exception as e:
-                    bot_logger.error(f"Erro ao enviar lembrete: {e}")
-                    completed.append(reminder)
-        
-        # Remover lembretes completados
-        for reminder in completed:
-            if reminder in self.reminders:
-                self.reminders.remove(reminder)
-        
-        if completed:
-            self.save_reminders()
-    
-    @tasks.loop(minutes=1)
-    async def check_announcements(self):
-        """Verificar anúncios agendados"""
+        await self.bot.wait_until_ready()
         now = datetime.now().timestamp()
-        completed = []
         
-        for announcement in self.scheduled_announcements:
-            if announcement['time'] <= now:
-                try:
-                    channel = self.bot.get_channel(int(announcement['channel_id']))
-                    
-                    if channel:
-                        if announcement.get('embed'):
-                            # Anúncio com embed
-                            embed_data = announcement['embed']
-                            embed = discord.Embed(
-                                title=embed_data.get('title'),
-                                description=embed_data.get('description'),
-                                color=discord.Color(int(embed_data.get('color', 0x3498db)))
-                            )
-                            if embed_data.get('image'):
-                                embed.set_image(url=embed_data['image'])
-                            if embed_data.get('thumbnail'):
-                                embed.set_thumbnail(url=embed_data['thumbnail'])
-                            
-                            await channel.send(embed=embed)
-                        else:
-                            # Anúncio simples
-                            await channel.send(announcement['message'])
-                        
-                        completed.append(announcement)
-                        bot_logger.info(f"Anúncio enviado no canal {channel.name}")
-                    else:
-                        completed.append(announcement)
-                        
-                except Exception as e:
-                    bot_logger.error(f"Erro ao enviar anúncio: {e}")
-                    completed.append(announcement)
-        
-        # Remover anúncios completados da lista
-        for announcement in completed:
-            if announcement in self.scheduled_announcements:
-                self.scheduled_announcements.remove(announcement)
-        
-        if completed:
-            self.save_announcements()
-    
-    @tasks.loop(minutes=1)
-    async def check_giveaways(self):
-        """Verificar giveaways que devem terminar"""
-        import aiosqlite
+        embed = discord.Embed(
+            title="⏰ Lembrete!",
+            description=reminder['message'],
+            color=discord.Color.orange(),
+            timestamp=datetime.now()
+        )
+        embed.set_footer(text=f"Definido há {self.format_time_ago(reminder['created_at'])}")
         
-        now = datetime.utcnow()
+        # Lembretes do mesmo canal que vencem juntos saem numa só mensagem
+        delivered = await self.delivery.deliver(int(reminder['channel_id']), int(reminder['user_id']), embed)
         
-        async with aiosqlite.connect(self.bot.db.db_path) as db:
-            cursor = await db.execute("""
-                SELECT message_id, guild_id
-                FROM giveaways
-                WHERE status = 'active' AND datetime(ends_at) <= datetime('now')
-            """)
-            rows = await cursor.fetchall()
+        # Se for recorrente e foi entregue, reagendar
+        if delivered and reminder['recurring']:
+            next_time = now + reminder['interval']
+            await self.bot.db.reschedule_reminder(reminder['id'], next_time)
+            return next_time
+        
+        await self.bot.db.delete_reminder(reminder['id'])
+        return None
+    
+    async def fire_announcement(self, key: str, payload: Optional[dict]) -> Optional[float]:
+        """Enviar um anúncio agendado (chamado pelo agendador na hora marcada)"""
+        announcement = await self.bot.db.get_announcement(int(key))
+        if announcement is None:
+            return None  # Cancelado
+        
+        await self.bot.wait_until_ready()
+        
+        try:
+            channel = self.bot.get_channel(int(announcement['channel_id']))
             
-            for message_id, guild_id in rows:
-                await self.end_giveaway(int(message_id), int(guild_id))
-    
-    @check_reminders.before_loop
-    @check_announcements.before_loop
-    @check_giveaways.before_loop
-    async def before_tasks(self):
-        """Aguardar bot estar pronto"""
+            if channel:
+                if announcement.get('embed'):
+                    # Anúncio com embed
+                    embed_data = announcement['embed']
+                    embed = discord.Embed(
+                        title=embed_data.get('title'),
+                        description=embed_data.get('description'),
+                        color=discord.Color(int(embed_data.get('color', 0x3498db)))
+                    )
+                    if embed_data.get('image'):
+                        embed.set_image(url=embed_data['image'])
+                    if embed_data.get('thumbnail'):
+                        embed.set_thumbnail(url=embed_data['thumbnail'])
+                    
+                    await channel.send(embed=embed)
+                else:
+                    # Anúncio simples
+                    await channel.send(announcement['message'])
+                
+                bot_logger.info(f"Anúncio enviado no canal {channel.name}")
+                
+        except Exception as e:
+            bot_logger.error(f"Erro ao enviar anúncio: {e}")
+        
+        await self.bot.db.delete_announcement(announcement['id'])
+        return None
+    
+    async def fire_giveaway(self, key: str, payload: Optional[dict]) -> Optional[float]:
+        """Terminar um giveaway (chamado pelo agendador na hora marcada)"""
         await self.bot.wait_until_ready()
+        await self.end_giveaway(int(key), int(payload['guild_id']))
+        return None
     
     # ===== EVENT LISTENERS =====
     
     @commands.Cog.listener()
     async def on_message(self, message):
         """Listener para AFK system"""
-        if message.author.bot:
+        if message.author.bot or not message.guild:
             return
         
-        import aiosqlite
+        guild_afk = self.afk_users.get(message.guild.id)
+        if not guild_afk:
+            return
         
         # Verificar se autor está AFK e remover
-        async with aiosqlite.connect(self.bot.db.db_path) as db:
-            cursor = await db.execute("""
-                SELECT reason, set_at FROM afk_status
-                WHERE user_id = ? AND guild_id = ?
-            """, (str(message.author.id), str(message.guild.id)))
-            row = await cursor.fetchone()
+        status = guild_afk.pop(message.author.id, None)
+        if status:
+            reason, set_at = status
+            await self.bot.db.clear_afk(str(message.author.id), str(message.guild.id))
             
-            if row:
-                reason, set_at = row
-                # Remover AFK
-                await db.execute("""
-                    DELETE FROM afk_status
-                    WHERE user_id = ? AND guild_id = ?
-                """, (str(message.author.id), str(message.guild.id)))
-                await db.commit()
+            # Calcular tempo AFK
+            try:
+                afk_start = datetime.fromisoformat(set_at)
+                duration = datetime.utcnow() - afk_start
+                duration_str = self.format_duration(duration)
                 
-                # Calcular tempo AFK
+                await message.channel.send(
+                    f"👋 Bem-vindo de volta {message.author.mention}! "
+                    f"Estiveste AFK por **{duration_str}**.",
+                    delete_after=5
+                )
+            except:
+                await message.channel.send(
+                    f"👋 Bem-vindo de volta {message.author.mention}!",
+                    delete_after=5
+                )
+        
+        # Verificar se alguém mencionado está AFK
+        for mentioned_user in message.mentions:
+            if mentioned_user.bot:
+                continue
+            
+            status = guild_afk.get(mentioned_user.id)
+            if status:
+                reason, set_at = status
                 try:
                     afk_start = datetime.fromisoformat(set_at)
                     duration = datetime.utcnow() - afk_start
                     duration_str = self.format_duration(duration)
                     
                     await message.channel.send(
-                        f"👋 Bem-vindo de volta {message.author.mention}! "
-                        f"Estiveste AFK por **{duration_str}**.",
-                        delete_after=5
+                        f"💤 {mentioned_user.display_name} está AFK há **{duration_str}**: {reason}",
+                        delete_after=10
                     )
                 except:
                     await message.channel.send(
-                        f"👋 Bem-vindo de volta {message.author.mention}!",
-                        delete_after=5
+                        f"💤 {mentioned_user.display_name} está AFK: {reason}",
+                        delete_after=10
                     )
-        
-        # Verificar se alguém mencionado está AFK
-        if message.mentions:
-            async with aiosqlite.connect(self.bot.db.db_path) as db:
-                for mentioned_user in message.mentions:
-                    if mentioned_user.bot:
-                        continue
-                    
-                    cursor = await db.execute("""
-                        SELECT reason, set_at FROM afk_status
-                        WHERE user_id = ? AND guild_id = ?
-                    """, (str(mentioned_user.id), str(message.guild.id)))
-                    row = await cursor.fetchone()
-                    
-                    if row:
-                        reason, set_at = row
-                        try:
-                            afk_start = datetime.fromisoformat(set_at)
-                            duration = datetime.utcnow() - afk_start
-                            duration_str = self.format_duration(duration)
-                            
-                            await message.channel.send(
-                                f"💤 {mentioned_user.display_name} está AFK há **{duration_str}**: {reason}",
-                                delete_after=10
-                            )
-                        except:
-                            await message.channel.send(
-                                f"💤 {mentioned_user.display_name} está AFK: {reason}",
-                                delete_after=10
-                            )
     
     @commands.Cog.listener()
     async def on_raw_reaction_add(self, payload):
-        """Listener para Starboard"""
-        if payload.member.bot:
-            return
-        
-        # Verificar configuração do starboard
-        starboard_config = self.config.get('starboard', {})
-        if not starboard_config.get('enabled', False):
-            return
-        
-        star_emoji = starboard_config.get('emoji', '⭐')
-        if str(payload.emoji) != star_emoji:
-            return
-        
-        import aiosqlite
-        guild = self.bot.get_guild(payload.guild_id)
-        channel = guild.get_channel(payload.channel_id)
-        
-        try:
-            message = await channel.fetch_message(payload.message_id)
-        except:
-            return
-        
-        # Verificar se autor está reagindo à própria mensagem
-        if not starboard_config.get('self_star', False) and payload.user_id == message.author.id:
-            try:
-                await message.remove_reaction(star_emoji, payload.member)
-            except:
-                pass
+        """Listener para Starboard e entradas de giveaways"""
+        if payload.member is None or payload.member.bot:
             return
-        
-        # Contar reações
-        reaction = discord.utils.get(message.reactions, emoji=star_emoji)
-        if not reaction:
+        if payload.message_id in self.active_giveaways and str(payload.emoji) == "🎉":
+            self.queue_giveaway_entry(payload.message_id, payload.user_id, True)
             return
-        
-        star_count = reaction.count
-        threshold = starboard_config.get('star_threshold', 3)
-        
-        if star_count >= threshold:
-            await self.add_to_starboard(message, star_count, guild)
+        await self.starboard.on_reaction(payload, 1)
     
-    async def add_to_starboard(self, message, star_count, guild):
-        """Adicionar mensagem ao starboard"""
-        import aiosqlite
-        
-        starboard_config = self.config.get('starboard', {})
-        starboard_channel_id = starboard_config.get('channel_id', 0)
-        
-        if starboard_channel_id == 0:
+    @commands.Cog.listener()
+    async def on_raw_reaction_remove(self, payload):
+        """Listener para Starboard e entradas de giveaways (reações removidas)"""
+        user = self.bot.get_user(payload.user_id)
+        if user is not None and user.bot:
             return
-        
-        starboard_channel = guild.get_channel(starboard_channel_id)
-        if not starboard_channel:
+        if payload.message_id in self.active_giveaways and str(payload.emoji) == "🎉":
+            self.queue_giveaway_entry(payload.message_id, payload.user_id, False)
             return
-        
-        # Verificar se já está no starboard
-        async with aiosqlite.connect(self.bot.db.db_path) as db:
-            cursor = await db.execute("""
-                SELECT id, starboard_message_id, star_count
-                FROM starboard
-                WHERE message_id = ? AND guild_id = ?
-            """, (str(message.id), str(guild.id)))
-            row = await cursor.fetchone()
-            
-            star_emoji = starboard_config.get('emoji', '⭐')
-            
-            # Criar embed
-            embed = discord.Embed(
-                description=message.content or "*[Sem conteúdo de texto]*",
-                color=discord.Color.gold(),
-                timestamp=message.created_at
-            )
-            embed.set_author(
-                name=message.author.display_name,
-                icon_url=message.author.display_avatar.url
-            )
-            embed.add_field(
-                name="Link",
-                value=f"[Ir para mensagem]({message.jump_url})",
-                inline=False
-            )
-            
-            # Adicionar imagens
-            if message.attachments:
-                embed.set_image(url=message.attachments[0].url)
-                if len(message.attachments) > 1:
-                    embed.set_footer(text=f"+{len(message.attachments)-1} anexos adicionais")
-            
-            content = f"{star_emoji} **{star_count}** | {message.channel.mention}"
-            
-            if row:
-                # Atualizar mensagem existente
-                starboard_id, starboard_msg_id, old_count = row
-                
-                if starboard_msg_id:
-                    try:
-                        starboard_msg = await starboard_channel.fetch_message(int(starboard_msg_id))
-                        await starboard_msg.edit(content=content, embed=embed)
-                        
-                        await db.execute("""
-                            UPDATE starboard
-                            SET star_count = ?
-                            WHERE id = ?
-                        """, (star_count, starboard_id))
-                        await db.commit()
-                    except discord.NotFound:
-                        pass
-            else:
-                # Criar nova entrada
-                starboard_msg = await starboard_channel.send(content=content, embed=embed)
-                
-                # Salvar attachments
-                attachment_urls = json.dumps([att.url for att in message.attachments]) if message.attachments else None
-                
-                await db.execute("""
-                    INSERT INTO starboard 
-                    (guild_id, message_id, channel_id, author_id, starboard_message_id, star_count, content, attachment_urls, starred_at)
-                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
-                """, (
-                    str(guild.id),
-                    str(message.id),
-                    str(message.channel.id),
-                    str(message.author.id),
-                    str(starboard_msg.id),
-                    star_count,
-                    message.content,
-                    attachment_urls
-                ))
-                await db.commit()
+        await self.starboard.on_reaction(payload, -1)
+    
+    @commands.Cog.listener()
+    async def on_raw_message_delete(self, payload):
+        """Fechar a poll cuja mensagem foi apagada"""
+        poll_id = self.open_polls.pop(payload.message_id, None)
+        if poll_id is not None:
+            await self.bot.db.close_polls([poll_id])
+    
+    @commands.Cog.listener()
+    async def on_raw_bulk_message_delete(self, payload):
+        """Fechar as polls apagadas numa limpeza de mensagens"""
+        poll_ids = [self.open_polls.pop(message_id) for message_id in payload.message_ids
+                    if message_id in self.open_polls]
+        if poll_ids:
+            await self.bot.db.close_polls(poll_ids)
     
     @commands.Cog.listener()
     async def on_voice_state_update(self, member, before, after):
@@ -1172,113 +1141,7 @@ class UtilitiesAdvanced(commands.Cog):
         if not voice_config.get('enabled', True):
             return
         
-        import aiosqlite
-        
-        # Membro entrou em canal de voz
-        if before.channel is None and after.channel is not None:
-            self.voice_sessions[member.id] = {
-                'join_time': datetime.utcnow(),
-                'channel_id': after.channel.id
-            }
-            bot_logger.info(f"{member} entrou em {after.channel.name}")
-        
-        # Membro saiu de canal de voz
-        elif before.channel is not None and after.channel is None:
-            if member.id in self.voice_sessions:
-                session = self.voice_sessions.pop(member.id)
-                join_time = session['join_time']
-                channel_id = session['channel_id']
-                
-                duration = int((datetime.utcnow() - join_time).total_seconds())
-                min_session_time = voice_config.get('min_session_time', 60)
-                
-                # Só salvar se duração >= mínimo
-                if duration >= min_session_time:
-                    async with aiosqlite.connect(self.bot.db.db_path) as db:
-                        # Salvar sessão
-                        date_str = join_time.strftime('%Y-%m-%d')
-                        await db.execute("""
-                            INSERT INTO voice_stats 
-                            (user_id, guild_id, channel_id, join_time, leave_time, duration, date)
-                            VALUES (?, ?, ?, ?, ?, ?, ?)
-                        """, (
-                            str(member.id),
-                            str(member.guild.id),
-                            str(channel_id),
-                            join_time.isoformat(),
-                            datetime.utcnow().isoformat(),
-                            duration,
-                            date_str
-                        ))
-                        
-                        # Atualizar totais
-                        await db.execute("""
-                            INSERT INTO voice_totals (user_id, guild_id, total_time, sessions_count, last_session)
-                            VALUES (?, ?, ?, 1, CURRENT_TIMESTAMP)
-                            ON CONFLICT(user_id, guild_id) DO UPDATE SET
-                                total_time = total_time + ?,
-                                sessions_count = sessions_count + 1,
-                                last_session = CURRENT_TIMESTAMP
-                        """, (
-                            str(member.id),
-                            str(member.guild.id),
-                            duration,
-                            duration
-                        ))
-                        
-                        await db.commit()
-                    
-                    bot_logger.info(f"{member} saiu de canal de voz - Duração: {duration}s")
-        
-        # Membro mudou de canal (contar como saída + entrada)
-        elif before.channel is not None and after.channel is not None and before.channel.id != after.channel.id:
-            if member.id in self.voice_sessions:
-                # Processar saída do canal anterior
-                session = self.voice_sessions[member.id]
-                join_time = session['join_time']
-                channel_id = session['channel_id']
-                
-                duration = int((datetime.utcnow() - join_time).total_seconds())
-                min_session_time = voice_config.get('min_session_time', 60)
-                
-                if duration >= min_session_time:
-                    async with aiosqlite.connect(self.bot.db.db_path) as db:
-                        date_str = join_time.strftime('%Y-%m-%d')
-                        await db.execute("""
-                            INSERT INTO voice_stats 
-                            (user_id, guild_id, channel_id, join_time, leave_time, duration, date)
-                            VALUES (?, ?, ?, ?, ?, ?, ?)
-                        """, (
-                            str(member.id),
-                            str(member.guild.id),
-                            str(channel_id),
-                            join_time.isoformat(),
-                            datetime.utcnow().isoformat(),
-                            duration,
-                            date_str
-                        ))
-                        
-                        await db.execute("""
-                            INSERT INTO voice_totals (user_id, guild_id, total_time, sessions_count, last_session)
-                            VALUES (?, ?, ?, 1, CURRENT_TIMESTAMP)
-                            ON CONFLICT(user_id, guild_id) DO UPDATE SET
-                                total_time = total_time + ?,
-                                sessions_count = sessions_count + 1,
-                                last_session = CURRENT_TIMESTAMP
-                        """, (
-                            str(member.id),
-                            str(member.guild.id),
-                            duration,
-                            duration
-                        ))
-                        
-                        await db.commit()
-                
-                # Registrar entrada no novo canal
-                self.voice_sessions[member.id] = {
-                    'join_time': datetime.utcnow(),
-                    'channel_id': after.channel.id
-                }
+        self.voice_tracker.on_voice_state_update(member, before, after)
     
     def format_duration(self, duration):
         """Formatar duração para texto legível"""
@@ -1355,18 +1218,15 @@ class UtilitiesAdvanced(commands.Cog):
             return
         
         # Criar lembrete
-        reminder = {
-            'user_id': str(interaction.user.id),
-            'channel_id': str(interaction.channel.id),
-            'message': mensagem,
-            'time': reminder_time,
-            'created_at': datetime.now().timestamp(),
-            'recurring': recorrente,
-            'interval': seconds if recorrente else 0
-        }
-        
-        self.reminders.append(reminder)
-        self.save_reminders()
+        reminder_id = await self.bot.db.create_reminder(
+            str(interaction.user.id),
+            str(interaction.channel.id),
+            mensagem,
+            reminder_time,
+            recurring=recorrente,
+            interval=seconds if recorrente else 0
+        )
+        await self.bot.db.scheduler.schedule("reminder", str(reminder_id), reminder_time)
         
         embed = discord.Embed(
             title="✅ Lembrete Criado!",
@@ -1430,21 +1290,29 @@ class UtilitiesAdvanced(commands.Cog):
                 }
                 for i, opt in enumerate(options_list)
             ],
-            'voters': set(),
             'created_by': str(interaction.user.id),
             'created_at': datetime.now().timestamp()
         }
         
+        # Guardar poll antes de publicar (para os votos terem onde ficar)
+        await self.bot.db.create_poll(
+            poll_id,
+            str(interaction.guild.id) if interaction.guild else None,
+            pergunta,
+            poll_data['description'],
+            poll_data['options'],
+            poll_data['created_by'],
+            poll_data['created_at']
+        )
+        
         view = PollView(poll_data)
         embed = view.create_poll_embed()
         
         await interaction.response.send_message(embed=embed, view=view)
         
-        # Guardar poll
-        poll_save = poll_data.copy()
-        poll_save['voters'] = list(poll_data['voters'])
-        self.polls.append(poll_save)
-        self.save_polls()
+        message = await interaction.original_response()
+        await self.bot.db.set_poll_message(poll_id, str(message.channel.id), str(message.id))
+        self.open_polls[message.id] = poll_id
     
     @app_commands.command(
         name="anuncio",
@@ -1494,16 +1362,10 @@ class UtilitiesAdvanced(commands.Cog):
             return
         
         # Agendar anúncio
-        announcement = {
-            'channel_id': str(canal.id),
-            'message': mensagem,
-            'time': announcement_time,
-            'created_by': str(interaction.user.id),
-            'created_at': datetime.now().timestamp()
-        }
-        
-        self.scheduled_announcements.append(announcement)
-        self.save_announcements()
+        announcement_id = await self.bot.db.create_announcement(
+            str(canal.id), mensagem, announcement_time, str(interaction.user.id)
+        )
+        await self.bot.db.scheduler.schedule("announcement", str(announcement_id), announcement_time)
         
         await interaction.response.send_message(
             f"✅ Anúncio agendado para {canal.mention} daqui a {tempo}!",
@@ -1517,7 +1379,8 @@ class UtilitiesAdvanced(commands.Cog):
     @app_commands.default_permissions(administrator=True)
     async def announcements_queue(self, interaction: discord.Interaction):
         """Ver fila de anúncios agendados"""
-        if not self.scheduled_announcements:
+        total = await self.bot.db.count_pending_announcements()
+        if not total:
             await interaction.response.send_message(
                 "📭 Não há anúncios agendados.",
                 ephemeral=True
@@ -1526,16 +1389,16 @@ class UtilitiesAdvanced(commands.Cog):
         
         embed = discord.Embed(
             title="📢 Anúncios Agendados",
-            description=f"Total: {len(self.scheduled_announcements)} anúncio(s)",
+            description=f"Total: {total} anúncio(s)",
             color=discord.Color.blue()
         )
         
-        for i, announcement in enumerate(self.scheduled_announcements, 1):
+        for i, announcement in enumerate(await self.bot.db.get_pending_announcements(limit=25), 1):
             channel = self.bot.get_channel(int(announcement['channel_id']))
             channel_mention = channel.mention if channel else f"<#{announcement['channel_id']}>"
             
             # Calcular tempo restante
-            time_left = announcement['time'] - datetime.now().timestamp()
+            time_left = announcement['due_at'] - datetime.now().timestamp()
             
             if time_left > 0:
                 hours = int(time_left // 3600)
@@ -1545,8 +1408,8 @@ class UtilitiesAdvanced(commands.Cog):
                 time_str = "⏰ Atrasado (será enviado em breve)"
             
             # Preview da mensagem (primeiros 100 chars)
-            message_preview = announcement['message'][:100]
-            if len(announcement['message']) > 100:
+            message_preview = (announcement['message'] or "")[:100]
+            if len(announcement['message'] or "") > 100:
                 message_preview += "..."
             
             embed.add_field(
@@ -1566,7 +1429,8 @@ class UtilitiesAdvanced(commands.Cog):
     @app_commands.describe(numero="Número do anúncio na fila")
     async def cancel_announcement(self, interaction: discord.Interaction, numero: int):
         """Cancelar anúncio agendado"""
-        if numero < 1 or numero > len(self.scheduled_announcements):
+        pending = await self.bot.db.get_pending_announcements(limit=1, offset=numero - 1) if numero >= 1 else []
+        if not pending:
             await interaction.response.send_message(
                 f"❌ Número inválido! Use /anuncios_fila para ver os números.",
                 ephemeral=True
@@ -1574,8 +1438,9 @@ class UtilitiesAdvanced(commands.Cog):
             return
         
         # Remover anúncio
-        removed = self.scheduled_announcements.pop(numero - 1)
-        self.save_announcements()
+        removed = pending[0]
+        await self.bot.db.delete_announcement(removed['id'])
+        await self.bot.db.scheduler.cancel("announcement", str(removed['id']))
         
         channel = self.bot.get_channel(int(removed['channel_id']))
         channel_name = channel.mention if channel else f"<#{removed['channel_id']}>"
@@ -1712,7 +1577,7 @@ class UtilitiesAdvanced(commands.Cog):
     )
     async def my_reminders(self, interaction: discord.Interaction):
         """Ver lembretes do utilizador"""
-        user_reminders = [r for r in self.reminders if r['user_id'] == str(interaction.user.id)]
+        user_reminders = await self.bot.db.get_user_reminders(str(interaction.user.id), limit=10)
         
         if not user_reminders:
             await interaction.response.send_message(
@@ -1726,8 +1591,8 @@ class UtilitiesAdvanced(commands.Cog):
             color=discord.Color.blue()
         )
         
-        for i, reminder in enumerate(user_reminders[:10], 1):
-            time_left = reminder['time'] - datetime.now().timestamp()
+        for i, reminder in enumerate(user_reminders, 1):
+            time_left = reminder['due_at'] - datetime.now().timestamp()
             
             if time_left > 0:
                 if time_left < 60:
@@ -1741,7 +1606,7 @@ class UtilitiesAdvanced(commands.Cog):
                 
                 embed.add_field(
                     name=f"{i}. {reminder['message'][:50]}",
-                    value=f"⏱️ Falta: {time_str} {'🔄' if reminder.get('recurring') else ''}",
+                    value=f"⏱️ Falta: {time_str} {'🔄' if reminder['recurring'] else ''}",
                     inline=False
                 )
         
@@ -2098,16 +1963,13 @@ class UtilitiesAdvanced(commands.Cog):
         # Enviar mensagem
         await interaction.response.send_message("✅ Giveaway criado!", ephemeral=True)
         msg = await interaction.channel.send(embed=embed)
-        await msg.add_reaction("🎉")
-        
-        # Salvar na database
-        import aiosqlite
-        async with aiosqlite.connect(self.bot.db.db_path) as db:
-            await db.execute("""
-                INSERT INTO giveaways 
-                (guild_id, channel_id, message_id, host_id, prize, winners_count, requirements, ends_at, status)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, 'active')
-            """, (
+        # Seguir as reações já, antes de haver ID (as que chegam entretanto ficam guardadas)
+        self.active_giveaways[msg.id] = None
+        try:
+            await msg.add_reaction("🎉")
+            
+            # Salvar na database
+            giveaway_id = await self.bot.db.create_giveaway(
                 str(interaction.guild.id), 
                 str(interaction.channel.id), 
                 str(msg.id),
@@ -2116,85 +1978,82 @@ class UtilitiesAdvanced(commands.Cog):
                 vencedores,
                 requisitos,
                 ends_at.isoformat()
-            ))
-            await db.commit()
+            )
+        except Exception:
+            self.active_giveaways.pop(msg.id, None)
+            self._early_entries.pop(msg.id, None)
+            raise
+        self.active_giveaways[msg.id] = giveaway_id
+        for user_id, joined in self._early_entries.pop(msg.id, {}).items():
+            self.queue_giveaway_entry(msg.id, user_id, joined)
         
         bot_logger.info(f"Giveaway criado por {interaction.user} - Premio: {premio}")
         
-        # Aguardar término
-        await asyncio.sleep(duracao * 60)
-        await self.end_giveaway(msg.id, interaction.guild.id)
+        # Terminar na hora marcada (sobrevive a reinícios do bot)
+        await self.bot.db.scheduler.schedule(
+            "giveaway", str(msg.id), time.time() + duracao * 60,
+            {"guild_id": str(interaction.guild.id)}
+        )
     
     async def end_giveaway(self, message_id: int, guild_id: int):
-        """Terminar giveaway e escolher vencedores"""
+        """Terminar giveaway e escolher vencedores
+        
+        Corre pelo agendador, que repete a tarefa se houver erro: o giveaway
+        é marcado como terminado antes de anunciar, por isso uma repetição
+        nunca sorteia outra vez, e falhas ao anunciar só ficam no log.
+        """
+        giveaway = await self.bot.db.get_active_giveaway(str(message_id), str(guild_id))
+        if not giveaway:
+            return
         
-        import aiosqlite
-        async with aiosqlite.connect(self.bot.db.db_path) as db:
-            cursor = await db.execute("""
-                SELECT channel_id, winners_count, prize, host_id
-                FROM giveaways
-                WHERE message_id = ? AND guild_id = ? AND status = 'active'
-            """, (str(message_id), str(guild_id)))
-            row = await cursor.fetchone()
-            
-            if not row:
+        # Entradas ainda por gravar (e as reações do arranque, se ainda a decorrer)
+        if self._entries_reconcile is not None and not self._entries_reconcile.done():
+            await asyncio.shield(self._entries_reconcile)
+        if not await self.flush_giveaway_entries():
+            # Sortear com entradas em falta seria injusto: o agendador tenta de novo
+            raise RuntimeError(f"entradas do giveaway {message_id} por gravar")
+        self.active_giveaways.pop(message_id, None)
+        
+        guild = self.bot.get_guild(int(guild_id))
+        channel = guild.get_channel(int(giveaway['channel_id'])) if guild else None
+        if channel is None:
+            bot_logger.error(f"Canal do giveaway não encontrado: {message_id}")
+            await self.bot.db.finish_giveaway(giveaway['id'])
+            return
+        
+        prize = giveaway['prize']
+        winners, total = await self.bot.db.pick_giveaway_winners(giveaway['id'], giveaway['winners_count'])
+        await self.bot.db.finish_giveaway(giveaway['id'])
+        bot_logger.info(f"Giveaway terminado - Vencedores: {winners} ({total} participantes)")
+        
+        try:
+            if not winners:
+                await channel.send("❌ Nenhum participante válido no giveaway!")
                 return
             
-            channel_id, winners_count, prize, host_id = row
+            # Anunciar vencedores
+            winners_mention = ", ".join(f"<@{user_id}>" for user_id in winners)
             
-            guild = self.bot.get_guild(int(guild_id))
-            channel = guild.get_channel(int(channel_id))
+            embed = discord.Embed(
+                title="🎉 GIVEAWAY TERMINADO 🎉",
+                description=f"**Prêmio:** {prize}\n\n"
+                           f"**{'Vencedor' if len(winners) == 1 else 'Vencedores'}:** {winners_mention}",
+                color=discord.Color.green(),
+                timestamp=datetime.utcnow()
+            )
+            embed.set_footer(text=f"{total} participantes")
             
             try:
-                msg = await channel.fetch_message(int(message_id))
-                
-                # Obter participantes
-                reaction = discord.utils.get(msg.reactions, emoji="🎉")
-                if not reaction:
-                    await channel.send("❌ Nenhum participante no giveaway!")
-                    return
-                
-                participants = []
-                async for user in reaction.users():
-                    if not user.bot:
-                        participants.append(user)
-                
-                if len(participants) == 0:
-                    await channel.send("❌ Nenhum participante válido no giveaway!")
-                    return
-                
-                # Escolher vencedores
-                winners = random.sample(participants, min(winners_count, len(participants)))
-                
-                # Anunciar vencedores
-                winners_mention = ", ".join([winner.mention for winner in winners])
-                
-                embed = discord.Embed(
-                    title="🎉 GIVEAWAY TERMINADO 🎉",
-                    description=f"**Prêmio:** {prize}\n\n"
-                               f"**{'Vencedor' if len(winners) == 1 else 'Vencedores'}:** {winners_mention}",
-                    color=discord.Color.green(),
-                    timestamp=datetime.utcnow()
-                )
-                
-                await msg.edit(embed=embed)
-                await channel.send(
-                    f"🎊 Parabéns {winners_mention}! Ganhaste **{prize}**!\n"
-                    f"Contacta <@{host_id}> para reclamar o prémio."
-                )
-                
-                # Atualizar database
-                await db.execute("""
-                    UPDATE giveaways 
-                    SET status = 'ended', ended_at = CURRENT_TIMESTAMP
-                    WHERE message_id = ?
-                """, (str(message_id),))
-                await db.commit()
-                
-                bot_logger.info(f"Giveaway terminado - Vencedores: {[w.name for w in winners]}")
-                
+                await channel.get_partial_message(message_id).edit(embed=embed)
             except discord.NotFound:
                 bot_logger.error(f"Mensagem de giveaway não encontrada: {message_id}")
+            
+            await channel.send(
+                f"🎊 Parabéns {winners_mention}! Ganhaste **{prize}**!\n"
+                f"Contacta <@{giveaway['host_id']}> para reclamar o prémio."
+            )
+        except discord.HTTPException as e:
+            bot_logger.error(f"Erro ao anunciar o fim do giveaway {message_id}: {e}")
     
     # ===== COMANDOS DE TIMESTAMP =====
     
@@ -2425,13 +2284,10 @@ class UtilitiesAdvanced(commands.Cog):
     async def afk(self, interaction: discord.Interaction, razao: str = "AFK"):
         """Definir status AFK"""
         
-        import aiosqlite
-        async with aiosqlite.connect(self.bot.db.db_path) as db:
-            await db.execute("""
-                INSERT OR REPLACE INTO afk_status (user_id, guild_id, reason, set_at)
-                VALUES (?, ?, ?, CURRENT_TIMESTAMP)
-            """, (str(interaction.user.id), str(interaction.guild.id), razao))
-            await db.commit()
+        # Mesmo formato que o CURRENT_TIMESTAMP do SQLite (UTC)
+        set_at = datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S")
+        await self.bot.db.set_afk(str(interaction.user.id), str(interaction.guild.id), razao, set_at)
+        self.afk_users.setdefault(interaction.guild.id, {})[interaction.user.id] = (razao, set_at)
         
         await interaction.response.send_message(
             f"💤 Definiste o teu status como AFK: **{razao}**\n"
@@ -2454,63 +2310,74 @@ class UtilitiesAdvanced(commands.Cog):
         
         target = membro or interaction.user
         
-        import aiosqlite
-        async with aiosqlite.connect(self.bot.db.db_path) as db:
-            cursor = await db.execute("""
-                SELECT total_time, sessions_count, last_session
-                FROM voice_totals
-                WHERE user_id = ? AND guild_id = ?
-            """, (str(target.id), str(interaction.guild.id)))
-            row = await cursor.fetchone()
-            
-            if not row:
-                await interaction.response.send_message(
-                    f"📊 {target.mention} ainda não tem tempo registado em canais de voz!",
-                    ephemeral=True
-                )
-                return
-            
-            total_time, sessions_count, last_session = row
-            
-            # Formatar tempo
-            hours = total_time // 3600
-            minutes = (total_time % 3600) // 60
-            
-            # Calcular média por sessão
-            avg_time = total_time // sessions_count if sessions_count > 0 else 0
-            avg_minutes = avg_time // 60
-            
-            embed = discord.Embed(
-                title=f"🎤 Estatísticas de Voz - {target.display_name}",
-                color=discord.Color.blue(),
-                timestamp=datetime.utcnow()
-            )
-            embed.set_thumbnail(url=target.display_avatar.url)
-            
-            embed.add_field(
-                name="⏱️ Tempo Total",
-                value=f"**{hours}h {minutes}m**",
-                inline=True
+        stats = await self.bot.db.get_voice_stats(str(target.id), str(interaction.guild.id))
+        current = self.voice_tracker.current_duration(interaction.guild.id, target.id)
+        
+        if not stats and not current:
+            await interaction.response.send_message(
+                f"📊 {target.mention} ainda não tem tempo registado em canais de voz!",
+                ephemeral=True
             )
+            return
+        
+        stats = stats or {"total_time": 0, "sessions_count": 0, "last_session": None, "recent_time": 0}
+        total_time = stats['total_time']
+        sessions_count = stats['sessions_count']
+        last_session = stats['last_session']
+        
+        # Formatar tempo
+        hours = total_time // 3600
+        minutes = (total_time % 3600) // 60
+        
+        # Calcular média por sessão
+        avg_time = total_time // sessions_count if sessions_count > 0 else 0
+        avg_minutes = avg_time // 60
+        
+        embed = discord.Embed(
+            title=f"🎤 Estatísticas de Voz - {target.display_name}",
+            color=discord.Color.blue(),
+            timestamp=datetime.utcnow()
+        )
+        embed.set_thumbnail(url=target.display_avatar.url)
+        
+        embed.add_field(
+            name="⏱️ Tempo Total",
+            value=f"**{hours}h {minutes}m**",
+            inline=True
+        )
+        embed.add_field(
+            name="🔢 Sessões",
+            value=f"**{sessions_count}**",
+            inline=True
+        )
+        embed.add_field(
+            name="📊 Média/Sessão",
+            value=f"**{avg_minutes}m**",
+            inline=True
+        )
+        
+        recent_time = stats['recent_time']
+        embed.add_field(
+            name="📅 Últimos 7 dias",
+            value=f"**{recent_time // 3600}h {(recent_time % 3600) // 60}m**",
+            inline=True
+        )
+        
+        if current:
             embed.add_field(
-                name="🔢 Sessões",
-                value=f"**{sessions_count}**",
+                name="🔴 Em chamada agora",
+                value=f"**{current // 3600}h {(current % 3600) // 60}m**",
                 inline=True
             )
+        
+        if last_session:
             embed.add_field(
-                name="📊 Média/Sessão",
-                value=f"**{avg_minutes}m**",
-                inline=True
+                name="🕒 Última Sessão",
+                value=f"<t:{int(datetime.fromisoformat(last_session).timestamp())}:R>",
+                inline=False
             )
-            
-            if last_session:
-                embed.add_field(
-                    name="🕒 Última Sessão",
-                    value=f"<t:{int(datetime.fromisoformat(last_session).timestamp())}:R>",
-                    inline=False
-                )
-            
-            await interaction.response.send_message(embed=embed)
+        
+        await interaction.response.send_message(embed=embed)
     
     @voz_group.command(
         name="leaderboard",
@@ -2518,17 +2385,13 @@ class UtilitiesAdvanced(commands.Cog):
     )
     async def voice_leaderboard(self, interaction: discord.Interaction):
         """Leaderboard de voz"""
-        
-        import aiosqlite
-        async with aiosqlite.connect(self.bot.db.db_path) as db:
-            cursor = await db.execute("""
-                SELECT user_id, total_time, sessions_count
-                FROM voice_totals
-                WHERE guild_id = ?
-                ORDER BY total_time DESC
-                LIMIT 10
-            """, (str(interaction.guild.id),))
-            rows = await cursor.fetchall()
+        guild_id = str(interaction.guild.id)
+        top = await self.bot.db.leaderboards.top("voice", guild_id, limit=10)
+        totals = await self.bot.db.get_voice_totals(guild_id, [user_id for user_id, _ in top])
+        rows = [
+            (user_id, total_time, totals.get(user_id, {}).get("sessions_count", 0))
+            for user_id, total_time in top
+        ]
         
         if not rows:
             await interaction.response.send_message(
@@ -2561,6 +2424,10 @@ class UtilitiesAdvanced(commands.Cog):
                 inline=False
             )
         
+        position = await self.bot.db.leaderboards.rank("voice", guild_id, str(interaction.user.id))
+        if position:
+            embed.set_footer(text=f"A tua posição: #{position}")
+        
         await interaction.response.send_message(embed=embed)
     
     # ===== STARBOARD SETUP =====
@@ -16,6 +16,7 @@ class Config:
     server_id: int = 0  # ID do seu servidor
     mod_role_id: int = 0  # ID da role de moderador
     ticket_category_id: int = 0  # ID da categoria para tickets
+    ticket_log_channel_id: int = 0  # ID do canal onde são enviadas as transcrições
     
     # Configurações de comando
     command_prefix: str = "!"
@@ -26,6 +27,9 @@ class Config:
     music_timeout: int = 15  # Timeout para extração de música em segundos
     ytdl_format: str = "bestaudio"  # Formato padrão do yt-dlp
     enable_music_cache: bool = True  # Cache de URLs extraídas
+    music_workers: int = 4  # Extrações do yt-dlp em simultâneo
+    music_process_pool: bool = False  # Extrair em processos em vez de threads
+    music_prefetch: int = 3  # Músicas da fila com stream resolvido antecipadamente
     
     # Configurações de logging
     log_level: str = "INFO"
@@ -54,12 +58,16 @@ class Config:
             server_id=int(os.getenv("SERVER_ID", "0")),
             mod_role_id=int(os.getenv("MOD_ROLE_ID", "0")),
             ticket_category_id=int(os.getenv("TICKET_CATEGORY_ID", "0")),
+            ticket_log_channel_id=int(os.getenv("TICKET_LOG_CHANNEL_ID", "0")),
             command_prefix=os.getenv("COMMAND_PREFIX", "!"),
             ffmpeg_path=os.getenv("FFMPEG_PATH", default_ffmpeg),
             max_queue_size=int(os.getenv("MAX_QUEUE_SIZE", "50")),
             music_timeout=int(os.getenv("MUSIC_TIMEOUT", "15")),
             ytdl_format=os.getenv("YTDL_FORMAT", "bestaudio"),
             enable_music_cache=os.getenv("ENABLE_MUSIC_CACHE", "True").lower() == "true",
+            music_workers=int(os.getenv("MUSIC_WORKERS", "4")),
+            music_process_pool=os.getenv("MUSIC_PROCESS_POOL", "False").lower() == "true",
+            music_prefetch=int(os.getenv("MUSIC_PREFETCH", "3")),
             log_level=os.getenv("LOG_LEVEL", "INFO"),
             music_debug=os.getenv("MUSIC_DEBUG", "False").lower() == "true",
             language=os.getenv("BOT_LANGUAGE", "en")
@@ -20,7 +20,7 @@ sys.path.insert(0, str(project_root))
 
 from config.settings import Config
 from utils.logger import setup_logging
-from utils.database import get_database
+from utils.database import get_database, close_database
 from utils.backup import BackupSystem
 
 
@@ -193,7 +193,18 @@ class EPABot(commands.Bot):
     async def close(self):
         """Limpeza quando o bot é desligado"""
         self.logger.info("🔄 A desligar bot...")
+        
+        if self.backup_system:
+            self.backup_system.stop()
+        
         await super().close()
+        
+        # Escrever atividade pendente (XP/streaks em buffer) e fechar as
+        # ligações à base de dados depois de os cogs terminarem
+        try:
+            await close_database()
+        except Exception as e:
+            self.logger.error(f"❌ Erro ao fechar base de dados: {e}")
 
 
 async def main():
@@ -62,7 +62,11 @@ class BackupSystem:
             
             # Backup da base de dados
             db_file = Path("data/epa_bot.db")
-            if db_file.exists():
+            if getattr(self.bot, "db", None) is not None:
+                # Cópia via API de backup do SQLite (inclui o que ainda está no WAL)
+                await self.bot.db.backup_to(str(backup_path / "epa_bot.db"))
+                self.logger.info("✅ Base de dados copiada")
+            elif db_file.exists():
                 shutil.copy2(db_file, backup_path / "epa_bot.db")
                 self.logger.info("✅ Base de dados copiada")
             
@@ -0,0 +1,79 @@
+"""
+Cache em Memória para EPA BOT
+Cache LRU limitada por tamanho, com contadores de hits/misses
+"""
+
+from collections import OrderedDict
+from typing import Any, Dict, Hashable
+
+
+class LRUCache:
+    """Cache LRU (least recently used) com tamanho máximo"""
+
+    def __init__(self, maxsize: int = 1000):
+        self.maxsize = maxsize
+        self._data: "OrderedDict[Hashable, Any]" = OrderedDict()
+
+        # Métricas
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._data
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Obtém um valor (conta hit/miss e marca como usado recentemente)"""
+        try:
+            value = self._data[key]
+        except KeyError:
+            self.misses += 1
+            return default
+        self._data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def peek(self, key: Hashable, default: Any = None) -> Any:
+        """Obtém um valor sem afetar métricas nem a ordem LRU"""
+        return self._data.get(key, default)
+
+    def put(self, key: Hashable, value: Any):
+        """Guarda um valor, removendo o menos usado se a cache estiver cheia"""
+        self._data[key] = value
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+            self.evictions += 1
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        return self._data.pop(key, default)
+
+    def clear(self):
+        self._data.clear()
+
+    def values(self) -> list:
+        """Valores guardados (sem afetar métricas nem a ordem LRU)"""
+        return list(self._data.values())
+
+    def items(self) -> list:
+        """Pares (chave, valor) do menos para o mais usado, sem afetar métricas"""
+        return list(self._data.items())
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return (self.hits / total) if total else 0.0
+
+    def stats(self) -> Dict[str, Any]:
+        """Resumo das métricas da cache"""
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hit_rate,
+        }
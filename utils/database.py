@@ -3,24 +3,58 @@ Sistema de Base de Dados para EPA BOT
 Migração de JSON para SQLite com suporte assíncrono
 """
 
-import aiosqlite
+import asyncio
 import json
-from datetime import datetime
+from datetime import datetime, timedelta
 from pathlib import Path
-from typing import Optional, Dict, List, Any
+from typing import Optional, Dict, List, Any, Tuple
 import logging
 
+from utils.cache import LRUCache
+from utils.db_pool import ConnectionPool
+from utils.leaderboard import LeaderboardService
+from utils.scheduler import Scheduler
+from utils.voice_tracker import split_by_day
+from utils.write_behind import ActivityBuffer
+
+
+class InsufficientFunds(Exception):
+    """Débito recusado por falta de saldo"""
+
+    def __init__(self, user_id: str, amount: int):
+        super().__init__(f"Saldo insuficiente: {user_id} ({amount})")
+        self.user_id = user_id
+        self.amount = amount
+
 
 class Database:
     """Classe principal para gestão da base de dados"""
     
-    def __init__(self, db_path: str = "data/epa_bot.db"):
+    def __init__(self, db_path: str = "data/epa_bot.db", readers: int = 4, level_cache_size: int = 10000):
         self.db_path = db_path
         self.logger = logging.getLogger("EPA BOT.Database")
         
+        # Ligações persistentes partilhadas por todos os métodos
+        self.pool = ConnectionPool(db_path, readers=readers)
+        
+        # XP/mensagens/streaks por mensagem são escritos em lote
+        self.activity = ActivityBuffer(self.pool)
+        
+        # Cache das linhas de user_levels mais usadas, por (user_id, guild_id)
+        self.level_cache = LRUCache(maxsize=level_cache_size)
+        self._level_writes = 0  # Incrementado por escritas diretas em user_levels
+        
+        # Rankings mantidos em memória e atualizados a cada escrita
+        self.leaderboards = LeaderboardService(self.pool, self.activity)
+        
+        # Tarefas com hora marcada (lembretes, anúncios, giveaways, quarentena)
+        self.scheduler = Scheduler(self.pool)
+        
     async def init_db(self):
         """Inicializa a base de dados e cria as tabelas"""
-        async with aiosqlite.connect(self.db_path) as db:
+        await self.pool.open()
+        
+        async with self.pool.transaction() as db:
             # Tabela de utilizadores (economia)
             await db.execute("""
                 CREATE TABLE IF NOT EXISTS users (
@@ -46,7 +80,16 @@ class Database:
                     FOREIGN KEY (user_id) REFERENCES users(user_id)
                 )
             """)
-            
+
+            # Colunas da economia que só existiam no JSON (migração)
+            for column in ("last_work TEXT", "last_crime TEXT", "extra_data TEXT"):
+                try:
+                    await db.execute(f"ALTER TABLE users ADD COLUMN {column}")
+                except:
+                    pass  # Coluna já existe
+
+            await db.execute("CREATE INDEX IF NOT EXISTS idx_user_items_user ON user_items(user_id)")
+
             # Tabela de XP e níveis (social) com reputação integrada
             await db.execute("""
                 CREATE TABLE IF NOT EXISTS user_levels (
@@ -111,6 +154,23 @@ class Database:
                 )
             """)
             
+            # Colunas do registo de tickets (migração)
+            for column in ("guild_number INTEGER", "category TEXT", "transcript_path TEXT"):
+                try:
+                    await db.execute(f"ALTER TABLE tickets ADD COLUMN {column}")
+                except:
+                    pass  # Coluna já existe
+            
+            # Numeração de tickets por servidor (sobrevive a reinícios)
+            await db.execute("""
+                CREATE TABLE IF NOT EXISTS ticket_sequences (
+                    guild_id TEXT PRIMARY KEY,
+                    last_number INTEGER NOT NULL DEFAULT 0
+                )
+            """)
+            await db.execute("CREATE INDEX IF NOT EXISTS idx_tickets_user_status ON tickets(guild_id, user_id, status)")
+            await db.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_tickets_guild_number ON tickets(guild_id, guild_number)")
+            
             # Tabela de transações (auditoria)
             await db.execute("""
                 CREATE TABLE IF NOT EXISTS transactions (
@@ -479,6 +539,15 @@ class Database:
                 )
             """)
             
+            # Tabela de configuração de moderação por servidor (JSON por secção)
+            await db.execute("""
+                CREATE TABLE IF NOT EXISTS moderation_config (
+                    guild_id TEXT PRIMARY KEY,
+                    config TEXT NOT NULL,
+                    updated_at TEXT DEFAULT CURRENT_TIMESTAMP
+                )
+            """)
+            
             # Índices para moderação
             await db.execute("CREATE INDEX IF NOT EXISTS idx_strikes_user ON moderation_strikes(user_id, guild_id)")
             await db.execute("CREATE INDEX IF NOT EXISTS idx_strikes_active ON moderation_strikes(is_active, expires_at)")
@@ -592,6 +661,53 @@ class Database:
                 )
             """)
             
+            # Tabela de totais de voz por dia (para estatísticas por período)
+            await db.execute("""
+                CREATE TABLE IF NOT EXISTS voice_daily (
+                    user_id TEXT NOT NULL,
+                    guild_id TEXT NOT NULL,
+                    date TEXT NOT NULL,
+                    total_time INTEGER DEFAULT 0,
+                    sessions_count INTEGER DEFAULT 0,
+                    PRIMARY KEY (guild_id, user_id, date)
+                )
+            """)
+            
+            # Preencher os totais diários a partir do histórico (só na primeira vez)
+            await db.execute("""
+                INSERT OR IGNORE INTO voice_daily (user_id, guild_id, date, total_time, sessions_count)
+                SELECT user_id, guild_id, date, SUM(duration), COUNT(*) FROM voice_stats
+                WHERE NOT EXISTS (SELECT 1 FROM voice_daily)
+                GROUP BY user_id, guild_id, date
+            """)
+            
+            # Sessões de voz em curso (checkpoint para recuperar após reinício)
+            await db.execute("""
+                CREATE TABLE IF NOT EXISTS voice_open_sessions (
+                    user_id TEXT NOT NULL,
+                    guild_id TEXT NOT NULL,
+                    channel_id TEXT NOT NULL,
+                    join_time TEXT NOT NULL,
+                    checkpoint_at TEXT NOT NULL,
+                    PRIMARY KEY (guild_id, user_id)
+                )
+            """)
+            
+            # Sessões de música (fila e posição) para retomar após reinício
+            await db.execute("""
+                CREATE TABLE IF NOT EXISTS music_sessions (
+                    guild_id TEXT PRIMARY KEY,
+                    voice_channel_id TEXT NOT NULL,
+                    text_channel_id TEXT,
+                    current_track TEXT,
+                    position REAL DEFAULT 0,
+                    queue TEXT NOT NULL,
+                    loop_mode TEXT DEFAULT 'off',
+                    volume REAL DEFAULT 0.5,
+                    updated_at TEXT DEFAULT CURRENT_TIMESTAMP
+                )
+            """)
+            
             # Tabela de starboard (mensagens favoritas)
             await db.execute("""
                 CREATE TABLE IF NOT EXISTS starboard (
@@ -645,7 +761,66 @@ class Database:
                 )
             """)
             
+            # Tabela de lembretes
+            await db.execute("""
+                CREATE TABLE IF NOT EXISTS reminders (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    user_id TEXT NOT NULL,
+                    channel_id TEXT NOT NULL,
+                    message TEXT NOT NULL,
+                    due_at REAL NOT NULL,
+                    created_at REAL NOT NULL,
+                    recurring INTEGER DEFAULT 0,
+                    interval_seconds INTEGER DEFAULT 0
+                )
+            """)
+            
+            # Tabela de anúncios agendados
+            await db.execute("""
+                CREATE TABLE IF NOT EXISTS scheduled_announcements (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    channel_id TEXT NOT NULL,
+                    message TEXT,
+                    embed TEXT,
+                    due_at REAL NOT NULL,
+                    created_by TEXT,
+                    created_at REAL NOT NULL
+                )
+            """)
+            
+            # Tabela de polls (votações)
+            await db.execute("""
+                CREATE TABLE IF NOT EXISTS polls (
+                    poll_id TEXT PRIMARY KEY,
+                    guild_id TEXT,
+                    channel_id TEXT,
+                    message_id TEXT,
+                    question TEXT NOT NULL,
+                    description TEXT,
+                    options TEXT NOT NULL,
+                    created_by TEXT,
+                    created_at REAL NOT NULL,
+                    status TEXT DEFAULT 'open'
+                )
+            """)
+            
+            # Votos das polls (um por utilizador em cada poll)
+            await db.execute("""
+                CREATE TABLE IF NOT EXISTS poll_votes (
+                    poll_id TEXT NOT NULL,
+                    user_id TEXT NOT NULL,
+                    option_index INTEGER NOT NULL,
+                    voted_at REAL NOT NULL,
+                    PRIMARY KEY (poll_id, user_id)
+                )
+            """)
+            
             # Índices para utilidades
+            await db.execute("CREATE INDEX IF NOT EXISTS idx_polls_status ON polls(status)")
+            await db.execute("CREATE INDEX IF NOT EXISTS idx_poll_votes_option ON poll_votes(poll_id, option_index)")
+            await db.execute("CREATE INDEX IF NOT EXISTS idx_reminders_due ON reminders(due_at)")
+            await db.execute("CREATE INDEX IF NOT EXISTS idx_reminders_user ON reminders(user_id, due_at)")
+            await db.execute("CREATE INDEX IF NOT EXISTS idx_announcements_due ON scheduled_announcements(due_at)")
             await db.execute("CREATE INDEX IF NOT EXISTS idx_suggestions_guild ON suggestions(guild_id, status)")
             await db.execute("CREATE INDEX IF NOT EXISTS idx_suggestions_user ON suggestions(user_id)")
             await db.execute("CREATE INDEX IF NOT EXISTS idx_giveaways_status ON giveaways(status, ends_at)")
@@ -657,51 +832,63 @@ class Database:
             await db.execute("CREATE INDEX IF NOT EXISTS idx_starboard_msg ON starboard(message_id)")
             await db.execute("CREATE INDEX IF NOT EXISTS idx_afk_guild ON afk_status(guild_id)")
             
-            await db.commit()
-            self.logger.info("✅ Base de dados inicializada com sucesso")
+            # Índices de cobertura para rankings
+            await db.execute("CREATE INDEX IF NOT EXISTS idx_levels_rank_xp ON user_levels(guild_id, xp DESC, user_id)")
+            await db.execute("CREATE INDEX IF NOT EXISTS idx_levels_rank_rep ON user_levels(guild_id, reputation DESC, user_id)")
+            await db.execute("CREATE INDEX IF NOT EXISTS idx_levels_rank_msgs ON user_levels(guild_id, messages_sent DESC, user_id)")
+            await db.execute("CREATE INDEX IF NOT EXISTS idx_users_rank_balance ON users(balance DESC, user_id)")
+            await db.execute("CREATE INDEX IF NOT EXISTS idx_streaks_rank ON user_streaks(guild_id, streak_type, current_streak DESC, user_id)")
+            await db.execute("CREATE INDEX IF NOT EXISTS idx_voice_totals_rank ON voice_totals(guild_id, total_time DESC, user_id)")
+            await db.execute("CREATE INDEX IF NOT EXISTS idx_game_stats_rank ON game_stats(game_type, wins DESC, total_earnings DESC)")
+            
+            # Tabela do agendador de tarefas
+            await db.execute("""
+                CREATE TABLE IF NOT EXISTS scheduled_jobs (
+                    kind TEXT NOT NULL,
+                    job_key TEXT NOT NULL,
+                    due_at REAL NOT NULL,
+                    payload TEXT,
+                    created_at TEXT DEFAULT CURRENT_TIMESTAMP,
+                    PRIMARY KEY (kind, job_key)
+                )
+            """)
+            await db.execute("CREATE INDEX IF NOT EXISTS idx_scheduled_jobs_due ON scheduled_jobs(due_at)")
+        self.logger.info("✅ Base de dados inicializada com sucesso")
+        self.activity.start()
+        await self.scheduler.start()
+    
+    async def close(self):
+        """Escreve a atividade pendente e fecha as ligações à base de dados"""
+        try:
+            await self.scheduler.stop()
+            await self.activity.stop()
+        finally:
+            await self.pool.close()
+    
+    async def backup_to(self, target_path: str):
+        """Cria uma cópia consistente da base de dados (seguro com WAL)"""
+        await self.pool.backup(target_path)
     
     async def migrate_from_json(self):
         """Migra dados dos ficheiros JSON existentes para SQLite"""
         self.logger.info("🔄 Iniciando migração de JSON para SQLite...")
         
         # Migrar economia
-        economy_file = Path("data/economy_simple.json")
-        if economy_file.exists():
-            with open(economy_file, 'r', encoding='utf-8') as f:
-                economy_data = json.load(f)
-            
-            async with aiosqlite.connect(self.db_path) as db:
-                for user_id, data in economy_data.get("users", {}).items():
-                    await db.execute("""
-                        INSERT OR REPLACE INTO users 
-                        (user_id, balance, last_daily, daily_streak, total_earned, total_donated)
-                        VALUES (?, ?, ?, ?, ?, ?)
-                    """, (
-                        user_id,
-                        data.get("balance", 2500),
-                        data.get("last_daily"),
-                        data.get("daily_streak", 0),
-                        data.get("total_earned", 2500),
-                        data.get("total_donated", 0)
-                    ))
-                    
-                    # Migrar items
-                    for item in data.get("items", []):
-                        await db.execute("""
-                            INSERT INTO user_items (user_id, item_name, item_data)
-                            VALUES (?, ?, ?)
-                        """, (user_id, str(item), json.dumps(item)))
-                
-                await db.commit()
-                self.logger.info(f"✅ Migrados {len(economy_data.get('users', {}))} utilizadores da economia")
+        await self.import_economy_json()
+        
+        # Migrar lembretes e anúncios agendados
+        await self.import_reminders_json()
         
+        # Migrar polls
+        await self.import_polls_json()
+
         # Migrar dados sociais
         social_file = Path("data/social_data.json")
         if social_file.exists():
             with open(social_file, 'r', encoding='utf-8') as f:
                 social_data = json.load(f)
             
-            async with aiosqlite.connect(self.db_path) as db:
+            async with self.pool.transaction() as db:
                 for guild_id, users in social_data.get("guilds", {}).items():
                     for user_id, data in users.items():
                         await db.execute("""
@@ -723,9 +910,11 @@ class Database:
                             VALUES (?, ?, ?)
                         """, (user_id, guild_id, data.get("reputation", 0)))
                 
-                await db.commit()
                 total_users = sum(len(users) for users in social_data.get("guilds", {}).values())
                 self.logger.info(f"✅ Migrados {total_users} utilizadores dos dados sociais")
+            
+            self._invalidate_levels()
+            self.leaderboards.invalidate()
         
         # Migrar configurações de boas-vindas
         welcome_file = Path("data/welcome_config.json")
@@ -733,7 +922,7 @@ class Database:
             with open(welcome_file, 'r', encoding='utf-8') as f:
                 welcome_data = json.load(f)
             
-            async with aiosqlite.connect(self.db_path) as db:
+            async with self.pool.transaction() as db:
                 for guild_id, config in welcome_data.get("guilds", {}).items():
                     await db.execute("""
                         INSERT OR REPLACE INTO welcome_config 
@@ -745,103 +934,449 @@ class Database:
                         config.get("message"),
                         1 if config.get("enabled", True) else 0
                     ))
-                
-                await db.commit()
                 self.logger.info(f"✅ Migradas {len(welcome_data.get('guilds', {}))} configurações de boas-vindas")
         
         self.logger.info("🎉 Migração concluída com sucesso!")
     
-    # --- Métodos de Economia ---
+    async def import_economy_json(self, json_path: str = "data/economy_simple.json") -> int:
+        """Importa a economia do JSON antigo (uma única vez)
+
+        Depois de importado, o ficheiro é renomeado para `.migrated` para que
+        a importação não volte a correr (e não duplique itens) no arranque.
+        """
+        economy_file = Path(json_path)
+        if not economy_file.exists():
+            return 0
+
+        with open(economy_file, 'r', encoding='utf-8') as f:
+            economy_data = json.load(f)
+
+        users = economy_data.get("users", {})
+        async with self.pool.transaction() as db:
+            for user_id, data in users.items():
+                extra = {k: v for k, v in data.items() if k not in self.ECONOMY_JSON_FIELDS}
+                await db.execute("""
+                    INSERT OR REPLACE INTO users 
+                    (user_id, balance, last_daily, last_work, last_crime, daily_streak,
+                     total_earned, total_donated, extra_data)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                """, (
+                    user_id,
+                    data.get("balance", 2500),
+                    data.get("last_daily"),
+                    data.get("last_work"),
+                    data.get("last_crime"),
+                    data.get("daily_streak", 0),
+                    data.get("total_earned", 2500),
+                    data.get("total_donated", 0),
+                    json.dumps(extra, ensure_ascii=False) if extra else None
+                ))
+
+                # Migrar items (substituindo os de importações anteriores)
+                await db.execute("DELETE FROM user_items WHERE user_id = ?", (user_id,))
+                await db.executemany("""
+                    INSERT INTO user_items (user_id, item_name, item_data, acquired_at)
+                    VALUES (?, ?, ?, COALESCE(?, CURRENT_TIMESTAMP))
+                """, [
+                    (user_id, item.get("name", str(item)), json.dumps(item, ensure_ascii=False), item.get("purchased"))
+                    for item in data.get("items", []) if isinstance(item, dict)
+                ])
+
+        economy_file.rename(economy_file.with_name(economy_file.name + ".migrated"))
+        self.leaderboards.invalidate("balance")
+        self.logger.info(f"✅ Migrados {len(users)} utilizadores da economia")
+        return len(users)
     
+    async def import_reminders_json(self, reminders_path: str = "data/reminders.json",
+                                    announcements_path: str = "data/scheduled_announcements.json") -> Tuple[int, int]:
+        """Importa lembretes e anúncios dos JSON antigos (uma única vez)
+
+        As linhas importadas são agendadas no agendador e os ficheiros são
+        renomeados para `.migrated`.
+        """
+        counts = []
+        for path, kind in ((reminders_path, "reminder"), (announcements_path, "announcement")):
+            json_file = Path(path)
+            if not json_file.exists():
+                counts.append(0)
+                continue
+            
+            with open(json_file, 'r', encoding='utf-8') as f:
+                items = json.load(f)
+            
+            jobs = []
+            async with self.pool.transaction() as db:
+                for item in items:
+                    if kind == "reminder":
+                        cursor = await db.execute("""
+                            INSERT INTO reminders
+                            (user_id, channel_id, message, due_at, created_at, recurring, interval_seconds)
+                            VALUES (?, ?, ?, ?, ?, ?, ?)
+                        """, (
+                            item['user_id'], item['channel_id'], item['message'], item['time'],
+                            item.get('created_at', item['time']),
+                            int(bool(item.get('recurring'))), item.get('interval', 0)
+                        ))
+                        legacy_key = f"{item['user_id']}:{item.get('created_at')}"
+                    else:
+                        cursor = await db.execute("""
+                            INSERT INTO scheduled_announcements
+                            (channel_id, message, embed, due_at, created_by, created_at)
+                            VALUES (?, ?, ?, ?, ?, ?)
+                        """, (
+                            item['channel_id'], item.get('message'),
+                            json.dumps(item['embed'], ensure_ascii=False) if item.get('embed') else None,
+                            item['time'], item.get('created_by'), item.get('created_at', item['time'])
+                        ))
+                        legacy_key = f"{item.get('created_by')}:{item.get('created_at')}"
+                    jobs.append((str(cursor.lastrowid), item['time'], legacy_key))
+            
+            # Tarefas agendadas com a chave antiga (antes das tabelas) deixam de servir
+            for _, _, legacy_key in jobs:
+                await self.scheduler.cancel(kind, legacy_key)
+            await self.scheduler.schedule_many(kind, [(key, due_at, None) for key, due_at, _ in jobs])
+            
+            json_file.rename(json_file.with_name(json_file.name + ".migrated"))
+            counts.append(len(items))
+        
+        if any(counts):
+            self.logger.info(f"✅ Migrados {counts[0]} lembretes e {counts[1]} anúncios agendados")
+        return counts[0], counts[1]
+    
+    # --- Métodos de Economia ---
+
+    # Campos do JSON antigo que têm coluna própria na tabela users
+    ECONOMY_JSON_FIELDS = (
+        "balance", "last_daily", "last_work", "last_crime",
+        "daily_streak", "total_earned", "total_donated", "items",
+    )
+    # Campos que podem ser alterados diretamente (o saldo só muda via add/remove)
+    ECONOMY_STATE_FIELDS = ("last_daily", "last_work", "last_crime", "daily_streak")
+
+    async def get_economy_user(self, user_id: str) -> Dict:
+        """Obtém os dados económicos de um utilizador (valores por defeito se não existir)"""
+        async with self.pool.read() as db:
+            async with db.execute("""
+                SELECT balance, last_daily, last_work, last_crime, daily_streak,
+                       total_earned, total_donated, extra_data
+                FROM users WHERE user_id = ?
+            """, (user_id,)) as cursor:
+                row = await cursor.fetchone()
+
+        if not row:
+            return {
+                "balance": 2500,
+                "last_daily": None,
+                "last_work": None,
+                "last_crime": None,
+                "daily_streak": 0,
+                "total_earned": 2500,
+                "total_donated": 0,
+            }
+
+        data = json.loads(row[7]) if row[7] else {}
+        data.update({
+            "balance": row[0],
+            "last_daily": row[1],
+            "last_work": row[2],
+            "last_crime": row[3],
+            "daily_streak": row[4] or 0,
+            "total_earned": row[5] or 0,
+            "total_donated": row[6] or 0,
+        })
+        return data
+
+    async def update_economy_user(self, user_id: str, **fields):
+        """Atualiza cooldowns/streak (e campos extra) de um utilizador"""
+        columns = {k: v for k, v in fields.items() if k in self.ECONOMY_STATE_FIELDS}
+        extra = {k: v for k, v in fields.items() if k not in self.ECONOMY_STATE_FIELDS}
+        if any(k in self.ECONOMY_JSON_FIELDS for k in extra):
+            raise ValueError("Saldo e itens não podem ser alterados com update_economy_user")
+
+        async with self.pool.transaction() as db:
+            await db.execute("INSERT OR IGNORE INTO users (user_id) VALUES (?)", (user_id,))
+
+            if columns:
+                assignments = ", ".join(f"{column} = ?" for column in columns)
+                await db.execute(
+                    f"UPDATE users SET {assignments}, updated_at = CURRENT_TIMESTAMP WHERE user_id = ?",
+                    (*columns.values(), user_id)
+                )
+
+            if extra:
+                async with db.execute(
+                    "SELECT extra_data FROM users WHERE user_id = ?", (user_id,)
+                ) as cursor:
+                    row = await cursor.fetchone()
+                data = json.loads(row[0]) if row and row[0] else {}
+                data.update(extra)
+                await db.execute(
+                    "UPDATE users SET extra_data = ? WHERE user_id = ?",
+                    (json.dumps(data, ensure_ascii=False), user_id)
+                )
+
+    async def delete_economy_user(self, user_id: str):
+        """Apaga os dados económicos de um utilizador"""
+        async with self.pool.transaction() as db:
+            await db.execute("DELETE FROM user_items WHERE user_id = ?", (user_id,))
+            await db.execute("DELETE FROM users WHERE user_id = ?", (user_id,))
+        self.leaderboards.set_score("balance", None, user_id, 0)
+
+    async def get_user_items(self, user_id: str) -> List[Dict]:
+        """Obtém os itens comprados por um utilizador"""
+        async with self.pool.read() as db:
+            async with db.execute(
+                "SELECT item_name, item_data FROM user_items WHERE user_id = ? ORDER BY id",
+                (user_id,)
+            ) as cursor:
+                rows = await cursor.fetchall()
+        return [json.loads(row[1]) if row[1] else {"name": row[0]} for row in rows]
+
+    async def add_user_item(self, user_id: str, item: Dict):
+        """Adiciona um item ao utilizador"""
+        async with self.pool.transaction() as db:
+            await db.execute("""
+                INSERT INTO user_items (user_id, item_name, item_data)
+                VALUES (?, ?, ?)
+            """, (user_id, item["name"], json.dumps(item, ensure_ascii=False)))
+
+    async def update_user_item(self, user_id: str, item_name: str, item: Dict):
+        """Substitui os dados do item mais recente com esse nome"""
+        async with self.pool.transaction() as db:
+            await db.execute("""
+                UPDATE user_items SET item_data = ?
+                WHERE id = (
+                    SELECT id FROM user_items
+                    WHERE user_id = ? AND item_name = ?
+                    ORDER BY id DESC LIMIT 1
+                )
+            """, (json.dumps(item, ensure_ascii=False), user_id, item_name))
+
     async def get_user_balance(self, user_id: str) -> int:
         """Obtém o saldo de um utilizador"""
-        async with aiosqlite.connect(self.db_path) as db:
+        async with self.pool.read() as db:
             async with db.execute(
                 "SELECT balance FROM users WHERE user_id = ?", (user_id,)
             ) as cursor:
                 row = await cursor.fetchone()
                 return row[0] if row else 2500
     
-    async def add_money(self, user_id: str, amount: int, transaction_type: str = "earn", description: str = None):
-        """Adiciona dinheiro a um utilizador"""
-        async with aiosqlite.connect(self.db_path) as db:
-            await db.execute("""
-                INSERT INTO users (user_id, balance, total_earned)
-                VALUES (?, ?, ?)
-                ON CONFLICT(user_id) DO UPDATE SET
-                    balance = balance + ?,
-                    total_earned = total_earned + ?,
-                    updated_at = CURRENT_TIMESTAMP
-            """, (user_id, 2500 + amount, amount, amount, amount))
+    async def add_money(self, user_id: str, amount: int, transaction_type: str = "earn", description: str = None) -> int:
+        """Adiciona dinheiro a um utilizador e devolve o novo saldo"""
+        async with self.pool.transaction() as db:
+            balance = await self._credit(db, user_id, amount)
             
             # Registar transação
             await db.execute("""
                 INSERT INTO transactions (to_user_id, amount, transaction_type, description)
                 VALUES (?, ?, ?, ?)
             """, (user_id, amount, transaction_type, description))
-            
-            await db.commit()
+        self.leaderboards.set_score("balance", None, user_id, balance)
+        return balance
     
     async def remove_money(self, user_id: str, amount: int, transaction_type: str = "spend", description: str = None):
         """Remove dinheiro de um utilizador"""
-        async with aiosqlite.connect(self.db_path) as db:
-            await db.execute("""
+        async with self.pool.transaction() as db:
+            await db.execute("INSERT OR IGNORE INTO users (user_id) VALUES (?)", (user_id,))
+            async with db.execute("""
                 UPDATE users 
                 SET balance = balance - ?, updated_at = CURRENT_TIMESTAMP
                 WHERE user_id = ?
-            """, (amount, user_id))
+                RETURNING balance
+            """, (amount, user_id)) as cursor:
+                row = await cursor.fetchone()
             
             # Registar transação
             await db.execute("""
                 INSERT INTO transactions (from_user_id, amount, transaction_type, description)
                 VALUES (?, ?, ?, ?)
             """, (user_id, amount, transaction_type, description))
-            
-            await db.commit()
+        self.leaderboards.set_score("balance", None, user_id, row[0])
     
-    async def transfer_money(self, from_user: str, to_user: str, amount: int):
-        """Transfere dinheiro entre utilizadores"""
-        async with aiosqlite.connect(self.db_path) as db:
-            # Remover do remetente
-            await db.execute("""
-                UPDATE users 
-                SET balance = balance - ?, total_donated = total_donated + ?, updated_at = CURRENT_TIMESTAMP
-                WHERE user_id = ?
-            """, (amount, amount, from_user))
-            
-            # Adicionar ao destinatário
+    async def transfer_money(self, from_user: str, to_user: str, amount: int) -> bool:
+        """Transfere dinheiro entre utilizadores (False se o saldo não chegar)"""
+        return await self.transfer_atomic(from_user, to_user, amount) is not None
+
+    # --- Operações atómicas de saldo ---
+    #
+    # Verificação e débito acontecem no mesmo UPDATE ... WHERE balance >= ?
+    # dentro de BEGIN IMMEDIATE, por isso pedidos concorrentes (/transferir,
+    # /apostar, lances, trades) nunca deixam um saldo negativo.
+
+    async def _debit(self, db, user_id: str, amount: int) -> Optional[int]:
+        """Débito condicional dentro de uma transação; None se o saldo não chegar"""
+        await db.execute("INSERT OR IGNORE INTO users (user_id) VALUES (?)", (user_id,))
+        async with db.execute("""
+            UPDATE users
+            SET balance = balance - ?, updated_at = CURRENT_TIMESTAMP
+            WHERE user_id = ? AND balance >= ?
+            RETURNING balance
+        """, (amount, user_id, amount)) as cursor:
+            row = await cursor.fetchone()
+        return row[0] if row else None
+
+    async def _credit(self, db, user_id: str, amount: int) -> int:
+        """Crédito dentro de uma transação; devolve o novo saldo"""
+        async with db.execute("""
+            INSERT INTO users (user_id, balance, total_earned)
+            VALUES (?, ?, ?)
+            ON CONFLICT(user_id) DO UPDATE SET
+                balance = balance + ?,
+                total_earned = total_earned + ?,
+                updated_at = CURRENT_TIMESTAMP
+            RETURNING balance
+        """, (user_id, 2500 + amount, 2500 + amount, amount, amount)) as cursor:
+            row = await cursor.fetchone()
+        return row[0]
+
+    async def _apply_ledger(self, db, ledger_entries) -> Dict[str, int]:
+        """Aplica lançamentos (user_id, delta[, tipo[, descrição]]) dentro de uma transação
+
+        Lança InsufficientFunds no primeiro débito sem saldo, o que faz
+        rollback de todos os lançamentos anteriores.
+        """
+        balances = {}
+        for entry in ledger_entries:
+            user_id, delta = entry[0], entry[1]
+            transaction_type = entry[2] if len(entry) > 2 else ("earn" if delta >= 0 else "spend")
+            description = entry[3] if len(entry) > 3 else None
+
+            if delta >= 0:
+                balances[user_id] = await self._credit(db, user_id, delta)
+                await db.execute("""
+                    INSERT INTO transactions (to_user_id, amount, transaction_type, description)
+                    VALUES (?, ?, ?, ?)
+                """, (user_id, delta, transaction_type, description))
+            else:
+                balance = await self._debit(db, user_id, -delta)
+                if balance is None:
+                    raise InsufficientFunds(user_id, -delta)
+                balances[user_id] = balance
+                await db.execute("""
+                    INSERT INTO transactions (from_user_id, amount, transaction_type, description)
+                    VALUES (?, ?, ?, ?)
+                """, (user_id, -delta, transaction_type, description))
+        return balances
+
+    async def debit_if_sufficient(self, user_id: str, amount: int, transaction_type: str = "spend",
+                                  description: str = None) -> Optional[int]:
+        """Remove dinheiro só se houver saldo; devolve o novo saldo ou None
+
+        Lança ValueError se `amount` não for positivo.
+        """
+        if amount <= 0:
+            raise ValueError(f"Valor a debitar tem de ser positivo: {amount}")
+        balances = await self.batch_apply([(user_id, -amount, transaction_type, description)])
+        return balances[user_id] if balances else None
+
+    async def transfer_atomic(self, from_user: str, to_user: str, amount: int,
+                              description: str = "Transferência entre utilizadores") -> Optional[Tuple[int, int]]:
+        """Transfere dinheiro numa única transação
+
+        Devolve (saldo do remetente, saldo do destinatário) ou None se o
+        remetente não tiver saldo suficiente. Lança ValueError se `amount`
+        não for positivo.
+        """
+        if amount <= 0:
+            raise ValueError(f"Valor a transferir tem de ser positivo: {amount}")
+        async with self.pool.transaction() as db:
+            from_balance = await self._debit(db, from_user, amount)
+            if from_balance is None:
+                return None
+
             await db.execute("""
-                INSERT INTO users (user_id, balance, total_earned)
-                VALUES (?, ?, ?)
-                ON CONFLICT(user_id) DO UPDATE SET
-                    balance = balance + ?,
-                    total_earned = total_earned + ?,
-                    updated_at = CURRENT_TIMESTAMP
-            """, (to_user, 2500 + amount, amount, amount, amount))
-            
+                UPDATE users SET total_donated = total_donated + ? WHERE user_id = ?
+            """, (amount, from_user))
+            to_balance = await self._credit(db, to_user, amount)
+
             # Registar transação
             await db.execute("""
                 INSERT INTO transactions (from_user_id, to_user_id, amount, transaction_type, description)
-                VALUES (?, ?, ?, 'transfer', 'Transferência entre utilizadores')
-            """, (from_user, to_user, amount))
-            
-            await db.commit()
+                VALUES (?, ?, ?, 'transfer', ?)
+            """, (from_user, to_user, amount, description))
+        self.leaderboards.set_score("balance", None, from_user, from_balance)
+        self.leaderboards.set_score("balance", None, to_user, to_balance)
+        return from_balance, to_balance
+
+    async def batch_apply(self, ledger_entries) -> Optional[Dict[str, int]]:
+        """Aplica vários lançamentos de forma atómica (tudo ou nada)
+
+        Cada lançamento é (user_id, delta[, tipo[, descrição]]), com delta
+        negativo para débitos. Devolve {user_id: novo saldo} ou None se algum
+        débito não tiver saldo (nesse caso nada é aplicado).
+        """
+        try:
+            async with self.pool.transaction() as db:
+                balances = await self._apply_ledger(db, ledger_entries)
+        except InsufficientFunds:
+            return None
+        self._publish_balances(balances)
+        return balances
+
+    def _publish_balances(self, balances: Dict[str, int]):
+        """Atualiza o ranking de saldo depois de um commit"""
+        for user_id, balance in balances.items():
+            self.leaderboards.set_score("balance", None, user_id, balance)
+
+    async def settle_trade(self, trade_id: int) -> str:
+        """Executa um trade pendente numa única transação
+
+        Devolve 'completed', 'unavailable' (já não está pendente) ou o
+        user_id de quem não tinha saldo (o trade fica cancelado).
+        """
+        try:
+            async with self.pool.transaction() as db:
+                async with db.execute("""
+                    SELECT sender_id, receiver_id, sender_offer_coins, receiver_offer_coins
+                    FROM trades WHERE trade_id = ? AND status = 'pending'
+                """, (trade_id,)) as cursor:
+                    row = await cursor.fetchone()
+                if not row:
+                    return "unavailable"
+
+                sender_id, receiver_id, sender_coins, receiver_coins = row
+                description = f"Trade #{trade_id}"
+                ledger = []
+                if sender_coins:
+                    ledger += [(sender_id, -sender_coins, "trade", description),
+                               (receiver_id, sender_coins, "trade", description)]
+                if receiver_coins:
+                    ledger += [(receiver_id, -receiver_coins, "trade", description),
+                               (sender_id, receiver_coins, "trade", description)]
+                balances = await self._apply_ledger(db, ledger)
+
+                await db.execute("""
+                    UPDATE trades SET status = 'completed', completed_at = CURRENT_TIMESTAMP
+                    WHERE trade_id = ?
+                """, (trade_id,))
+        except InsufficientFunds as e:
+            await self.update_trade_status(trade_id, "cancelled")
+            return e.user_id
+        self._publish_balances(balances)
+        return "completed"
     
-    async def get_top_richest(self, limit: int = 10) -> List[Dict]:
+    async def get_top_richest(self, limit: int = 10, offset: int = 0) -> List[Dict]:
         """Obtém os utilizadores mais ricos"""
-        async with aiosqlite.connect(self.db_path) as db:
-            async with db.execute("""
-                SELECT user_id, balance FROM users 
-                ORDER BY balance DESC LIMIT ?
-            """, (limit,)) as cursor:
-                rows = await cursor.fetchall()
-                return [{"user_id": row[0], "balance": row[1]} for row in rows]
+        rows = await self.leaderboards.top("balance", limit=limit, offset=offset)
+        return [{"user_id": user_id, "balance": balance} for user_id, balance in rows]
+
+    async def get_balance_rank(self, user_id: str) -> Optional[int]:
+        """Obtém a posição de um utilizador no ranking global de saldo"""
+        return await self.leaderboards.rank("balance", None, user_id)
     
     # --- Métodos de XP/Níveis ---
     
+    def _invalidate_levels(self, user_id: str = None, guild_id: str = None):
+        """Invalida a cache de níveis após uma escrita direta em user_levels"""
+        self._level_writes += 1
+        if user_id is None:
+            self.level_cache.clear()
+        else:
+            self.level_cache.pop((user_id, guild_id))
+    
     async def add_xp(self, user_id: str, guild_id: str, xp: int) -> Dict:
         """Adiciona XP a um utilizador e calcula nível"""
-        async with aiosqlite.connect(self.db_path) as db:
+        async with self.pool.transaction() as db:
             # Obter XP atual
             async with db.execute("""
                 SELECT xp, level FROM user_levels 
@@ -865,31 +1400,87 @@ class Database:
                     messages_sent = messages_sent + 1,
                     last_message_at = ?
             """, (user_id, guild_id, new_xp, new_level, new_xp, new_level, datetime.now().timestamp()))
-            
-            await db.commit()
-            
-            return {
-                "xp": new_xp,
-                "level": new_level,
-                "leveled_up": leveled_up,
-                "old_level": current_level
-            }
+        
+        self._invalidate_levels(user_id, guild_id)
+        self.leaderboards.adjust_score("xp", guild_id, user_id, xp)
+        self.leaderboards.adjust_score("messages", guild_id, user_id, 1)
+        
+        return {
+            "xp": new_xp,
+            "level": new_level,
+            "leveled_up": leveled_up,
+            "old_level": current_level
+        }
     
     async def get_user_level(self, user_id: str, guild_id: str) -> Dict:
         """Obtém informações de nível de um utilizador incluindo reputação"""
-        async with aiosqlite.connect(self.db_path) as db:
+        key = (user_id, guild_id)
+        cached = self.level_cache.get(key)
+        if cached is not None:
+            return dict(cached)
+        
+        # Se houver escritas ou um flush durante a leitura, o valor lido
+        # pode já estar desatualizado e não é guardado na cache
+        epoch = (self._level_writes, self.activity.flush_count)
+        
+        async with self.pool.read() as db:
             async with db.execute("""
-                SELECT xp, level, messages_sent, reputation FROM user_levels 
+                SELECT xp, level, messages_sent, reputation, daily_streak FROM user_levels 
                 WHERE user_id = ? AND guild_id = ?
             """, (user_id, guild_id)) as cursor:
                 row = await cursor.fetchone()
-                if row:
-                    return {"xp": row[0], "level": row[1], "messages": row[2], "reputation": row[3]}
-                return {"xp": 0, "level": 1, "messages": 0, "reputation": 0}
+        
+        data = {"xp": row[0], "level": row[1], "messages": row[2], "reputation": row[3], "daily_streak": row[4] or 0} if row \
+            else {"xp": 0, "level": 1, "messages": 0, "reputation": 0, "daily_streak": 0}
+        
+        # Incluir XP ainda no buffer de escrita
+        pending = self.activity.pending_level(user_id, guild_id)
+        if pending:
+            data["xp"] += pending[0]
+            data["messages"] += pending[1]
+            data["level"] = max(data["level"], pending[2])
+        
+        if epoch == (self._level_writes, self.activity.flush_count):
+            self.level_cache.put(key, data)
+        return dict(data)
+    
+    def record_message_activity(self, user_id: str, guild_id: str, xp_gain: int, level: int):
+        """Regista XP de uma mensagem: atualiza a cache e deixa a escrita para o buffer"""
+        cached = self.level_cache.peek((user_id, guild_id))
+        if cached is not None:
+            cached["xp"] += xp_gain
+            cached["messages"] += 1
+            cached["level"] = max(cached["level"], level)
+        
+        self.activity.record_message(user_id, guild_id, xp_gain, level)
+        self.leaderboards.record_message(user_id, guild_id, xp_gain)
+    
+    async def add_reputation(self, user_id: str, guild_id: str, amount: int = 1) -> int:
+        """Adiciona reputação a um utilizador e devolve o novo total"""
+        async with self.pool.transaction() as db:
+            await db.execute("""
+                INSERT INTO user_levels (user_id, guild_id, reputation, xp, level)
+                VALUES (?, ?, ?, 0, 1)
+                ON CONFLICT(user_id, guild_id) 
+                DO UPDATE SET reputation = reputation + ?
+            """, (user_id, guild_id, amount, amount))
+            
+            async with db.execute("""
+                SELECT reputation FROM user_levels 
+                WHERE user_id = ? AND guild_id = ?
+            """, (user_id, guild_id)) as cursor:
+                row = await cursor.fetchone()
+        
+        self._level_writes += 1
+        cached = self.level_cache.peek((user_id, guild_id))
+        if cached is not None:
+            cached["reputation"] = row[0]
+        self.leaderboards.set_score("reputation", guild_id, user_id, row[0])
+        return row[0]
     
     async def update_user_level(self, user_id: str, guild_id: str, xp: int, level: int, increment_messages: bool = True):
         """Atualiza XP e nível de um utilizador"""
-        async with aiosqlite.connect(self.db_path) as db:
+        async with self.pool.transaction() as db:
             timestamp = datetime.utcnow().isoformat()
             if increment_messages:
                 await db.execute("""
@@ -905,24 +1496,41 @@ class Database:
                     ON CONFLICT(user_id, guild_id) 
                     DO UPDATE SET xp = ?, level = ?, updated_at = ?
                 """, (user_id, guild_id, xp, level, timestamp, xp, level, timestamp))
-            await db.commit()
+        
+        self._invalidate_levels(user_id, guild_id)
+        
+        # O buffer de escrita ainda vai somar o XP pendente a este valor
+        pending = self.activity.pending_level(user_id, guild_id)
+        self.leaderboards.set_score("xp", guild_id, user_id, xp + (pending[0] if pending else 0))
+        if increment_messages:
+            self.leaderboards.adjust_score("messages", guild_id, user_id, 1)
     
-    async def get_leaderboard(self, guild_id: str, limit: int = 10) -> List[Dict]:
+    async def get_leaderboard(self, guild_id: str, limit: int = 10, offset: int = 0) -> List[Dict]:
         """Obtém o leaderboard de XP"""
-        async with aiosqlite.connect(self.db_path) as db:
+        rows = await self.leaderboards.top("xp", guild_id, limit, offset)
+        result = []
+        for user_id, xp in rows:
+            data = await self.get_user_level(user_id, guild_id)
+            result.append({"user_id": user_id, "xp": xp, "level": data["level"]})
+        return result
+
+    async def get_total_wins_leaderboard(self, limit: int = 10) -> List[Dict]:
+        """Obtém o ranking de vitórias somando todos os jogos"""
+        async with self.pool.read() as db:
             async with db.execute("""
-                SELECT user_id, xp, level FROM user_levels 
-                WHERE guild_id = ?
-                ORDER BY xp DESC LIMIT ?
-            """, (guild_id, limit)) as cursor:
+                SELECT user_id, SUM(wins) AS total_wins FROM game_stats
+                GROUP BY user_id
+                HAVING total_wins > 0
+                ORDER BY total_wins DESC LIMIT ?
+            """, (limit,)) as cursor:
                 rows = await cursor.fetchall()
-                return [{"user_id": row[0], "xp": row[1], "level": row[2]} for row in rows]
+                return [{"user_id": row[0], "wins": row[1]} for row in rows]
     
     # --- Métodos de Moderação ---
     
     async def add_warning(self, guild_id: str, user_id: str, moderator_id: str, reason: str):
         """Adiciona um aviso a um utilizador"""
-        async with aiosqlite.connect(self.db_path) as db:
+        async with self.pool.transaction() as db:
             await db.execute("""
                 INSERT INTO warnings (guild_id, user_id, moderator_id, reason)
                 VALUES (?, ?, ?, ?)
@@ -932,12 +1540,10 @@ class Database:
                 INSERT INTO moderation_logs (guild_id, user_id, moderator_id, action, reason)
                 VALUES (?, ?, ?, 'warn', ?)
             """, (guild_id, user_id, moderator_id, reason))
-            
-            await db.commit()
     
     async def get_warnings(self, guild_id: str, user_id: str) -> List[Dict]:
         """Obtém os avisos de um utilizador"""
-        async with aiosqlite.connect(self.db_path) as db:
+        async with self.pool.read() as db:
             async with db.execute("""
                 SELECT id, moderator_id, reason, created_at FROM warnings 
                 WHERE guild_id = ? AND user_id = ? AND active = 1
@@ -954,18 +1560,145 @@ class Database:
     async def log_moderation(self, guild_id: str, user_id: str, moderator_id: str, 
                             action: str, reason: str = None, duration: int = None):
         """Registra uma ação de moderação"""
-        async with aiosqlite.connect(self.db_path) as db:
+        async with self.pool.transaction() as db:
             await db.execute("""
                 INSERT INTO moderation_logs (guild_id, user_id, moderator_id, action, reason, duration)
                 VALUES (?, ?, ?, ?, ?, ?)
             """, (guild_id, user_id, moderator_id, action, reason, duration))
-            await db.commit()
+    
+    async def get_moderation_configs(self) -> Dict[str, Dict]:
+        """Obtém a configuração de moderação de todos os servidores"""
+        async with self.pool.read() as db:
+            async with db.execute("SELECT guild_id, config FROM moderation_config") as cursor:
+                rows = await cursor.fetchall()
+        
+        configs = {}
+        for guild_id, config in rows:
+            try:
+                configs[guild_id] = json.loads(config)
+            except (json.JSONDecodeError, TypeError):
+                self.logger.error(f"❌ Configuração de moderação inválida para o servidor {guild_id}")
+        return configs
+    
+    async def set_moderation_config(self, guild_id: str, config: Dict):
+        """Guarda a configuração de moderação de um servidor"""
+        async with self.pool.transaction() as db:
+            await db.execute("""
+                INSERT INTO moderation_config (guild_id, config, updated_at)
+                VALUES (?, ?, CURRENT_TIMESTAMP)
+                ON CONFLICT(guild_id) DO UPDATE SET
+                    config = excluded.config,
+                    updated_at = excluded.updated_at
+            """, (guild_id, json.dumps(config, ensure_ascii=False)))
+    
+    # --- Métodos de Tickets ---
+    
+    def _ticket_from_row(self, row) -> Dict:
+        return {
+            "ticket_id": row[0],
+            "guild_id": row[1],
+            "channel_id": row[2],
+            "user_id": row[3],
+            "status": row[4],
+            "number": row[5],
+            "category": row[6],
+            "created_at": row[7],
+        }
+    
+    async def get_open_ticket(self, guild_id: str, user_id: str) -> Optional[Dict]:
+        """Obtém o ticket aberto de um utilizador (se existir)"""
+        async with self.pool.read() as db:
+            async with db.execute("""
+                SELECT ticket_id, guild_id, channel_id, user_id, status, guild_number, category, created_at
+                FROM tickets
+                WHERE guild_id = ? AND user_id = ? AND status = 'open'
+                LIMIT 1
+            """, (guild_id, user_id)) as cursor:
+                row = await cursor.fetchone()
+        return self._ticket_from_row(row) if row else None
+    
+    async def reserve_ticket(self, guild_id: str, user_id: str, category: str) -> Tuple[Optional[Dict], Optional[Dict]]:
+        """Reserva o próximo número de ticket do servidor para o utilizador
+        
+        Numa só transação: se o utilizador já tem um ticket aberto devolve
+        (existente, None); caso contrário incrementa a sequência do servidor e
+        regista o ticket com um canal provisório, devolvendo (None, novo).
+        """
+        async with self.pool.transaction() as db:
+            async with db.execute("""
+                SELECT ticket_id, guild_id, channel_id, user_id, status, guild_number, category, created_at
+                FROM tickets
+                WHERE guild_id = ? AND user_id = ? AND status = 'open'
+                LIMIT 1
+            """, (guild_id, user_id)) as cursor:
+                row = await cursor.fetchone()
+            if row:
+                return self._ticket_from_row(row), None
+            
+            # Sequência do servidor (começa no maior número já usado)
+            async with db.execute("""
+                INSERT INTO ticket_sequences (guild_id, last_number)
+                VALUES (?, COALESCE((SELECT MAX(guild_number) FROM tickets WHERE guild_id = ?), 0) + 1)
+                ON CONFLICT(guild_id) DO UPDATE SET last_number = last_number + 1
+                RETURNING last_number
+            """, (guild_id, guild_id)) as cursor:
+                number = (await cursor.fetchone())[0]
+            
+            async with db.execute("""
+                INSERT INTO tickets (guild_id, channel_id, user_id, status, guild_number, category)
+                VALUES (?, ?, ?, 'open', ?, ?)
+                RETURNING ticket_id, guild_id, channel_id, user_id, status, guild_number, category, created_at
+            """, (guild_id, f"pending:{guild_id}:{number}", user_id, number, category)) as cursor:
+                row = await cursor.fetchone()
+        return None, self._ticket_from_row(row)
+    
+    async def get_ticket_by_channel(self, channel_id: str) -> Optional[Dict]:
+        """Obtém o ticket de um canal"""
+        async with self.pool.read() as db:
+            async with db.execute("""
+                SELECT ticket_id, guild_id, channel_id, user_id, status, guild_number, category, created_at
+                FROM tickets
+                WHERE channel_id = ?
+            """, (channel_id,)) as cursor:
+                row = await cursor.fetchone()
+        return self._ticket_from_row(row) if row else None
+    
+    async def set_ticket_transcript(self, ticket_id: int, transcript_path: str):
+        """Guarda o caminho da transcrição de um ticket"""
+        async with self.pool.transaction() as db:
+            await db.execute(
+                "UPDATE tickets SET transcript_path = ? WHERE ticket_id = ?", (transcript_path, ticket_id)
+            )
+    
+    async def set_ticket_channel(self, ticket_id: int, channel_id: str):
+        """Associa o canal criado a um ticket reservado"""
+        async with self.pool.transaction() as db:
+            await db.execute(
+                "UPDATE tickets SET channel_id = ? WHERE ticket_id = ?", (channel_id, ticket_id)
+            )
+    
+    async def close_ticket(self, ticket_id: int, closed_by: Optional[str] = None):
+        """Marca um ticket como fechado"""
+        async with self.pool.transaction() as db:
+            await db.execute("""
+                UPDATE tickets SET status = 'closed', closed_at = CURRENT_TIMESTAMP, closed_by = ?
+                WHERE ticket_id = ? AND status = 'open'
+            """, (closed_by, ticket_id))
+    
+    async def close_ticket_by_channel(self, channel_id: str, closed_by: Optional[str] = None) -> bool:
+        """Marca como fechado o ticket de um canal; devolve True se havia um aberto"""
+        async with self.pool.transaction() as db:
+            cursor = await db.execute("""
+                UPDATE tickets SET status = 'closed', closed_at = CURRENT_TIMESTAMP, closed_by = ?
+                WHERE channel_id = ? AND status = 'open'
+            """, (closed_by, channel_id))
+            return cursor.rowcount > 0
     
     # --- Métodos de Estatísticas de Jogos ---
     
     async def update_game_stats(self, user_id: str, game_type: str, result: str, earnings: int = 0):
         """Atualiza estatísticas de jogo de um utilizador"""
-        async with aiosqlite.connect(self.db_path) as db:
+        async with self.pool.transaction() as db:
             # Verificar se já existe
             async with db.execute(
                 "SELECT * FROM game_stats WHERE user_id = ? AND game_type = ?",
@@ -1003,12 +1736,10 @@ class Database:
                     VALUES (?, ?, ?, ?, ?, 1, ?, ?, ?, CURRENT_TIMESTAMP)
                 """, (user_id, game_type, wins, losses, draws, earnings, 
                       current_streak, current_streak))
-            
-            await db.commit()
     
     async def get_game_stats(self, user_id: str, game_type: str = None):
         """Obtém estatísticas de jogo de um utilizador"""
-        async with aiosqlite.connect(self.db_path) as db:
+        async with self.pool.read() as db:
             if game_type:
                 async with db.execute(
                     "SELECT * FROM game_stats WHERE user_id = ? AND game_type = ?",
@@ -1041,7 +1772,7 @@ class Database:
     
     async def get_game_leaderboard(self, game_type: str, limit: int = 10):
         """Obtém leaderboard de um jogo específico"""
-        async with aiosqlite.connect(self.db_path) as db:
+        async with self.pool.read() as db:
             async with db.execute("""
                 SELECT user_id, wins, total_games, total_earnings, best_streak
                 FROM game_stats
@@ -1066,21 +1797,20 @@ class Database:
     async def add_badge(self, user_id: str, guild_id: str, badge_id: str, 
                        badge_name: str, badge_emoji: str = None, badge_description: str = None):
         """Adiciona badge a um utilizador"""
-        async with aiosqlite.connect(self.db_path) as db:
+        async with self.pool.transaction() as db:
             try:
                 await db.execute("""
                     INSERT OR IGNORE INTO user_badges 
                     (user_id, guild_id, badge_id, badge_name, badge_emoji, badge_description)
                     VALUES (?, ?, ?, ?, ?, ?)
                 """, (user_id, guild_id, badge_id, badge_name, badge_emoji, badge_description))
-                await db.commit()
                 return True
             except:
                 return False
     
     async def get_user_badges(self, user_id: str, guild_id: str):
         """Obtém badges de um utilizador"""
-        async with aiosqlite.connect(self.db_path) as db:
+        async with self.pool.read() as db:
             async with db.execute("""
                 SELECT badge_id, badge_name, badge_emoji, badge_description, earned_at
                 FROM user_badges
@@ -1101,7 +1831,7 @@ class Database:
     
     async def update_profile(self, user_id: str, guild_id: str, **kwargs):
         """Atualiza perfil de utilizador"""
-        async with aiosqlite.connect(self.db_path) as db:
+        async with self.pool.transaction() as db:
             # Construir query dinamicamente
             fields = []
             values = []
@@ -1120,11 +1850,10 @@ class Database:
                 ON CONFLICT(user_id, guild_id) DO UPDATE SET
                 {', '.join(fields)}, updated_at = CURRENT_TIMESTAMP
             """, values)
-            await db.commit()
     
     async def get_profile(self, user_id: str, guild_id: str):
         """Obtém perfil de utilizador"""
-        async with aiosqlite.connect(self.db_path) as db:
+        async with self.pool.read() as db:
             async with db.execute("""
                 SELECT bio, color, banner_url, favorite_game, birthday, pronouns,
                        custom_field_1_name, custom_field_1_value,
@@ -1148,20 +1877,19 @@ class Database:
     
     async def create_marriage(self, guild_id: str, user1_id: str, user2_id: str):
         """Cria casamento entre dois utilizadores"""
-        async with aiosqlite.connect(self.db_path) as db:
+        async with self.pool.transaction() as db:
             try:
                 await db.execute("""
                     INSERT INTO marriages (guild_id, user1_id, user2_id)
                     VALUES (?, ?, ?)
                 """, (guild_id, user1_id, user2_id))
-                await db.commit()
                 return True
             except:
                 return False
     
     async def get_marriage(self, guild_id: str, user_id: str):
         """Obtém casamento de um utilizador"""
-        async with aiosqlite.connect(self.db_path) as db:
+        async with self.pool.read() as db:
             async with db.execute("""
                 SELECT user1_id, user2_id, married_at, ring_tier, anniversary_count
                 FROM marriages
@@ -1180,25 +1908,23 @@ class Database:
     
     async def divorce(self, guild_id: str, user_id: str):
         """Remove casamento"""
-        async with aiosqlite.connect(self.db_path) as db:
+        async with self.pool.transaction() as db:
             await db.execute("""
                 UPDATE marriages SET status = 'divorced'
                 WHERE guild_id = ? AND (user1_id = ? OR user2_id = ?) AND status = 'active'
             """, (guild_id, user_id, user_id))
-            await db.commit()
     
     async def log_activity(self, user_id: str, guild_id: str, activity_type: str, activity_data: str = None):
         """Registra atividade de utilizador"""
-        async with aiosqlite.connect(self.db_path) as db:
+        async with self.pool.transaction() as db:
             await db.execute("""
                 INSERT INTO activity_history (user_id, guild_id, activity_type, activity_data)
                 VALUES (?, ?, ?, ?)
             """, (user_id, guild_id, activity_type, activity_data))
-            await db.commit()
     
     async def get_activity_history(self, user_id: str, guild_id: str, limit: int = 50):
         """Obtém histórico de atividade"""
-        async with aiosqlite.connect(self.db_path) as db:
+        async with self.pool.read() as db:
             async with db.execute("""
                 SELECT activity_type, activity_data, timestamp
                 FROM activity_history
@@ -1218,7 +1944,7 @@ class Database:
     
     async def update_streak(self, user_id: str, guild_id: str, streak_type: str, increment: bool = True):
         """Atualiza streak de utilizador"""
-        async with aiosqlite.connect(self.db_path) as db:
+        async with self.pool.transaction() as db:
             async with db.execute("""
                 SELECT current_streak, best_streak FROM user_streaks
                 WHERE user_id = ? AND guild_id = ? AND streak_type = ?
@@ -1239,40 +1965,42 @@ class Database:
                     INSERT INTO user_streaks (user_id, guild_id, streak_type, current_streak, best_streak)
                     VALUES (?, ?, ?, ?, ?)
                 """, (user_id, guild_id, streak_type, 1 if increment else 0, 1 if increment else 0))
-            
-            await db.commit()
+        
+        if streak_type == "messages":
+            self.leaderboards.invalidate("streaks", guild_id)
     
     async def get_streak(self, user_id: str, guild_id: str, streak_type: str):
         """Obtém streak de utilizador"""
-        async with aiosqlite.connect(self.db_path) as db:
+        async with self.pool.read() as db:
             async with db.execute("""
                 SELECT current_streak, best_streak, total_rewards
                 FROM user_streaks
                 WHERE user_id = ? AND guild_id = ? AND streak_type = ?
             """, (user_id, guild_id, streak_type)) as cursor:
                 row = await cursor.fetchone()
-                if row:
-                    return {
-                        "current": row[0],
-                        "best": row[1],
-                        "total_rewards": row[2]
-                    }
-                return {"current": 0, "best": 0, "total_rewards": 0}
+        
+        pending = self.activity.pending_streak(user_id, guild_id, streak_type)
+        if row:
+            return {
+                "current": row[0] + pending,
+                "best": max(row[1], row[0] + pending),
+                "total_rewards": row[2]
+            }
+        return {"current": pending, "best": pending, "total_rewards": 0}
     
     # ===== MÉTODOS DE ECONOMIA AVANÇADA =====
     
     async def create_custom_role(self, user_id: str, guild_id: str, role_id: str, role_name: str, role_color: str, expires_at: str = None):
         """Cria uma custom role para o utilizador"""
-        async with aiosqlite.connect(self.db_path) as db:
+        async with self.pool.transaction() as db:
             await db.execute("""
                 INSERT OR REPLACE INTO custom_roles (user_id, guild_id, role_id, role_name, role_color, expires_at)
                 VALUES (?, ?, ?, ?, ?, ?)
             """, (user_id, guild_id, role_id, role_name, role_color, expires_at))
-            await db.commit()
     
     async def get_custom_role(self, user_id: str, guild_id: str):
         """Obtém custom role do utilizador"""
-        async with aiosqlite.connect(self.db_path) as db:
+        async with self.pool.read() as db:
             async with db.execute("""
                 SELECT role_id, role_name, role_color, created_at, expires_at
                 FROM custom_roles
@@ -1291,26 +2019,24 @@ class Database:
     
     async def delete_custom_role(self, user_id: str, guild_id: str):
         """Remove custom role do utilizador"""
-        async with aiosqlite.connect(self.db_path) as db:
+        async with self.pool.transaction() as db:
             await db.execute("""
                 DELETE FROM custom_roles
                 WHERE user_id = ? AND guild_id = ?
             """, (user_id, guild_id))
-            await db.commit()
     
     async def create_trade(self, guild_id: str, sender_id: str, receiver_id: str, sender_coins: int, sender_items: str, receiver_coins: int, receiver_items: str):
         """Cria uma proposta de trade"""
-        async with aiosqlite.connect(self.db_path) as db:
+        async with self.pool.transaction() as db:
             cursor = await db.execute("""
                 INSERT INTO trades (guild_id, sender_id, receiver_id, sender_offer_coins, sender_offer_items, receiver_offer_coins, receiver_offer_items)
                 VALUES (?, ?, ?, ?, ?, ?, ?)
             """, (guild_id, sender_id, receiver_id, sender_coins, sender_items, receiver_coins, receiver_items))
-            await db.commit()
             return cursor.lastrowid
     
     async def get_trade(self, trade_id: int):
         """Obtém detalhes de um trade"""
-        async with aiosqlite.connect(self.db_path) as db:
+        async with self.pool.read() as db:
             async with db.execute("""
                 SELECT trade_id, guild_id, sender_id, receiver_id, sender_offer_coins, sender_offer_items,
                        receiver_offer_coins, receiver_offer_items, status, created_at, completed_at
@@ -1336,17 +2062,16 @@ class Database:
     
     async def update_trade_status(self, trade_id: int, status: str):
         """Atualiza status de um trade"""
-        async with aiosqlite.connect(self.db_path) as db:
+        async with self.pool.transaction() as db:
             await db.execute("""
                 UPDATE trades
                 SET status = ?, completed_at = CURRENT_TIMESTAMP
                 WHERE trade_id = ?
             """, (status, trade_id))
-            await db.commit()
     
     async def get_pending_trades(self, user_id: str, guild_id: str):
         """Obtém trades pendentes para um utilizador"""
-        async with aiosqlite.connect(self.db_path) as db:
+        async with self.pool.read() as db:
             async with db.execute("""
                 SELECT trade_id, sender_id, receiver_id, sender_offer_coins, receiver_offer_coins, created_at
                 FROM trades
@@ -1358,29 +2083,27 @@ class Database:
     
     async def add_achievement(self, achievement_id: str, name: str, description: str, emoji: str, reward_coins: int, reward_badge: str, requirement_type: str, requirement_value: int, tier: str = "bronze"):
         """Adiciona um achievement ao sistema"""
-        async with aiosqlite.connect(self.db_path) as db:
+        async with self.pool.transaction() as db:
             await db.execute("""
                 INSERT OR REPLACE INTO achievements (achievement_id, name, description, emoji, reward_coins, reward_badge, requirement_type, requirement_value, tier)
                 VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
             """, (achievement_id, name, description, emoji, reward_coins, reward_badge, requirement_type, requirement_value, tier))
-            await db.commit()
     
     async def unlock_achievement(self, user_id: str, guild_id: str, achievement_id: str):
         """Desbloqueia achievement para utilizador"""
-        async with aiosqlite.connect(self.db_path) as db:
+        async with self.pool.transaction() as db:
             try:
                 await db.execute("""
                     INSERT INTO user_achievements (user_id, guild_id, achievement_id)
                     VALUES (?, ?, ?)
                 """, (user_id, guild_id, achievement_id))
-                await db.commit()
                 return True
             except:
                 return False  # Já tinha desbloqueado
     
     async def get_user_achievements(self, user_id: str, guild_id: str):
         """Obtém achievements desbloqueados pelo utilizador"""
-        async with aiosqlite.connect(self.db_path) as db:
+        async with self.pool.read() as db:
             async with db.execute("""
                 SELECT a.achievement_id, a.name, a.description, a.emoji, a.tier, ua.unlocked_at, ua.claimed
                 FROM user_achievements ua
@@ -1393,45 +2116,52 @@ class Database:
     
     async def claim_achievement_reward(self, user_id: str, guild_id: str, achievement_id: str):
         """Marca achievement como claimed"""
-        async with aiosqlite.connect(self.db_path) as db:
+        async with self.pool.transaction() as db:
             await db.execute("""
                 UPDATE user_achievements
                 SET claimed = 1
                 WHERE user_id = ? AND guild_id = ? AND achievement_id = ?
             """, (user_id, guild_id, achievement_id))
-            await db.commit()
     
     async def create_auction(self, guild_id: str, seller_id: str, item_name: str, item_description: str, item_emoji: str, item_rarity: str, starting_bid: int, buyout_price: int, ends_at: str):
         """Cria um leilão"""
-        async with aiosqlite.connect(self.db_path) as db:
+        async with self.pool.transaction() as db:
             cursor = await db.execute("""
                 INSERT INTO auctions (guild_id, seller_id, item_name, item_description, item_emoji, item_rarity, starting_bid, buyout_price, ends_at)
                 VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
             """, (guild_id, seller_id, item_name, item_description, item_emoji, item_rarity, starting_bid, buyout_price, ends_at))
-            await db.commit()
             return cursor.lastrowid
     
-    async def place_bid(self, auction_id: int, bidder_id: str, bid_amount: int):
-        """Coloca uma bid num leilão"""
-        async with aiosqlite.connect(self.db_path) as db:
+    async def place_bid(self, auction_id: int, bidder_id: str, bid_amount: int) -> bool:
+        """Coloca uma bid num leilão
+
+        O lance só é aceite se o leilão estiver ativo, se for maior que o
+        lance atual e se o licitador tiver saldo para o cobrir, tudo numa
+        única instrução. Devolve False se o lance for recusado.
+        """
+        async with self.pool.transaction() as db:
             # Atualizar leilão
-            await db.execute("""
+            cursor = await db.execute("""
                 UPDATE auctions
                 SET current_bid = ?, current_bidder_id = ?
                 WHERE auction_id = ?
-            """, (bid_amount, bidder_id, auction_id))
+                  AND status = 'active'
+                  AND COALESCE(current_bid, 0) < ?
+                  AND COALESCE((SELECT balance FROM users WHERE user_id = ?), 2500) >= ?
+            """, (bid_amount, bidder_id, auction_id, bid_amount, bidder_id, bid_amount))
+            if cursor.rowcount != 1:
+                return False
             
             # Registar bid
             await db.execute("""
                 INSERT INTO auction_bids (auction_id, bidder_id, bid_amount)
                 VALUES (?, ?, ?)
             """, (auction_id, bidder_id, bid_amount))
-            
-            await db.commit()
+        return True
     
     async def get_auction(self, auction_id: int):
         """Obtém detalhes de um leilão"""
-        async with aiosqlite.connect(self.db_path) as db:
+        async with self.pool.read() as db:
             async with db.execute("""
                 SELECT auction_id, guild_id, seller_id, item_name, item_description, item_emoji, item_rarity,
                        starting_bid, current_bid, current_bidder_id, buyout_price, status, created_at, ends_at
@@ -1451,7 +2181,7 @@ class Database:
     
     async def get_active_auctions(self, guild_id: str):
         """Obtém leilões ativos"""
-        async with aiosqlite.connect(self.db_path) as db:
+        async with self.pool.read() as db:
             async with db.execute("""
                 SELECT auction_id, item_name, item_emoji, item_rarity, starting_bid, current_bid, ends_at
                 FROM auctions
@@ -1463,27 +2193,25 @@ class Database:
     
     async def complete_auction(self, auction_id: int, status: str = "completed"):
         """Completa um leilão"""
-        async with aiosqlite.connect(self.db_path) as db:
+        async with self.pool.transaction() as db:
             await db.execute("""
                 UPDATE auctions
                 SET status = ?
                 WHERE auction_id = ?
             """, (status, auction_id))
-            await db.commit()
     
     async def create_event(self, guild_id: str, event_type: str, event_name: str, multiplier: float, bonus_coins: int, description: str, started_by: str, ends_at: str):
         """Cria um evento especial"""
-        async with aiosqlite.connect(self.db_path) as db:
+        async with self.pool.transaction() as db:
             cursor = await db.execute("""
                 INSERT INTO active_events (guild_id, event_type, event_name, multiplier, bonus_coins, description, started_by, ends_at)
                 VALUES (?, ?, ?, ?, ?, ?, ?, ?)
             """, (guild_id, event_type, event_name, multiplier, bonus_coins, description, started_by, ends_at))
-            await db.commit()
             return cursor.lastrowid
     
     async def get_active_events(self, guild_id: str):
         """Obtém eventos ativos"""
-        async with aiosqlite.connect(self.db_path) as db:
+        async with self.pool.read() as db:
             async with db.execute("""
                 SELECT event_id, event_type, event_name, multiplier, bonus_coins, description, started_at, ends_at
                 FROM active_events
@@ -1494,7 +2222,7 @@ class Database:
     
     async def add_inventory_item(self, user_id: str, guild_id: str, item_id: str, item_name: str, item_type: str, item_rarity: str, item_data: str = None, quantity: int = 1, tradeable: bool = True):
         """Adiciona item ao inventário"""
-        async with aiosqlite.connect(self.db_path) as db:
+        async with self.pool.transaction() as db:
             # Verificar se já tem o item
             async with db.execute("""
                 SELECT quantity FROM inventory_items
@@ -1515,12 +2243,10 @@ class Database:
                         INSERT INTO inventory_items (user_id, guild_id, item_id, item_name, item_type, item_rarity, item_data, quantity, tradeable)
                         VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
                     """, (user_id, guild_id, item_id, item_name, item_type, item_rarity, item_data, quantity, 1 if tradeable else 0))
-                
-                await db.commit()
     
     async def get_user_inventory(self, user_id: str, guild_id: str):
         """Obtém inventário do utilizador"""
-        async with aiosqlite.connect(self.db_path) as db:
+        async with self.pool.read() as db:
             async with db.execute("""
                 SELECT item_id, item_name, item_type, item_rarity, quantity, tradeable, acquired_at
                 FROM inventory_items
@@ -1532,7 +2258,7 @@ class Database:
     
     async def remove_inventory_item(self, user_id: str, guild_id: str, item_id: str, quantity: int = 1):
         """Remove item do inventário"""
-        async with aiosqlite.connect(self.db_path) as db:
+        async with self.pool.transaction() as db:
             # Verificar quantidade atual
             async with db.execute("""
                 SELECT quantity FROM inventory_items
@@ -1556,19 +2282,612 @@ class Database:
                         SET quantity = quantity - ?
                         WHERE user_id = ? AND guild_id = ? AND item_id = ?
                     """, (quantity, user_id, guild_id, item_id))
-                
-                await db.commit()
                 return True
+    
+    # ===== MÉTODOS DE LEMBRETES E ANÚNCIOS =====
+    
+    def _reminder_from_row(self, row) -> Dict:
+        return {
+            "id": row[0],
+            "user_id": row[1],
+            "channel_id": row[2],
+            "message": row[3],
+            "due_at": row[4],
+            "created_at": row[5],
+            "recurring": bool(row[6]),
+            "interval": row[7],
+        }
+    
+    async def create_reminder(self, user_id: str, channel_id: str, message: str, due_at: float,
+                              recurring: bool = False, interval: int = 0) -> int:
+        """Cria um lembrete e devolve o seu ID"""
+        async with self.pool.transaction() as db:
+            cursor = await db.execute("""
+                INSERT INTO reminders
+                (user_id, channel_id, message, due_at, created_at, recurring, interval_seconds)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+            """, (user_id, channel_id, message, due_at, datetime.now().timestamp(), int(recurring), interval))
+            return cursor.lastrowid
+    
+    async def get_reminder(self, reminder_id: int) -> Optional[Dict]:
+        """Obtém um lembrete pelo ID"""
+        async with self.pool.read() as db:
+            async with db.execute("""
+                SELECT id, user_id, channel_id, message, due_at, created_at, recurring, interval_seconds
+                FROM reminders WHERE id = ?
+            """, (reminder_id,)) as cursor:
+                row = await cursor.fetchone()
+        return self._reminder_from_row(row) if row else None
+    
+    async def get_user_reminders(self, user_id: str, limit: int = 10) -> List[Dict]:
+        """Obtém os próximos lembretes de um utilizador"""
+        async with self.pool.read() as db:
+            async with db.execute("""
+                SELECT id, user_id, channel_id, message, due_at, created_at, recurring, interval_seconds
+                FROM reminders WHERE user_id = ?
+                ORDER BY due_at LIMIT ?
+            """, (user_id, limit)) as cursor:
+                rows = await cursor.fetchall()
+        return [self._reminder_from_row(row) for row in rows]
+    
+    async def reschedule_reminder(self, reminder_id: int, due_at: float):
+        """Atualiza a próxima execução de um lembrete recorrente"""
+        async with self.pool.transaction() as db:
+            await db.execute("UPDATE reminders SET due_at = ? WHERE id = ?", (due_at, reminder_id))
+    
+    async def delete_reminder(self, reminder_id: int) -> bool:
+        """Remove um lembrete"""
+        async with self.pool.transaction() as db:
+            cursor = await db.execute("DELETE FROM reminders WHERE id = ?", (reminder_id,))
+            return cursor.rowcount > 0
+    
+    def _announcement_from_row(self, row) -> Dict:
+        return {
+            "id": row[0],
+            "channel_id": row[1],
+            "message": row[2],
+            "embed": json.loads(row[3]) if row[3] else None,
+            "due_at": row[4],
+            "created_by": row[5],
+            "created_at": row[6],
+        }
+    
+    async def create_announcement(self, channel_id: str, message: str, due_at: float,
+                                  created_by: str, embed: Dict = None) -> int:
+        """Agenda um anúncio e devolve o seu ID"""
+        async with self.pool.transaction() as db:
+            cursor = await db.execute("""
+                INSERT INTO scheduled_announcements
+                (channel_id, message, embed, due_at, created_by, created_at)
+                VALUES (?, ?, ?, ?, ?, ?)
+            """, (
+                channel_id, message,
+                json.dumps(embed, ensure_ascii=False) if embed else None,
+                due_at, created_by, datetime.now().timestamp()
+            ))
+            return cursor.lastrowid
+    
+    async def get_announcement(self, announcement_id: int) -> Optional[Dict]:
+        """Obtém um anúncio agendado pelo ID"""
+        async with self.pool.read() as db:
+            async with db.execute("""
+                SELECT id, channel_id, message, embed, due_at, created_by, created_at
+                FROM scheduled_announcements WHERE id = ?
+            """, (announcement_id,)) as cursor:
+                row = await cursor.fetchone()
+        return self._announcement_from_row(row) if row else None
+    
+    async def get_pending_announcements(self, limit: int = 25, offset: int = 0) -> List[Dict]:
+        """Obtém os anúncios agendados, do mais próximo para o mais distante"""
+        async with self.pool.read() as db:
+            async with db.execute("""
+                SELECT id, channel_id, message, embed, due_at, created_by, created_at
+                FROM scheduled_announcements
+                ORDER BY due_at, id LIMIT ? OFFSET ?
+            """, (limit, offset)) as cursor:
+                rows = await cursor.fetchall()
+        return [self._announcement_from_row(row) for row in rows]
+    
+    async def count_pending_announcements(self) -> int:
+        """Número de anúncios agendados"""
+        async with self.pool.read() as db:
+            async with db.execute("SELECT COUNT(*) FROM scheduled_announcements") as cursor:
+                row = await cursor.fetchone()
+        return row[0]
+    
+    async def delete_announcement(self, announcement_id: int) -> bool:
+        """Remove um anúncio agendado"""
+        async with self.pool.transaction() as db:
+            cursor = await db.execute("DELETE FROM scheduled_announcements WHERE id = ?", (announcement_id,))
+            return cursor.rowcount > 0
+    
+    # ===== MÉTODOS DE POLLS =====
+    
+    async def create_poll(self, poll_id: str, guild_id: Optional[str], question: str, description: str,
+                          options: List[Dict], created_by: str, created_at: float):
+        """Regista uma poll (as opções são guardadas sem contagens)"""
+        async with self.pool.transaction() as db:
+            await db.execute("""
+                INSERT INTO polls (poll_id, guild_id, question, description, options, created_by, created_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+            """, (
+                poll_id, guild_id, question, description,
+                json.dumps([{"text": opt['text'], "emoji": opt['emoji']} for opt in options], ensure_ascii=False),
+                created_by, created_at
+            ))
+    
+    async def set_poll_message(self, poll_id: str, channel_id: str, message_id: str):
+        """Associa a mensagem publicada a uma poll"""
+        async with self.pool.transaction() as db:
+            await db.execute(
+                "UPDATE polls SET channel_id = ?, message_id = ? WHERE poll_id = ?",
+                (channel_id, message_id, poll_id)
+            )
+    
+    async def add_poll_vote(self, poll_id: str, user_id: str, option_index: int) -> bool:
+        """Regista um voto; devolve False se o utilizador já tinha votado"""
+        async with self.pool.transaction() as db:
+            cursor = await db.execute("""
+                INSERT OR IGNORE INTO poll_votes (poll_id, user_id, option_index, voted_at)
+                VALUES (?, ?, ?, ?)
+            """, (poll_id, user_id, option_index, datetime.now().timestamp()))
+            return cursor.rowcount > 0
+    
+    async def close_polls(self, poll_ids: List[str]):
+        """Fecha polls (deixam de ser carregadas no arranque)"""
+        async with self.pool.transaction() as db:
+            await db.executemany(
+                "UPDATE polls SET status = 'closed' WHERE poll_id = ?", [(poll_id,) for poll_id in poll_ids]
+            )
+    
+    async def close_stale_polls(self, created_before: float) -> int:
+        """Fecha as polls abertas criadas antes de `created_before`; devolve quantas"""
+        async with self.pool.transaction() as db:
+            cursor = await db.execute(
+                "UPDATE polls SET status = 'closed' WHERE status = 'open' AND created_at < ?",
+                (created_before,)
+            )
+            return cursor.rowcount
+    
+    async def get_open_polls(self) -> List[Dict]:
+        """Obtém as polls abertas com a contagem de votos de cada opção"""
+        async with self.pool.read() as db:
+            async with db.execute("""
+                SELECT poll_id, guild_id, channel_id, message_id, question, description,
+                       options, created_by, created_at
+                FROM polls WHERE status = 'open'
+            """) as cursor:
+                rows = await cursor.fetchall()
+            async with db.execute("""
+                SELECT v.poll_id, v.option_index, COUNT(*) FROM poll_votes v
+                JOIN polls p ON p.poll_id = v.poll_id
+                WHERE p.status = 'open'
+                GROUP BY v.poll_id, v.option_index
+            """) as cursor:
+                counts = await cursor.fetchall()
+        
+        votes: Dict[Tuple[str, int], int] = {(poll_id, index): count for poll_id, index, count in counts}
+        polls = []
+        for row in rows:
+            options = json.loads(row[6])
+            for i, option in enumerate(options):
+                option['votes'] = votes.get((row[0], i), 0)
+            polls.append({
+                "id": row[0],
+                "guild_id": row[1],
+                "channel_id": row[2],
+                "message_id": row[3],
+                "question": row[4],
+                "description": row[5] or "",
+                "options": options,
+                "created_by": row[7],
+                "created_at": row[8],
+            })
+        return polls
+    
+    async def import_polls_json(self, path: str = "data/polls.json") -> int:
+        """Importa as polls do JSON antigo (uma única vez)
+        
+        O JSON só era escrito ao criar a poll, por isso só as definições são
+        importadas. O ficheiro é renomeado para `.migrated`.
+        """
+        json_file = Path(path)
+        if not json_file.exists():
+            return 0
+        
+        with open(json_file, 'r', encoding='utf-8') as f:
+            polls = json.load(f)
+        
+        async with self.pool.transaction() as db:
+            for poll in polls:
+                await db.execute("""
+                    INSERT OR IGNORE INTO polls (poll_id, question, description, options, created_by, created_at)
+                    VALUES (?, ?, ?, ?, ?, ?)
+                """, (
+                    poll['id'], poll['question'], poll.get('description', ''),
+                    json.dumps([{"text": opt['text'], "emoji": opt['emoji']} for opt in poll['options']], ensure_ascii=False),
+                    poll.get('created_by'), poll.get('created_at', 0)
+                ))
+        
+        json_file.rename(json_file.with_name(json_file.name + ".migrated"))
+        if polls:
+            self.logger.info(f"✅ Migradas {len(polls)} polls")
+        return len(polls)
+    
+    # ===== MÉTODOS DE STARBOARD =====
+    
+    async def get_starboard_entry(self, message_id: str) -> Optional[Dict]:
+        """Obtém o post do starboard de uma mensagem (se existir)"""
+        async with self.pool.read() as db:
+            async with db.execute("""
+                SELECT id, starboard_message_id, star_count FROM starboard
+                WHERE message_id = ?
+            """, (message_id,)) as cursor:
+                row = await cursor.fetchone()
+        if row is None:
+            return None
+        return {"id": row[0], "starboard_message_id": row[1], "star_count": row[2]}
+    
+    async def create_starboard_entry(self, guild_id: str, message_id: str, channel_id: str,
+                                     author_id: str, starboard_message_id: str, star_count: int,
+                                     content: Optional[str], attachment_urls: Optional[str]):
+        """Regista uma mensagem publicada no starboard"""
+        async with self.pool.transaction() as db:
+            await db.execute("""
+                INSERT INTO starboard 
+                (guild_id, message_id, channel_id, author_id, starboard_message_id, star_count, content, attachment_urls, starred_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
+                ON CONFLICT(message_id) DO UPDATE SET
+                    starboard_message_id = excluded.starboard_message_id,
+                    star_count = excluded.star_count
+            """, (guild_id, message_id, channel_id, author_id, starboard_message_id,
+                  star_count, content, attachment_urls))
+    
+    async def update_starboard_counts(self, counts: List[Tuple[int, str]]):
+        """Atualiza as contagens de estrelas em lote: [(contagem, message_id)]"""
+        async with self.pool.transaction() as db:
+            await db.executemany(
+                "UPDATE starboard SET star_count = ? WHERE message_id = ?", counts
+            )
+    
+    # ===== MÉTODOS DE AFK =====
+    
+    async def get_afk_statuses(self) -> Dict[str, Dict[str, Tuple[str, str]]]:
+        """Obtém todos os estados AFK: {guild_id: {user_id: (razão, set_at)}}"""
+        async with self.pool.read() as db:
+            async with db.execute("SELECT guild_id, user_id, reason, set_at FROM afk_status") as cursor:
+                rows = await cursor.fetchall()
+        
+        statuses: Dict[str, Dict[str, Tuple[str, str]]] = {}
+        for guild_id, user_id, reason, set_at in rows:
+            statuses.setdefault(guild_id, {})[user_id] = (reason, set_at)
+        return statuses
+    
+    async def set_afk(self, user_id: str, guild_id: str, reason: str, set_at: str):
+        """Define (ou substitui) o estado AFK de um utilizador"""
+        async with self.pool.transaction() as db:
+            await db.execute("""
+                INSERT OR REPLACE INTO afk_status (user_id, guild_id, reason, set_at)
+                VALUES (?, ?, ?, ?)
+            """, (user_id, guild_id, reason, set_at))
+    
+    async def clear_afk(self, user_id: str, guild_id: str):
+        """Remove o estado AFK de um utilizador"""
+        async with self.pool.transaction() as db:
+            await db.execute("""
+                DELETE FROM afk_status
+                WHERE user_id = ? AND guild_id = ?
+            """, (user_id, guild_id))
+    
+    # ===== MÉTODOS DE GIVEAWAYS =====
+    
+    async def get_active_giveaways(self) -> List[Dict]:
+        """Obtém os giveaways ainda ativos (para reagendar o fim e seguir as entradas)"""
+        async with self.pool.read() as db:
+            async with db.execute("""
+                SELECT id, message_id, guild_id, channel_id, ends_at FROM giveaways
+                WHERE status = 'active'
+            """) as cursor:
+                rows = await cursor.fetchall()
+        return [
+            {"id": row[0], "message_id": row[1], "guild_id": row[2], "channel_id": row[3], "ends_at": row[4]}
+            for row in rows
+        ]
+    
+    async def create_giveaway(self, guild_id: str, channel_id: str, message_id: str, host_id: str,
+                              prize: str, winners_count: int, requirements: Optional[str], ends_at: str) -> int:
+        """Regista um giveaway e devolve o seu ID"""
+        async with self.pool.transaction() as db:
+            cursor = await db.execute("""
+                INSERT INTO giveaways 
+                (guild_id, channel_id, message_id, host_id, prize, winners_count, requirements, ends_at, status)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, 'active')
+            """, (guild_id, channel_id, message_id, host_id, prize, winners_count, requirements, ends_at))
+            return cursor.lastrowid
+    
+    async def get_active_giveaway(self, message_id: str, guild_id: str) -> Optional[Dict]:
+        """Obtém um giveaway ativo pela mensagem"""
+        async with self.pool.read() as db:
+            async with db.execute("""
+                SELECT id, channel_id, winners_count, prize, host_id
+                FROM giveaways
+                WHERE message_id = ? AND guild_id = ? AND status = 'active'
+            """, (message_id, guild_id)) as cursor:
+                row = await cursor.fetchone()
+        if row is None:
+            return None
+        return {"id": row[0], "channel_id": row[1], "winners_count": row[2], "prize": row[3], "host_id": row[4]}
+    
+    async def apply_giveaway_entries(self, added: List[Tuple[int, str]], removed: List[Tuple[int, str]]):
+        """Regista entradas e saídas de giveaways em lote: [(giveaway_id, user_id)]"""
+        async with self.pool.transaction() as db:
+            if added:
+                await db.executemany(
+                    "INSERT OR IGNORE INTO giveaway_entries (giveaway_id, user_id) VALUES (?, ?)", added
+                )
+            if removed:
+                await db.executemany(
+                    "DELETE FROM giveaway_entries WHERE giveaway_id = ? AND user_id = ?", removed
+                )
+    
+    async def get_giveaway_entrants(self, giveaway_id: int) -> List[str]:
+        """IDs dos utilizadores inscritos num giveaway"""
+        async with self.pool.read() as db:
+            async with db.execute(
+                "SELECT user_id FROM giveaway_entries WHERE giveaway_id = ?", (giveaway_id,)
+            ) as cursor:
+                rows = await cursor.fetchall()
+        return [row[0] for row in rows]
+    
+    async def pick_giveaway_winners(self, giveaway_id: int, count: int) -> Tuple[List[str], int]:
+        """Sorteia vencedores entre as entradas; devolve (vencedores, total de entradas)
+        
+        Lê só o índice (giveaway_id, user_id) das entradas deste giveaway.
+        """
+        async with self.pool.read() as db:
+            async with db.execute(
+                "SELECT COUNT(*) FROM giveaway_entries WHERE giveaway_id = ?", (giveaway_id,)
+            ) as cursor:
+                total = (await cursor.fetchone())[0]
+            async with db.execute("""
+                SELECT user_id FROM giveaway_entries
+                WHERE giveaway_id = ?
+                ORDER BY random()
+                LIMIT ?
+            """, (giveaway_id, count)) as cursor:
+                rows = await cursor.fetchall()
+        return [row[0] for row in rows], total
+    
+    async def finish_giveaway(self, giveaway_id: int):
+        """Marca um giveaway como terminado"""
+        async with self.pool.transaction() as db:
+            await db.execute("""
+                UPDATE giveaways 
+                SET status = 'ended', ended_at = CURRENT_TIMESTAMP
+                WHERE id = ?
+            """, (giveaway_id,))
+    
+    # ===== MÉTODOS DE SESSÕES DE MÚSICA =====
+    
+    async def save_music_sessions(self, sessions: List[Dict], positions: List[Tuple[float, str]]):
+        """Grava numa transação as sessões alteradas (estado completo) e a
+        posição das restantes que estão a tocar: [(posição, guild_id)]"""
+        async with self.pool.transaction() as db:
+            if sessions:
+                await db.executemany("""
+                    INSERT OR REPLACE INTO music_sessions
+                    (guild_id, voice_channel_id, text_channel_id, current_track, position,
+                     queue, loop_mode, volume, updated_at)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
+                """, [
+                    (
+                        session['guild_id'], session['voice_channel_id'], session['text_channel_id'],
+                        json.dumps(session['current'], ensure_ascii=False) if session['current'] else None,
+                        session['position'],
+                        json.dumps(session['queue'], ensure_ascii=False),
+                        session['loop_mode'], session['volume']
+                    )
+                    for session in sessions
+                ])
+            if positions:
+                await db.executemany("""
+                    UPDATE music_sessions SET position = ?, updated_at = CURRENT_TIMESTAMP
+                    WHERE guild_id = ?
+                """, positions)
+    
+    async def get_music_sessions(self) -> List[Dict]:
+        """Obtém as sessões de música guardadas"""
+        async with self.pool.read() as db:
+            async with db.execute("""
+                SELECT guild_id, voice_channel_id, text_channel_id, current_track, position,
+                       queue, loop_mode, volume
+                FROM music_sessions
+            """) as cursor:
+                rows = await cursor.fetchall()
+        return [
+            {
+                "guild_id": row[0],
+                "voice_channel_id": row[1],
+                "text_channel_id": row[2],
+                "current": json.loads(row[3]) if row[3] else None,
+                "position": row[4] or 0,
+                "queue": json.loads(row[5]),
+                "loop_mode": row[6],
+                "volume": row[7],
+            }
+            for row in rows
+        ]
+    
+    async def delete_music_sessions(self, guild_ids: List[str]):
+        """Apaga as sessões de música terminadas"""
+        async with self.pool.transaction() as db:
+            await db.executemany(
+                "DELETE FROM music_sessions WHERE guild_id = ?", [(guild_id,) for guild_id in guild_ids]
+            )
+    
+    # ===== MÉTODOS DE VOZ =====
+    
+    async def record_voice_session(self, user_id: str, guild_id: str, channel_id: str,
+                                   join_time: datetime, leave_time: datetime, duration: int) -> int:
+        """Regista uma sessão de voz e devolve o tempo total do utilizador"""
+        totals = await self.record_voice_sessions(
+            [(user_id, guild_id, channel_id, join_time, leave_time, duration)]
+        )
+        return totals.get((guild_id, user_id), 0)
+    
+    async def record_voice_sessions(self, sessions: List[Tuple[str, str, str, datetime, datetime, int]],
+                                    open_sessions: Optional[List[Tuple[str, str, str, datetime]]] = None,
+                                    checkpoint_at: Optional[datetime] = None) -> Dict[Tuple[str, str], int]:
+        """Regista sessões de voz terminadas e o checkpoint das que estão em curso
+        
+        sessions: [(user_id, guild_id, channel_id, entrada, saída, duração)]
+        open_sessions: [(user_id, guild_id, channel_id, entrada)] - substitui
+        as sessões em curso guardadas. Tudo numa só transação; devolve o novo
+        tempo total de cada (guild_id, user_id) afetado.
+        """
+        totals: Dict[Tuple[str, str], int] = {}
+        async with self.pool.transaction() as db:
+            # Histórico (uma sessão é única pela hora de entrada: sessões já
+            # gravadas, p.ex. recuperadas duas vezes, não voltam a contar)
+            recorded = []
+            for session in sessions:
+                user_id, guild_id, channel_id, join_time, leave_time, duration = session
+                cursor = await db.execute("""
+                    INSERT OR IGNORE INTO voice_stats 
+                    (user_id, guild_id, channel_id, join_time, leave_time, duration, date)
+                    VALUES (?, ?, ?, ?, ?, ?, ?)
+                """, (user_id, guild_id, channel_id, join_time.isoformat(), leave_time.isoformat(),
+                      duration, join_time.strftime('%Y-%m-%d')))
+                if cursor.rowcount:
+                    recorded.append(session)
+            sessions = recorded
+            
+            # Totais por dia (sessões que passam a meia-noite são divididas)
+            daily: Dict[Tuple[str, str, str], List[int]] = {}
+            for user_id, guild_id, _, join_time, leave_time, duration in sessions:
+                for date, seconds in split_by_day(join_time, leave_time):
+                    entry = daily.setdefault((user_id, guild_id, date), [0, 0])
+                    entry[0] += seconds
+                entry = daily.setdefault((user_id, guild_id, join_time.strftime('%Y-%m-%d')), [0, 0])
+                entry[1] += 1
+            await db.executemany("""
+                INSERT INTO voice_daily (user_id, guild_id, date, total_time, sessions_count)
+                VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT(guild_id, user_id, date) DO UPDATE SET
+                    total_time = total_time + excluded.total_time,
+                    sessions_count = sessions_count + excluded.sessions_count
+            """, [(user_id, guild_id, date, seconds, count)
+                  for (user_id, guild_id, date), (seconds, count) in daily.items()])
+            
+            # Atualizar totais (uma linha por utilizador)
+            per_user: Dict[Tuple[str, str], List[int]] = {}
+            for user_id, guild_id, _, _, _, duration in sessions:
+                entry = per_user.setdefault((guild_id, user_id), [0, 0])
+                entry[0] += duration
+                entry[1] += 1
+            for (guild_id, user_id), (duration, count) in per_user.items():
+                async with db.execute("""
+                    INSERT INTO voice_totals (user_id, guild_id, total_time, sessions_count, last_session)
+                    VALUES (?, ?, ?, ?, CURRENT_TIMESTAMP)
+                    ON CONFLICT(user_id, guild_id) DO UPDATE SET
+                        total_time = total_time + excluded.total_time,
+                        sessions_count = sessions_count + excluded.sessions_count,
+                        last_session = CURRENT_TIMESTAMP
+                    RETURNING total_time
+                """, (user_id, guild_id, duration, count)) as cursor:
+                    row = await cursor.fetchone()
+                totals[(guild_id, user_id)] = row[0]
+            
+            if open_sessions is not None:
+                checkpoint = (checkpoint_at or datetime.utcnow()).isoformat()
+                await db.execute("DELETE FROM voice_open_sessions")
+                await db.executemany("""
+                    INSERT INTO voice_open_sessions (user_id, guild_id, channel_id, join_time, checkpoint_at)
+                    VALUES (?, ?, ?, ?, ?)
+                """, [(user_id, guild_id, channel_id, join_time.isoformat(), checkpoint)
+                      for user_id, guild_id, channel_id, join_time in open_sessions])
+        
+        for (guild_id, user_id), total_time in totals.items():
+            self.leaderboards.set_score("voice", guild_id, user_id, total_time)
+        return totals
+    
+    async def get_open_voice_sessions(self) -> List[Dict]:
+        """Obtém as sessões de voz em curso no último checkpoint"""
+        async with self.pool.read() as db:
+            async with db.execute("""
+                SELECT user_id, guild_id, channel_id, join_time, checkpoint_at
+                FROM voice_open_sessions
+            """) as cursor:
+                rows = await cursor.fetchall()
+        return [
+            {
+                "user_id": row[0],
+                "guild_id": row[1],
+                "channel_id": row[2],
+                "join_time": datetime.fromisoformat(row[3]),
+                "checkpoint_at": datetime.fromisoformat(row[4]),
+            }
+            for row in rows
+        ]
+    
+    async def get_voice_stats(self, user_id: str, guild_id: str, days: int = 7) -> Optional[Dict]:
+        """Obtém os totais de voz de um utilizador e o tempo dos últimos dias"""
+        since = (datetime.utcnow() - timedelta(days=days - 1)).strftime('%Y-%m-%d')
+        async with self.pool.read() as db:
+            async with db.execute("""
+                SELECT total_time, sessions_count, last_session
+                FROM voice_totals
+                WHERE user_id = ? AND guild_id = ?
+            """, (user_id, guild_id)) as cursor:
+                row = await cursor.fetchone()
+            if not row:
+                return None
+            async with db.execute("""
+                SELECT COALESCE(SUM(total_time), 0) FROM voice_daily
+                WHERE guild_id = ? AND user_id = ? AND date >= ?
+            """, (guild_id, user_id, since)) as cursor:
+                recent = (await cursor.fetchone())[0]
+        return {
+            "total_time": row[0],
+            "sessions_count": row[1],
+            "last_session": row[2],
+            "recent_time": recent,
+        }
+    
+    async def get_voice_totals(self, guild_id: str, user_ids: List[str]) -> Dict[str, Dict]:
+        """Obtém os totais de voz de vários utilizadores"""
+        if not user_ids:
+            return {}
+        placeholders = ", ".join("?" for _ in user_ids)
+        async with self.pool.read() as db:
+            async with db.execute(f"""
+                SELECT user_id, total_time, sessions_count FROM voice_totals
+                WHERE guild_id = ? AND user_id IN ({placeholders})
+            """, (guild_id, *user_ids)) as cursor:
+                rows = await cursor.fetchall()
+        return {row[0]: {"total_time": row[1], "sessions_count": row[2]} for row in rows}
 
 
 # Instância global
 db_instance = None
+_db_init_lock = asyncio.Lock()
 
 async def get_database() -> Database:
-    """Obtém a instância da base de dados"""
+    """Obtém a instância da base de dados (partilhada por todos os cogs)"""
     global db_instance
     if db_instance is None:
-        db_instance = Database()
-        await db_instance.init_db()
+        async with _db_init_lock:
+            if db_instance is None:
+                instance = Database()
+                await instance.init_db()
+                db_instance = instance
     return db_instance
 
+
+async def close_database():
+    """Fecha a instância global da base de dados"""
+    global db_instance
+    if db_instance is not None:
+        await db_instance.close()
+        db_instance = None
+
@@ -0,0 +1,140 @@
+"""
+Pool de Ligações SQLite para EPA BOT
+Ligações persistentes (1 escritor + N leitores) em modo WAL
+"""
+
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+from pathlib import Path
+from typing import List, Optional
+
+import aiosqlite
+
+
+class ConnectionPool:
+    """Pool de ligações aiosqlite de longa duração
+
+    O SQLite só permite um escritor de cada vez, por isso todas as escritas
+    passam por uma única ligação protegida por um lock. As leituras usam
+    ligações próprias que, em modo WAL, não bloqueiam nem são bloqueadas
+    pelo escritor.
+    """
+
+    # Pragmas aplicados a todas as ligações
+    PRAGMAS = (
+        "PRAGMA journal_mode = WAL",
+        "PRAGMA synchronous = NORMAL",  # Seguro em WAL, evita fsync por commit
+        "PRAGMA temp_store = MEMORY",
+        "PRAGMA cache_size = -16000",  # ~16MB de cache de páginas por ligação
+        "PRAGMA mmap_size = 134217728",  # 128MB
+        "PRAGMA busy_timeout = 5000",
+    )
+
+    def __init__(self, db_path: str, readers: int = 4, statement_cache_size: int = 256):
+        self.db_path = db_path
+        self.reader_count = max(1, readers)
+        self.statement_cache_size = statement_cache_size
+        self.logger = logging.getLogger("EPA BOT.Database")
+
+        self._writer: Optional[aiosqlite.Connection] = None
+        self._readers: List[aiosqlite.Connection] = []
+        self._idle_readers: Optional[asyncio.Queue] = None
+        self._write_lock = asyncio.Lock()
+        self._open_lock = asyncio.Lock()
+
+    @property
+    def is_open(self) -> bool:
+        return self._writer is not None
+
+    async def _connect(self, read_only: bool = False) -> aiosqlite.Connection:
+        """Abre uma ligação já configurada"""
+        # isolation_level=None: as transações são geridas explicitamente
+        # (BEGIN IMMEDIATE / COMMIT) em transaction()
+        conn = await aiosqlite.connect(
+            self.db_path,
+            isolation_level=None,
+            cached_statements=self.statement_cache_size,
+        )
+        for pragma in self.PRAGMAS:
+            await conn.execute(pragma)
+        if read_only:
+            await conn.execute("PRAGMA query_only = ON")
+        return conn
+
+    async def open(self):
+        """Abre o escritor e os leitores (idempotente)"""
+        async with self._open_lock:
+            if self.is_open:
+                return
+
+            Path(self.db_path).parent.mkdir(parents=True, exist_ok=True)
+
+            # O escritor é aberto primeiro para que o modo WAL fique ativo
+            # antes de os leitores se ligarem
+            self._writer = await self._connect()
+            self._idle_readers = asyncio.Queue()
+            for _ in range(self.reader_count):
+                conn = await self._connect(read_only=True)
+                self._readers.append(conn)
+                self._idle_readers.put_nowait(conn)
+
+            self.logger.info(f"✅ Pool de ligações aberto (1 escritor + {self.reader_count} leitores, WAL)")
+
+    async def close(self):
+        """Fecha todas as ligações"""
+        async with self._open_lock:
+            if not self.is_open:
+                return
+
+            # Esperar que a escrita em curso termine
+            async with self._write_lock:
+                try:
+                    await self._writer.execute("PRAGMA optimize")
+                except Exception:
+                    pass
+                await self._writer.close()
+                self._writer = None
+
+            for conn in self._readers:
+                await conn.close()
+            self._readers.clear()
+            self._idle_readers = None
+
+            self.logger.info("🔒 Pool de ligações fechado")
+
+    @asynccontextmanager
+    async def read(self):
+        """Empresta uma ligação de leitura"""
+        conn = await self._idle_readers.get()
+        try:
+            yield conn
+        finally:
+            self._idle_readers.put_nowait(conn)
+
+    @asynccontextmanager
+    async def transaction(self):
+        """Transação de escrita (BEGIN IMMEDIATE ... COMMIT)
+
+        Faz commit à saída ou rollback se ocorrer uma exceção. Não pode ser
+        aninhada: o lock de escrita não é reentrante.
+        """
+        async with self._write_lock:
+            conn = self._writer
+            await conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield conn
+            except BaseException:
+                await conn.rollback()
+                raise
+            else:
+                await conn.commit()
+
+    async def backup(self, target_path: str):
+        """Copia a base de dados de forma consistente (inclui o conteúdo do WAL)"""
+        async with self._write_lock:
+            target = await aiosqlite.connect(target_path)
+            try:
+                await self._writer.backup(target)
+            finally:
+                await target.close()
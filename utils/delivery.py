@@ -0,0 +1,178 @@
+"""
+Entrega de Lembretes para EPA BOT
+Agrupa lembretes do mesmo canal numa só mensagem, resolve utilizadores e
+canais pela cache do gateway (com LRU para pedidos REST) e limita o ritmo
+de envio por canal
+"""
+
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import Dict, List, Optional, Tuple
+
+import discord
+
+from utils.cache import LRUCache
+
+
+class ReminderDelivery:
+    """Fila de entrega de lembretes por canal
+
+    `deliver` junta o lembrete à fila do canal e espera pelo envio. O
+    primeiro lembrete de um canal agenda um envio após uma pequena janela
+    (COALESCE_DELAY), para que os lembretes que vencem ao mesmo tempo saiam
+    juntos: até 10 embeds por mensagem, com as menções no conteúdo. Cada
+    canal envia no máximo RATE_LIMIT mensagens por RATE_WINDOW segundos (o
+    limite de envio de mensagens do Discord), e um semáforo global limita
+    os envios em paralelo, evitando respostas 429.
+    """
+
+    COALESCE_DELAY = 0.5
+    MAX_EMBEDS = 10          # Limite do Discord por mensagem
+    MAX_EMBED_CHARS = 5500   # Limite do Discord: 6000 caracteres somando todos os embeds
+    RATE_LIMIT = 5
+    RATE_WINDOW = 5.0
+
+    def __init__(self, bot, cache_size: int = 1000, max_concurrent: int = 10):
+        self.bot = bot
+        self.logger = logging.getLogger("EPA BOT.Delivery")
+
+        # Resultados de pedidos REST (incluindo None para IDs inexistentes)
+        self.users = LRUCache(maxsize=cache_size)
+        self.channels = LRUCache(maxsize=cache_size)
+
+        self._pending: Dict[int, List[Tuple[int, discord.Embed, asyncio.Future]]] = {}
+        self._flushers: Dict[int, asyncio.Task] = {}
+        self._recent_sends: Dict[int, deque] = {}
+        self._send_slots = asyncio.Semaphore(max_concurrent)
+
+        # Métricas
+        self.messages_sent = 0
+        self.delivered = 0
+        self.rest_lookups = 0
+
+    # --- Resolução com cache ---
+
+    async def get_user(self, user_id: int) -> Optional[discord.User]:
+        """Utilizador pela cache do gateway, depois LRU, depois REST"""
+        user = self.bot.get_user(user_id)
+        if user is not None:
+            return user
+        if user_id in self.users:
+            return self.users.get(user_id)
+        self.rest_lookups += 1
+        try:
+            user = await self.bot.fetch_user(user_id)
+        except discord.NotFound:
+            user = None
+        self.users.put(user_id, user)
+        return user
+
+    async def get_channel(self, channel_id: int):
+        """Canal pela cache do gateway, depois LRU, depois REST"""
+        channel = self.bot.get_channel(channel_id)
+        if channel is not None:
+            return channel
+        if channel_id in self.channels:
+            return self.channels.get(channel_id)
+        self.rest_lookups += 1
+        try:
+            channel = await self.bot.fetch_channel(channel_id)
+        except (discord.NotFound, discord.Forbidden):
+            channel = None
+        self.channels.put(channel_id, channel)
+        return channel
+
+    # --- Entrega ---
+
+    async def deliver(self, channel_id: int, user_id: int, embed: discord.Embed) -> bool:
+        """Entrega um lembrete; devolve True se foi enviado (no canal ou por DM)"""
+        future = asyncio.get_running_loop().create_future()
+        self._pending.setdefault(channel_id, []).append((user_id, embed, future))
+        if channel_id not in self._flushers:
+            self._flushers[channel_id] = asyncio.create_task(self._flush(channel_id))
+        return await future
+
+    async def _flush(self, channel_id: int):
+        try:
+            await asyncio.sleep(self.COALESCE_DELAY)
+            channel = await self.get_channel(channel_id)
+
+            while self._pending.get(channel_id):
+                batch = self._take_batch(channel_id)
+                if channel is None:
+                    # Canal apagado ou inacessível: enviar por DM
+                    for user_id, embed, future in batch:
+                        self._resolve(future, await self._send_dm(user_id, embed))
+                    continue
+
+                try:
+                    await self._pace(channel_id)
+                    async with self._send_slots:
+                        await channel.send(
+                            content=" ".join(dict.fromkeys(f"<@{user_id}>" for user_id, _, _ in batch)),
+                            embeds=[embed for _, embed, _ in batch],
+                            allowed_mentions=discord.AllowedMentions(everyone=False, roles=False, users=True)
+                        )
+                    self.messages_sent += 1
+                    for _, _, future in batch:
+                        self._resolve(future, True)
+                except Exception as e:
+                    self.logger.error(f"❌ Erro ao enviar lembretes no canal {channel_id}: {e}")
+                    for _, _, future in batch:
+                        self._resolve(future, False)
+        except Exception as e:
+            self.logger.error(f"❌ Erro na entrega de lembretes ({channel_id}): {e}")
+            for _, _, future in self._pending.pop(channel_id, []):
+                self._resolve(future, False)
+        finally:
+            self._flushers.pop(channel_id, None)
+            self._pending.pop(channel_id, None)
+
+    def _take_batch(self, channel_id: int) -> List[Tuple[int, discord.Embed, asyncio.Future]]:
+        """Próximos lembretes do canal que cabem numa mensagem"""
+        pending = self._pending[channel_id]
+        batch, chars = [], 0
+        while pending and len(batch) < self.MAX_EMBEDS:
+            size = len(pending[0][1])
+            if batch and chars + size > self.MAX_EMBED_CHARS:
+                break
+            batch.append(pending.pop(0))
+            chars += size
+        return batch
+
+    async def _pace(self, channel_id: int):
+        """Espera se o canal já atingiu o limite de mensagens na janela"""
+        sends = self._recent_sends.setdefault(channel_id, deque(maxlen=self.RATE_LIMIT))
+        if len(sends) == self.RATE_LIMIT:
+            wait = sends[0] + self.RATE_WINDOW - time.monotonic()
+            if wait > 0:
+                await asyncio.sleep(wait)
+        sends.append(time.monotonic())
+
+    async def _send_dm(self, user_id: int, embed: discord.Embed) -> bool:
+        user = await self.get_user(user_id)
+        if user is None:
+            return False
+        try:
+            async with self._send_slots:
+                await user.send(embed=embed)
+            self.messages_sent += 1
+            return True
+        except Exception:
+            return False
+
+    def _resolve(self, future: asyncio.Future, delivered: bool):
+        if not future.done():
+            future.set_result(delivered)
+            if delivered:
+                self.delivered += 1
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "pending": sum(len(items) for items in self._pending.values()),
+            "delivered": self.delivered,
+            "messages_sent": self.messages_sent,
+            "rest_lookups": self.rest_lookups,
+        }
@@ -0,0 +1,172 @@
+"""
+Lista Indexada para EPA BOT
+Lista em blocos com índice posicional (árvore de Fenwick sobre o tamanho dos
+blocos): acesso, inserção e remoção por posição sem deslocar a lista inteira
+"""
+
+from typing import Any, Iterable, Iterator, List, Tuple
+
+
+class IndexedList:
+    """Sequência para filas grandes com operações por posição
+
+    Os elementos ficam em blocos de até 2 * LOAD; uma árvore de Fenwick com
+    o tamanho de cada bloco encontra o bloco de uma posição em O(log n).
+    Inserir ou remover mexe só nesse bloco (no máximo 2 * LOAD elementos) e
+    atualiza a árvore em O(log n); ler uma página de k elementos custa
+    O(log n + k). Dividir ou apagar um bloco reconstrói a árvore (O(n / LOAD)),
+    o que só acontece uma vez a cada LOAD operações no mesmo bloco.
+    """
+
+    LOAD = 128
+
+    def __init__(self, iterable: Iterable[Any] = ()):
+        self._blocks: List[list] = []
+        self._tree: List[int] = [0]
+        self._len = 0
+        self.extend(iterable)
+
+    # --- Índice ---
+
+    def _build_tree(self):
+        n = len(self._blocks)
+        tree = [0] * (n + 1)
+        for i, block in enumerate(self._blocks, 1):
+            tree[i] += len(block)
+            parent = i + (i & -i)
+            if parent <= n:
+                tree[parent] += tree[i]
+        self._tree = tree
+
+    def _update(self, block_index: int, delta: int):
+        i = block_index + 1
+        n = len(self._blocks)
+        while i <= n:
+            self._tree[i] += delta
+            i += i & -i
+
+    def _locate(self, index: int) -> Tuple[int, int]:
+        """(bloco, posição no bloco) de um índice já validado"""
+        n = len(self._blocks)
+        pos = 0
+        step = 1 << n.bit_length()
+        while step:
+            nxt = pos + step
+            if nxt <= n and self._tree[nxt] <= index:
+                pos = nxt
+                index -= self._tree[nxt]
+            step >>= 1
+        return pos, index
+
+    def _normalize(self, index: int) -> int:
+        if index < 0:
+            index += self._len
+        if not 0 <= index < self._len:
+            raise IndexError("índice fora da lista")
+        return index
+
+    # --- Leitura ---
+
+    def __len__(self) -> int:
+        return self._len
+
+    def __bool__(self) -> bool:
+        return self._len > 0
+
+    def __iter__(self) -> Iterator[Any]:
+        for block in self._blocks:
+            yield from block
+
+    def __getitem__(self, index: int) -> Any:
+        block, offset = self._locate(self._normalize(index))
+        return self._blocks[block][offset]
+
+    def __setitem__(self, index: int, value: Any):
+        block, offset = self._locate(self._normalize(index))
+        self._blocks[block][offset] = value
+
+    def slice(self, start: int, stop: int) -> list:
+        """Elementos de [start, stop) — uma página custa O(log n + tamanho)"""
+        start, stop = max(0, start), min(self._len, stop)
+        if start >= stop:
+            return []
+        block, offset = self._locate(start)
+        result = []
+        remaining = stop - start
+        while remaining > 0:
+            chunk = self._blocks[block][offset:offset + remaining]
+            result.extend(chunk)
+            remaining -= len(chunk)
+            block, offset = block + 1, 0
+        return result
+
+    # --- Escrita ---
+
+    def append(self, value: Any):
+        if not self._blocks or len(self._blocks[-1]) >= 2 * self.LOAD:
+            self._blocks.append([value])
+            self._len += 1
+            self._build_tree()
+            return
+        self._blocks[-1].append(value)
+        self._len += 1
+        self._update(len(self._blocks) - 1, 1)
+
+    def extend(self, values: Iterable[Any]):
+        """Adiciona vários elementos no fim (uma só reconstrução do índice)"""
+        values = list(values)
+        if not values:
+            return
+        self._len += len(values)
+        if self._blocks:
+            room = max(0, self.LOAD - len(self._blocks[-1]))
+            self._blocks[-1].extend(values[:room])
+            values = values[room:]
+        for i in range(0, len(values), self.LOAD):
+            self._blocks.append(values[i:i + self.LOAD])
+        self._build_tree()
+
+    def insert(self, index: int, value: Any):
+        """Insere antes de `index` (como list.insert)"""
+        if index < 0:
+            index = max(0, index + self._len)
+        if index >= self._len:
+            self.append(value)
+            return
+        block, offset = self._locate(index)
+        self._blocks[block].insert(offset, value)
+        self._len += 1
+        if len(self._blocks[block]) > 2 * self.LOAD:
+            full = self._blocks[block]
+            self._blocks[block:block + 1] = [full[:self.LOAD], full[self.LOAD:]]
+            self._build_tree()
+        else:
+            self._update(block, 1)
+
+    def pop(self, index: int = -1) -> Any:
+        block, offset = self._locate(self._normalize(index))
+        value = self._blocks[block].pop(offset)
+        self._len -= 1
+        if not self._blocks[block]:
+            del self._blocks[block]
+            self._build_tree()
+        else:
+            self._update(block, -1)
+        return value
+
+    def popleft(self) -> Any:
+        return self.pop(0)
+
+    def move(self, source: int, destination: int):
+        """Move o elemento de `source` para a posição `destination`"""
+        self.insert(destination, self.pop(source))
+
+    def clear(self):
+        self._blocks = []
+        self._tree = [0]
+        self._len = 0
+
+    def replace(self, values: Iterable[Any]):
+        """Substitui o conteúdo (ex.: depois de baralhar)"""
+        self.clear()
+        self.extend(values)
@@ -0,0 +1,226 @@
+"""
+Rankings em Memória para EPA BOT
+Índices ordenados por servidor (XP, reputação, saldo, mensagens, streaks e
+tempo em voz), atualizados a cada escrita em vez de recalculados por comando
+"""
+
+import asyncio
+import logging
+from bisect import bisect_left, insort
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from utils.cache import LRUCache
+
+
+class RankIndex:
+    """Ranking ordenado por pontuação (desc) e user_id
+
+    Guarda a pontuação de cada utilizador e uma lista ordenada de chaves
+    (-pontuação, user_id). A posição de um utilizador é uma pesquisa
+    binária; inserir/mover um utilizador é uma pesquisa binária mais um
+    deslocamento de memória na lista. Só entram pontuações positivas.
+    """
+
+    def __init__(self, rows: Iterable[Tuple[str, int]] = ()):
+        self._scores: Dict[str, int] = {user_id: score for user_id, score in rows if score > 0}
+        self._keys: List[Tuple[int, str]] = sorted((-score, user_id) for user_id, score in self._scores.items())
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def get(self, user_id: str) -> int:
+        return self._scores.get(user_id, 0)
+
+    def set(self, user_id: str, score: int):
+        """Define a pontuação absoluta de um utilizador"""
+        old = self._scores.pop(user_id, None)
+        if old is not None:
+            i = bisect_left(self._keys, (-old, user_id))
+            del self._keys[i]
+        if score > 0:
+            self._scores[user_id] = score
+            insort(self._keys, (-score, user_id))
+
+    def increment(self, user_id: str, delta: int):
+        self.set(user_id, self.get(user_id) + delta)
+
+    def top(self, limit: int = 10, offset: int = 0) -> List[Tuple[str, int]]:
+        return [(user_id, -neg) for neg, user_id in self._keys[offset:offset + limit]]
+
+    def rank(self, user_id: str) -> Optional[int]:
+        """Posição (1 = primeiro; empates partilham a posição) ou None"""
+        score = self._scores.get(user_id)
+        if score is None:
+            return None
+        return bisect_left(self._keys, (-score, "")) + 1
+
+
+class LeaderboardService:
+    """Rankings por servidor, carregados uma vez e mantidos pelas escritas
+
+    Cada índice é lido da base de dados na primeira consulta (uma leitura
+    pelo índice de cobertura), somando os incrementos ainda no buffer de
+    escrita. Depois disso a classe Database chama `record_message`,
+    `set_score` e `adjust_score` a cada escrita, e os comandos de ranking
+    deixam de percorrer tabelas.
+    """
+
+    # Métrica -> (query, por servidor?)
+    METRICS = {
+        "xp": ("SELECT user_id, xp FROM user_levels WHERE guild_id = ? AND xp > 0", True),
+        "reputation": ("SELECT user_id, reputation FROM user_levels WHERE guild_id = ? AND reputation > 0", True),
+        "messages": ("SELECT user_id, messages_sent FROM user_levels WHERE guild_id = ? AND messages_sent > 0", True),
+        "streaks": ("""SELECT user_id, current_streak FROM user_streaks
+                       WHERE guild_id = ? AND streak_type = 'messages' AND current_streak > 0""", True),
+        "voice": ("SELECT user_id, total_time FROM voice_totals WHERE guild_id = ? AND total_time > 0", True),
+        # O saldo é global (a tabela users não tem servidor)
+        "balance": ("SELECT user_id, balance FROM users WHERE balance > 0", False),
+    }
+
+    def __init__(self, pool, activity, max_indexes: int = 256):
+        self.pool = pool
+        self.activity = activity
+        self.logger = logging.getLogger("EPA BOT.Database")
+
+        self._indexes = LRUCache(maxsize=max_indexes)
+        self._loading: Dict[tuple, asyncio.Future] = {}
+        # Índices que receberam escritas diretas enquanto eram carregados
+        self._stale = set()
+
+        # Métricas
+        self.loads = 0
+
+    def _key(self, metric: str, guild_id: Optional[str]) -> tuple:
+        if metric not in self.METRICS:
+            raise ValueError(f"Métrica de ranking desconhecida: {metric}")
+        return (metric, guild_id if self.METRICS[metric][1] else None)
+
+    # --- Consultas ---
+
+    async def top(self, metric: str, guild_id: Optional[str] = None,
+                  limit: int = 10, offset: int = 0) -> List[Tuple[str, int]]:
+        """[(user_id, pontuação)] do topo do ranking"""
+        index = await self._get_index(self._key(metric, guild_id))
+        return index.top(limit, offset)
+
+    async def rank(self, metric: str, guild_id: Optional[str], user_id: str) -> Optional[int]:
+        """Posição de um utilizador no ranking (None se não pontuou)"""
+        index = await self._get_index(self._key(metric, guild_id))
+        return index.rank(user_id)
+
+    async def score(self, metric: str, guild_id: Optional[str], user_id: str) -> int:
+        index = await self._get_index(self._key(metric, guild_id))
+        return index.get(user_id)
+
+    async def size(self, metric: str, guild_id: Optional[str] = None) -> int:
+        index = await self._get_index(self._key(metric, guild_id))
+        return len(index)
+
+    # --- Atualizações (chamadas pela classe Database após cada escrita) ---
+
+    def record_message(self, user_id: str, guild_id: str, xp_gain: int):
+        """Mensagem registada no buffer de escrita
+
+        Índices a meio do carregamento não são marcados como desatualizados:
+        o carregamento soma o buffer no fim e já inclui este incremento.
+        """
+        for metric, delta in (("xp", xp_gain), ("messages", 1), ("streaks", 1)):
+            index = self._indexes.peek((metric, guild_id))
+            if index is not None:
+                index.increment(user_id, delta)
+
+    def set_score(self, metric: str, guild_id: Optional[str], user_id: str, score: int):
+        """Pontuação absoluta após uma escrita direta"""
+        key = self._key(metric, guild_id)
+        index = self._indexes.peek(key)
+        if index is not None:
+            index.set(user_id, score)
+        if key in self._loading:
+            self._stale.add(key)
+
+    def adjust_score(self, metric: str, guild_id: Optional[str], user_id: str, delta: int):
+        """Incremento após uma escrita direta"""
+        key = self._key(metric, guild_id)
+        index = self._indexes.peek(key)
+        if index is not None:
+            index.increment(user_id, delta)
+        if key in self._loading:
+            self._stale.add(key)
+
+    def invalidate(self, metric: Optional[str] = None, guild_id: Optional[str] = None):
+        """Descarta índices (voltam a ser lidos na próxima consulta)"""
+        if metric is None:
+            self._indexes.clear()
+            self._stale.update(self._loading)
+            return
+        key = self._key(metric, guild_id)
+        self._indexes.pop(key)
+        if key in self._loading:
+            self._stale.add(key)
+
+    # --- Carregamento ---
+
+    async def _get_index(self, key: tuple) -> RankIndex:
+        index = self._indexes.get(key)
+        if index is not None:
+            return index
+
+        # Uma única leitura por índice, mesmo com vários pedidos em simultâneo
+        future = self._loading.get(key)
+        if future is None:
+            future = asyncio.get_running_loop().create_future()
+            self._loading[key] = future
+            try:
+                index = await self._load(key)
+            except asyncio.CancelledError:
+                future.cancel()
+                raise
+            except Exception as e:
+                future.set_exception(e)
+                future.exception()  # Evita aviso se ninguém mais estiver à espera
+                raise
+            else:
+                self._indexes.put(key, index)
+                future.set_result(index)
+            finally:
+                del self._loading[key]
+                self._stale.discard(key)
+            return index
+        return await asyncio.shield(future)
+
+    async def _load(self, key: tuple) -> RankIndex:
+        metric, guild_id = key
+        query, per_guild = self.METRICS[metric]
+        params = (guild_id,) if per_guild else ()
+
+        while True:
+            self._stale.discard(key)
+
+            # Com os flushes parados, snapshot + buffer = valor real
+            async with self.activity.paused():
+                async with self.pool.read() as db:
+                    async with db.execute(query, params) as cursor:
+                        rows = await cursor.fetchall()
+
+                index = RankIndex(rows)
+                if metric in ("xp", "messages"):
+                    for user_id, xp, messages in self.activity.pending_levels_in(guild_id):
+                        index.increment(user_id, xp if metric == "xp" else messages)
+                elif metric == "streaks":
+                    for user_id, count in self.activity.pending_streaks_in(guild_id, "messages"):
+                        index.increment(user_id, count)
+
+            if key not in self._stale:
+                self.loads += 1
+                return index
+
+    def stats(self) -> Dict[str, int]:
+        """Resumo dos índices carregados"""
+        cache = self._indexes.stats()
+        return {
+            "indexes": cache["size"],
+            "entries": sum(len(index) for index in self._indexes.values()),
+            "loads": self.loads,
+            "hits": cache["hits"],
+            "misses": cache["misses"],
+        }
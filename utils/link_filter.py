@@ -0,0 +1,159 @@
+"""
+Classificação de Links para EPA BOT
+Extrai o host de cada URL e compara-o com conjuntos de domínios por sufixo
+(lista branca, lista negra e feed local de phishing com recarregamento)
+"""
+
+import asyncio
+import logging
+import os
+import re
+from typing import Iterable, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+
+URL_PATTERN = re.compile(r"https?://[^\s<>]+", re.IGNORECASE)
+
+# Hosts de convite do Discord -> prefixo do caminho que indica convite
+INVITE_HOSTS = {
+    "discord.gg": "/",
+    "discord.com": "/invite/",
+    "discordapp.com": "/invite/",
+}
+
+
+def normalize_host(host: str) -> str:
+    """Host em minúsculas, sem ponto final e em punycode (IDN)"""
+    host = host.strip().rstrip(".").lower()
+    if host.startswith("*."):
+        host = host[2:]
+    try:
+        return host.encode("idna").decode("ascii")
+    except UnicodeError:
+        return host
+
+
+def extract_links(content: str) -> List[Tuple[str, str, str]]:
+    """[(url, host, caminho)] de cada URL http(s) na mensagem
+
+    O host vem do parser de URLs, por isso "https://discord.com@evil.ru/"
+    resulta em "evil.ru" e não em "discord.com".
+    """
+    links = []
+    for url in URL_PATTERN.findall(content):
+        # Links em markdown: [texto](url)
+        url = url.rstrip(")>]")
+        try:
+            parts = urlsplit(url)
+            host = parts.hostname
+        except ValueError:
+            continue
+        if host:
+            links.append((url, normalize_host(host), parts.path))
+    return links
+
+
+def is_invite(host: str, path: str) -> bool:
+    """Se o link é um convite do Discord"""
+    prefix = INVITE_HOSTS.get(host)
+    if prefix is None:
+        return False
+    return path.startswith(prefix) and len(path) > len(prefix)
+
+
+class DomainSet:
+    """Conjunto de domínios consultado por sufixo de labels
+
+    "login.discord-gift.com" corresponde a "discord-gift.com" mas
+    "notdiscord-gift.com" não. Cada consulta faz uma pesquisa em hash por
+    sufixo do host (O(número de labels)), independentemente do tamanho do
+    conjunto, e guarda só as strings dos domínios em memória.
+    """
+
+    def __init__(self, domains: Iterable[str] = ()):
+        self._domains = frozenset(
+            host for host in (normalize_host(domain) for domain in domains) if host
+        )
+
+    def __len__(self) -> int:
+        return len(self._domains)
+
+    def match(self, host: str) -> Optional[str]:
+        """Domínio do conjunto que cobre o host (ou None)"""
+        domains = self._domains
+        if not domains:
+            return None
+        while True:
+            if host in domains:
+                return host
+            dot = host.find(".")
+            if dot < 0:
+                return None
+            host = host[dot + 1:]
+
+
+def read_domain_feed(path: str) -> List[str]:
+    """Lê um feed de domínios (um por linha)
+
+    Aceita comentários com "#" e o formato de ficheiro hosts
+    ("0.0.0.0 dominio.com"), usado pela maioria das listas públicas.
+    """
+    domains = []
+    with open(path, "r", encoding="utf-8", errors="ignore") as f:
+        for line in f:
+            line = line.split("#", 1)[0].strip()
+            if not line:
+                continue
+            domains.append(line.split()[-1])
+    return domains
+
+
+class PhishingFeed:
+    """Domínios de phishing: lista interna + feed local recarregável
+
+    O ficheiro só volta a ser lido quando a data de modificação muda. A
+    leitura corre numa thread e o conjunto novo substitui o antigo de uma
+    só vez, por isso as consultas nunca veem um conjunto a meio.
+    """
+
+    def __init__(self, path: str, builtin: Iterable[str] = ()):
+        self.path = path
+        self.builtin = list(builtin)
+        self.domains = DomainSet(self.builtin)
+        self.logger = logging.getLogger("EPA BOT.Moderation")
+        self._mtime: Optional[float] = None
+
+    def __len__(self) -> int:
+        return len(self.domains)
+
+    def match(self, host: str) -> Optional[str]:
+        return self.domains.match(host)
+
+    def _load(self) -> DomainSet:
+        return DomainSet(self.builtin + read_domain_feed(self.path))
+
+    async def refresh(self, force: bool = False) -> bool:
+        """Recarrega o feed se o ficheiro mudou; devolve True se recarregou"""
+        try:
+            mtime = os.path.getmtime(self.path)
+        except OSError:
+            # Sem ficheiro: fica só a lista interna
+            if self._mtime is not None:
+                self.domains = DomainSet(self.builtin)
+                self._mtime = None
+                return True
+            return False
+
+        if not force and mtime == self._mtime:
+            return False
+
+        try:
+            domains = await asyncio.to_thread(self._load)
+        except Exception as e:
+            self.logger.error(f"❌ Erro ao ler feed de phishing {self.path}: {e}")
+            return False
+
+        self.domains = domains
+        self._mtime = mtime
+        self.logger.info(f"🔗 Feed de phishing carregado: {len(domains)} domínios")
+        return True
@@ -0,0 +1,121 @@
+"""
+Configuração de Moderação por Servidor para EPA BOT
+Snapshots imutáveis e pré-compilados da configuração de cada servidor,
+guardada em SQLite e trocada de uma só vez quando um /setup a altera
+"""
+
+import copy
+import logging
+from types import MappingProxyType
+from typing import Dict, Mapping, Optional
+
+from utils.link_filter import DomainSet
+from utils.word_filter import WordFilter
+
+
+def merge_config(defaults: Dict, overrides: Dict) -> Dict:
+    """Configuração por omissão com as secções do servidor por cima"""
+    merged = copy.deepcopy(defaults)
+    for section, values in overrides.items():
+        if isinstance(values, dict) and isinstance(merged.get(section), dict):
+            merged[section].update(copy.deepcopy(values))
+        else:
+            merged[section] = copy.deepcopy(values)
+    return merged
+
+
+class GuildModerationConfig:
+    """Configuração de moderação de um servidor (só de leitura)
+
+    `get(secção)` devolve uma vista só de leitura da secção, por isso o
+    código existente `config.get("anti_spam", {}).get("action")` continua a
+    funcionar. O que o `on_message` consulta a cada mensagem (ativações,
+    canais isentos, domínios e palavras) fica pré-calculado em atributos.
+    """
+
+    def __init__(self, data: Dict, previous: Optional["GuildModerationConfig"] = None):
+        self._data = data
+        self._sections = {
+            name: MappingProxyType(values) if isinstance(values, dict) else values
+            for name, values in data.items()
+        }
+
+        anti_spam = data.get("anti_spam", {})
+        self.anti_spam_enabled = bool(anti_spam.get("enabled", False))
+        self.anti_spam_channels = frozenset(anti_spam.get("whitelisted_channels", []))
+
+        nsfw = data.get("nsfw_detection", {})
+        self.nsfw_enabled = bool(nsfw.get("enabled", False))
+        self.nsfw_channels = frozenset(nsfw.get("whitelisted_channels", []))
+
+        link_filter = data.get("link_filter", {})
+        self.link_filter_enabled = bool(link_filter.get("enabled", False))
+        self.link_filter_channels = frozenset(link_filter.get("whitelisted_channels", []))
+        self.block_invites = bool(link_filter.get("block_invites", True))
+        self.block_phishing = bool(link_filter.get("block_phishing", True))
+        self.link_whitelist = DomainSet(link_filter.get("whitelist_domains", []) + link_filter.get("whitelist", []))
+        self.link_blacklist = DomainSet(link_filter.get("blacklist_domains", []) + link_filter.get("blacklist", []))
+
+        self.mention_spam_enabled = bool(data.get("mention_spam", {}).get("enabled", False))
+        self.auto_slowmode_enabled = bool(data.get("auto_slowmode", {}).get("enabled", False))
+
+        word_filter = data.get("word_filter", {})
+        self.word_filter_enabled = bool(word_filter.get("enabled", False))
+        self.words = tuple(word_filter.get("words", []))
+        # Só recompila a lista de palavras se ela mudou
+        if previous is not None and previous.words == self.words:
+            self.word_filter = previous.word_filter
+        else:
+            self.word_filter = WordFilter(self.words)
+
+    def get(self, section: str, default=None):
+        return self._sections.get(section, default)
+
+    def __getitem__(self, section: str) -> Mapping:
+        return self._sections[section]
+
+    def to_dict(self) -> Dict:
+        """Cópia editável (para alterar e guardar com o store)"""
+        return copy.deepcopy(self._data)
+
+
+class ModerationConfigStore:
+    """Snapshots por servidor, com a configuração global como base
+
+    Servidores sem configuração própria usam o snapshot por omissão (o
+    ficheiro config/moderation_config.json). Consultar é um acesso a um
+    dicionário; guardar escreve na base de dados e só depois substitui o
+    snapshot do servidor por um novo, nunca o altera no lugar.
+    """
+
+    def __init__(self, defaults: Dict):
+        self.logger = logging.getLogger("EPA BOT.Moderation")
+        self.defaults = defaults
+        self._default = GuildModerationConfig(copy.deepcopy(defaults))
+        self._snapshots: Dict[int, GuildModerationConfig] = {}
+
+    def __len__(self) -> int:
+        return len(self._snapshots)
+
+    async def load(self, db):
+        """Lê as configurações de todos os servidores"""
+        snapshots = {}
+        for guild_id, overrides in (await db.get_moderation_configs()).items():
+            snapshots[int(guild_id)] = GuildModerationConfig(
+                merge_config(self.defaults, overrides), previous=self._default
+            )
+        self._snapshots = snapshots
+        self.logger.info(f"✅ Configuração de moderação de {len(snapshots)} servidores carregada")
+
+    def get(self, guild_id: int) -> GuildModerationConfig:
+        return self._snapshots.get(guild_id, self._default)
+
+    def editable(self, guild_id: int) -> Dict:
+        return self.get(guild_id).to_dict()
+
+    async def save(self, db, guild_id: int, data: Dict) -> GuildModerationConfig:
+        """Guarda a configuração de um servidor e publica o novo snapshot"""
+        await db.set_moderation_config(str(guild_id), data)
+        snapshot = GuildModerationConfig(copy.deepcopy(data), previous=self.get(guild_id))
+        self._snapshots[guild_id] = snapshot
+        return snapshot
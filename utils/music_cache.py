@@ -0,0 +1,200 @@
+"""
+Cache de Extração de Música para EPA BOT
+Metadados das músicas (duráveis) separados dos URLs de stream (assinados e
+com validade), ambos LRU, com persistência opcional em JSON
+"""
+
+import json
+import logging
+import os
+import re
+import time
+from typing import Dict, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+
+from utils.cache import LRUCache
+
+
+METADATA_FIELDS = ("title", "webpage_url", "duration", "uploader", "thumbnail")
+
+_EXPIRE_PATH = re.compile(r"/expire/(\d+)")
+
+
+def stream_expires_at(url: str, default_ttl: float, now: Optional[float] = None) -> float:
+    """Momento (epoch) em que um URL de stream deixa de ser válido
+
+    Os URLs do YouTube (googlevideo) trazem a validade no parâmetro `expire`
+    (ou no caminho, nos manifestos); para outras fontes usa-se `default_ttl`.
+    """
+    now = time.time() if now is None else now
+    try:
+        parsed = urlparse(url)
+        values = parse_qs(parsed.query).get("expire")
+        if values:
+            return float(values[0])
+        match = _EXPIRE_PATH.search(parsed.path)
+        if match:
+            return float(match.group(1))
+    except (ValueError, TypeError):
+        pass
+    return now + default_ttl
+
+
+class ExtractionCache:
+    """Cache dos resultados do yt-dlp por pesquisa
+
+    - `metadata`: {pesquisa: metadados} — título, duração, webpage_url...
+      Estes dados não mudam, por isso duram METADATA_TTL.
+    - `streams`: {webpage_url: (url, expira_em)} — o URL assinado do áudio,
+      válido até ao `expire` indicado no próprio URL.
+
+    Um stream só é devolvido se ainda for válido durante a música inteira
+    (com uma margem de STREAM_MARGIN), porque o FFmpeg volta a usar o URL
+    quando reconecta. Se os metadados existem mas o stream expirou, `get`
+    devolve só os metadados para se extrair de novo a partir do
+    webpage_url (um "refresh", sem voltar a pesquisar).
+    """
+
+    METADATA_TTL = 7 * 24 * 3600
+    DEFAULT_STREAM_TTL = 3600
+    STREAM_MARGIN = 300
+
+    def __init__(self, path: Optional[str] = None, metadata_size: int = 2000,
+                 stream_size: int = 300):
+        self.path = path
+        self.metadata = LRUCache(maxsize=metadata_size)
+        self.streams = LRUCache(maxsize=stream_size)
+        self.logger = logging.getLogger("EPA BOT.MusicCache")
+        self._dirty = False
+
+        # Métricas
+        self.hits = 0
+        self.misses = 0
+        self.refreshes = 0
+        self.expired = 0
+
+    def __len__(self) -> int:
+        return len(self.metadata)
+
+    # --- Consulta ---
+
+    def get(self, query: str) -> Tuple[Optional[dict], Optional[dict]]:
+        """(track_info pronto a tocar, metadados) de uma pesquisa
+
+        - hit: (track_info, metadados)
+        - refresh: (None, metadados) — falta só um URL de stream válido
+        - miss: (None, None)
+        """
+        now = time.time()
+        meta = self.metadata.get(query)
+        if meta is not None and now - meta["cached_at"] > self.METADATA_TTL:
+            self.metadata.pop(query)
+            meta = None
+        if meta is None:
+            self.misses += 1
+            return None, None
+
+        stream = self.streams.get(meta["webpage_url"]) if meta.get("webpage_url") else None
+        if stream is not None:
+            url, expires_at = stream
+            if self._valid_for(expires_at, meta.get("duration"), now):
+                self.hits += 1
+                return self._track_info(meta, url), meta
+            self.streams.pop(meta["webpage_url"])
+            self.expired += 1
+
+        self.refreshes += 1
+        return None, meta
+
+    @classmethod
+    def _valid_for(cls, expires_at: float, duration: Optional[float], now: float) -> bool:
+        return expires_at - now > max(cls.STREAM_MARGIN, duration or 0)
+
+    @classmethod
+    def is_fresh(cls, url: str, duration: Optional[float] = None) -> bool:
+        """Se um URL de stream ainda dá para tocar a música inteira"""
+        now = time.time()
+        return cls._valid_for(stream_expires_at(url, cls.DEFAULT_STREAM_TTL, now), duration, now)
+
+    def put(self, query: str, track_info: dict):
+        """Guarda o resultado de uma extração"""
+        now = time.time()
+        meta = {field: track_info.get(field) for field in METADATA_FIELDS}
+        meta["cached_at"] = now
+        self.metadata.put(query, meta)
+
+        url = track_info.get("url")
+        if url and meta["webpage_url"]:
+            self.streams.put(meta["webpage_url"], (url, stream_expires_at(url, self.DEFAULT_STREAM_TTL, now)))
+        self._dirty = True
+
+    def invalidate(self, query: str) -> bool:
+        """Remove uma pesquisa (e o stream associado)"""
+        meta = self.metadata.pop(query)
+        if meta is None:
+            return False
+        if meta.get("webpage_url"):
+            self.streams.pop(meta["webpage_url"])
+        self._dirty = True
+        return True
+
+    @staticmethod
+    def _track_info(meta: dict, url: str) -> dict:
+        track_info = {field: meta.get(field) for field in METADATA_FIELDS}
+        track_info["url"] = url
+        return track_info
+
+    # --- Persistência ---
+
+    def load(self):
+        """Carrega a cache do disco (ignora streams já expirados)"""
+        if not self.path or not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            self.logger.warning(f"⚠️ Cache de música ignorada ({self.path}): {e}")
+            return
+
+        now = time.time()
+        for query, meta in data.get("metadata", []):
+            if now - meta.get("cached_at", 0) <= self.METADATA_TTL:
+                self.metadata.put(query, meta)
+        for webpage_url, url, expires_at in data.get("streams", []):
+            if expires_at - now > self.STREAM_MARGIN:
+                self.streams.put(webpage_url, (url, expires_at))
+        self.logger.info(f"🎵 Cache de música carregada: {len(self.metadata)} músicas, {len(self.streams)} streams")
+
+    def save(self):
+        """Grava a cache no disco se mudou desde a última gravação (bloqueante)"""
+        if not self.path or not self._dirty:
+            return
+        self._dirty = False
+        # Ordem LRU preservada (do menos para o mais usado)
+        data = {
+            "metadata": self.metadata.items(),
+            "streams": [[webpage_url, url, expires_at]
+                        for webpage_url, (url, expires_at) in self.streams.items()],
+        }
+        try:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(data, f, ensure_ascii=False)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            self._dirty = True
+            self.logger.error(f"❌ Erro ao gravar cache de música: {e}")
+
+    def stats(self) -> Dict[str, float]:
+        lookups = self.hits + self.misses + self.refreshes
+        return {
+            "tracks": len(self.metadata),
+            "streams": len(self.streams),
+            "hits": self.hits,
+            "misses": self.misses,
+            "refreshes": self.refreshes,
+            "expired": self.expired,
+            "hit_rate": (self.hits / lookups) if lookups else 0.0,
+        }
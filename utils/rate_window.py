@@ -0,0 +1,75 @@
+"""
+Contadores de Janela Deslizante para EPA BOT
+Um anel (deque de tamanho fixo) de eventos por chave, usado pelo anti-spam,
+spam de menções e slowmode automático
+"""
+
+import time
+from collections import OrderedDict, deque
+from typing import Any, Hashable, List, Optional
+
+
+class SlidingWindow:
+    """Eventos recentes por chave (utilizador, canal, ...)
+
+    Cada chave guarda no máximo `capacity` eventos (tempo, valor) num deque
+    de tamanho fixo; inserir e expirar são O(1) amortizado. As chaves estão
+    ordenadas pela última atividade, por isso a cada inserção as chaves sem
+    eventos dentro da janela são removidas pela frente da fila: a memória
+    fica limitada às chaves ativas, sem tarefa de limpeza.
+
+    Cada chamada pode usar uma janela diferente (ex.: configuração por
+    servidor), por isso a limpeza usa a maior janela já vista: uma janela
+    curta nunca apaga chaves que ainda contam numa janela mais longa.
+    """
+
+    def __init__(self):
+        self._events: "OrderedDict[Hashable, deque]" = OrderedDict()
+        self._max_window = 0.0
+
+    def __len__(self) -> int:
+        return len(self._events)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._events
+
+    def hit(self, key: Hashable, window: float, capacity: int,
+            value: Any = None, now: Optional[float] = None) -> deque:
+        """Regista um evento e devolve os eventos da chave dentro da janela"""
+        if now is None:
+            now = time.time()
+        cutoff = now - window
+        capacity = max(1, capacity)
+
+        events = self._events.pop(key, None)
+        if events is None or events.maxlen != capacity:
+            events = deque(events or (), maxlen=capacity)
+        events.append((now, value))
+        while events[0][0] < cutoff:
+            events.popleft()
+        self._events[key] = events
+
+        self._max_window = max(self._max_window, window)
+        self._evict_idle(now - self._max_window)
+        return events
+
+    def count(self, key: Hashable) -> int:
+        events = self._events.get(key)
+        return len(events) if events else 0
+
+    def values(self, key: Hashable) -> List[Any]:
+        """Valores dos eventos da chave (do mais antigo para o mais recente)"""
+        events = self._events.get(key)
+        return [value for _, value in events] if events else []
+
+    def reset(self, key: Hashable):
+        self._events.pop(key, None)
+
+    def _evict_idle(self, cutoff: float):
+        """Remove chaves cujo último evento já saiu da janela"""
+        events = self._events
+        while events:
+            key, oldest = next(iter(events.items()))
+            if oldest[-1][0] >= cutoff:
+                break
+            del events[key]
@@ -0,0 +1,250 @@
+"""
+Agendador Persistente para EPA BOT
+Tarefas com hora marcada (lembretes, anúncios, giveaways, quarentena)
+guardadas em SQLite e mantidas numa min-heap em memória
+"""
+
+import asyncio
+import heapq
+import itertools
+import json
+import logging
+import time
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+# handler(chave, payload) -> próxima execução (timestamp) ou None para terminar
+JobHandler = Callable[[str, Optional[dict]], Awaitable[Optional[float]]]
+
+
+class Scheduler:
+    """Tarefas agendadas por (tipo, chave), persistidas na tabela scheduled_jobs
+
+    Os cogs registam um handler por tipo e agendam tarefas com `schedule`.
+    Uma única tarefa de fundo dorme exatamente até ao próximo prazo (topo da
+    heap) e acorda mais cedo se for agendado algo anterior. Cada tarefa só
+    sai da base de dados depois de o handler terminar, por isso um reinício
+    a meio volta a executá-la (pelo menos uma vez). Se o handler falhar, a
+    tarefa é reagendada com espera exponencial (RETRY_BASE * 2^tentativas,
+    no máximo RETRY_MAX) até MAX_ATTEMPTS tentativas, e depois é
+    descartada; de resto só é apagada quando o handler devolve None.
+    Tarefas de um tipo sem handler ficam em espera até o cog correspondente
+    o registar.
+    """
+
+    # Limite de cada espera, para acompanhar mudanças no relógio do sistema
+    MAX_SLEEP = 3600
+
+    # Novas tentativas quando o handler falha. Cada tentativa repete os
+    # efeitos do handler, por isso ao fim de MAX_ATTEMPTS falhas seguidas
+    # (cerca de um dia) a tarefa é descartada e fica registada no log.
+    RETRY_BASE = 60
+    RETRY_MAX = 3600
+    MAX_ATTEMPTS = 30
+    ATTEMPTS_KEY = "_attempts"
+
+    def __init__(self, pool):
+        self.pool = pool
+        self.logger = logging.getLogger("EPA BOT.Scheduler")
+
+        self._heap: List[Tuple[float, int, str, str]] = []
+        self._jobs: Dict[Tuple[str, str], Tuple[float, Optional[dict]]] = {}
+        self._parked: Dict[str, Dict[str, Tuple[float, Optional[dict]]]] = {}
+        self._handlers: Dict[str, JobHandler] = {}
+        self._seq = itertools.count()
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self._running = set()
+
+        # Métricas
+        self.fired = 0
+        self.failed = 0
+        self.dropped = 0
+        self._lag_total = 0.0
+        self._lag_max = 0.0
+
+    # --- Ciclo de vida ---
+
+    async def start(self):
+        """Carrega as tarefas pendentes e inicia o ciclo de execução"""
+        if self._task is not None:
+            return
+        async with self.pool.read() as db:
+            async with db.execute(
+                "SELECT kind, job_key, due_at, payload FROM scheduled_jobs ORDER BY due_at"
+            ) as cursor:
+                rows = await cursor.fetchall()
+        for kind, key, due_at, payload in rows:
+            self._push(kind, key, due_at, json.loads(payload) if payload else None)
+        self._task = asyncio.create_task(self._run())
+        if rows:
+            self.logger.info(f"⏰ {len(rows)} tarefas agendadas carregadas")
+
+    async def stop(self):
+        """Para o ciclo e espera (pouco) pelas tarefas em execução"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._running:
+            await asyncio.wait(self._running, timeout=5)
+
+    # --- API para os cogs ---
+
+    def register(self, kind: str, handler: JobHandler):
+        """Define o handler de um tipo de tarefa (liberta as que esperavam)"""
+        self._handlers[kind] = handler
+        for key, (due_at, payload) in self._parked.pop(kind, {}).items():
+            self._push(kind, key, due_at, payload)
+
+    def unregister(self, kind: str):
+        self._handlers.pop(kind, None)
+
+    async def schedule(self, kind: str, key: str, due_at: float, payload: Optional[dict] = None):
+        """Agenda (ou reagenda) a tarefa (tipo, chave) para o timestamp dado"""
+        await self.schedule_many(kind, [(key, due_at, payload)])
+
+    async def schedule_many(self, kind: str, jobs: List[Tuple[str, float, Optional[dict]]]):
+        """Agenda várias tarefas do mesmo tipo numa só transação"""
+        if not jobs:
+            return
+        async with self.pool.transaction() as db:
+            await db.executemany("""
+                INSERT INTO scheduled_jobs (kind, job_key, due_at, payload)
+                VALUES (?, ?, ?, ?)
+                ON CONFLICT(kind, job_key) DO UPDATE SET
+                    due_at = excluded.due_at,
+                    payload = excluded.payload
+            """, [
+                (kind, str(key), due_at, json.dumps(payload) if payload is not None else None)
+                for key, due_at, payload in jobs
+            ])
+        for key, due_at, payload in jobs:
+            self._parked.get(kind, {}).pop(str(key), None)
+            self._push(kind, str(key), due_at, payload)
+
+    async def cancel(self, kind: str, key: str) -> bool:
+        """Cancela uma tarefa; devolve True se existia"""
+        key = str(key)
+        existed = self._jobs.pop((kind, key), None) is not None
+        existed = self._parked.get(kind, {}).pop(key, None) is not None or existed
+        async with self.pool.transaction() as db:
+            await db.execute(
+                "DELETE FROM scheduled_jobs WHERE kind = ? AND job_key = ?", (kind, key)
+            )
+        # A entrada na heap fica obsoleta e é ignorada quando chegar ao topo
+        return existed
+
+    def is_scheduled(self, kind: str, key: str) -> bool:
+        key = str(key)
+        return (kind, key) in self._jobs or key in self._parked.get(kind, {})
+
+    # --- Execução ---
+
+    def _push(self, kind: str, key: str, due_at: float, payload: Optional[dict]):
+        self._jobs[(kind, key)] = (due_at, payload)
+        heapq.heappush(self._heap, (due_at, next(self._seq), kind, key))
+        if self._heap[0][0] == due_at:
+            self._wakeup.set()
+
+    async def _run(self):
+        while True:
+            self._wakeup.clear()
+            now = time.time()
+            delay = None
+
+            while self._heap:
+                due_at, _, kind, key = self._heap[0]
+                job = self._jobs.get((kind, key))
+                if job is None or job[0] != due_at:
+                    heapq.heappop(self._heap)  # Cancelada ou reagendada
+                    continue
+                if due_at > now:
+                    delay = due_at - now
+                    break
+
+                heapq.heappop(self._heap)
+                del self._jobs[(kind, key)]
+                payload = job[1]
+
+                handler = self._handlers.get(kind)
+                if handler is None:
+                    self._parked.setdefault(kind, {})[key] = (due_at, payload)
+                    continue
+
+                lag = now - due_at
+                self._lag_total += lag
+                self._lag_max = max(self._lag_max, lag)
+                self.fired += 1
+
+                task = asyncio.create_task(self._fire(kind, key, payload, handler))
+                self._running.add(task)
+                task.add_done_callback(self._running.discard)
+
+            try:
+                timeout = None if delay is None else min(delay, self.MAX_SLEEP)
+                await asyncio.wait_for(self._wakeup.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _fire(self, kind: str, key: str, payload: Optional[dict], handler: JobHandler):
+        # O número de tentativas falhadas viaja no payload, mas o handler não o vê
+        attempts = 0
+        if payload is not None and self.ATTEMPTS_KEY in payload:
+            payload = dict(payload)
+            attempts = payload.pop(self.ATTEMPTS_KEY)
+            payload = payload or None
+
+        try:
+            next_due = await handler(key, payload)
+        except Exception as e:
+            self.failed += 1
+            attempts += 1
+            if attempts >= self.MAX_ATTEMPTS:
+                next_due = None
+                self.dropped += 1
+                self.logger.error(
+                    f"❌ Tarefa agendada {kind}:{key} descartada após {attempts} tentativas "
+                    f"(payload: {payload}): {e}"
+                )
+            else:
+                delay = min(self.RETRY_BASE * 2 ** (attempts - 1), self.RETRY_MAX)
+                next_due = time.time() + delay
+                payload = {**(payload or {}), self.ATTEMPTS_KEY: attempts}
+                self.logger.error(
+                    f"❌ Erro na tarefa agendada {kind}:{key} (tentativa {attempts}/{self.MAX_ATTEMPTS}, "
+                    f"nova tentativa em {delay:.0f}s): {e}"
+                )
+
+        # Reagendada durante a execução: a nova marcação prevalece
+        if self.is_scheduled(kind, key):
+            return
+
+        try:
+            if next_due is not None:
+                await self.schedule(kind, key, next_due, payload)
+            else:
+                async with self.pool.transaction() as db:
+                    await db.execute(
+                        "DELETE FROM scheduled_jobs WHERE kind = ? AND job_key = ?", (kind, key)
+                    )
+        except Exception as e:
+            self.logger.error(f"❌ Erro ao atualizar tarefa agendada {kind}:{key}: {e}")
+
+    def stats(self) -> Dict[str, float]:
+        """Profundidade da fila e atraso de execução"""
+        parked = sum(len(jobs) for jobs in self._parked.values())
+        next_due = min((due_at for due_at, _ in self._jobs.values()), default=None)
+        return {
+            "pending": len(self._jobs) + parked,
+            "parked": parked,
+            "running": len(self._running),
+            "fired": self.fired,
+            "failed": self.failed,
+            "dropped": self.dropped,
+            "lag_avg_ms": (self._lag_total / self.fired * 1000) if self.fired else 0.0,
+            "lag_max_ms": self._lag_max * 1000,
+            "next_in": max(0.0, next_due - time.time()) if next_due is not None else None,
+        }
@@ -0,0 +1,317 @@
+"""
+Motor do Starboard para EPA BOT
+Contagem de estrelas mantida em memória a partir dos eventos de reação,
+edições do starboard agrupadas por mensagem e contagens guardadas em lote
+"""
+
+import asyncio
+import json
+import logging
+import time
+from typing import Callable, Dict, Optional, Set, Tuple
+
+import discord
+
+from utils.cache import LRUCache
+
+
+class StarEntry:
+    """Estado de uma mensagem com estrelas"""
+
+    __slots__ = ("guild_id", "channel_id", "message_id", "count", "message",
+                 "starboard_message_id", "posted_count", "last_edit", "update_task")
+
+    def __init__(self, guild_id: int, channel_id: int, message_id: int, count: int,
+                 message: Optional[discord.Message] = None,
+                 starboard_message_id: Optional[int] = None):
+        self.guild_id = guild_id
+        self.channel_id = channel_id
+        self.message_id = message_id
+        self.count = count
+        self.message = message
+        self.starboard_message_id = starboard_message_id
+        self.posted_count: Optional[int] = None  # Contagem mostrada no post
+        self.last_edit = 0.0
+        self.update_task: Optional[asyncio.Task] = None
+
+
+class StarboardEngine:
+    """Starboard orientado a eventos
+
+    A primeira reação a uma mensagem desconhecida faz um único
+    `fetch_message` para obter a contagem atual; a partir daí cada evento de
+    reação (adicionar/remover) só soma ou subtrai em memória. Ao atingir o
+    threshold o post é criado logo; as edições seguintes respeitam
+    EDIT_INTERVAL por mensagem e usam sempre a contagem mais recente, sem
+    voltar a ir buscar o post (o ID fica em cache). As contagens são gravadas
+    em lote a cada FLUSH_INTERVAL segundos e ao parar.
+    """
+
+    EDIT_INTERVAL = 5.0
+    FLUSH_INTERVAL = 30.0
+
+    def __init__(self, bot, db, get_config: Callable[[], Dict], cache_size: int = 5000):
+        self.bot = bot
+        self.db = db
+        self.get_config = get_config
+        self.logger = logging.getLogger("EPA BOT.Starboard")
+
+        self.entries = LRUCache(maxsize=cache_size)
+        self._loading: Dict[int, asyncio.Future] = {}
+        self._dirty: Dict[int, int] = {}  # {message_id: contagem por gravar}
+        # Estrelas do próprio autor removidas pelo bot: {(message_id, user_id)}.
+        # O evento de remoção não traz o autor, por isso é reconhecido aqui.
+        self._self_star_removals: Set[Tuple[int, int]] = set()
+        self._flush_task: Optional[asyncio.Task] = None
+
+        # Métricas
+        self.fetches = 0
+        self.edits = 0
+
+    # --- Ciclo de vida ---
+
+    def start(self):
+        if self._flush_task is None:
+            self._flush_task = asyncio.create_task(self._flush_loop())
+
+    async def stop(self):
+        if self._flush_task is not None:
+            self._flush_task.cancel()
+            try:
+                await self._flush_task
+            except asyncio.CancelledError:
+                pass
+            self._flush_task = None
+        await self.flush()
+
+    async def _flush_loop(self):
+        while True:
+            await asyncio.sleep(self.FLUSH_INTERVAL)
+            await self.flush()
+
+    async def flush(self):
+        """Grava as contagens alteradas desde a última gravação"""
+        if not self._dirty:
+            return
+        dirty, self._dirty = self._dirty, {}
+        try:
+            await self.db.update_starboard_counts(
+                [(count, str(message_id)) for message_id, count in dirty.items()]
+            )
+        except Exception as e:
+            # Voltar a marcar (sem sobrepor contagens mais recentes)
+            for message_id, count in dirty.items():
+                self._dirty.setdefault(message_id, count)
+            self.logger.error(f"❌ Erro ao gravar contagens do starboard: {e}")
+
+    # --- Eventos ---
+
+    async def on_reaction(self, payload: discord.RawReactionActionEvent, delta: int):
+        """Processa uma reação (delta +1 ao adicionar, -1 ao remover)"""
+        config = self.get_config()
+        if not config.get('enabled', False) or payload.guild_id is None:
+            return
+        star_emoji = config.get('emoji', '⭐')
+        if str(payload.emoji) != star_emoji:
+            return
+
+        if delta < 0 and (payload.message_id, payload.user_id) in self._self_star_removals:
+            # Remoção feita pelo bot de uma estrela que nunca foi contada
+            self._self_star_removals.discard((payload.message_id, payload.user_id))
+            return
+
+        # Reação do próprio autor (só disponível ao adicionar)
+        self_star = (
+            payload.message_author_id is not None
+            and payload.user_id == payload.message_author_id
+        )
+        if self_star and not config.get('self_star', False):
+            if delta > 0:
+                await self._remove_self_star(payload, star_emoji)
+            return
+
+        entry = self.entries.get(payload.message_id)
+        if entry is None:
+            # A contagem inicial vem do fetch (que já inclui este evento)
+            entry = await self._load(payload, star_emoji, delta)
+            if entry is None:
+                return
+        else:
+            entry.count = max(0, entry.count + delta)
+
+        self._schedule_update(entry)
+
+    async def _remove_self_star(self, payload, star_emoji):
+        channel = self.bot.get_channel(payload.channel_id)
+        if channel is None or payload.member is None:
+            return
+        key = (payload.message_id, payload.user_id)
+        self._self_star_removals.add(key)
+        try:
+            await channel.get_partial_message(payload.message_id).remove_reaction(star_emoji, payload.member)
+        except Exception:
+            self._self_star_removals.discard(key)  # Não vai haver evento de remoção
+
+    async def _load(self, payload, star_emoji: str, delta: int) -> Optional[StarEntry]:
+        """Cria a entrada de uma mensagem (eventos concorrentes esperam pelo mesmo fetch)"""
+        message_id = payload.message_id
+        pending = self._loading.get(message_id)
+        if pending is not None:
+            # Outro evento já está a carregar: o fetch dele reflete este evento
+            await asyncio.shield(pending)
+            return None
+
+        future = asyncio.get_running_loop().create_future()
+        self._loading[message_id] = future
+        try:
+            row = await self.db.get_starboard_entry(str(message_id))
+            if row is None and delta < 0:
+                return None  # Sem post e a perder estrelas: nada a fazer
+
+            channel = self.bot.get_channel(payload.channel_id)
+            if channel is None:
+                return None
+            self.fetches += 1
+            try:
+                message = await channel.fetch_message(message_id)
+            except (discord.NotFound, discord.Forbidden):
+                return None
+
+            reaction = discord.utils.get(message.reactions, emoji=star_emoji)
+            entry = StarEntry(
+                payload.guild_id,
+                payload.channel_id,
+                message_id,
+                reaction.count if reaction else 0,
+                message=message,
+                starboard_message_id=int(row['starboard_message_id']) if row and row['starboard_message_id'] else None
+            )
+            if row:
+                entry.posted_count = row['star_count']
+            self.entries.put(message_id, entry)
+            return entry
+        except Exception as e:
+            self.logger.error(f"❌ Erro ao carregar mensagem {message_id} para o starboard: {e}")
+            return None
+        finally:
+            self._loading.pop(message_id, None)
+            future.set_result(None)
+
+    # --- Atualização do post ---
+
+    def _schedule_update(self, entry: StarEntry):
+        """Agenda a atualização do post (no máximo uma pendente por mensagem)"""
+        if entry.update_task is not None and not entry.update_task.done():
+            return  # A tarefa pendente vai usar a contagem mais recente
+        entry.update_task = asyncio.create_task(self._update(entry))
+
+    async def _update(self, entry: StarEntry):
+        try:
+            while entry.count != entry.posted_count:
+                if entry.starboard_message_id is None:
+                    if entry.count < self.get_config().get('star_threshold', 3):
+                        return
+                    if not await self._create_post(entry):
+                        return  # Sem canal do starboard ou mensagem original
+                    continue
+
+                wait = entry.last_edit + self.EDIT_INTERVAL - time.monotonic()
+                if wait > 0:
+                    await asyncio.sleep(wait)
+
+                channel = self._starboard_channel(entry.guild_id)
+                if channel is None:
+                    return
+                count = entry.count
+                entry.last_edit = time.monotonic()
+                await channel.get_partial_message(entry.starboard_message_id).edit(
+                    content=self._post_content(entry, count)
+                )
+                entry.posted_count = count
+                self.edits += 1
+                self._dirty[entry.message_id] = count
+        except discord.NotFound:
+            # Post apagado manualmente: não voltar a tentar editar
+            entry.starboard_message_id = None
+            entry.posted_count = entry.count
+        except Exception as e:
+            self.logger.error(f"❌ Erro ao atualizar starboard ({entry.message_id}): {e}")
+
+    def _starboard_channel(self, guild_id: int):
+        channel_id = self.get_config().get('channel_id', 0)
+        if not channel_id:
+            return None
+        guild = self.bot.get_guild(guild_id)
+        return guild.get_channel(channel_id) if guild else None
+
+    def _post_content(self, entry: StarEntry, count: int) -> str:
+        star_emoji = self.get_config().get('emoji', '⭐')
+        return f"{star_emoji} **{count}** | <#{entry.channel_id}>"
+
+    async def _create_post(self, entry: StarEntry) -> bool:
+        """Publica a mensagem no starboard; devolve False se não foi possível"""
+        channel = self._starboard_channel(entry.guild_id)
+        if channel is None:
+            return False
+        message = entry.message
+        if message is None:
+            # Post anterior apagado: voltar a ir buscar a mensagem original
+            source_channel = self.bot.get_channel(entry.channel_id)
+            if source_channel is None:
+                return False
+            self.fetches += 1
+            try:
+                message = await source_channel.fetch_message(entry.message_id)
+            except (discord.NotFound, discord.Forbidden):
+                return False
+
+        # Criar embed
+        embed = discord.Embed(
+            description=message.content or "*[Sem conteúdo de texto]*",
+            color=discord.Color.gold(),
+            timestamp=message.created_at
+        )
+        embed.set_author(
+            name=message.author.display_name,
+            icon_url=message.author.display_avatar.url
+        )
+        embed.add_field(
+            name="Link",
+            value=f"[Ir para mensagem]({message.jump_url})",
+            inline=False
+        )
+
+        # Adicionar imagens
+        if message.attachments:
+            embed.set_image(url=message.attachments[0].url)
+            if len(message.attachments) > 1:
+                embed.set_footer(text=f"+{len(message.attachments)-1} anexos adicionais")
+
+        count = entry.count
+        starboard_msg = await channel.send(content=self._post_content(entry, count), embed=embed)
+        entry.starboard_message_id = starboard_msg.id
+        entry.posted_count = count
+        entry.last_edit = time.monotonic()
+        entry.message = None  # Já não é preciso para editar
+
+        attachment_urls = json.dumps([att.url for att in message.attachments]) if message.attachments else None
+        await self.db.create_starboard_entry(
+            str(entry.guild_id),
+            str(message.id),
+            str(entry.channel_id),
+            str(message.author.id),
+            str(starboard_msg.id),
+            count,
+            message.content,
+            attachment_urls
+        )
+        return True
+
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "tracked": len(self.entries),
+            "dirty": len(self._dirty),
+            "fetches": self.fetches,
+            "edits": self.edits,
+        }
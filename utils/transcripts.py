@@ -0,0 +1,134 @@
+"""
+Transcrições de Tickets para EPA BOT
+Exporta o histórico de um canal em streaming para HTML e JSONL comprimidos
+(gzip), sem manter a conversa inteira em memória
+"""
+
+import asyncio
+import gzip
+import html
+import json
+import os
+from typing import Optional, Tuple
+
+
+HTML_HEADER = """<!DOCTYPE html>
+<html lang="pt">
+<head>
+<meta charset="utf-8">
+<title>{title}</title>
+<style>
+body {{ background: #313338; color: #dbdee1; font-family: sans-serif; margin: 24px; }}
+h1 {{ font-size: 20px; }}
+.msg {{ padding: 6px 0; border-bottom: 1px solid #3f4147; }}
+.author {{ font-weight: bold; color: #f2f3f5; }}
+.time {{ color: #949ba4; font-size: 12px; margin-left: 6px; }}
+.content {{ white-space: pre-wrap; margin-top: 2px; }}
+.extra {{ color: #00a8fc; font-size: 13px; }}
+</style>
+</head>
+<body>
+<h1>{title}</h1>
+"""
+
+HTML_FOOTER = """<p class="time">{count} mensagens</p>
+</body>
+</html>
+"""
+
+
+def message_to_dict(message) -> dict:
+    """Campos de uma mensagem guardados na transcrição"""
+    return {
+        "id": message.id,
+        "author_id": message.author.id,
+        "author": str(message.author),
+        "created_at": message.created_at.isoformat(),
+        "edited_at": message.edited_at.isoformat() if message.edited_at else None,
+        "content": message.content,
+        "attachments": [attachment.url for attachment in message.attachments],
+        "embeds": [embed.title for embed in message.embeds if embed.title],
+    }
+
+
+def message_to_html(data: dict) -> str:
+    extra = "".join(
+        f'<div class="extra">📎 <a href="{html.escape(url)}">{html.escape(url.rsplit("/", 1)[-1])}</a></div>'
+        for url in data["attachments"]
+    )
+    extra += "".join(
+        f'<div class="extra">🗂️ {html.escape(title)}</div>' for title in data["embeds"]
+    )
+    return (
+        f'<div class="msg"><span class="author">{html.escape(data["author"])}</span>'
+        f'<span class="time">{data["created_at"][:19].replace("T", " ")}</span>'
+        f'<div class="content">{html.escape(data["content"])}</div>{extra}</div>\n'
+    )
+
+
+class TranscriptExporter:
+    """Escreve transcrições em <base_dir>/<guild_id>/ticket-<número>.{html,jsonl}.gz
+
+    O histórico é lido por páginas (`channel.history` pede 100 mensagens de
+    cada vez) e cada página é comprimida e escrita numa thread antes de ler
+    a seguinte, por isso a memória usada não depende do tamanho do ticket.
+    Os ficheiros são escritos com sufixo .part e só mudam de nome no fim.
+    """
+
+    PAGE_SIZE = 100
+
+    def __init__(self, base_dir: str = "data/transcripts"):
+        self.base_dir = base_dir
+
+    def path_for(self, guild_id: int, number: int) -> str:
+        """Caminho base (sem extensão) da transcrição de um ticket"""
+        return os.path.join(self.base_dir, str(guild_id), f"ticket-{number:04d}")
+
+    async def export(self, channel, guild_id: int, number: int,
+                     title: Optional[str] = None) -> Tuple[str, str, int]:
+        """Exporta o canal; devolve (caminho HTML, caminho JSONL, nº de mensagens)"""
+        base = self.path_for(guild_id, number)
+        os.makedirs(os.path.dirname(base), exist_ok=True)
+        html_path, jsonl_path = f"{base}.html.gz", f"{base}.jsonl.gz"
+        title = html.escape(title or f"Ticket #{number}")
+
+        html_file = gzip.open(f"{html_path}.part", "wt", encoding="utf-8")
+        jsonl_file = gzip.open(f"{jsonl_path}.part", "wt", encoding="utf-8")
+        count = 0
+        try:
+            html_file.write(HTML_HEADER.format(title=title))
+            html_page, jsonl_page = [], []
+            async for message in channel.history(limit=None, oldest_first=True):
+                data = message_to_dict(message)
+                html_page.append(message_to_html(data))
+                jsonl_page.append(json.dumps(data, ensure_ascii=False) + "\n")
+                count += 1
+                if len(jsonl_page) >= self.PAGE_SIZE:
+                    await asyncio.to_thread(self._write_page, html_file, jsonl_file, html_page, jsonl_page)
+                    html_page, jsonl_page = [], []
+            html_page.append(HTML_FOOTER.format(count=count))
+            await asyncio.to_thread(self._write_page, html_file, jsonl_file, html_page, jsonl_page)
+        except BaseException:
+            html_file.close()
+            jsonl_file.close()
+            for path in (html_path, jsonl_path):
+                try:
+                    os.remove(f"{path}.part")
+                except OSError:
+                    pass
+            raise
+
+        await asyncio.to_thread(self._finish, html_file, jsonl_file, html_path, jsonl_path)
+        return html_path, jsonl_path, count
+
+    @staticmethod
+    def _write_page(html_file, jsonl_file, html_page, jsonl_page):
+        html_file.write("".join(html_page))
+        jsonl_file.write("".join(jsonl_page))
+
+    @staticmethod
+    def _finish(html_file, jsonl_file, html_path, jsonl_path):
+        html_file.close()
+        jsonl_file.close()
+        os.replace(f"{html_path}.part", html_path)
+        os.replace(f"{jsonl_path}.part", jsonl_path)
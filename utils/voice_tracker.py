@@ -0,0 +1,164 @@
+"""
+Registo de Tempo em Voz para EPA BOT
+Sessões de voz em memória com checkpoint periódico em SQLite, recuperação
+após reinício e gravação das sessões terminadas em lote
+"""
+
+import asyncio
+import logging
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional, Tuple
+
+
+def split_by_day(start: datetime, end: datetime) -> List[Tuple[str, int]]:
+    """[(data, segundos)] de um intervalo, dividido à meia-noite (UTC)"""
+    parts = []
+    while start < end:
+        midnight = datetime(start.year, start.month, start.day) + timedelta(days=1)
+        part_end = min(end, midnight)
+        parts.append((start.strftime('%Y-%m-%d'), int((part_end - start).total_seconds())))
+        start = part_end
+    return parts
+
+
+class VoiceSession:
+    __slots__ = ("channel_id", "join_time")
+
+    def __init__(self, channel_id: int, join_time: datetime):
+        self.channel_id = channel_id
+        self.join_time = join_time
+
+
+class VoiceTracker:
+    """Sessões de voz abertas por (servidor, utilizador)
+
+    Entradas, saídas e mudanças de canal só mexem no dicionário em memória;
+    as sessões terminadas ficam numa fila. A cada CHECKPOINT_INTERVAL
+    segundos uma única transação grava a fila (voice_stats, voice_totals e
+    voice_daily) e substitui o checkpoint das sessões em curso. Depois de um
+    reinício, as sessões do checkpoint são fechadas na hora do checkpoint (o
+    último momento conhecido) e os membros que estão em voz começam sessões
+    novas a partir dos estados de voz atuais.
+    """
+
+    CHECKPOINT_INTERVAL = 60
+
+    def __init__(self, bot, db, get_config: Callable[[], Dict]):
+        self.bot = bot
+        self.db = db
+        self.get_config = get_config
+        self.logger = logging.getLogger("EPA BOT.Voice")
+
+        self.sessions: Dict[Tuple[int, int], VoiceSession] = {}
+        self._closed: List[Tuple[str, str, str, datetime, datetime, int]] = []
+        self._task: Optional[asyncio.Task] = None
+        self._resumed = False  # Só substituir o checkpoint depois de o recuperar
+
+    # --- Ciclo de vida ---
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Para o ciclo e grava um último checkpoint"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.checkpoint()
+
+    async def _run(self):
+        await self.recover()
+        await self.bot.wait_until_ready()
+        self.resume_from_voice_states()
+        self._resumed = True
+        # Gravar já as sessões recuperadas e o novo estado
+        await self.checkpoint()
+        while True:
+            await asyncio.sleep(self.CHECKPOINT_INTERVAL)
+            await self.checkpoint()
+
+    async def recover(self):
+        """Fecha as sessões que estavam em curso no último checkpoint"""
+        try:
+            open_sessions = await self.db.get_open_voice_sessions()
+        except Exception as e:
+            self.logger.error(f"❌ Erro ao ler sessões de voz em curso: {e}")
+            return
+
+        min_session_time = self.get_config().get('min_session_time', 60)
+        for session in open_sessions:
+            duration = int((session['checkpoint_at'] - session['join_time']).total_seconds())
+            if duration >= min_session_time:
+                self._closed.append((
+                    session['user_id'], session['guild_id'], session['channel_id'],
+                    session['join_time'], session['checkpoint_at'], duration
+                ))
+        if open_sessions:
+            self.logger.info(f"🎤 {len(open_sessions)} sessões de voz recuperadas do checkpoint")
+
+    def resume_from_voice_states(self):
+        """Abre sessões para quem já está em canais de voz"""
+        now = datetime.utcnow()
+        for guild in self.bot.guilds:
+            for channel in list(guild.voice_channels) + list(guild.stage_channels):
+                for member in channel.members:
+                    if not member.bot:
+                        self.sessions.setdefault((guild.id, member.id), VoiceSession(channel.id, now))
+
+    # --- Eventos ---
+
+    def on_voice_state_update(self, member, before, after):
+        """Atualiza as sessões (entrada, saída ou mudança de canal)"""
+        if before.channel == after.channel:
+            return  # Mute, deafen, stream...
+        key = (member.guild.id, member.id)
+        now = datetime.utcnow()
+
+        if before.channel is not None:
+            self._close(key, now)
+        if after.channel is not None:
+            self.sessions[key] = VoiceSession(after.channel.id, now)
+
+    def _close(self, key: Tuple[int, int], leave_time: datetime):
+        session = self.sessions.pop(key, None)
+        if session is None:
+            return
+        duration = int((leave_time - session.join_time).total_seconds())
+        if duration >= self.get_config().get('min_session_time', 60):
+            guild_id, user_id = key
+            self._closed.append((
+                str(user_id), str(guild_id), str(session.channel_id),
+                session.join_time, leave_time, duration
+            ))
+
+    # --- Persistência ---
+
+    async def checkpoint(self):
+        """Grava as sessões terminadas e o estado das sessões em curso"""
+        if not self._resumed and not self._closed:
+            return
+        closed, self._closed = self._closed, []
+        open_sessions = [
+            (str(user_id), str(guild_id), str(session.channel_id), session.join_time)
+            for (guild_id, user_id), session in self.sessions.items()
+        ] if self._resumed else None
+        try:
+            await self.db.record_voice_sessions(closed, open_sessions, datetime.utcnow())
+        except Exception as e:
+            self._closed = closed + self._closed
+            self.logger.error(f"❌ Erro ao gravar sessões de voz: {e}")
+
+    def current_duration(self, guild_id: int, user_id: int) -> int:
+        """Segundos da sessão em curso (0 se não estiver em voz)"""
+        session = self.sessions.get((guild_id, user_id))
+        if session is None:
+            return 0
+        return int((datetime.utcnow() - session.join_time).total_seconds())
+
+    def stats(self) -> Dict[str, int]:
+        return {"open": len(self.sessions), "pending": len(self._closed)}
@@ -0,0 +1,112 @@
+"""
+Filtro de Palavras Compilado para EPA BOT
+Compila a lista de palavras proibidas uma única vez numa regex em forma de
+árvore de prefixos, com normalização de acentos e leetspeak
+"""
+
+import re
+import unicodedata
+from typing import Dict, Iterable, Optional
+
+
+# Substituições de leetspeak mais comuns (aplicadas depois de minúsculas).
+# Pontuação como "!" fica de fora para não colar a letras no fim de palavras
+LEET_MAP = str.maketrans({
+    "0": "o",
+    "1": "i",
+    "3": "e",
+    "4": "a",
+    "@": "a",
+    "5": "s",
+    "$": "s",
+    "7": "t",
+    "8": "b",
+    "9": "g",
+})
+
+
+def normalize(text: str) -> str:
+    """Minúsculas, sem acentos e com leetspeak convertido
+
+    Aplicada tanto às palavras configuradas como às mensagens, por isso
+    "merda", "MÉRDA" e "m3rd4" resultam no mesmo texto.
+    """
+    text = unicodedata.normalize("NFKD", text.casefold())
+    text = "".join(ch for ch in text if not unicodedata.combining(ch))
+    return text.translate(LEET_MAP)
+
+
+class WordFilter:
+    """Lista de palavras proibidas compilada numa única regex
+
+    As palavras (normalizadas) são organizadas numa árvore de prefixos e
+    convertidas numa regex sem alternativas repetidas: em cada posição da
+    mensagem o motor só percorre os ramos que partilham o prefixo lido, em
+    vez de testar as palavras uma a uma. Só é recompilada quando a lista
+    muda (`/wordfilter add|remove`).
+    """
+
+    def __init__(self, words: Iterable[str] = ()):
+        self._pattern: Optional[re.Pattern] = None
+        self._originals: Dict[str, str] = {}
+        self.compile(words)
+
+    def __len__(self) -> int:
+        return len(self._originals)
+
+    def compile(self, words: Iterable[str]):
+        """(Re)compila a lista de palavras"""
+        originals: Dict[str, str] = {}
+        for word in words:
+            key = normalize(word.strip())
+            if key and key not in originals:
+                originals[key] = word
+
+        pattern = None
+        if originals:
+            trie: dict = {}
+            for key in originals:
+                node = trie
+                for ch in key:
+                    node = node.setdefault(ch, {})
+                node[""] = True
+            pattern = re.compile(r"(?<!\w)" + self._trie_regex(trie) + r"(?!\w)")
+
+        # Troca atómica: quem estiver a usar o filtro antigo não é afetado
+        self._pattern, self._originals = pattern, originals
+
+    @classmethod
+    def _trie_regex(cls, node: dict) -> str:
+        optional = "" in node
+        singles = []
+        branches = []
+        for ch in sorted(k for k in node if k):
+            child = node[ch]
+            if len(child) == 1 and "" in child:
+                singles.append(ch)
+            else:
+                branches.append(re.escape(ch) + cls._trie_regex(child))
+
+        if singles:
+            if len(singles) == 1:
+                branches.append(re.escape(singles[0]))
+            else:
+                branches.append("[" + "".join(re.escape(ch) for ch in singles) + "]")
+
+        if not branches:
+            return ""
+
+        if len(branches) == 1 and not optional:
+            return branches[0]
+        body = "(?:" + "|".join(branches) + ")"
+        return body + "?" if optional else body
+
+    def match(self, content: str) -> Optional[str]:
+        """Primeira palavra proibida encontrada (como foi configurada) ou None"""
+        pattern = self._pattern
+        if pattern is None or not content:
+            return None
+        found = pattern.search(normalize(content))
+        if found is None:
+            return None
+        return self._originals.get(found.group(0))
@@ -0,0 +1,250 @@
+"""
+Escrita Diferida (write-behind) para EPA BOT
+Acumula XP, mensagens, streaks e estatísticas diárias em memória e
+escreve tudo numa única transação periódica
+"""
+
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+from datetime import datetime
+from typing import Dict, Iterator, Optional, Tuple
+
+
+class ActivityBuffer:
+    """Buffer de atividade por (utilizador, servidor)
+
+    Cada mensagem elegível para XP gerava várias transações (user_levels,
+    user_streaks, message_stats). Aqui os incrementos são agregados e
+    escritos de uma vez a cada `flush_interval` segundos ou quando se
+    acumulam `max_pending` eventos.
+    """
+
+    def __init__(self, pool, flush_interval: float = 2.0, max_pending: int = 500):
+        self.pool = pool
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self.logger = logging.getLogger("EPA BOT.Database")
+
+        # (user_id, guild_id) -> [xp, mensagens, nível, last_message_at]
+        self._levels: Dict[Tuple[str, str], list] = {}
+        # (user_id, guild_id, streak_type) -> incrementos
+        self._streaks: Dict[Tuple[str, str, str], int] = {}
+        # (user_id, guild_id, data) -> [mensagens, xp]
+        self._stats: Dict[Tuple[str, str, str], list] = {}
+        self._pending_events = 0
+
+        # Lote a ser escrito neste momento (continua visível nas leituras
+        # até a transação terminar)
+        self._inflight_levels: Dict[Tuple[str, str], list] = {}
+        self._inflight_streaks: Dict[Tuple[str, str, str], int] = {}
+
+        self._flush_lock = asyncio.Lock()
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+        # Métricas
+        self.flush_count = 0
+        self.events_flushed = 0
+
+    @property
+    def pending_events(self) -> int:
+        return self._pending_events
+
+    # --- Registo de eventos ---
+
+    def record_message(self, user_id: str, guild_id: str, xp_gain: int, level: int,
+                       streak_type: Optional[str] = "messages"):
+        """Regista uma mensagem que deu XP"""
+        now = datetime.utcnow()
+
+        entry = self._levels.get((user_id, guild_id))
+        if entry is None:
+            self._levels[(user_id, guild_id)] = [xp_gain, 1, level, now.timestamp()]
+        else:
+            entry[0] += xp_gain
+            entry[1] += 1
+            entry[2] = max(entry[2], level)
+            entry[3] = now.timestamp()
+
+        if streak_type:
+            key = (user_id, guild_id, streak_type)
+            self._streaks[key] = self._streaks.get(key, 0) + 1
+
+        stats_key = (user_id, guild_id, now.date().isoformat())
+        stats = self._stats.get(stats_key)
+        if stats is None:
+            self._stats[stats_key] = [1, xp_gain]
+        else:
+            stats[0] += 1
+            stats[1] += xp_gain
+
+        self._pending_events += 1
+        if self._pending_events >= self.max_pending:
+            self._wakeup.set()
+
+    # --- Leitura dos valores ainda não escritos ---
+
+    def pending_level(self, user_id: str, guild_id: str) -> Optional[tuple]:
+        """(xp, mensagens, nível) ainda por escrever, ou None"""
+        key = (user_id, guild_id)
+        entry = self._levels.get(key)
+        inflight = self._inflight_levels.get(key)
+        if entry is None and inflight is None:
+            return None
+
+        xp = messages = 0
+        level = 1
+        for e in (entry, inflight):
+            if e is not None:
+                xp += e[0]
+                messages += e[1]
+                level = max(level, e[2])
+        return xp, messages, level
+
+    def pending_streak(self, user_id: str, guild_id: str, streak_type: str) -> int:
+        key = (user_id, guild_id, streak_type)
+        return self._streaks.get(key, 0) + self._inflight_streaks.get(key, 0)
+
+    def pending_levels_in(self, guild_id: str) -> Iterator[Tuple[str, int, int]]:
+        """(user_id, xp, mensagens) por escrever num servidor"""
+        for source in (self._levels, self._inflight_levels):
+            for (user_id, g), entry in source.items():
+                if g == guild_id:
+                    yield user_id, entry[0], entry[1]
+
+    def pending_streaks_in(self, guild_id: str, streak_type: str) -> Iterator[Tuple[str, int]]:
+        """(user_id, incremento) de streaks por escrever num servidor"""
+        for source in (self._streaks, self._inflight_streaks):
+            for (user_id, g, t), count in source.items():
+                if g == guild_id and t == streak_type:
+                    yield user_id, count
+
+    @asynccontextmanager
+    async def paused(self):
+        """Impede flushes enquanto o bloco corre
+
+        Útil para ler um snapshot da base de dados e somar-lhe os valores
+        pendentes sem que um flush a meio conte (ou perca) incrementos.
+        """
+        async with self._flush_lock:
+            yield
+
+    # --- Ciclo de vida ---
+
+    def start(self):
+        """Inicia a tarefa de escrita periódica"""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._flush_loop())
+
+    async def stop(self):
+        """Para a tarefa periódica e escreve o que falta"""
+        if self._task and not self._task.done():
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        self._task = None
+        await self.flush()
+
+    async def _flush_loop(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+
+            try:
+                await self.flush()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.logger.error(f"Erro ao escrever atividade em lote: {e}", exc_info=True)
+
+    async def flush(self):
+        """Escreve todos os incrementos pendentes numa única transação"""
+        async with self._flush_lock:
+            if not self._pending_events:
+                return
+
+            levels, streaks, stats = self._levels, self._streaks, self._stats
+            events = self._pending_events
+            self._levels, self._streaks, self._stats = {}, {}, {}
+            self._pending_events = 0
+            self._inflight_levels, self._inflight_streaks = levels, streaks
+
+            updated_at = datetime.utcnow().isoformat()
+            try:
+                async with self.pool.transaction() as db:
+                    await db.executemany("""
+                        INSERT INTO user_levels (user_id, guild_id, xp, level, messages_sent, last_message_at, updated_at)
+                        VALUES (?, ?, ?, ?, ?, ?, ?)
+                        ON CONFLICT(user_id, guild_id) DO UPDATE SET
+                            xp = xp + excluded.xp,
+                            level = MAX(level, excluded.level),
+                            messages_sent = messages_sent + excluded.messages_sent,
+                            last_message_at = excluded.last_message_at,
+                            updated_at = excluded.updated_at
+                    """, [
+                        (user_id, guild_id, xp, level, messages, last_at, updated_at)
+                        for (user_id, guild_id), (xp, messages, level, last_at) in levels.items()
+                    ])
+
+                    await db.executemany("""
+                        INSERT INTO user_streaks (user_id, guild_id, streak_type, current_streak, best_streak, last_activity)
+                        VALUES (?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
+                        ON CONFLICT(user_id, guild_id, streak_type) DO UPDATE SET
+                            current_streak = current_streak + excluded.current_streak,
+                            best_streak = MAX(best_streak, current_streak + excluded.current_streak),
+                            last_activity = CURRENT_TIMESTAMP
+                    """, [
+                        (user_id, guild_id, streak_type, count, count)
+                        for (user_id, guild_id, streak_type), count in streaks.items()
+                    ])
+
+                    await db.executemany("""
+                        INSERT INTO message_stats (user_id, guild_id, date, message_count, xp_gained)
+                        VALUES (?, ?, ?, ?, ?)
+                        ON CONFLICT(user_id, guild_id, date) DO UPDATE SET
+                            message_count = message_count + excluded.message_count,
+                            xp_gained = xp_gained + excluded.xp_gained
+                    """, [
+                        (user_id, guild_id, date, messages, xp)
+                        for (user_id, guild_id, date), (messages, xp) in stats.items()
+                    ])
+            except BaseException:
+                # Repor os incrementos para a próxima tentativa
+                self._merge_back(levels, streaks, stats, events)
+                raise
+            finally:
+                self._inflight_levels, self._inflight_streaks = {}, {}
+
+            self.flush_count += 1
+            self.events_flushed += events
+
+    def _merge_back(self, levels, streaks, stats, events):
+        """Junta incrementos não escritos com os que chegaram entretanto"""
+        for key, (xp, messages, level, last_at) in levels.items():
+            entry = self._levels.get(key)
+            if entry is None:
+                self._levels[key] = [xp, messages, level, last_at]
+            else:
+                entry[0] += xp
+                entry[1] += messages
+                entry[2] = max(entry[2], level)
+                entry[3] = max(entry[3], last_at)
+
+        for key, count in streaks.items():
+            self._streaks[key] = self._streaks.get(key, 0) + count
+
+        for key, (messages, xp) in stats.items():
+            entry = self._stats.get(key)
+            if entry is None:
+                self._stats[key] = [messages, xp]
+            else:
+                entry[0] += messages
+                entry[1] += xp
+
+        self._pending_events += events
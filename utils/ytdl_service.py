@@ -0,0 +1,192 @@
+"""
+Serviço de Extração (yt-dlp) para EPA BOT
+Pool de workers própria e limitada, instâncias de YoutubeDL reutilizadas por
+estratégia, pedidos iguais em curso partilhados e estratégias em corrida
+"""
+
+import asyncio
+import logging
+import threading
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+import yt_dlp
+
+
+# Instâncias de YoutubeDL do worker atual: {(grupo, índice): YoutubeDL}.
+# O YoutubeDL não é thread-safe, por isso cada thread (ou processo) tem as suas.
+_local = threading.local()
+_strategies: Dict[str, List[dict]] = {}
+
+
+def _init_worker(strategies: Dict[str, List[dict]]):
+    """Inicializador dos processos da pool (as estratégias não vêm por pedido)"""
+    global _strategies
+    _strategies = strategies
+
+
+def _get_ydl(group: str, index: int, strategies: Dict[str, List[dict]]) -> yt_dlp.YoutubeDL:
+    instances = getattr(_local, "instances", None)
+    if instances is None:
+        instances = _local.instances = {}
+    ydl = instances.get((group, index))
+    if ydl is None:
+        ydl = instances[(group, index)] = yt_dlp.YoutubeDL(strategies[group][index])
+    return ydl
+
+
+def _compact(data: Optional[dict], target: str) -> Optional[dict]:
+    """Reduz o resultado do yt-dlp aos campos usados pelo bot"""
+    if not data:
+        return None
+    if "entries" in data:
+        entries = [entry for entry in (data.get("entries") or []) if entry]
+        if not entries:
+            return None
+        data = entries[0]
+    if not data.get("url"):
+        return None
+    return {
+        "title": data.get("title", "Desconhecido"),
+        "url": data.get("url"),
+        "webpage_url": data.get("webpage_url") or (target if target.startswith("http") else None),
+        "duration": data.get("duration", 0),
+        "uploader": data.get("uploader", "Desconhecido"),
+        "thumbnail": data.get("thumbnail"),
+    }
+
+
+def _extract(group: str, index: int, target: str,
+             strategies: Optional[Dict[str, List[dict]]] = None) -> Optional[dict]:
+    """Corre uma estratégia num worker (thread ou processo)"""
+    ydl = _get_ydl(group, index, strategies if strategies is not None else _strategies)
+    return _compact(ydl.extract_info(target, download=False), target)
+
+
+class ExtractionService:
+    """Extração de músicas fora do event loop
+
+    - Pool própria com `max_workers` (threads ou, opcionalmente, processos
+      para fugir ao GIL), para as extrações não ocuparem a pool por omissão
+      do asyncio nem crescerem sem limite.
+    - Cada worker guarda um YoutubeDL configurado por estratégia em vez de
+      criar um novo em cada tentativa.
+    - Pedidos iguais em curso (mesmo grupo e alvo) esperam pela mesma
+      extração.
+    - As estratégias de um grupo correm em corrida escalonada: a primeira
+      arranca logo, a seguinte arranca quando uma falha ou ao fim de
+      STAGGER segundos, e o primeiro resultado válido cancela as restantes.
+      Escalonar evita multiplicar por cinco os pedidos ao YouTube quando a
+      primeira estratégia funciona.
+    """
+
+    STAGGER = 2.0
+
+    def __init__(self, strategies: Dict[str, List[dict]], max_workers: int = 4,
+                 attempt_timeout: float = 15.0, use_processes: bool = False):
+        self.strategies = strategies
+        self.attempt_timeout = attempt_timeout
+        self.use_processes = use_processes
+        self.logger = logging.getLogger("EPA BOT.Music")
+        if use_processes:
+            self._executor: Executor = ProcessPoolExecutor(
+                max_workers=max_workers, initializer=_init_worker, initargs=(strategies,)
+            )
+        else:
+            self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="ytdl")
+        self._inflight: Dict[Tuple[str, str], asyncio.Future] = {}
+
+        # Métricas
+        self.extractions = 0
+        self.coalesced = 0
+        self.failures = 0
+        self.wins: Dict[str, List[int]] = {group: [0] * len(opts) for group, opts in strategies.items()}
+        self.total_time = 0.0
+
+    async def extract(self, target: str, group: str = "search") -> Optional[dict]:
+        """Extrai `target` com as estratégias de `group` (None se todas falharem)"""
+        key = (group, target)
+        task = self._inflight.get(key)
+        if task is not None:
+            self.coalesced += 1
+        else:
+            # Tarefa independente: cancelar um dos pedidos não cancela os outros
+            task = asyncio.ensure_future(self._race(group, target))
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        return await asyncio.shield(task)
+
+    async def _race(self, group: str, target: str) -> Optional[dict]:
+        loop = asyncio.get_running_loop()
+        strategies = self.strategies[group]
+        start = time.monotonic()
+        self.extractions += 1
+
+        running: Dict[asyncio.Future, int] = {}
+        next_index = 0
+        launch = True
+        try:
+            while running or next_index < len(strategies):
+                if launch and next_index < len(strategies):
+                    running[self._submit(loop, group, next_index, target)] = next_index
+                    next_index += 1
+                launch = False
+
+                done, _ = await asyncio.wait(
+                    running, timeout=self.STAGGER if next_index < len(strategies) else None,
+                    return_when=asyncio.FIRST_COMPLETED
+                )
+                if not done:
+                    # Nenhuma respondeu a tempo: lançar a estratégia seguinte em paralelo
+                    launch = True
+                    continue
+
+                for task in done:
+                    index = running.pop(task)
+                    launch = True  # Se esta falhar, a seguinte arranca já
+                    try:
+                        result = task.result()
+                    except asyncio.TimeoutError:
+                        self.logger.warning(f"⏱️ Estratégia {group}#{index + 1} expirou (timeout)")
+                        continue
+                    except Exception as e:
+                        self.logger.warning(f"Estratégia {group}#{index + 1} falhou: {e}")
+                        continue
+                    if result:
+                        self.wins[group][index] += 1
+                        self.logger.info(
+                            f"✅ Extraído com a estratégia {group}#{index + 1} "
+                            f"em {time.monotonic() - start:.1f}s: {result['title']}"
+                        )
+                        return result
+                    self.logger.warning(f"⚠️ Estratégia {group}#{index + 1} não retornou dados válidos")
+
+            self.failures += 1
+            return None
+        finally:
+            # Cancela as que ainda não começaram (as que já correm acabam sozinhas)
+            for task in running:
+                task.cancel()
+            self.total_time += time.monotonic() - start
+
+    def _submit(self, loop, group: str, index: int, target: str) -> asyncio.Future:
+        if self.use_processes:
+            call = loop.run_in_executor(self._executor, _extract, group, index, target)
+        else:
+            call = loop.run_in_executor(self._executor, _extract, group, index, target, self.strategies)
+        return asyncio.ensure_future(asyncio.wait_for(call, timeout=self.attempt_timeout))
+
+    def shutdown(self):
+        """Fecha a pool (sem esperar pelas extrações em curso)"""
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def stats(self) -> Dict[str, object]:
+        return {
+            "extractions": self.extractions,
+            "coalesced": self.coalesced,
+            "failures": self.failures,
+            "in_flight": len(self._inflight),
+            "wins": {group: list(counts) for group, counts in self.wins.items()},
+            "avg_time": (self.total_time / self.extractions) if self.extractions else 0.0,
+        }